@@ -1,16 +1,88 @@
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import aclosing
+import json
+import math
 import uuid
 
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app.core.dependencies import IngestionServiceDep, QAServiceDep, RerankServiceDep, VectorDBDep
-from app.models.process_document_request import ProcessDocumentRequest, SearchVectorDataBaseRequest
+from app.infrastructure.scheduling.rate_limiter import RateLimitRejected
+from app.models.process_document_request import (
+    BatchSearchVectorDataBaseRequest,
+    ProcessDocumentRequest,
+    SearchVectorDataBaseRequest,
+    SimilarChunksRequest,
+)
 from app.utils import logger
 
 
 router = APIRouter()
 
 
+def _requested_titles(request: SearchVectorDataBaseRequest) -> list[str]:
+    """Titles a QA request is scoped to (`title` plus `titles`, without duplicates)."""
+    titles = [request.title] if request.title else []
+    titles += [title for title in request.titles or [] if title not in titles]
+    return titles
+
+
+def _title_filter(titles: list[str]) -> dict:
+    """Metadata filter used to check that the requested documents exist."""
+    if len(titles) > 1:
+        return {"titulo": {"$in": titles}}
+    return {"titulo": titles[0] if titles else None}
+
+
+def _rate_limited(error: RateLimitRejected) -> HTTPException:
+    """429 with a Retry-After hint for a call the OpenAI scheduler rejected."""
+    logger.warning(str(error))
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"Límite de peticiones a OpenAI: {error}",
+        headers={"Retry-After": str(max(math.ceil(error.retry_after_s), 1))},
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    """One Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _no_documents_events() -> AsyncGenerator[tuple[str, dict], None]:
+    yield "sources", {"source_documents": [], "chunks_used": 0}
+    yield "done", {"usage": None, "timing": None}
+
+
+def _event_stream(
+    events: AsyncGenerator[tuple[str, dict], None], http_request: Request
+) -> StreamingResponse:
+    """SSE response over (event, data) pairs; generation stops when the client disconnects."""
+
+    async def body() -> AsyncIterator[str]:
+        # * Closing the service iterator cancels the in-flight LLM request
+        async with aclosing(events):
+            try:
+                async for event, data in events:
+                    if await http_request.is_disconnected():
+                        logger.info("Client disconnected: generation stopped")
+                        return
+                    yield _sse(event, data)
+            except Exception as e:
+                # * Headers are already sent: report the failure as an event
+                error_message = f"Error en streaming: {type(e).__name__} - {str(e)}"
+                logger.error(error_message)
+                yield _sse("error", {"detail": error_message})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/api/v1/document")
 async def process_document(
     request: ProcessDocumentRequest,
@@ -20,7 +92,9 @@ async def process_document(
         query_id = str(uuid.uuid4())
         logger.info(f"Processing document: {request.title} (query_id={query_id})")
 
-        result_process = ingestion_service.ingest_document(
+        # * Off the event loop: bulk embedding calls may wait for rate limit budget
+        result_process = await run_in_threadpool(
+            ingestion_service.ingest_document,
             base64_content=request.document_content,
             title=request.title,
             document_type=request.document_type or "documento-pdf",
@@ -34,6 +108,9 @@ async def process_document(
             content={"query_id": query_id, "status": result_process},
         )
 
+    except RateLimitRejected as e:
+        raise _rate_limited(e)
+
     except Exception as e:
         error_message = f"Error procesando documento: {type(e).__name__} - {str(e)}"
         logger.error(error_message)
@@ -53,11 +130,21 @@ async def search_vdb(
         if not vdb_repo.check_document_exists({"titulo": request.title}):
             return {"results": []}
 
-        # Perform similarity search
-        vdb_results = vdb_repo.similarity_search_with_score(
+        # Perform similarity (MMR, adaptive k or small-to-big) search
+        vdb_results = vdb_repo.search_with_scores(
             query=request.query,
-            k=request.k_results,
-            metadata_filter=request.metadata_filter,
+            search_type=request.search_type,
+            search_kwargs={
+                "k": request.k_results,
+                "filter": request.metadata_filter,
+                "fetch_k": request.fetch_k,
+                "lambda_mult": request.lambda_mult,
+                "score_threshold": request.score_threshold,
+                "score_gap": request.score_gap,
+                "token_budget": request.token_budget,
+                "expand": request.expand,
+                "window": request.window,
+            },
         )
 
         # Parse results (Document, score) tuples
@@ -65,6 +152,9 @@ async def search_vdb(
 
         return {"results": parsed_results}
 
+    except RateLimitRejected as e:
+        raise _rate_limited(e)
+
     except Exception as e:
         error_message = f"Error en búsqueda: {type(e).__name__} - {str(e)}"
         logger.error(error_message)
@@ -74,6 +164,72 @@ async def search_vdb(
         )
 
 
+@router.post("/api/v1/vdb_batch_result", status_code=status.HTTP_200_OK)
+async def batch_search_vdb(
+    request: BatchSearchVectorDataBaseRequest,
+    vdb_repo: VectorDBDep,
+):
+    try:
+        # Check if document exists
+        if request.title and not vdb_repo.check_document_exists({"titulo": request.title}):
+            return {"results": [{"query": item.query, "results": []} for item in request.queries]}
+
+        # One embeddings call and one Chroma query per distinct filter
+        batch_results = vdb_repo.batch_similarity_search_with_score(
+            queries=[item.query for item in request.queries],
+            k_values=[item.k_results for item in request.queries],
+            metadata_filters=[item.metadata_filter for item in request.queries],
+        )
+
+        # Parse results (Document, score) tuples per query
+        return {
+            "results": [
+                {
+                    "query": item.query,
+                    "results": [(doc.model_dump(), score) for doc, score in vdb_results],
+                }
+                for item, vdb_results in zip(request.queries, batch_results)
+            ]
+        }
+
+    except RateLimitRejected as e:
+        raise _rate_limited(e)
+
+    except Exception as e:
+        error_message = f"Error en búsqueda por lotes: {type(e).__name__} - {str(e)}"
+        logger.error(error_message)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=error_message,
+        )
+
+
+@router.post("/api/v1/vdb_similar", status_code=status.HTTP_200_OK)
+async def search_similar_chunks(
+    request: SimilarChunksRequest,
+    vdb_repo: VectorDBDep,
+):
+    try:
+        # Stored embeddings are reused: no embeddings call
+        vdb_results = vdb_repo.similar_chunks_search_with_score(
+            chunk_ids=request.chunk_ids,
+            k=request.k_results,
+            metadata_filter=request.metadata_filter,
+            exclude_sources=request.exclude_sources,
+        )
+
+        # Parse results (Document, score) tuples
+        return {"results": [(doc.model_dump(), score) for doc, score in vdb_results]}
+
+    except Exception as e:
+        error_message = f"Error en búsqueda de similares: {type(e).__name__} - {str(e)}"
+        logger.error(error_message)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=error_message,
+        )
+
+
 @router.post("/api/v1/qa", status_code=status.HTTP_200_OK)
 async def query_qa_chain(
     request: SearchVectorDataBaseRequest,
@@ -82,27 +238,48 @@ async def query_qa_chain(
 ):
     try:
         # Check if document exists
-        if not vdb_repo.check_document_exists({"titulo": request.title}):
+        titles = _requested_titles(request)
+        if not vdb_repo.check_document_exists(_title_filter(titles)):
             return {
                 "query": request.query,
                 "result": None,
                 "source_documents": [],
+                "chunks_used": 0,
             }
 
-        # Get answer from QA service
-        qa_result = qa_service.answer_question(
+        # Get answer from QA service (off the event loop so identical requests can coalesce)
+        qa_result = await run_in_threadpool(
+            qa_service.answer_question,
             query=request.query,
             document_type=request.document_type or "documento-pdf",
             k_results=request.k_results,
+            search_type=request.search_type,
+            fetch_k=request.fetch_k,
+            lambda_mult=request.lambda_mult,
+            titles=titles,
+            score_threshold=request.score_threshold,
+            score_gap=request.score_gap,
+            token_budget=request.token_budget,
+            expand=request.expand,
+            window=request.window,
+            chain_type=request.chain_type,
         )
 
         # Parse response (convert Documents to dicts)
+        source_documents = qa_result.get("source_documents", [])
         return {
             "query": qa_result.get("query", request.query),
             "result": qa_result.get("result"),
-            "source_documents": [doc.model_dump() for doc in qa_result.get("source_documents", [])],
+            "source_documents": [doc.model_dump() for doc in source_documents],
+            "chunks_used": qa_result.get("chunks_used", len(source_documents)),
+            "context_tokens_saved": qa_result.get("context_tokens_saved"),
+            "map_reduce": qa_result.get("map_reduce"),
+            "route": qa_result.get("route"),
         }
 
+    except RateLimitRejected as e:
+        raise _rate_limited(e)
+
     except Exception as e:
         error_message = f"Error en cadena QA: {type(e).__name__} - {str(e)}"
         logger.error(error_message)
@@ -120,24 +297,44 @@ async def query_reranked_chain(
 ):
     try:
         # Check if document exists
-        if not vdb_repo.check_document_exists({"titulo": request.title}):
+        titles = _requested_titles(request)
+        if not vdb_repo.check_document_exists(_title_filter(titles)):
             return {
                 "query": request.query,
                 "result": None,
+                "chunks_used": 0,
             }
 
-        # Get answer from Rerank service
-        answer = rerank_service.answer_question(
+        # Get answer from Rerank service (off the event loop so identical requests can coalesce)
+        rerank_result = await run_in_threadpool(
+            rerank_service.answer_question,
             query=request.query,
             document_type=request.document_type or "documento-pdf",
             k_results=request.k_results,
+            search_type=request.search_type,
+            fetch_k=request.fetch_k,
+            lambda_mult=request.lambda_mult,
+            titles=titles,
+            score_threshold=request.score_threshold,
+            score_gap=request.score_gap,
+            token_budget=request.token_budget,
+            expand=request.expand,
+            window=request.window,
+            rerank_mode=request.rerank_mode,
         )
 
         return {
             "query": request.query,
-            "result": answer,
+            "result": rerank_result["result"],
+            "chunks_used": rerank_result.get("chunks_used", len(rerank_result["source_documents"])),
+            "context_tokens_saved": rerank_result.get("context_tokens_saved"),
+            "route": rerank_result.get("route"),
+            "rerank": rerank_result.get("rerank"),
         }
 
+    except RateLimitRejected as e:
+        raise _rate_limited(e)
+
     except Exception as e:
         error_message = f"Error en cadena rankeada: {type(e).__name__} - {str(e)}"
         logger.error(error_message)
@@ -145,3 +342,64 @@ async def query_reranked_chain(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=error_message,
         )
+
+
+@router.post("/api/v1/qa_stream", status_code=status.HTTP_200_OK)
+async def stream_qa_chain(
+    request: SearchVectorDataBaseRequest,
+    http_request: Request,
+    qa_service: QAServiceDep,
+    vdb_repo: VectorDBDep,
+):
+    # Check if document exists
+    titles = _requested_titles(request)
+    if not vdb_repo.check_document_exists(_title_filter(titles)):
+        return _event_stream(_no_documents_events(), http_request)
+
+    # Sources first, then LLM tokens as they are generated, then usage and timings
+    events = qa_service.astream_answer(
+        query=request.query,
+        document_type=request.document_type or "documento-pdf",
+        k_results=request.k_results,
+        search_type=request.search_type,
+        fetch_k=request.fetch_k,
+        lambda_mult=request.lambda_mult,
+        titles=titles,
+        score_threshold=request.score_threshold,
+        score_gap=request.score_gap,
+        token_budget=request.token_budget,
+        expand=request.expand,
+        window=request.window,
+    )
+    return _event_stream(events, http_request)
+
+
+@router.post("/api/v1/qa_ranked_stream", status_code=status.HTTP_200_OK)
+async def stream_reranked_chain(
+    request: SearchVectorDataBaseRequest,
+    http_request: Request,
+    rerank_service: RerankServiceDep,
+    vdb_repo: VectorDBDep,
+):
+    # Check if document exists
+    titles = _requested_titles(request)
+    if not vdb_repo.check_document_exists(_title_filter(titles)):
+        return _event_stream(_no_documents_events(), http_request)
+
+    # Reranked sources first, then LLM tokens as they are generated, then usage and timings
+    events = rerank_service.astream_answer(
+        query=request.query,
+        document_type=request.document_type or "documento-pdf",
+        k_results=request.k_results,
+        search_type=request.search_type,
+        fetch_k=request.fetch_k,
+        lambda_mult=request.lambda_mult,
+        titles=titles,
+        score_threshold=request.score_threshold,
+        score_gap=request.score_gap,
+        token_budget=request.token_budget,
+        expand=request.expand,
+        window=request.window,
+        rerank_mode=request.rerank_mode,
+    )
+    return _event_stream(events, http_request)
@@ -1,5 +1,13 @@
 from fastapi import APIRouter, status
 
+from app.core.dependencies import (
+    LLMClientDep,
+    ModelRouterDep,
+    OpenAISchedulerDep,
+    RerankServiceDep,
+    SettingsDep,
+)
+
 
 router = APIRouter(prefix="/rag-docs", tags=["Health"])
 
@@ -7,3 +15,36 @@ router = APIRouter(prefix="/rag-docs", tags=["Health"])
 @router.get("/health", status_code=status.HTTP_200_OK, tags=["Health"])
 def health_msg():
     return {"status": "service up"}
+
+
+@router.get("/metrics/openai", status_code=status.HTTP_200_OK, tags=["Health"])
+def openai_metrics(scheduler: OpenAISchedulerDep):
+    """OpenAI rate limiter metrics: queue depth, budget left, grants, rejections, waits."""
+    if scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, **scheduler.metrics()}
+
+
+@router.get("/metrics/llm_hedging", status_code=status.HTTP_200_OK, tags=["Health"])
+def llm_hedging_metrics(llm_client: LLMClientDep):
+    """LLM hedging metrics: hedged requests, wins and time to first token per provider."""
+    if llm_client.hedging_policy is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_client.hedging_policy.metrics()}
+
+
+@router.get("/metrics/model_router", status_code=status.HTTP_200_OK, tags=["Health"])
+def model_router_metrics(model_router: ModelRouterDep):
+    """QA model cascade metrics: requests, latency and LLM tokens per route."""
+    if model_router is None:
+        return {"enabled": False}
+    return {"enabled": True, "routes": model_router.metrics.snapshot()}
+
+
+@router.get("/metrics/rerank", status_code=status.HTTP_200_OK, tags=["Health"])
+def rerank_metrics(rerank_service: RerankServiceDep, settings: SettingsDep):
+    """Rerank metrics per mode: reranked, cached and skipped calls, skip rate, latency saved."""
+    return {
+        "skip_enabled": settings.rerank_skip_enabled,
+        "modes": rerank_service.metrics.snapshot(),
+    }
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -16,23 +17,142 @@ class Settings(BaseSettings):
 
     # Embeddings Configuration
     embeddings_model: str = Field(default="text-embedding-ada-002")
+    # Recent query vectors kept by the repository (LRU, 0 disables; saves local rerank a call)
+    query_embedding_cache_size: int = Field(default=0)
+
+    # OpenAI rate limiting: per-model budgets, interactive before bulk (max waits; None = forever)
+    openai_scheduler_enabled: bool = Field(default=False)
+    openai_llm_requests_per_minute: int = Field(default=500)
+    openai_llm_tokens_per_minute: int = Field(default=200_000)
+    openai_embeddings_requests_per_minute: int = Field(default=3000)
+    openai_embeddings_tokens_per_minute: int = Field(default=1_000_000)
+    openai_scheduler_max_wait_s: float | None = Field(default=20.0)
+    openai_scheduler_bulk_max_wait_s: float | None = Field(default=300.0)
+
+    # LLM hedging: slow first tokens are raced against a secondary model (see HedgingPolicy)
+    llm_hedging_enabled: bool = Field(default=False)
+    llm_hedge_provider: Literal["bedrock", "openai"] = Field(default="bedrock")
+    llm_hedge_model: str = Field(default="us.anthropic.claude-3-5-haiku-20241022-v1:0")
+    aws_region: str = Field(default="us-east-1")
+    llm_hedge_quantile: float = Field(default=0.95)
+    llm_hedge_initial_delay_s: float = Field(default=2.0)
+    llm_hedge_min_delay_s: float = Field(default=0.5)
+    llm_hedge_max_delay_s: float = Field(default=10.0)
+    llm_hedge_min_samples: int = Field(default=10)
+    llm_hedge_ewma_alpha: float = Field(default=0.1)
+
+    # Vector backend: "chroma" (server or embedded) or "numpy" (memory-mapped exact search,
+    # no Chroma at all; suited to small and mid-size corpora)
+    vector_backend: Literal["chroma", "numpy"] = Field(default="chroma")
+    numpy_store_path: str = Field(default="./vector_store")
+    # Optional in-memory sidecar of compact codes for the first scoring pass ("int8" or
+    # "binary", optionally PCA-reduced); the best k * rescore_factor rows are re-scored exactly
+    numpy_store_quantization: Literal["none", "int8", "binary"] = Field(default="none")
+    numpy_store_pca_dimensions: int | None = Field(default=None)
+    numpy_store_rescore_factor: int = Field(default=4)
 
     # ChromaDB Configuration
+    # "http" talks to a Chroma server, "embedded" runs Chroma in-process (single node)
+    chromadb_mode: Literal["http", "embedded"] = Field(default="http")
+    chromadb_persist_path: str = Field(default="./chroma")
     chromadb_host: str = Field(default="localhost", env="CHROMADB_HOST")  # type: ignore[call-overload]
     chromadb_port: int = Field(default=9000, env="CHROMADB_PORT")  # type: ignore[call-overload]
     chromadb_tenant: str = Field(default="dev")
     chromadb_database: str = Field(default="rag-database")
     chromadb_collection: str = Field(default="rag-docs")
+    # HNSW index of new collections (space, M and ef_construction are fixed at creation;
+    # ef_search is also applied to existing collections on startup)
+    chromadb_hnsw_space: Literal["cosine", "l2", "ip"] = Field(default="cosine")
+    chromadb_hnsw_m: int = Field(default=16)
+    chromadb_hnsw_ef_construction: int = Field(default=100)
+    chromadb_hnsw_ef_search: int = Field(default=100)
+    # One collection per value of this metadata key (e.g. "tipo-documento"); None disables
+    chromadb_partition_key: str | None = Field(default=None)
+    partition_migration_batch_size: int = Field(default=1000)
+
+    # Local HNSW replica Configuration (Chroma remains the source of truth)
+    local_index_enabled: bool = Field(default=False)
+    local_index_max_elements: int = Field(default=500_000)
+    local_index_m: int = Field(default=16)
+    local_index_ef_construction: int = Field(default=200)
+    local_index_ef_search: int = Field(default=100)
+    local_index_reconcile_interval_s: int = Field(default=300)
+    local_index_sync_batch_size: int = Field(default=1000)
+
+    # Document centroid routing: queries without a title search only the closest documents
+    centroid_routing_enabled: bool = Field(default=False)
+    centroid_routing_top_n: int = Field(default=5)
+    centroid_clusters: int = Field(default=1)
+
+    # Local chunk text store keyed by (titulo, pagina, seq), used by small-to-big retrieval
+    chunk_store_enabled: bool = Field(default=False)
+    chunk_store_path: str = Field(default="./chunk_store.sqlite3")
+
+    # Retrieval result cache: chunk ids and scores per (query, filter, k), invalidated by
+    # per-title / per-type generation counters that ingestion bumps
+    retrieval_cache_enabled: bool = Field(default=False)
+    retrieval_cache_path: str = Field(default="./retrieval_cache.sqlite3")
+    retrieval_cache_max_entries: int = Field(default=10_000)
 
     # RAG Configuration
     default_chunk_size: int = Field(default=800)
     default_chunk_overlap: int = Field(default=50)
     default_k_results: int = Field(default=4)
     default_rerank_top_n: int = Field(default=3)
+    # Maximal marginal relevance (search_type="mmr")
+    default_mmr_fetch_k: int = Field(default=20)
+    default_mmr_lambda: float = Field(default=0.5)
+    # Adaptive k (search_type="adaptive"): over-fetch, then cut where relevance drops
+    default_adaptive_fetch_k: int = Field(default=12)
+    default_adaptive_max_distance: float | None = Field(default=None)
+    default_adaptive_score_gap: float | None = Field(default=0.2)
+    default_adaptive_token_budget: int | None = Field(default=2000)
+    default_adaptive_min_k: int = Field(default=1)
+    # Small-to-big (search_type="small_to_big"): expand hits to neighbors or whole pages
+    default_small_to_big_expand: Literal["neighbors", "page"] = Field(default="neighbors")
+    default_small_to_big_window: int = Field(default=1)
+
+    # Context packing between retrieval and the prompt: drop chunk overlaps, stitch adjacent
+    # chunks, order by page and cap the context at a token budget (None disables the cap)
+    context_packing_enabled: bool = Field(default=True)
+    context_token_budget: int | None = Field(default=3000)
+
+    # Model cascade for QA: extractive / small / full routes (distances are cosine distances)
+    cascade_enabled: bool = Field(default=False)
+    cascade_small_model: str = Field(default="gpt-4.1-nano")
+    cascade_small_max_tokens: int = Field(default=512)
+    cascade_small_max_query_tokens: int = Field(default=24)
+    cascade_small_max_pages: int = Field(default=2)
+    cascade_small_max_distance: float = Field(default=0.35)
+    cascade_extractive_enabled: bool = Field(default=False)
+    cascade_extractive_max_distance: float = Field(default=0.2)
+    cascade_extractive_min_gap: float = Field(default=0.5)
+
+    # Map-reduce QA (chain_type="map_reduce"): chunks are grouped up to map_reduce_group_tokens
+    # (one chunk per call if None), groups are extracted concurrently (at most
+    # map_reduce_max_concurrency calls in flight) and one reduce call answers from the extracts
+    map_reduce_max_concurrency: int = Field(default=8)
+    map_reduce_group_tokens: int | None = Field(default=1500)
 
     # Cohere Configuration (for reranking)
     cohere_model: str = Field(default="rerank-v3.5")
     cohere_api_key: str = Field(env="COHERE_API_KEY")  # type: ignore[call-overload]
+    # Rerank mode (selectable per request): "cohere" (rerank API) or "local" (candidates
+    # re-scored with their stored embeddings: cosine similarity to the query blended with
+    # IDF-weighted lexical overlap, then optionally diversified with MMR; no external call)
+    rerank_mode: Literal["cohere", "local"] = Field(default="cohere")
+    local_rerank_lexical_weight: float = Field(default=0.3)
+    local_rerank_mmr_lambda: float | None = Field(default=None)
+    # Rerank result cache: scores per (query, candidate chunk ids and texts, model, top_n), so a
+    # repeated question over unchanged candidates skips the rerank call
+    rerank_cache_enabled: bool = Field(default=False)
+    rerank_cache_path: str = Field(default="./rerank_cache.sqlite3")
+    rerank_cache_max_entries: int = Field(default=10_000)
+    # Adaptive rerank skipping when vector scores are decisive (cosine collections only)
+    rerank_skip_enabled: bool = Field(default=False)
+    rerank_skip_min_gap: float | None = Field(default=0.5)
+    rerank_skip_max_entropy: float | None = Field(default=None)
+    rerank_skip_temperature: float = Field(default=0.05)
 
     # Application
     app_host: str = Field(default="0.0.0.0", env="HOST")  # type: ignore[call-overload]
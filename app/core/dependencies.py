@@ -6,10 +6,12 @@ from fastapi import Depends
 from app.core.config import Settings, settings
 from app.infrastructure.embeddings.client import EmbeddingsClient
 from app.infrastructure.llm.client import LLMClient
+from app.infrastructure.scheduling.rate_limiter import OpenAIScheduler
 from app.infrastructure.vector_db.chroma_client import ChromaDBClient
 from app.infrastructure.vector_db.repository import VectorDBRepository
 from app.services.document.text_splitter import TextSplitterFactory
 from app.services.ingest.ingestion import DocumentIngestionService
+from app.services.rag.model_router import ModelRouter
 from app.services.rag.qa_service import QAService
 from app.services.rag.rerank_service import RerankService
 
@@ -27,27 +29,37 @@ SettingsDep = Annotated[Settings, Depends(get_settings)]
 # ============================================================================
 # Infrastructure Dependencies
 # ============================================================================
+@lru_cache()
+def get_openai_scheduler() -> OpenAIScheduler | None:
+    """Get the shared OpenAI rate limiter; None when scheduling is disabled"""
+    if not settings.openai_scheduler_enabled:
+        return None
+    return OpenAIScheduler(settings)
+
+
 @lru_cache()
 def get_llm_client() -> LLMClient:
     """Get LLM client"""
-    return LLMClient(settings)
+    return LLMClient(settings, get_openai_scheduler())
 
 
 @lru_cache()
 def get_embeddings_client() -> EmbeddingsClient:
     """Get embeddings client"""
-    return EmbeddingsClient(settings)
+    return EmbeddingsClient(settings, get_openai_scheduler())
 
 
 @lru_cache()
-def get_chroma_client() -> ChromaDBClient:
-    """Get ChromaDB HTTP client"""
+def get_chroma_client() -> ChromaDBClient | None:
+    """Get ChromaDB client (HTTP or embedded); None with the NumPy vector backend"""
+    if settings.vector_backend == "numpy":
+        return None
     return ChromaDBClient(settings)
 
 
 @lru_cache()
 def get_vector_db_repository(
-    chroma_client: Annotated[ChromaDBClient, Depends(get_chroma_client)],
+    chroma_client: Annotated[ChromaDBClient | None, Depends(get_chroma_client)],
     embeddings_client: Annotated[EmbeddingsClient, Depends(get_embeddings_client)],
 ) -> VectorDBRepository:
     """Get vector database repository"""
@@ -55,9 +67,10 @@ def get_vector_db_repository(
 
 
 # Type aliases for dependency injection
+OpenAISchedulerDep = Annotated[OpenAIScheduler | None, Depends(get_openai_scheduler)]
 LLMClientDep = Annotated[LLMClient, Depends(get_llm_client)]
 EmbeddingsClientDep = Annotated[EmbeddingsClient, Depends(get_embeddings_client)]
-ChromaClientDep = Annotated[ChromaDBClient, Depends(get_chroma_client)]
+ChromaClientDep = Annotated[ChromaDBClient | None, Depends(get_chroma_client)]
 VectorDBDep = Annotated[VectorDBRepository, Depends(get_vector_db_repository)]
 
 
@@ -87,24 +100,41 @@ IngestionServiceDep = Annotated[DocumentIngestionService, Depends(get_ingestion_
 # ============================================================================
 # RAG Query Services
 # ============================================================================
+@lru_cache()
+def get_model_router() -> ModelRouter | None:
+    """Get the QA model cascade router (shared, keeps per-route metrics); None if disabled"""
+    if not settings.cascade_enabled:
+        return None
+    # * The distance thresholds depend on the collection space (repository only when enabled)
+    vdb_repo = get_vector_db_repository(get_chroma_client(), get_embeddings_client())
+    return ModelRouter(settings, vdb_repo.distance_space)
+
+
+ModelRouterDep = Annotated[ModelRouter | None, Depends(get_model_router)]
+
+
+@lru_cache()
 def get_qa_service(
     llm_client: LLMClientDep,
     vdb_repo: VectorDBDep,
+    model_router: ModelRouterDep,
 ) -> QAService:
-    """Get standard QA service."""
+    """Get standard QA service (shared: its chain is built once)"""
     from app.services.rag.qa_service import QAService
 
-    return QAService(settings, llm_client, vdb_repo)
+    return QAService(settings, llm_client, vdb_repo, model_router)
 
 
+@lru_cache()
 def get_rerank_service(
     llm_client: LLMClientDep,
     vdb_repo: VectorDBDep,
+    model_router: ModelRouterDep,
 ) -> RerankService:
-    """Get rerank QA service."""
+    """Get rerank QA service (shared: its chain and Cohere client are built once)"""
     from app.services.rag.rerank_service import RerankService
 
-    return RerankService(settings, llm_client, vdb_repo)
+    return RerankService(settings, llm_client, vdb_repo, model_router)
 
 
 # Type aliases
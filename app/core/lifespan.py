@@ -1,11 +1,31 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 
-from app.core.dependencies import get_chroma_client
+from app.core.config import settings
+from app.core.dependencies import (
+    get_chroma_client,
+    get_embeddings_client,
+    get_vector_db_repository,
+)
+from app.infrastructure.vector_db.repository import VectorDBRepository
 from app.utils.logger import logger
 
 
+async def reconcile_local_index_periodically(
+    vdb_repo: VectorDBRepository,
+    interval_s: int,
+) -> None:
+    """Periodically reconcile the local HNSW replica against ChromaDB."""
+    while True:
+        try:
+            await asyncio.to_thread(vdb_repo.reconcile_local_index)
+        except Exception as e:
+            logger.error(f"Local index reconciliation failed: {type(e).__name__} - {e}")
+        await asyncio.sleep(interval_s)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -15,13 +35,27 @@ async def lifespan(app: FastAPI):
     """
     logger.info("Starting up RAG-docs application...")
 
-    # Verify ChromaDB connection
+    # Verify ChromaDB connection (the NumPy backend runs without Chroma)
     chroma_client = get_chroma_client()
-    heartbeat = chroma_client.heartbeat()
-    logger.info(f"ChromaDB heartbeat: {heartbeat}")
+    if chroma_client is not None:
+        heartbeat = chroma_client.heartbeat()
+        logger.info(f"ChromaDB heartbeat: {heartbeat}")
+
+    # Warm up and keep the local HNSW replica in sync (queries use Chroma until ready)
+    reconcile_task = None
+    if settings.local_index_enabled:
+        vdb_repo = get_vector_db_repository(chroma_client, get_embeddings_client())
+        reconcile_task = asyncio.create_task(
+            reconcile_local_index_periodically(vdb_repo, settings.local_index_reconcile_interval_s)
+        )
 
     logger.info("Application startup complete")
 
     yield  # Application runs here
 
     logger.info("Shutting down RAG-docs application...")
+
+    if reconcile_task is not None:
+        reconcile_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await reconcile_task
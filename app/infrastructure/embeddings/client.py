@@ -1,13 +1,25 @@
+from functools import partial
+from typing import Any
+
 from langchain_openai import OpenAIEmbeddings
 
 from app.core.config import Settings
+from app.infrastructure.scheduling.models import ScheduledOpenAIEmbeddings
+from app.infrastructure.scheduling.rate_limiter import OpenAIScheduler
 
 
 class EmbeddingsClient:
     """OpenAI embeddings client wrapper."""
 
-    def __init__(self, settings: Settings) -> None:
-        self._client = OpenAIEmbeddings(
+    def __init__(self, settings: Settings, scheduler: OpenAIScheduler | None = None) -> None:
+        # * With a scheduler every request is admitted by the shared OpenAI rate limiter
+        embeddings_model: Any = OpenAIEmbeddings
+        if scheduler is not None:
+            embeddings_model = partial(
+                ScheduledOpenAIEmbeddings, openai_limiter=scheduler.embeddings
+            )
+
+        self._client = embeddings_model(
             model=settings.embeddings_model,
             api_key=settings.openai_api_key,  # type: ignore[call-arg]
         )
@@ -0,0 +1,44 @@
+from collections import OrderedDict
+import threading
+
+from langchain_core.embeddings import Embeddings
+
+
+class QueryCachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper keeping the vectors of the most recent queries (LRU).
+
+    Steps that need the query vector again after retrieval (e.g. local
+    reranking) get it without a second embeddings request. Document
+    embeddings are not cached. Thread-safe.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_entries: int = 256) -> None:
+        self._embeddings = embeddings
+        self._max_entries = max_entries
+        self._vectors: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        """Wrapped embeddings model."""
+        return self._embeddings
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        with self._lock:
+            vector = self._vectors.get(text)
+            if vector is not None:
+                self._vectors.move_to_end(text)
+                return vector
+
+        # * Embedded outside the lock: concurrent misses on the same text may both call
+        vector = self._embeddings.embed_query(text)
+        with self._lock:
+            self._vectors[text] = vector
+            self._vectors.move_to_end(text)
+            while len(self._vectors) > self._max_entries:
+                self._vectors.popitem(last=False)
+        return vector
@@ -1,14 +1,26 @@
+from functools import partial
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_openai import ChatOpenAI
 from pydantic import SecretStr
 
 from app.core.config import Settings
+from app.infrastructure.llm.hedging import HedgedChatModel, HedgingPolicy, build_hedge_model
+from app.infrastructure.scheduling.models import ScheduledChatOpenAI
+from app.infrastructure.scheduling.rate_limiter import OpenAIScheduler
 
 
 class LLMClient:
     """OpenAI LLM client wrapper."""
 
-    def __init__(self, settings: Settings) -> None:
-        self._client = ChatOpenAI(
+    def __init__(self, settings: Settings, scheduler: OpenAIScheduler | None = None) -> None:
+        # * With a scheduler every call is admitted by the shared OpenAI rate limiter
+        chat_model: Any = ChatOpenAI
+        if scheduler is not None:
+            chat_model = partial(ScheduledChatOpenAI, openai_limiter=scheduler.llm)
+
+        self._client = chat_model(
             model=settings.openai_model,
             api_key=SecretStr(settings.openai_api_key),
             temperature=settings.openai_temperature,
@@ -16,6 +28,37 @@ class LLMClient:
             top_p=settings.openai_top_p,
         )
 
+        # * Small model of the QA model cascade (see ModelRouter)
+        self._small_client: BaseChatModel | None = None
+        if settings.cascade_enabled:
+            self._small_client = chat_model(
+                model=settings.cascade_small_model,
+                api_key=SecretStr(settings.openai_api_key),
+                temperature=settings.openai_temperature,
+                max_tokens=settings.cascade_small_max_tokens,
+                top_p=settings.openai_top_p,
+            )
+
+        # * Slow first tokens are hedged with a secondary model (see HedgedChatModel)
+        self._hedging_policy: HedgingPolicy | None = None
+        if settings.llm_hedging_enabled:
+            # Non-streamed calls are served from the stream: keep reporting token usage
+            self._client.stream_usage = True
+            self._hedging_policy = HedgingPolicy.from_settings(settings)
+            self._client = HedgedChatModel(
+                primary=self._client,
+                secondary=build_hedge_model(settings),
+                policy=self._hedging_policy,
+            )
+
     @property
-    def client(self) -> ChatOpenAI:
+    def client(self) -> BaseChatModel:
         return self._client
+
+    @property
+    def small_client(self) -> BaseChatModel | None:
+        return self._small_client
+
+    @property
+    def hedging_policy(self) -> HedgingPolicy | None:
+        return self._hedging_policy
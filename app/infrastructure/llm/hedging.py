@@ -0,0 +1,362 @@
+import asyncio
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import contextvars
+from functools import partial
+import math
+from statistics import NormalDist
+import threading
+import time
+from typing import Any
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import (
+    BaseChatModel,
+    agenerate_from_stream,
+    generate_from_stream,
+)
+from langchain_core.messages import BaseMessage, BaseMessageChunk
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from app.core.config import Settings
+from app.utils.logger import logger
+
+
+PRIMARY = "primary"
+SECONDARY = "secondary"
+
+
+class LatencyTracker:
+    """Exponentially weighted moving mean and variance of a latency (seconds)."""
+
+    def __init__(self, alpha: float) -> None:
+        self._alpha = alpha
+        self.samples = 0
+        self.mean = 0.0
+        self.variance = 0.0
+
+    def observe(self, seconds: float) -> None:
+        if self.samples == 0:
+            self.mean = seconds
+        else:
+            diff = seconds - self.mean
+            increment = self._alpha * diff
+            self.mean += increment
+            self.variance = (1 - self._alpha) * (self.variance + diff * increment)
+        self.samples += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimated `q` quantile, assuming roughly normal latencies around the mean."""
+        return self.mean + NormalDist().inv_cdf(q) * math.sqrt(self.variance)
+
+
+class HedgingPolicy:
+    """
+    Hedging deadline and counters shared by all requests of a `HedgedChatModel`.
+
+    The deadline is the `quantile` of the primary's time to first token
+    (EWMA estimate), clamped to [min_delay_s, max_delay_s]; `initial_delay_s`
+    is used until `min_samples` latencies were observed. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        initial_delay_s: float = 2.0,
+        min_delay_s: float = 0.5,
+        max_delay_s: float = 10.0,
+        min_samples: int = 10,
+        ewma_alpha: float = 0.1,
+    ) -> None:
+        self._quantile = quantile
+        self._initial_delay_s = initial_delay_s
+        self._min_delay_s = min_delay_s
+        self._max_delay_s = max_delay_s
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+        self._latency = {PRIMARY: LatencyTracker(ewma_alpha), SECONDARY: LatencyTracker(ewma_alpha)}
+
+        # Metrics
+        self._requests = 0
+        self._hedged = 0
+        self._wins = {PRIMARY: 0, SECONDARY: 0}
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "HedgingPolicy":
+        return cls(
+            quantile=settings.llm_hedge_quantile,
+            initial_delay_s=settings.llm_hedge_initial_delay_s,
+            min_delay_s=settings.llm_hedge_min_delay_s,
+            max_delay_s=settings.llm_hedge_max_delay_s,
+            min_samples=settings.llm_hedge_min_samples,
+            ewma_alpha=settings.llm_hedge_ewma_alpha,
+        )
+
+    def deadline(self) -> float:
+        """Seconds to wait for the primary's first token before hedging."""
+        with self._lock:
+            tracker = self._latency[PRIMARY]
+            if tracker.samples < self._min_samples:
+                return self._initial_delay_s
+            return min(max(tracker.quantile(self._quantile), self._min_delay_s), self._max_delay_s)
+
+    def observe(self, provider: str, seconds: float) -> None:
+        """
+        Record a time to first token. For a cancelled primary the elapsed time
+        (a lower bound) is recorded, so the deadline grows while it is slow.
+        """
+        with self._lock:
+            self._latency[provider].observe(seconds)
+
+    def record(self, winner: str, hedged: bool) -> None:
+        with self._lock:
+            self._requests += 1
+            self._hedged += hedged
+            self._wins[winner] += 1
+
+    def metrics(self) -> dict:
+        """Requests, hedges, wins per provider and latency estimates."""
+        deadline_s = self.deadline()
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "hedged": self._hedged,
+                "deadline_s": round(deadline_s, 3),
+                "providers": {
+                    provider: {
+                        "wins": self._wins[provider],
+                        "samples": tracker.samples,
+                        "ttft_s_ewma": round(tracker.mean, 3),
+                        "ttft_s_quantile": round(tracker.quantile(self._quantile), 3),
+                    }
+                    for provider, tracker in self._latency.items()
+                },
+            }
+
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Chat model that hedges slow requests of a primary model with a secondary one.
+
+    The request is streamed from the primary; if no first token arrives
+    within the policy deadline (or the primary fails first), the same
+    messages are sent to the secondary. The first model to produce a token
+    serves the whole answer and the other request is cancelled. Non-streamed
+    calls are served from the stream, so the deadline always applies to the
+    first token.
+
+    Call options (e.g. `stream_usage`) are specific to the primary's API and
+    only passed to it; the secondary only receives `stop`.
+    """
+
+    # Chat models (typed as Any: ChatOpenAI / ChatBedrockConverse)
+    primary: Any
+    secondary: Any
+    # HedgingPolicy (typed as Any: not a pydantic type)
+    policy: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged-chat"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await agenerate_from_stream(self._astream(messages, stop, run_manager, **kwargs))
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        deadline_s = self.policy.deadline()
+        started_at = time.perf_counter()
+        streams: dict[str, Iterator[BaseMessageChunk]] = {}
+        pending: dict[Future, str] = {}
+
+        # * Only the first chunk is fetched in a worker thread, the winner is then iterated here
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-hedge")
+
+        def start(provider: str) -> None:
+            model, options = (self.primary, kwargs) if provider == PRIMARY else (self.secondary, {})
+            streams[provider] = iter(model.stream(messages, stop=stop, **options))
+            first = executor.submit(contextvars.copy_context().run, next, streams[provider])
+            pending[first] = provider
+
+        winner, first_chunk, started = None, None, {PRIMARY: started_at}
+        try:
+            start(PRIMARY)
+            timeout: float | None = deadline_s
+            while winner is None:
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                timeout = None
+                for future in done:
+                    provider = pending.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        winner, first_chunk = provider, future.result()
+                        break
+                    # * A failure is not a latency sample
+                    del started[provider]
+                    if not pending and SECONDARY in streams:
+                        raise error
+                    logger.warning(f"LLM {provider} failed before its first token: {error}")
+                if winner is None and SECONDARY not in streams:
+                    if PRIMARY in started:
+                        logger.info(f"LLM hedge: no first token from primary in {deadline_s:.2f}s")
+                    started[SECONDARY] = time.perf_counter()
+                    start(SECONDARY)
+        finally:
+            # * A running `next` cannot be interrupted: the loser is closed once it returns
+            for future, provider in pending.items():
+                future.add_done_callback(partial(_close_stream, streams[provider]))
+            executor.shutdown(wait=False)
+
+        self._record(winner, started, started_at, hedged=SECONDARY in streams)
+        for message in _chain_first(first_chunk, streams[winner]):
+            chunk = ChatGenerationChunk(message=message)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        deadline_s = self.policy.deadline()
+        started_at = time.perf_counter()
+        streams: dict[str, AsyncIterator[BaseMessageChunk]] = {}
+        pending: dict[asyncio.Task, str] = {}
+
+        def start(provider: str) -> None:
+            model, options = (self.primary, kwargs) if provider == PRIMARY else (self.secondary, {})
+            streams[provider] = model.astream(messages, stop=stop, **options)
+            pending[asyncio.ensure_future(anext(streams[provider]))] = provider
+
+        winner, first_chunk, started = None, None, {PRIMARY: started_at}
+        try:
+            start(PRIMARY)
+            timeout: float | None = deadline_s
+            while winner is None:
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                timeout = None
+                for task in done:
+                    provider = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        winner, first_chunk = provider, task.result()
+                        break
+                    # * A failure is not a latency sample
+                    del started[provider]
+                    if not pending and SECONDARY in streams:
+                        raise error
+                    logger.warning(f"LLM {provider} failed before its first token: {error}")
+                if winner is None and SECONDARY not in streams:
+                    if PRIMARY in started:
+                        logger.info(f"LLM hedge: no first token from primary in {deadline_s:.2f}s")
+                    started[SECONDARY] = time.perf_counter()
+                    start(SECONDARY)
+        finally:
+            # * Cancel the loser (or both, if the caller went away) and close its request
+            for task, provider in pending.items():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await _aclose(streams[provider])
+
+        self._record(winner, started, started_at, hedged=SECONDARY in streams)
+        try:
+            chunk = ChatGenerationChunk(message=first_chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            async for message in streams[winner]:
+                chunk = ChatGenerationChunk(message=message)
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            await _aclose(streams[winner])
+
+    def _record(
+        self, winner: Any, started: dict[str, float], started_at: float, hedged: bool
+    ) -> None:
+        now = time.perf_counter()
+        for provider, provider_start in started.items():
+            self.policy.observe(provider, now - provider_start)
+        self.policy.record(winner, hedged)
+        if hedged:
+            logger.info(f"LLM hedge won by {winner} after {now - started_at:.2f}s")
+
+
+def _chain_first(first: Any, rest: Iterator[BaseMessageChunk]) -> Iterator[BaseMessageChunk]:
+    try:
+        yield first
+        yield from rest
+    finally:
+        _close(rest)
+
+
+def _close(stream: Any) -> None:
+    close = getattr(stream, "close", None)
+    if close is not None:
+        close()
+
+
+def _close_stream(stream: Any, _: Future) -> None:
+    _close(stream)
+
+
+async def _aclose(stream: Any) -> None:
+    aclose = getattr(stream, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+def build_hedge_model(settings: Settings) -> BaseChatModel:
+    """Secondary model of the hedging policy (`llm_hedge_provider`: "bedrock" or "openai")."""
+    if settings.llm_hedge_provider == "bedrock":
+        from langchain_aws import ChatBedrockConverse
+
+        return ChatBedrockConverse(
+            model_id=settings.llm_hedge_model,
+            region_name=settings.aws_region,
+            temperature=settings.openai_temperature,
+            max_tokens=settings.openai_max_tokens,
+            top_p=settings.openai_top_p,
+        )
+    if settings.llm_hedge_provider == "openai":
+        from langchain_openai import ChatOpenAI
+        from pydantic import SecretStr
+
+        return ChatOpenAI(
+            model=settings.llm_hedge_model,
+            api_key=SecretStr(settings.openai_api_key),
+            temperature=settings.openai_temperature,
+            max_tokens=settings.openai_max_tokens,
+            top_p=settings.openai_top_p,
+            stream_usage=True,
+        )
+    raise ValueError(f"Unknown LLM hedge provider: {settings.llm_hedge_provider}")
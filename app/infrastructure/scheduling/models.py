@@ -0,0 +1,166 @@
+import asyncio
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import Any
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from pydantic import Field
+
+from app.infrastructure.scheduling.rate_limiter import Reservation
+from app.utils.tokens import count_tokens
+
+
+async def _reserve_in_thread(limiter: Any, reserve: Callable[[], Reservation]) -> Reservation:
+    """
+    Wait for a reservation in a worker thread (context, and so the priority, is copied).
+
+    A cancelled caller cannot stop the thread: the reservation it still obtains
+    is released once granted, so no budget leaks.
+    """
+    reservation = asyncio.ensure_future(asyncio.to_thread(reserve))
+    try:
+        return await asyncio.shield(reservation)
+    except asyncio.CancelledError:
+
+        def release(granted: asyncio.Future) -> None:
+            if not granted.cancelled() and granted.exception() is None:
+                limiter.release(granted.result())
+
+        reservation.add_done_callback(release)
+        raise
+
+
+def _result_tokens(result: ChatResult | None) -> int | None:
+    usage = (result.llm_output or {}).get("token_usage") if result is not None else None
+    return usage.get("total_tokens") if usage else None
+
+
+def _chunk_tokens(chunk: ChatGenerationChunk) -> int | None:
+    usage = getattr(chunk.message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+class ScheduledChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI whose calls first take a slot from the shared rate limiter.
+
+    Each call reserves its prompt tokens plus `max_tokens` (what OpenAI counts
+    against the tokens/min limit); the unused part is returned once the
+    response reports its usage.
+    """
+
+    # Shared RateLimiter (typed as Any: not a pydantic type; `rate_limiter` is LangChain's)
+    openai_limiter: Any = Field(exclude=True)
+
+    def _reserve(self, messages: list[BaseMessage], kwargs: dict) -> Reservation:
+        prompt_tokens = sum(
+            count_tokens(str(message.content), self.model_name) for message in messages
+        )
+        completion_tokens = kwargs.get("max_tokens") or self.max_tokens or 0
+        return self.openai_limiter.acquire(prompt_tokens + completion_tokens)
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        reservation = self._reserve(messages, kwargs)
+        result = None
+        try:
+            result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return result
+        finally:
+            self.openai_limiter.settle(reservation, _result_tokens(result))
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        reservation = await _reserve_in_thread(
+            self.openai_limiter, lambda: self._reserve(messages, kwargs)
+        )
+        result = None
+        try:
+            result = await super()._agenerate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            )
+            return result
+        finally:
+            self.openai_limiter.settle(reservation, _result_tokens(result))
+
+    # * Same signature as ChatOpenAI (which sets `stream_usage`); messages come first
+    def _stream(
+        self, *args: Any, stream_usage: bool | None = None, **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        messages = args[0] if args else kwargs["messages"]
+        reservation = self._reserve(messages, kwargs)
+        used_tokens = None
+        try:
+            for chunk in super()._stream(*args, stream_usage=stream_usage, **kwargs):
+                used_tokens = _chunk_tokens(chunk) or used_tokens
+                yield chunk
+        finally:
+            self.openai_limiter.settle(reservation, used_tokens)
+
+    async def _astream(
+        self, *args: Any, stream_usage: bool | None = None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        messages = args[0] if args else kwargs["messages"]
+        reservation = await _reserve_in_thread(
+            self.openai_limiter, lambda: self._reserve(messages, kwargs)
+        )
+        used_tokens = None
+        try:
+            async for chunk in super()._astream(*args, stream_usage=stream_usage, **kwargs):
+                used_tokens = _chunk_tokens(chunk) or used_tokens
+                yield chunk
+        finally:
+            self.openai_limiter.settle(reservation, used_tokens)
+
+
+class ScheduledOpenAIEmbeddings(OpenAIEmbeddings):
+    """
+    OpenAIEmbeddings whose requests first take a slot from the shared rate limiter.
+
+    Texts are sent in batches of `chunk_size` (one request each), every batch
+    admitted separately so long ingestions interleave with interactive queries.
+    """
+
+    # Shared RateLimiter (typed as Any: not a pydantic type; `rate_limiter` is LangChain's)
+    openai_limiter: Any = Field(exclude=True)
+
+    def embed_documents(self, texts: list[str], chunk_size: int | None = None) -> list[list[float]]:
+        embeddings: list[list[float]] = []
+        for batch in self._batches(texts, chunk_size):
+            self.openai_limiter.acquire(self._batch_tokens(batch))
+            embeddings += super().embed_documents(batch, chunk_size)
+        return embeddings
+
+    async def aembed_documents(
+        self, texts: list[str], chunk_size: int | None = None
+    ) -> list[list[float]]:
+        embeddings: list[list[float]] = []
+        for batch in self._batches(texts, chunk_size):
+            tokens = self._batch_tokens(batch)
+            await _reserve_in_thread(
+                self.openai_limiter, lambda: self.openai_limiter.acquire(tokens)
+            )
+            embeddings += await super().aembed_documents(batch, chunk_size)
+        return embeddings
+
+    def _batches(self, texts: list[str], chunk_size: int | None) -> list[list[str]]:
+        size = chunk_size or self.chunk_size
+        return [texts[start : start + size] for start in range(0, len(texts), size)]
+
+    def _batch_tokens(self, texts: list[str]) -> int:
+        return sum(count_tokens(text, self.model) for text in texts)
@@ -0,0 +1,261 @@
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+import heapq
+import itertools
+import threading
+import time
+
+from app.core.config import Settings
+
+
+class Priority(IntEnum):
+    """Scheduling class of an OpenAI call (lower values are served first)."""
+
+    INTERACTIVE = 0
+    BULK = 1
+
+
+_priority: ContextVar[Priority] = ContextVar("openai_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def scheduling_priority(priority: Priority) -> Iterator[None]:
+    """Run the OpenAI calls made inside the block (same thread/task) with `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+class RateLimitRejected(Exception):
+    """Raised when a call would wait in the queue longer than its priority allows."""
+
+    def __init__(self, message: str, retry_after_s: float) -> None:
+        super().__init__(message)
+        # Estimated seconds until the call could be served (the max wait when unknown)
+        self.retry_after_s = retry_after_s
+
+
+class TokenBucket:
+    """Continuously refilled bucket holding at most one minute of budget."""
+
+    def __init__(self, per_minute: float, now: float) -> None:
+        self.capacity = float(per_minute)
+        self._rate = self.capacity / 60
+        self._level = self.capacity
+        self._updated = now
+
+    def level(self, now: float) -> float:
+        self._refill(now)
+        return self._level
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` (capped at the capacity) is available."""
+        self._refill(now)
+        return max(min(amount, self.capacity) - self._level, 0.0) / self._rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self._level -= min(amount, self.capacity)
+
+    def refund(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self._level = min(self._level + amount, self.capacity)
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self._level + (now - self._updated) * self._rate, self.capacity)
+        self._updated = now
+
+
+@dataclass
+class Reservation:
+    """Budget granted to one call; unused tokens are returned with `RateLimiter.settle`."""
+
+    tokens: int
+    priority: Priority
+    wait_s: float
+
+
+class RateLimiter:
+    """
+    Requests/min and tokens/min token buckets in front of one OpenAI model.
+
+    Callers queue in a priority heap (interactive before bulk, FIFO within a
+    priority) and only the head of the queue draws from the buckets, so a
+    burst of ingestion calls cannot starve a question that arrives later.
+    A call is rejected up front when its wait would exceed the limit of its
+    priority, instead of failing with a 429 after the work that led to it.
+    Thread-safe; async callers wait in a worker thread.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_wait_s: Mapping[Priority, float | None],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._name = name
+        self._max_wait_s = max_wait_s
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._queue: list[tuple[int, int]] = []
+        self._arrivals = itertools.count()
+        now = clock()
+        self._requests = TokenBucket(requests_per_minute, now)
+        self._tokens = TokenBucket(tokens_per_minute, now)
+
+        # Metrics
+        self._granted = {priority: 0 for priority in Priority}
+        self._rejected = {priority: 0 for priority in Priority}
+        self._wait_total_s = {priority: 0.0 for priority in Priority}
+        self._wait_max_s = {priority: 0.0 for priority in Priority}
+        self._tokens_granted = 0
+        self._tokens_refunded = 0
+
+    def acquire(self, tokens: int, priority: Priority | None = None) -> Reservation:
+        """
+        Wait for one request and `tokens` tokens of budget.
+
+        Args:
+            tokens: Estimated tokens of the call (capped at the per-minute budget)
+            priority: Scheduling class (the current `scheduling_priority` if None)
+
+        Raises:
+            RateLimitRejected: If the wait would exceed the priority's limit
+        """
+        priority = current_priority() if priority is None else priority
+        tokens = int(min(tokens, self._tokens.capacity))
+        max_wait_s = self._max_wait_s.get(priority)
+
+        with self._condition:
+            started_at = self._clock()
+            entry = (int(priority), next(self._arrivals))
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    now = self._clock()
+                    wait_s: float | None = None
+                    if self._queue[0] == entry:
+                        wait_s = max(
+                            self._requests.wait_time(1, now), self._tokens.wait_time(tokens, now)
+                        )
+                        if wait_s <= 0:
+                            heapq.heappop(self._queue)
+                            return self._grant(tokens, priority, now - started_at, now)
+
+                    # * Behind other callers the wait is unknown: wait for them until the deadline
+                    remaining_s = None
+                    if max_wait_s is not None:
+                        remaining_s = started_at + max_wait_s - now
+                        if remaining_s <= 0 or (wait_s is not None and wait_s > remaining_s):
+                            self._rejected[priority] += 1
+                            raise RateLimitRejected(
+                                f"OpenAI {self._name} rate limit: {priority.name.lower()} call "
+                                f"would wait more than {max_wait_s:g}s",
+                                retry_after_s=max_wait_s if wait_s is None else wait_s,
+                            )
+                    timeouts = [t for t in (wait_s, remaining_s) if t is not None]
+                    self._condition.wait(timeout=min(timeouts) if timeouts else None)
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                raise
+            finally:
+                # * The head changed or budget was taken: let the next caller re-check
+                self._condition.notify_all()
+
+    def settle(self, reservation: Reservation, used_tokens: int | None) -> None:
+        """Return the reserved tokens a call did not use (no-op when usage is unknown)."""
+        if used_tokens is None or used_tokens >= reservation.tokens:
+            return
+        with self._condition:
+            unused = reservation.tokens - used_tokens
+            self._tokens.refund(unused, self._clock())
+            self._tokens_refunded += unused
+            self._condition.notify_all()
+
+    def release(self, reservation: Reservation) -> None:
+        """Return the whole budget (request and tokens) of a call that was never made."""
+        with self._condition:
+            now = self._clock()
+            self._requests.refund(1, now)
+            self._tokens.refund(reservation.tokens, now)
+            self._tokens_refunded += reservation.tokens
+            self._condition.notify_all()
+
+    def metrics(self) -> dict:
+        """Queue depth, budget left, and grants, rejections and queue waits per priority."""
+        with self._condition:
+            now = self._clock()
+            return {
+                "queue_depth": len(self._queue),
+                "requests_available": round(self._requests.level(now), 1),
+                "tokens_available": round(self._tokens.level(now)),
+                "tokens_granted": self._tokens_granted,
+                "tokens_refunded": self._tokens_refunded,
+                "priorities": {
+                    priority.name.lower(): {
+                        "granted": self._granted[priority],
+                        "rejected": self._rejected[priority],
+                        "wait_s_total": round(self._wait_total_s[priority], 3),
+                        "wait_s_max": round(self._wait_max_s[priority], 3),
+                        "wait_s_avg": round(
+                            self._wait_total_s[priority] / max(self._granted[priority], 1), 3
+                        ),
+                    }
+                    for priority in Priority
+                },
+            }
+
+    def _grant(self, tokens: int, priority: Priority, wait_s: float, now: float) -> Reservation:
+        self._requests.take(1, now)
+        self._tokens.take(tokens, now)
+        self._granted[priority] += 1
+        self._tokens_granted += tokens
+        self._wait_total_s[priority] += wait_s
+        self._wait_max_s[priority] = max(self._wait_max_s[priority], wait_s)
+        return Reservation(tokens=tokens, priority=priority, wait_s=wait_s)
+
+
+class OpenAIScheduler:
+    """
+    Process-wide rate limiters of the OpenAI chat model and embeddings model.
+
+    Interactive queries are served before bulk ingestion. Calls that would
+    wait longer than the max wait of their priority are rejected; bulk calls
+    also get a limit so an ingestion cannot hold a worker thread indefinitely.
+    """
+
+    def __init__(self, settings: Settings, clock: Callable[[], float] = time.monotonic) -> None:
+        max_wait_s = {
+            Priority.INTERACTIVE: settings.openai_scheduler_max_wait_s,
+            Priority.BULK: settings.openai_scheduler_bulk_max_wait_s,
+        }
+        self.llm = RateLimiter(
+            "llm",
+            settings.openai_llm_requests_per_minute,
+            settings.openai_llm_tokens_per_minute,
+            max_wait_s,
+            clock,
+        )
+        self.embeddings = RateLimiter(
+            "embeddings",
+            settings.openai_embeddings_requests_per_minute,
+            settings.openai_embeddings_tokens_per_minute,
+            max_wait_s,
+            clock,
+        )
+
+    def metrics(self) -> dict:
+        return {"llm": self.llm.metrics(), "embeddings": self.embeddings.metrics()}
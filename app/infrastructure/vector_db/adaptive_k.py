@@ -0,0 +1,52 @@
+from collections.abc import Callable
+
+from langchain.schema import Document
+
+
+def adaptive_cutoff(
+    docs_and_scores: list[tuple[Document, float]],
+    max_distance: float | None = None,
+    score_gap: float | None = None,
+    token_budget: int | None = None,
+    min_k: int = 1,
+    token_counter: Callable[[str], int] | None = None,
+) -> list[tuple[Document, float]]:
+    """
+    Cut an over-fetched, distance-ordered result list where relevance drops.
+
+    The list is truncated at the first chunk that breaks any configured rule:
+    its distance exceeds `max_distance`, its distance grew more than
+    `score_gap` (relative) over the previous chunk, or it no longer fits in
+    `token_budget`. The first `min_k` chunks are always kept.
+
+    Args:
+        docs_and_scores: (Document, distance) tuples, closest first
+        max_distance: Absolute distance threshold (disabled if None)
+        score_gap: Relative distance jump that ends the list, e.g. 0.2 = +20% (disabled if None)
+        token_budget: Maximum total tokens of the kept chunks (disabled if None)
+        min_k: Chunks kept regardless of the rules
+        token_counter: Token counting function, required when `token_budget` is set
+
+    Returns:
+        Leading slice of `docs_and_scores`
+    """
+    if token_budget is not None and token_counter is None:
+        raise ValueError("token_counter is required when token_budget is set")
+
+    used_tokens = 0
+    for position, (doc, distance) in enumerate(docs_and_scores):
+        if token_budget is not None and token_counter is not None:
+            used_tokens += token_counter(doc.page_content)
+
+        if position < min_k:
+            continue
+        if max_distance is not None and distance > max_distance:
+            return docs_and_scores[:position]
+        if score_gap is not None:
+            previous = docs_and_scores[position - 1][1]
+            if distance - previous > score_gap * max(abs(previous), 1e-6):
+                return docs_and_scores[:position]
+        if token_budget is not None and used_tokens > token_budget:
+            return docs_and_scores[:position]
+
+    return docs_and_scores
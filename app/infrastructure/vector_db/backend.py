@@ -0,0 +1,130 @@
+from abc import ABC, abstractmethod
+from typing import Any
+
+from langchain.schema import Document
+from langchain_chroma import Chroma
+import numpy as np
+
+
+class VectorBackend(ABC):
+    """
+    One collection of chunks, as used by `VectorDBRepository`.
+
+    Text-level operations (embedding included) mirror the Langchain vector
+    store; `query` and `get` take and return the Chroma collection shapes
+    (ids, documents, metadatas, distances, embeddings), so results from any
+    backend can be merged and post-processed the same way.
+    """
+
+    @property
+    @abstractmethod
+    def space(self) -> str:
+        """Distance space of the collection ("cosine", "l2" or "ip")."""
+
+    @abstractmethod
+    def add_documents(self, documents: list[Document]) -> list[str]:
+        """Embed and store chunks, returning their ids."""
+
+    @abstractmethod
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int,
+        filter: dict | None = None,
+        where_document: dict | None = None,
+    ) -> list[tuple[Document, float]]:
+        """Embed a query and return the `k` closest chunks with their distances."""
+
+    @abstractmethod
+    def query(
+        self,
+        query_embeddings: list[list[float]],
+        n_results: int,
+        where: dict | None = None,
+        where_document: dict | None = None,
+        include: list[str] | None = None,
+    ) -> Any:
+        """Nearest chunks for already embedded queries (Chroma `query` result)."""
+
+    @abstractmethod
+    def get(
+        self,
+        ids: list[str] | None = None,
+        where: dict | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        where_document: dict | None = None,
+        include: list[str] | None = None,
+    ) -> Any:
+        """Chunks by id and/or filter, paginated (Chroma `get` result)."""
+
+
+class ChromaBackend(VectorBackend):
+    """Chroma collection behind the Langchain wrapper (server or embedded)."""
+
+    def __init__(self, store: Chroma) -> None:
+        self._store = store
+
+    @property
+    def store(self) -> Chroma:
+        return self._store
+
+    @property
+    def space(self) -> str:
+        # * Fixed when the collection was created; Chroma's default is l2
+        hnsw = (self._store._collection.configuration or {}).get("hnsw")
+        if isinstance(hnsw, dict) and hnsw.get("space"):
+            return hnsw["space"]
+        return "l2"
+
+    def add_documents(self, documents: list[Document]) -> list[str]:
+        return self._store.add_documents(documents)
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int,
+        filter: dict | None = None,
+        where_document: dict | None = None,
+    ) -> list[tuple[Document, float]]:
+        return self._store.similarity_search_with_score(
+            query=query, k=k, filter=filter, where_document=where_document
+        )
+
+    def query(
+        self,
+        query_embeddings: list[list[float]],
+        n_results: int,
+        where: dict | None = None,
+        where_document: dict | None = None,
+        include: list[str] | None = None,
+    ) -> Any:
+        return self._store._collection.query(
+            query_embeddings=np.asarray(query_embeddings, dtype=np.float32),
+            n_results=n_results,
+            where=where,
+            where_document=where_document,
+            include=include or ["documents", "metadatas", "distances"],  # type: ignore[arg-type]
+        )
+
+    def get(
+        self,
+        ids: list[str] | None = None,
+        where: dict | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        where_document: dict | None = None,
+        include: list[str] | None = None,
+    ) -> Any:
+        # * Only forward what was given so Chroma keeps its own defaults (e.g. `include`)
+        arguments: dict[str, Any] = {
+            "ids": ids,
+            "where": where,
+            "limit": limit,
+            "offset": offset,
+            "where_document": where_document,
+            "include": include,
+        }
+        return self._store.get(
+            **{name: value for name, value in arguments.items() if value is not None}
+        )
@@ -0,0 +1,37 @@
+"""
+Compute document centroids for chunks ingested before centroid routing was enabled.
+
+Centroids are built from the stored chunk embeddings (no embedding calls). Usage:
+
+    python -m app.infrastructure.vector_db.centroid_backfill [--title TITLE ...]
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.infrastructure.embeddings.client import EmbeddingsClient
+from app.infrastructure.vector_db.chroma_client import ChromaDBClient
+from app.infrastructure.vector_db.repository import VectorDBRepository
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--title",
+        action="append",
+        dest="titles",
+        help="Document to refresh (repeatable; every document when omitted)",
+    )
+    args = parser.parse_args()
+
+    repository = VectorDBRepository(
+        settings.model_copy(update={"centroid_routing_enabled": True}),
+        ChromaDBClient(settings),
+        EmbeddingsClient(settings),
+    )
+    refreshed = repository.refresh_document_centroids(args.titles)
+    print(f"Centroids refreshed for {refreshed} documents")
+
+
+if __name__ == "__main__":
+    main()
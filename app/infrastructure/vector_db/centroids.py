@@ -0,0 +1,115 @@
+from typing import Any
+
+from chromadb.api import ClientAPI
+import numpy as np
+
+from app.infrastructure.vector_db.memmap_store import MemmapVectorClient
+from app.utils.logger import logger
+
+
+# Lloyd iterations when a document is summarized by several cluster centroids
+KMEANS_ITERATIONS = 10
+
+
+def document_centroids(embeddings: Any, clusters: int = 1) -> np.ndarray:
+    """
+    Summarize a document's chunk embeddings as one or a few unit centroids.
+
+    Embeddings are L2-normalized first so each chunk weighs the same; with
+    `clusters > 1` a small k-means (deterministic, evenly spaced seeds) splits
+    documents covering several topics.
+
+    Args:
+        embeddings: Chunk embeddings (n, dim)
+        clusters: Centroids per document (capped at the number of chunks)
+
+    Returns:
+        Normalized centroids (min(clusters, n), dim)
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    clusters = max(1, min(clusters, vectors.shape[0]))
+
+    if clusters == 1:
+        centroids = vectors.mean(axis=0, keepdims=True)
+    else:
+        seeds = np.linspace(0, vectors.shape[0] - 1, clusters).astype(int)
+        centroids = vectors[seeds].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            for cluster in range(clusters):
+                members = vectors[assignment == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+
+    return centroids / np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+
+def document_metadata(metadatas: list[dict]) -> dict:
+    """Metadata shared by every chunk of a document (e.g. titulo, tipo-documento)."""
+    if not metadatas:
+        return {}
+    shared = dict(metadatas[0])
+    for metadata in metadatas[1:]:
+        shared = {key: value for key, value in shared.items() if metadata.get(key) == value}
+    return shared
+
+
+class CentroidIndex:
+    """
+    Secondary collection (Chroma or memory-mapped) holding document centroids.
+
+    One entry per document (or per cluster, ids `<titulo>#<n>`) with the
+    document-level metadata, so queries can be routed to the most similar
+    documents before the chunk search.
+    """
+
+    def __init__(self, client: ClientAPI | MemmapVectorClient, collection_name: str) -> None:
+        self._collection: Any = client.get_or_create_collection(name=collection_name)
+
+    def upsert(self, title: str, centroids: np.ndarray, metadata: dict) -> None:
+        """Replace the centroids of a document."""
+        self.delete(title)
+        self._collection.upsert(
+            ids=[f"{title}#{cluster}" for cluster in range(len(centroids))],
+            embeddings=centroids,
+            metadatas=[{**metadata, "titulo": title}] * len(centroids),
+        )
+
+    def delete(self, title: str) -> None:
+        self._collection.delete(where={"titulo": title})
+
+    def route(
+        self, query_embedding: list[float], n_documents: int, where: dict | None
+    ) -> list[str]:
+        """
+        Titles of the documents whose centroids are closest to the query.
+
+        Args:
+            query_embedding: Query vector
+            n_documents: Documents to route to
+            where: Document-level metadata filter (e.g. the type filter)
+
+        Returns:
+            Up to `n_documents` titles, closest first
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        try:
+            # * Over-fetch: several clusters of one document may rank together
+            results: Any = self._collection.query(
+                query_embeddings=query[np.newaxis, :],
+                n_results=n_documents * 4,
+                where=where,
+                include=["metadatas"],
+            )
+        except Exception as e:
+            logger.warning(f"Centroid routing skipped: {e}")
+            return []
+
+        titles: list[str] = []
+        for metadata in results["metadatas"][0]:
+            title = metadata.get("titulo")
+            if title is not None and title not in titles:
+                titles.append(title)
+        return titles[:n_documents]
@@ -1,22 +1,81 @@
 import chromadb
 from chromadb.api import ClientAPI
+from chromadb.api.collection_configuration import (
+    CreateCollectionConfiguration,
+    CreateHNSWConfiguration,
+    UpdateCollectionConfiguration,
+    UpdateHNSWConfiguration,
+)
+from chromadb.api.models.Collection import Collection
+from chromadb.config import Settings as ChromaSettings
+from chromadb.errors import NotFoundError
 
 from app.core.config import Settings
 from app.utils.logger import logger
 
 
+def hnsw_configuration(settings: Settings) -> CreateCollectionConfiguration:
+    """Chroma collection configuration for the HNSW parameters in `settings`."""
+    return CreateCollectionConfiguration(
+        hnsw=CreateHNSWConfiguration(
+            space=settings.chromadb_hnsw_space,
+            max_neighbors=settings.chromadb_hnsw_m,
+            ef_construction=settings.chromadb_hnsw_ef_construction,
+            ef_search=settings.chromadb_hnsw_ef_search,
+        )
+    )
+
+
 class ChromaDBClient:
-    """ChromaDB HTTP client wrapper."""
+    """ChromaDB client wrapper (HTTP server or embedded persistent mode)."""
 
     def __init__(self, settings: Settings) -> None:
-        self._client: ClientAPI = chromadb.HttpClient(
-            host=f"http://{settings.chromadb_host}:{settings.chromadb_port}",
+        self._settings = settings
+        if settings.chromadb_mode == "http":
+            self._client: ClientAPI = chromadb.HttpClient(
+                host=f"http://{settings.chromadb_host}:{settings.chromadb_port}",
+                tenant=settings.chromadb_tenant,
+                database=settings.chromadb_database,
+            )
+            logger.info(
+                f"ChromaDB client initialized: {settings.chromadb_host}:{settings.chromadb_port}"
+            )
+        else:
+            self._client = self._create_persistent_client(settings)
+            logger.info(f"ChromaDB embedded client initialized: {settings.chromadb_persist_path}")
+
+    @staticmethod
+    def _create_persistent_client(settings: Settings) -> ClientAPI:
+        """Create an in-process client keeping the same tenant/database layout."""
+        chroma_settings = ChromaSettings(
+            is_persistent=True,
+            persist_directory=settings.chromadb_persist_path,
+            anonymized_telemetry=False,
+        )
+
+        # * Embedded storage starts empty: create tenant and database on first run
+        admin_client = chromadb.AdminClient(chroma_settings)
+        try:
+            admin_client.get_tenant(name=settings.chromadb_tenant)
+        except NotFoundError:
+            admin_client.create_tenant(name=settings.chromadb_tenant)
+            logger.info(f"Tenant '{settings.chromadb_tenant}' created")
+        try:
+            admin_client.get_database(
+                name=settings.chromadb_database, tenant=settings.chromadb_tenant
+            )
+        except NotFoundError:
+            admin_client.create_database(
+                name=settings.chromadb_database, tenant=settings.chromadb_tenant
+            )
+            logger.info(f"Database '{settings.chromadb_database}' created")
+
+        return chromadb.PersistentClient(
+            path=settings.chromadb_persist_path,
+            settings=chroma_settings,
             tenant=settings.chromadb_tenant,
             database=settings.chromadb_database,
         )
-        logger.info(
-            f"ChromaDB client initialized: {settings.chromadb_host}:{settings.chromadb_port}"
-        )
 
     @property
     def client(self) -> ClientAPI:
@@ -27,11 +86,47 @@ class ChromaDBClient:
         return self._client.heartbeat()
 
     def get_or_create_collection(self, name: str) -> None:
-        """Ensure collection exists, create if needed."""
+        """Ensure collection exists, create if needed (HNSW parameters from settings)."""
         try:
-            self._client.get_collection(name=name)
-            logger.info(f"Collection '{name}' exists")
+            collection = self._client.get_collection(name=name)
         except Exception as e:
             logger.warning(f"Collection '{name}' not found: {e}")
-            self._client.create_collection(name=name)
+            self._client.create_collection(
+                name=name,
+                configuration=hnsw_configuration(self._settings),
+            )
             logger.info(f"Collection '{name}' created")
+            return
+
+        logger.info(f"Collection '{name}' exists")
+        self._apply_search_ef(collection)
+
+    def _apply_search_ef(self, collection: Collection) -> None:
+        """Align ef_search of an existing collection; other HNSW parameters are immutable."""
+        current = (collection.configuration or {}).get("hnsw")
+        if not isinstance(current, dict):
+            return
+
+        wanted = {
+            "space": self._settings.chromadb_hnsw_space,
+            "max_neighbors": self._settings.chromadb_hnsw_m,
+            "ef_construction": self._settings.chromadb_hnsw_ef_construction,
+        }
+        drift = {
+            key: current.get(key) for key, value in wanted.items() if current.get(key) != value
+        }
+        if drift:
+            logger.warning(
+                f"Collection '{collection.name}' was created with different HNSW parameters "
+                f"{drift}; recreate it (e.g. migrate) to apply the configured ones"
+            )
+
+        ef_search = self._settings.chromadb_hnsw_ef_search
+        if current.get("ef_search") != ef_search:
+            collection.modify(
+                configuration=UpdateCollectionConfiguration(
+                    hnsw=UpdateHNSWConfiguration(ef_search=ef_search)
+                )
+            )
+            # * Chroma reads ef_search when it loads the index segment (e.g. on restart)
+            logger.info(f"Collection '{collection.name}' ef_search set to {ef_search}")
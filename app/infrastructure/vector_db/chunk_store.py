@@ -0,0 +1,102 @@
+import json
+from pathlib import Path
+import sqlite3
+import threading
+
+from langchain.schema import Document
+
+
+class ChunkStore:
+    """
+    Local chunk text store keyed by (titulo, pagina, seq).
+
+    Holds the text and metadata of every ingested chunk so neighbors and
+    whole pages can be fetched by key instead of by vector search. Backed by
+    SQLite (WAL mode), so several worker processes can share one file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # * Opened lazily so a disabled/unused store never touches the filesystem
+        if self._connection is None:
+            Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                " titulo TEXT NOT NULL,"
+                " pagina INTEGER NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " chunk_id TEXT,"
+                " content TEXT NOT NULL,"
+                " metadata TEXT NOT NULL,"
+                " PRIMARY KEY (titulo, pagina, seq))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS chunks_seq ON chunks (titulo, seq)")
+            connection.execute("CREATE INDEX IF NOT EXISTS chunks_id ON chunks (chunk_id)")
+            self._connection = connection
+        return self._connection
+
+    def put(self, chunks: list[Document]) -> None:
+        """
+        Store chunks (upsert by key).
+
+        Raises:
+            KeyError: If a chunk lacks `titulo`, `pagina` or `seq` metadata
+        """
+        rows = [
+            (
+                chunk.metadata["titulo"],
+                chunk.metadata["pagina"],
+                chunk.metadata["seq"],
+                chunk.id,
+                chunk.page_content,
+                json.dumps(chunk.metadata, ensure_ascii=False),
+            )
+            for chunk in chunks
+        ]
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+
+    def get_range(self, title: str, seq_start: int, seq_end: int) -> list[Document]:
+        """Chunks of a document with `seq_start <= seq <= seq_end`, in order."""
+        return self._select(
+            "WHERE titulo = ? AND seq BETWEEN ? AND ? ORDER BY seq", (title, seq_start, seq_end)
+        )
+
+    def get_page(self, title: str, pagina: int) -> list[Document]:
+        """Chunks of one page of a document, in order."""
+        return self._select("WHERE titulo = ? AND pagina = ? ORDER BY seq", (title, pagina))
+
+    def get_by_ids(self, chunk_ids: list[str]) -> list[Document]:
+        """Chunks with the given ids (unknown ids are skipped; order not preserved)."""
+        if not chunk_ids:
+            return []
+        placeholders = ", ".join("?" * len(chunk_ids))
+        return self._select(f"WHERE chunk_id IN ({placeholders})", tuple(chunk_ids))
+
+    def delete_document(self, title: str) -> None:
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM chunks WHERE titulo = ?", (title,))
+
+    def _select(self, clause: str, params: tuple) -> list[Document]:
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(f"SELECT chunk_id, content, metadata FROM chunks {clause}", params)
+                .fetchall()
+            )
+        return [
+            Document(page_content=content, metadata=json.loads(metadata), id=chunk_id)
+            for chunk_id, content, metadata in rows
+        ]
@@ -0,0 +1,89 @@
+from typing import Any
+
+
+# Chroma `where` comparison operators evaluated locally
+_COMPARISONS = {
+    "$eq": lambda value, target: value == target,
+    "$ne": lambda value, target: value != target,
+    "$gt": lambda value, target: value is not None and value > target,
+    "$gte": lambda value, target: value is not None and value >= target,
+    "$lt": lambda value, target: value is not None and value < target,
+    "$lte": lambda value, target: value is not None and value <= target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value not in target,
+}
+
+
+def matches_where(metadata: dict[str, Any], where: dict | None) -> bool:
+    """
+    Evaluate a Chroma metadata filter against a metadata dict.
+
+    Supports the subset of the Chroma `where` syntax used by the services:
+    `$and`, `$or`, plain equality and the comparison operators.
+
+    Args:
+        metadata: Chunk metadata
+        where: Chroma `where` filter (None or empty matches everything)
+
+    Returns:
+        True if the metadata satisfies the filter
+    """
+    if not where:
+        return True
+
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, sub) for sub in condition):
+                return False
+        elif not _matches_condition(metadata.get(key), condition):
+            return False
+
+    return True
+
+
+def _matches_condition(value: Any, condition: Any) -> bool:
+    # * Plain values are shorthand for `$eq`
+    if not isinstance(condition, dict):
+        return value == condition
+
+    for operator, target in condition.items():
+        comparison = _COMPARISONS.get(operator)
+        if comparison is None:
+            raise ValueError(f"Unsupported metadata filter operator: {operator}")
+        if not comparison(value, target):
+            return False
+    return True
+
+
+def matches_where_document(document: str, where_document: dict | None) -> bool:
+    """
+    Evaluate a Chroma `where_document` filter against chunk text.
+
+    Args:
+        document: Chunk text
+        where_document: Chroma document filter (`$contains`, `$not_contains`, `$and`, `$or`)
+
+    Returns:
+        True if the text satisfies the filter
+    """
+    if not where_document:
+        return True
+
+    for operator, target in where_document.items():
+        if operator == "$contains":
+            matched = target in document
+        elif operator == "$not_contains":
+            matched = target not in document
+        elif operator == "$and":
+            matched = all(matches_where_document(document, sub) for sub in target)
+        elif operator == "$or":
+            matched = any(matches_where_document(document, sub) for sub in target)
+        else:
+            raise ValueError(f"Unsupported document filter operator: {operator}")
+        if not matched:
+            return False
+
+    return True
@@ -0,0 +1,218 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+import threading
+from typing import Any
+
+import hnswlib  # type: ignore[import-untyped]
+from langchain.schema import Document
+import numpy as np
+
+from app.infrastructure.vector_db.filters import matches_where, matches_where_document
+from app.utils.logger import logger
+
+
+@dataclass
+class _LocalRecord:
+    chunk_id: str
+    document: str
+    metadata: dict[str, Any]
+
+
+class LocalHNSWIndex:
+    """
+    In-process HNSW read replica of a Chroma collection.
+
+    Mirrors ids, embeddings and metadata so hot queries can be answered
+    without the HTTP hop. Chroma remains the source of truth: the replica is
+    fed from ingestion and periodically reconciled against the collection.
+    The graph uses the collection's distance space, so both return the same
+    distances.
+    """
+
+    # hnswlib grows the graph by this factor when it runs out of capacity
+    RESIZE_FACTOR = 2
+
+    def __init__(
+        self,
+        space: str = "l2",
+        max_elements: int = 500_000,
+        m: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 100,
+    ) -> None:
+        self._space = space
+        self._max_elements = max_elements
+        self._m = m
+        self._ef_construction = ef_construction
+        self._ef_search = ef_search
+
+        # * The graph is created lazily, once the embedding dimension is known
+        self._index: hnswlib.Index | None = None
+        self._labels: dict[str, int] = {}
+        self._records: dict[int, _LocalRecord] = {}
+        self._next_label = 0
+        self._ready = False
+        self._lock = threading.RLock()
+
+    @property
+    def space(self) -> str:
+        """Distance space of the graph (hnswlib names, the same as Chroma's)."""
+        return self._space
+
+    @property
+    def ready(self) -> bool:
+        """Whether the replica finished its initial sync and can serve queries."""
+        return self._ready
+
+    def mark_ready(self) -> None:
+        self._ready = True
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def ids(self) -> set[str]:
+        """Chunk ids currently mirrored."""
+        with self._lock:
+            return set(self._labels)
+
+    def reset(self, space: str) -> None:
+        """Drop every mirrored chunk and switch the distance space (resync needed)."""
+        with self._lock:
+            self._space = space
+            self._index = None
+            self._labels = {}
+            self._records = {}
+            self._next_label = 0
+            self._ready = False
+
+    def upsert(
+        self,
+        ids: list[str],
+        embeddings: Any,
+        documents: list[str],
+        metadatas: list[dict[str, Any]],
+    ) -> None:
+        """
+        Insert or replace chunks in the replica.
+
+        Args:
+            ids: Chroma chunk ids
+            embeddings: Chunk embeddings (one row per id)
+            documents: Chunk texts
+            metadatas: Chunk metadata
+        """
+        if not ids:
+            return
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            self._ensure_index(vectors.shape[1], len(ids))
+
+            labels = []
+            for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                label = self._labels.get(chunk_id)
+                if label is None:
+                    label = self._next_label
+                    self._next_label += 1
+                    self._labels[chunk_id] = label
+                self._records[label] = _LocalRecord(chunk_id, document or "", metadata or {})
+                labels.append(label)
+
+            assert self._index is not None
+            self._index.add_items(vectors, np.asarray(labels, dtype=np.int64))
+
+    def remove(self, ids: list[str]) -> None:
+        """Drop chunks that no longer exist in Chroma."""
+        with self._lock:
+            for chunk_id in ids:
+                label = self._labels.pop(chunk_id, None)
+                if label is None:
+                    continue
+                self._records.pop(label, None)
+                assert self._index is not None
+                self._index.mark_deleted(label)
+
+    def search(
+        self,
+        embedding: list[float],
+        k: int,
+        metadata_filter: dict | None = None,
+        where_document: dict | None = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Nearest-neighbour search with Chroma-style metadata filtering.
+
+        Args:
+            embedding: Query embedding
+            k: Number of results
+            metadata_filter: Chroma `where` filter
+            where_document: Chroma `where_document` filter
+
+        Returns:
+            List of (Document, distance) tuples, closest first
+        """
+        with self._lock:
+            if self._index is None or not self._labels:
+                return []
+
+            def label_filter(label: int) -> bool:
+                record = self._records.get(label)
+                return (
+                    record is not None
+                    and matches_where(record.metadata, metadata_filter)
+                    and matches_where_document(record.document, where_document)
+                )
+
+            query = np.asarray(embedding, dtype=np.float32)
+            k = min(k, len(self._labels))
+            try:
+                labels, distances = self._index.knn_query(query, k=k, filter=label_filter)
+            except RuntimeError:
+                # * Fewer than k chunks pass the filter: bisect the largest k that succeeds
+                labels, distances = self._largest_knn_query(query, k, label_filter)
+
+            results = []
+            for label, distance in zip(labels[0], distances[0]):
+                record = self._records[int(label)]
+                document = Document(
+                    page_content=record.document,
+                    metadata=record.metadata,
+                    id=record.chunk_id,
+                )
+                results.append((document, float(distance)))
+            return results
+
+    def _largest_knn_query(
+        self, query: np.ndarray, failed_k: int, label_filter: Callable[[int], bool]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Filtered query with the largest k below `failed_k` that hnswlib can fill."""
+        assert self._index is not None
+        empty = (np.empty((1, 0), dtype=np.uint64), np.empty((1, 0), dtype=np.float32))
+        found, low, high = empty, 0, failed_k
+        while high - low > 1:
+            k = (low + high) // 2
+            try:
+                found = self._index.knn_query(query, k=k, filter=label_filter)
+                low = k
+            except RuntimeError:
+                high = k
+        return found
+
+    def _ensure_index(self, dim: int, incoming: int) -> None:
+        if self._index is None:
+            self._index = hnswlib.Index(space=self._space, dim=dim)
+            self._index.init_index(
+                max_elements=max(self._max_elements, incoming),
+                ef_construction=self._ef_construction,
+                M=self._m,
+            )
+            self._index.set_ef(self._ef_search)
+            logger.info(f"Local HNSW index created: dim={dim}, space={self._space}")
+            return
+
+        required = self._index.element_count + incoming
+        capacity = self._index.get_max_elements()
+        if required > capacity:
+            new_capacity = max(required, capacity * self.RESIZE_FACTOR)
+            self._index.resize_index(new_capacity)
+            logger.info(f"Local HNSW index resized: {capacity} -> {new_capacity}")
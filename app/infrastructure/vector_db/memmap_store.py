@@ -0,0 +1,574 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+import fcntl
+import json
+import operator
+import os
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any
+import uuid
+
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+import numpy as np
+
+from app.infrastructure.vector_db.backend import VectorBackend
+from app.infrastructure.vector_db.filters import matches_where_document
+from app.infrastructure.vector_db.quantization import VectorQuantizer, build_quantizer
+
+
+# Chroma `where` ordering operators (missing values never match)
+_ORDERINGS = {
+    "$gt": operator.gt,
+    "$gte": operator.ge,
+    "$lt": operator.lt,
+    "$lte": operator.le,
+}
+
+# Filter masks cached per collection; the cache is cleared whenever the collection changes
+_MASK_CACHE_SIZE = 256
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32, copy=False)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the `k` highest scores, best first."""
+    if k >= scores.size:
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class MemmapCollection(VectorBackend):
+    """
+    Exact-search collection on a memory-mapped float32 matrix.
+
+    Embeddings are L2-normalized and appended as rows of `vectors.f32`; ids,
+    texts and metadata live in a SQLite table (`records.sqlite3`) keyed by row.
+    A search is one matrix product over the rows passing the metadata and
+    document pre-filter masks, and distances are cosine distances (`1 - cos`),
+    as in a Chroma collection using the cosine space.
+
+    Rows are never rewritten: upserts append and tombstone the previous row of
+    the id, deletes only tombstone. Writers serialize on a file lock, so several
+    worker processes can share one directory; each process maps the matrix
+    read-only and picks up other processes' writes through a version counter.
+
+    With `quantization` set, an in-memory sidecar of compact codes (see
+    `VectorQuantizer`) scores the candidates first and only the best
+    `n_results * rescore_factor` rows are re-scored with the mapped vectors, so
+    most of the float32 matrix is never paged in.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        embedding_function: Embeddings | None = None,
+        quantization: str = "none",
+        pca_dimensions: int | None = None,
+        rescore_factor: int = 4,
+    ) -> None:
+        self._path = Path(path)
+        self._vectors_path = self._path / "vectors.f32"
+        self.embedding_function = embedding_function
+        self._lock = threading.RLock()
+        # * Validated eagerly; the sidecar itself is built on the first query
+        build_quantizer(quantization, pca_dimensions)
+        self._quantization = quantization
+        self._pca_dimensions = pca_dimensions
+        self._rescore_factor = rescore_factor
+        self._quantizer: VectorQuantizer | None = None
+        self._codes: np.ndarray | None = None
+        self._connection: sqlite3.Connection | None = None
+
+        # * In-process view of the collection, reloaded when the stored version changes
+        self._version = -1
+        self._dimension: int | None = None
+        self._vectors: np.ndarray | None = None
+        self._ids: list[str] = []
+        self._documents: list[str] = []
+        self._metadatas: list[dict[str, Any]] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._rows_by_id: dict[str, int] = {}
+        self._columns: dict[str, np.ndarray] = {}
+        self._masks: dict[str, np.ndarray] = {}
+
+    @property
+    def name(self) -> str:
+        return self._path.name
+
+    @property
+    def sidecar_nbytes(self) -> int:
+        """Memory held by the quantized codes (0 when quantization is off or not built yet)."""
+        return 0 if self._codes is None else int(self._codes.nbytes)
+
+    @property
+    def space(self) -> str:
+        return "cosine"
+
+    def add_documents(self, documents: list[Document]) -> list[str]:
+        if not documents:
+            return []
+        if self.embedding_function is None:
+            raise ValueError(f"Collection '{self.name}' has no embedding function")
+
+        ids = [document.id or str(uuid.uuid4()) for document in documents]
+        embeddings = self.embedding_function.embed_documents(
+            [document.page_content for document in documents]
+        )
+        self.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=[document.page_content for document in documents],
+            metadatas=[document.metadata for document in documents],
+        )
+        return ids
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int,
+        filter: dict | None = None,
+        where_document: dict | None = None,
+    ) -> list[tuple[Document, float]]:
+        if self.embedding_function is None:
+            raise ValueError(f"Collection '{self.name}' has no embedding function")
+
+        results = self.query(
+            query_embeddings=[self.embedding_function.embed_query(query)],
+            n_results=k,
+            where=filter,
+            where_document=where_document,
+        )
+        return [
+            (Document(page_content=text, metadata=metadata, id=chunk_id), distance)
+            for chunk_id, text, metadata, distance in zip(
+                results["ids"][0],
+                results["documents"][0],
+                results["metadatas"][0],
+                results["distances"][0],
+            )
+        ]
+
+    def upsert(
+        self,
+        ids: list[str],
+        embeddings: Any,
+        documents: list[str] | None = None,
+        metadatas: list[dict] | None = None,
+    ) -> None:
+        """
+        Append chunks, replacing any stored chunk with the same id.
+
+        Raises:
+            ValueError: If the embedding dimension differs from the stored one
+        """
+        if len(ids) == 0:
+            return
+
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        documents = documents or [""] * len(ids)
+        metadatas = metadatas or [{}] * len(ids)
+        # * An id repeated within one call keeps its last occurrence
+        positions = sorted({chunk_id: position for position, chunk_id in enumerate(ids)}.values())
+
+        with self._write_lock() as connection:
+            dimension = self._stored_dimension(connection)
+            if dimension is not None and vectors.shape[1] != dimension:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match "
+                    f"collection '{self.name}' ({dimension})"
+                )
+
+            (start,) = connection.execute(
+                "SELECT COALESCE(MAX(row) + 1, 0) FROM records"
+            ).fetchone()
+            self._append_vectors(start, vectors[positions])
+            with connection:
+                connection.execute(
+                    "INSERT OR IGNORE INTO info VALUES ('dimension', ?)", (vectors.shape[1],)
+                )
+                connection.executemany(
+                    "UPDATE records SET deleted = 1 WHERE chunk_id = ? AND deleted = 0",
+                    [(ids[position],) for position in positions],
+                )
+                connection.executemany(
+                    "INSERT INTO records VALUES (?, ?, ?, ?, 0)",
+                    [
+                        (
+                            start + offset,
+                            ids[position],
+                            documents[position] or "",
+                            json.dumps(metadatas[position] or {}, ensure_ascii=False),
+                        )
+                        for offset, position in enumerate(positions)
+                    ],
+                )
+                connection.execute("UPDATE info SET value = value + 1 WHERE key = 'version'")
+
+    def delete(self, ids: list[str] | None = None, where: dict | None = None) -> None:
+        """Delete chunks by id and/or metadata filter."""
+        if ids is None and not where:
+            return
+
+        with self._write_lock() as connection:
+            self._refresh()
+            rows = self._select_rows(ids=ids, where=where)
+            if rows.size == 0:
+                return
+            with connection:
+                connection.executemany(
+                    "UPDATE records SET deleted = 1 WHERE row = ?", [(int(row),) for row in rows]
+                )
+                connection.execute("UPDATE info SET value = value + 1 WHERE key = 'version'")
+
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return int(self._alive.sum())
+
+    def get(
+        self,
+        ids: list[str] | None = None,
+        where: dict | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        where_document: dict | None = None,
+        include: list[str] | None = None,
+    ) -> dict[str, Any]:
+        include = ["documents", "metadatas"] if include is None else include
+        with self._lock:
+            self._refresh()
+            rows = self._select_rows(ids=ids, where=where, where_document=where_document)
+            vectors = self._vectors
+
+        start = offset or 0
+        rows = rows[start : None if limit is None else start + limit]
+        result: dict[str, Any] = {"ids": [self._ids[row] for row in rows]}
+        for field in include:
+            result[field] = self._field(field, rows, vectors)
+        return result
+
+    def query(
+        self,
+        query_embeddings: Any,
+        n_results: int = 10,
+        where: dict | None = None,
+        where_document: dict | None = None,
+        include: list[str] | None = None,
+    ) -> dict[str, Any]:
+        include = ["documents", "metadatas", "distances"] if include is None else include
+        queries = _normalize(
+            np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        )
+
+        with self._lock:
+            self._refresh()
+            rows = np.flatnonzero(self._candidates(where, where_document))
+            vectors = self._vectors
+            sidecar = self._sidecar()
+
+        result: dict[str, Any] = {field: [] for field in ["ids", *include]}
+        if vectors is None or rows.size == 0:
+            for field in result:
+                result[field] = [[] for _ in range(len(queries))]
+            return result
+
+        # * Dense masks: one product over all rows; sparse masks: gather rows first
+        dense = rows.size * 2 > len(vectors)
+        shortlist = n_results * self._rescore_factor
+        approximate: np.ndarray | None = None
+        if sidecar is not None and rows.size > shortlist:
+            quantizer, codes = sidecar
+            if dense:
+                approximate = quantizer.scores(codes, queries)[rows]
+            else:
+                approximate = quantizer.scores(codes[rows], queries)
+        elif dense:
+            scores = (vectors @ queries.T)[rows]
+        else:
+            scores = vectors[rows] @ queries.T
+
+        for column, query in enumerate(queries):
+            if approximate is not None:
+                # * First pass on the codes, exact re-scoring of the shortlist
+                candidates = np.sort(rows[_top_k(approximate[:, column], shortlist)])
+                exact = vectors[candidates] @ query
+                top = _top_k(exact, n_results)
+                selected, selected_scores = candidates[top], exact[top]
+            else:
+                top = _top_k(scores[:, column], n_results)
+                selected, selected_scores = rows[top], scores[top, column]
+
+            result["ids"].append([self._ids[row] for row in selected])
+            for field in include:
+                if field == "distances":
+                    result[field].append([float(1.0 - score) for score in selected_scores])
+                else:
+                    result[field].append(self._field(field, selected, vectors))
+        return result
+
+    def _sidecar(self) -> tuple[VectorQuantizer, np.ndarray] | None:
+        """Quantizer and codes of every row, refitted whenever the collection doubles."""
+        if self._quantization == "none" or self._vectors is None:
+            return None
+
+        if self._quantizer is None or len(self._vectors) >= 2 * self._quantizer.fitted_rows:
+            # * A new quantizer (not a refit in place): concurrent queries keep a consistent pair
+            quantizer = build_quantizer(self._quantization, self._pca_dimensions)
+            if quantizer is None:
+                return None
+            quantizer.fit(self._vectors)
+            self._quantizer = quantizer
+            self._codes = quantizer.encode(self._vectors)
+        elif self._codes is not None and len(self._codes) < len(self._vectors):
+            self._codes = np.concatenate(
+                [self._codes, self._quantizer.encode(self._vectors[len(self._codes) :])]
+            )
+
+        if self._codes is None:
+            return None
+        return self._quantizer, self._codes
+
+    def _field(self, field: str, rows: np.ndarray, vectors: np.ndarray | None) -> Any:
+        if field == "documents":
+            return [self._documents[row] for row in rows]
+        if field == "metadatas":
+            return [dict(self._metadatas[row]) for row in rows]
+        if field == "embeddings":
+            if vectors is None:
+                return np.zeros((0, self._dimension or 0), dtype=np.float32)
+            return np.array(vectors[rows])
+        raise ValueError(f"Unsupported include field: {field}")
+
+    def _connect(self) -> sqlite3.Connection:
+        # * Opened lazily so a collection that is never used never touches the filesystem
+        if self._connection is None:
+            self._path.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path / "records.sqlite3", timeout=30, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " row INTEGER PRIMARY KEY,"
+                " chunk_id TEXT NOT NULL,"
+                " document TEXT NOT NULL,"
+                " metadata TEXT NOT NULL,"
+                " deleted INTEGER NOT NULL DEFAULT 0)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS records_chunk_id ON records (chunk_id)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            connection.execute("INSERT OR IGNORE INTO info VALUES ('version', 0)")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[sqlite3.Connection]:
+        """Serialize writers across threads and processes."""
+        with self._lock:
+            connection = self._connect()
+            with open(self._path / "write.lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield connection
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _stored_dimension(connection: sqlite3.Connection) -> int | None:
+        row = connection.execute("SELECT value FROM info WHERE key = 'dimension'").fetchone()
+        return None if row is None else int(row[0])
+
+    def _append_vectors(self, start_row: int, vectors: np.ndarray) -> None:
+        with open(self._vectors_path, "ab") as vectors_file:
+            # * Drop rows left by a writer that died before committing them
+            vectors_file.truncate(start_row * vectors.shape[1] * vectors.itemsize)
+            vectors_file.write(np.ascontiguousarray(vectors).tobytes())
+            vectors_file.flush()
+            os.fsync(vectors_file.fileno())
+
+    def _refresh(self) -> None:
+        """Load rows and tombstones committed since the last refresh (by any process)."""
+        connection = self._connect()
+        version = connection.execute("SELECT value FROM info WHERE key = 'version'").fetchone()[0]
+        if version == self._version:
+            return
+
+        # * Rows are append-only: only the new ones are read
+        for chunk_id, document, metadata in connection.execute(
+            "SELECT chunk_id, document, metadata FROM records WHERE row >= ? ORDER BY row",
+            (len(self._ids),),
+        ):
+            self._ids.append(chunk_id)
+            self._documents.append(document)
+            self._metadatas.append(json.loads(metadata))
+
+        alive = np.ones(len(self._ids), dtype=bool)
+        deleted = [
+            row for (row,) in connection.execute("SELECT row FROM records WHERE deleted = 1")
+        ]
+        alive[deleted] = False
+
+        self._dimension = self._stored_dimension(connection)
+        self._vectors = None
+        if self._ids and self._dimension:
+            # * Read-only mapping of the committed rows; pages are shared by every process
+            self._vectors = np.memmap(
+                self._vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(len(self._ids), self._dimension),
+            )
+        self._alive = alive
+        self._rows_by_id = {self._ids[row]: int(row) for row in np.flatnonzero(alive)}
+        self._columns = {}
+        self._masks = {}
+        self._version = version
+
+    def _select_rows(
+        self,
+        ids: list[str] | None = None,
+        where: dict | None = None,
+        where_document: dict | None = None,
+    ) -> np.ndarray:
+        mask = self._candidates(where, where_document)
+        if ids is None:
+            return np.flatnonzero(mask)
+        rows = [self._rows_by_id[chunk_id] for chunk_id in ids if chunk_id in self._rows_by_id]
+        return np.asarray([row for row in rows if mask[row]], dtype=np.int64)
+
+    def _candidates(self, where: dict | None, where_document: dict | None) -> np.ndarray:
+        """Pre-filter mask: live rows matching the metadata and document filters."""
+        mask = self._alive
+        if where:
+            mask = mask & self._cached_mask("where", where, self._where_mask)
+        if where_document:
+            mask = mask & self._cached_mask("document", where_document, self._document_mask)
+        return mask
+
+    def _cached_mask(self, kind: str, condition: dict, build: Any) -> np.ndarray:
+        key = f"{kind}:{json.dumps(condition, sort_keys=True, default=str)}"
+        mask = self._masks.get(key)
+        if mask is None:
+            if len(self._masks) >= _MASK_CACHE_SIZE:
+                self._masks.clear()
+            mask = build(condition)
+            self._masks[key] = mask
+        return mask
+
+    def _where_mask(self, where: dict) -> np.ndarray:
+        """Evaluate a Chroma `where` filter column-wise (same semantics as `matches_where`)."""
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for sub_filter in condition:
+                    mask &= self._where_mask(sub_filter)
+            elif key == "$or":
+                union = np.zeros(len(self._ids), dtype=bool)
+                for sub_filter in condition:
+                    union |= self._where_mask(sub_filter)
+                mask &= union
+            elif not isinstance(condition, dict):
+                mask &= self._compare(self._column(key), "$eq", condition)
+            else:
+                for comparison, target in condition.items():
+                    mask &= self._compare(self._column(key), comparison, target)
+        return mask
+
+    @staticmethod
+    def _compare(column: np.ndarray, comparison: str, target: Any) -> np.ndarray:
+        if comparison == "$eq":
+            return np.asarray(column == target, dtype=bool)
+        if comparison == "$ne":
+            return np.asarray(column != target, dtype=bool)
+        if comparison in ("$in", "$nin"):
+            matched = np.zeros(len(column), dtype=bool)
+            for value in target:
+                matched |= np.asarray(column == value, dtype=bool)
+            return matched if comparison == "$in" else ~matched
+        ordering = _ORDERINGS.get(comparison)
+        if ordering is None:
+            raise ValueError(f"Unsupported metadata filter operator: {comparison}")
+        return np.fromiter(
+            (value is not None and ordering(value, target) for value in column),
+            dtype=bool,
+            count=len(column),
+        )
+
+    def _column(self, key: str) -> np.ndarray:
+        """Values of one metadata key for every row (None where missing)."""
+        column = self._columns.get(key)
+        if column is None:
+            column = np.empty(len(self._metadatas), dtype=object)
+            for row, metadata in enumerate(self._metadatas):
+                column[row] = metadata.get(key)
+            self._columns[key] = column
+        return column
+
+    def _document_mask(self, where_document: dict) -> np.ndarray:
+        return np.fromiter(
+            (matches_where_document(document, where_document) for document in self._documents),
+            dtype=bool,
+            count=len(self._documents),
+        )
+
+
+class MemmapVectorClient:
+    """
+    Directory of memory-mapped collections, one sub-directory per collection.
+
+    Exposes the part of the Chroma client API used by the repository and the
+    centroid index (`get_or_create_collection`, `list_collections`), so both
+    run unchanged on either backend.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        quantization: str = "none",
+        pca_dimensions: int | None = None,
+        rescore_factor: int = 4,
+    ) -> None:
+        self._path = Path(path)
+        self._quantization = quantization
+        self._pca_dimensions = pca_dimensions
+        self._rescore_factor = rescore_factor
+        self._lock = threading.Lock()
+        self._collections: dict[str, MemmapCollection] = {}
+
+    def get_or_create_collection(
+        self, name: str, embedding_function: Embeddings | None = None
+    ) -> MemmapCollection:
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = MemmapCollection(
+                    self._path / name,
+                    embedding_function,
+                    quantization=self._quantization,
+                    pca_dimensions=self._pca_dimensions,
+                    rescore_factor=self._rescore_factor,
+                )
+                self._collections[name] = collection
+            elif collection.embedding_function is None:
+                collection.embedding_function = embedding_function
+            return collection
+
+    def list_collections(self) -> list[MemmapCollection]:
+        """Collections stored under the directory (including other processes' ones)."""
+        if not self._path.is_dir():
+            return []
+        return [
+            self.get_or_create_collection(entry.name)
+            for entry in sorted(self._path.iterdir())
+            if (entry / "records.sqlite3").is_file()
+        ]
@@ -0,0 +1,56 @@
+from typing import Any
+
+import numpy as np
+
+
+def maximal_marginal_relevance(
+    query_embedding: Any,
+    candidate_embeddings: Any,
+    k: int,
+    lambda_mult: float = 0.5,
+    relevance: Any = None,
+) -> list[int]:
+    """
+    Select candidates balancing query relevance against redundancy (MMR).
+
+    Cosine similarities are computed once as matrix products; the running
+    "max similarity to the selected set" vector is updated with one column per
+    step, so selection costs O(k * n) after the initial O(n^2) Gram matrix.
+
+    Args:
+        query_embedding: Query vector (dim,)
+        candidate_embeddings: Candidate vectors (n, dim)
+        k: Number of candidates to select
+        lambda_mult: 1 favours pure relevance, 0 favours pure diversity
+        relevance: Precomputed relevance scores (n,) used instead of the query
+            cosine similarity (e.g. reranking scores)
+
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    if candidates.ndim != 2 or candidates.shape[0] == 0 or k <= 0:
+        return []
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = candidates @ query if relevance is None else np.asarray(relevance, np.float32)
+    similarity = candidates @ candidates.T
+
+    k = min(k, candidates.shape[0])
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    available = np.ones(candidates.shape[0], dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+
+    return selected
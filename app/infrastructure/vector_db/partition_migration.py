@@ -0,0 +1,120 @@
+"""
+Move chunks from the single base collection into per-partition collections.
+
+Embeddings are copied as stored (no re-embedding) and chunk ids are kept, so
+the migration can be re-run safely. Usage:
+
+    python -m app.infrastructure.vector_db.partition_migration --partition-key tipo-documento
+"""
+
+import argparse
+from typing import Any
+
+from chromadb.api import ClientAPI
+
+from app.core.config import settings
+from app.infrastructure.vector_db.chroma_client import ChromaDBClient, hnsw_configuration
+from app.infrastructure.vector_db.partitioning import PartitionRouter
+from app.utils.logger import logger
+
+
+def migrate_to_partitions(
+    client: ClientAPI,
+    source_collection: str,
+    partition_key: str,
+    batch_size: int = 1000,
+    delete_source: bool = False,
+) -> dict[str, int]:
+    """
+    Copy every chunk of `source_collection` into its partition collection.
+
+    Args:
+        client: Chroma client
+        source_collection: Collection to migrate (the unpartitioned one)
+        partition_key: Metadata key used to partition
+        batch_size: Chunks read and written per request
+        delete_source: Delete migrated chunks from the source collection
+
+    Returns:
+        Number of chunks written per partition collection; chunks without the
+        partition key are left in the source under the "unpartitioned" entry
+    """
+    router = PartitionRouter(source_collection, partition_key)
+    source = client.get_collection(name=source_collection)
+    counts: dict[str, int] = {}
+    migrated_ids: list[str] = []
+
+    offset = 0
+    while True:
+        page: Any = source.get(
+            include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset
+        )
+        page_ids = page["ids"]
+        if not page_ids:
+            break
+
+        groups: dict[str, list[int]] = {}
+        for position, metadata in enumerate(page["metadatas"]):
+            if not metadata or partition_key not in metadata:
+                counts["unpartitioned"] = counts.get("unpartitioned", 0) + 1
+                continue
+            collection_name = router.collection_name(metadata[partition_key])
+            groups.setdefault(collection_name, []).append(position)
+
+        for collection_name, positions in groups.items():
+            target = client.get_or_create_collection(
+                name=collection_name,
+                configuration=hnsw_configuration(settings),
+            )
+            target.upsert(
+                ids=[page_ids[position] for position in positions],
+                embeddings=[page["embeddings"][position] for position in positions],
+                documents=[page["documents"][position] for position in positions],
+                metadatas=[page["metadatas"][position] for position in positions],
+            )
+            counts[collection_name] = counts.get(collection_name, 0) + len(positions)
+            migrated_ids += [page_ids[position] for position in positions]
+
+        logger.info(f"Partition migration: {offset + len(page_ids)} chunks read")
+        if len(page_ids) < batch_size:
+            break
+        offset += batch_size
+
+    # * Delete after paging so offsets stay valid while reading
+    if delete_source:
+        for start in range(0, len(migrated_ids), batch_size):
+            source.delete(ids=migrated_ids[start : start + batch_size])
+        logger.info(f"Deleted {len(migrated_ids)} migrated chunks from '{source_collection}'")
+
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--partition-key",
+        default=settings.chromadb_partition_key or "tipo-documento",
+        help="Metadata key to partition by",
+    )
+    parser.add_argument("--collection", default=settings.chromadb_collection)
+    parser.add_argument("--batch-size", type=int, default=settings.partition_migration_batch_size)
+    parser.add_argument(
+        "--delete-source",
+        action="store_true",
+        help="Delete migrated chunks from the source collection",
+    )
+    args = parser.parse_args()
+
+    counts = migrate_to_partitions(
+        ChromaDBClient(settings).client,
+        source_collection=args.collection,
+        partition_key=args.partition_key,
+        batch_size=args.batch_size,
+        delete_source=args.delete_source,
+    )
+    for collection_name, count in sorted(counts.items()):
+        print(f"{collection_name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
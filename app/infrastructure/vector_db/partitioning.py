@@ -0,0 +1,84 @@
+import re
+from typing import Any
+
+
+class PartitionRouter:
+    """
+    Route chunks and queries to one Chroma collection per partition value.
+
+    Partitions are named `<base collection>.<value>` (e.g. `rag-docs.documento-pdf`
+    when partitioning by `tipo-documento`).
+    """
+
+    def __init__(self, base_collection: str, partition_key: str) -> None:
+        self._base_collection = base_collection
+        self._partition_key = partition_key
+
+    @property
+    def partition_key(self) -> str:
+        return self._partition_key
+
+    @property
+    def prefix(self) -> str:
+        """Collection name prefix shared by all partitions."""
+        return f"{self._base_collection}."
+
+    def collection_name(self, value: Any) -> str:
+        """Collection holding the chunks whose partition key equals `value`."""
+        # * Chroma names allow [a-zA-Z0-9._-]; dots are kept as the partition separator
+        slug = re.sub(r"[^a-zA-Z0-9_-]+", "-", str(value)).strip("-_") or "default"
+        return f"{self.prefix}{slug}"
+
+    def partition_value(self, metadata: dict[str, Any]) -> Any:
+        """
+        Partition value of a chunk.
+
+        Raises:
+            ValueError: If the chunk metadata lacks the partition key
+        """
+        if self._partition_key not in metadata:
+            raise ValueError(f"Chunk metadata is missing partition key '{self._partition_key}'")
+        return metadata[self._partition_key]
+
+    def values_for_filter(self, where: dict | None) -> list[Any] | None:
+        """
+        Partition values a metadata filter can match.
+
+        Args:
+            where: Chroma `where` filter
+
+        Returns:
+            Values to query, or None when the filter does not constrain the
+            partition key (scatter to every partition)
+        """
+        if not where:
+            return None
+
+        if self._partition_key in where:
+            condition = where[self._partition_key]
+            if not isinstance(condition, dict):
+                return [condition]
+            if "$eq" in condition:
+                return [condition["$eq"]]
+            if "$in" in condition:
+                return list(condition["$in"])
+            return None
+
+        if "$and" in where:
+            # * Any constrained branch bounds the whole conjunction
+            for sub_filter in where["$and"]:
+                values = self.values_for_filter(sub_filter)
+                if values is not None:
+                    return values
+            return None
+
+        if "$or" in where:
+            union: list[Any] = []
+            for sub_filter in where["$or"]:
+                values = self.values_for_filter(sub_filter)
+                if values is None:
+                    return None
+                union += [value for value in values if value not in union]
+            return union
+
+        return None
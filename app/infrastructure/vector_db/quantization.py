@@ -0,0 +1,164 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+# Rows scored per block: keeps the first-pass temporaries in cache
+SCORE_BLOCK_ROWS = 512
+# Rows sampled to fit the PCA projection and the quantization parameters
+FIT_SAMPLE_ROWS = 20_000
+
+
+def _popcount64(words: np.ndarray) -> np.ndarray:
+    """Set bits of every uint64 word (SWAR popcount, computed in place)."""
+    shifted = words >> np.uint64(1)
+    shifted &= np.uint64(0x5555555555555555)
+    words -= shifted
+    shifted = words >> np.uint64(2)
+    shifted &= np.uint64(0x3333333333333333)
+    words &= np.uint64(0x3333333333333333)
+    words += shifted
+    words += words >> np.uint64(4)
+    words &= np.uint64(0x0F0F0F0F0F0F0F0F)
+    words *= np.uint64(0x0101010101010101)
+    words >>= np.uint64(56)
+    return words
+
+
+class VectorQuantizer(ABC):
+    """
+    Compact codes of unit embeddings for a cheap first scoring pass.
+
+    Vectors are optionally projected onto their top `pca_dimensions` principal
+    directions (uncentered, so dot products are preserved up to the dropped
+    components) before being encoded. Scores only rank candidates: the top ones
+    are meant to be re-scored with the full-precision vectors.
+    """
+
+    def __init__(self, pca_dimensions: int | None = None) -> None:
+        self._pca_dimensions = pca_dimensions
+        self._components: np.ndarray | None = None
+        self.fitted_rows = 0
+
+    @property
+    def fitted(self) -> bool:
+        return self.fitted_rows > 0
+
+    def fit(self, vectors: np.ndarray) -> None:
+        """Fit the projection and the code parameters on (a sample of) the stored vectors."""
+        if len(vectors) > FIT_SAMPLE_ROWS:
+            rng = np.random.default_rng(0)
+            sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), FIT_SAMPLE_ROWS, False))])
+        else:
+            sample = np.asarray(vectors)
+
+        self._components = None
+        if self._pca_dimensions and self._pca_dimensions < sample.shape[1]:
+            # * Right singular vectors of the raw (uncentered) sample
+            _, _, right = np.linalg.svd(sample, full_matrices=False)
+            self._components = right[: self._pca_dimensions].astype(np.float32)
+
+        self._fit_codes(self._project(sample))
+        self.fitted_rows = len(vectors)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Codes of the given vectors (one row per vector)."""
+        codes = [
+            self._encode(self._project(np.asarray(vectors[start : start + SCORE_BLOCK_ROWS])))
+            for start in range(0, len(vectors), SCORE_BLOCK_ROWS)
+        ]
+        return np.concatenate(codes) if codes else self._encode(self._project(vectors[:0]))
+
+    def scores(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Approximate similarity of every code to every query, shape (len(codes), len(queries))."""
+        projected = self._project(queries)
+        return np.concatenate(
+            [
+                self._scores(codes[start : start + SCORE_BLOCK_ROWS], projected)
+                for start in range(0, len(codes), SCORE_BLOCK_ROWS)
+            ]
+            or [np.zeros((0, len(queries)), dtype=np.float32)]
+        )
+
+    def _project(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self._components is None:
+            return vectors
+        return vectors @ self._components.T
+
+    @abstractmethod
+    def _fit_codes(self, projected: np.ndarray) -> None: ...
+
+    @abstractmethod
+    def _encode(self, projected: np.ndarray) -> np.ndarray: ...
+
+    @abstractmethod
+    def _scores(self, codes: np.ndarray, projected_queries: np.ndarray) -> np.ndarray: ...
+
+
+class Int8Quantizer(VectorQuantizer):
+    """Symmetric per-dimension int8 scalar quantization (4x smaller than float32)."""
+
+    def __init__(self, pca_dimensions: int | None = None) -> None:
+        super().__init__(pca_dimensions)
+        self._scale = np.ones(0, dtype=np.float32)
+
+    def _fit_codes(self, projected: np.ndarray) -> None:
+        self._scale = np.maximum(np.abs(projected).max(axis=0), 1e-12) / 127
+
+    def _encode(self, projected: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(projected / self._scale), -127, 127).astype(np.int8)
+
+    def _scores(self, codes: np.ndarray, projected_queries: np.ndarray) -> np.ndarray:
+        # * Dequantization folded into the query: codes . (q * scale)
+        return codes.astype(np.float32) @ (projected_queries * self._scale).T
+
+
+class BinaryQuantizer(VectorQuantizer):
+    """
+    One sign bit per dimension (32x smaller than float32), scored by Hamming distance.
+
+    Bits are taken against the per-dimension mean so they split the corpus
+    evenly; codes are padded to whole 64-bit words and scored by negative
+    Hamming distance (XOR + popcount on the words).
+    """
+
+    def __init__(self, pca_dimensions: int | None = None) -> None:
+        super().__init__(pca_dimensions)
+        self._threshold = np.zeros(0, dtype=np.float32)
+
+    def _fit_codes(self, projected: np.ndarray) -> None:
+        self._threshold = projected.mean(axis=0)
+
+    def _encode(self, projected: np.ndarray) -> np.ndarray:
+        packed = np.packbits(projected > self._threshold, axis=1)
+        padding = -packed.shape[1] % 8
+        return np.pad(packed, ((0, 0), (0, padding)))
+
+    def _scores(self, codes: np.ndarray, projected_queries: np.ndarray) -> np.ndarray:
+        words = np.ascontiguousarray(codes).view(np.uint64)
+        query_words = self._encode(projected_queries).view(np.uint64)
+        scores = np.empty((len(codes), len(query_words)), dtype=np.float32)
+        for column, query_word in enumerate(query_words):
+            scores[:, column] = -_popcount64(words ^ query_word).sum(axis=1, dtype=np.int64)
+        return scores
+
+
+def build_quantizer(method: str, pca_dimensions: int | None = None) -> VectorQuantizer | None:
+    """
+    Quantizer for a method name.
+
+    Args:
+        method: "none", "int8" or "binary"
+        pca_dimensions: Project to this many dimensions before encoding (None keeps all)
+
+    Returns:
+        The quantizer, or None for "none"
+    """
+    if method == "none":
+        return None
+    if method == "int8":
+        return Int8Quantizer(pca_dimensions)
+    if method == "binary":
+        return BinaryQuantizer(pca_dimensions)
+    raise ValueError(f"Invalid quantization: {method}. Use 'none', 'int8' or 'binary'")
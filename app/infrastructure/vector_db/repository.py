@@ -1,46 +1,178 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+from typing import Any
+
 from langchain.schema import Document
 from langchain_chroma import Chroma
 
 from app.core.config import Settings
 from app.infrastructure.embeddings.client import EmbeddingsClient
+from app.infrastructure.embeddings.query_cache import QueryCachedEmbeddings
+from app.infrastructure.vector_db.adaptive_k import adaptive_cutoff
+from app.infrastructure.vector_db.backend import ChromaBackend, VectorBackend
+from app.infrastructure.vector_db.centroids import (
+    CentroidIndex,
+    document_centroids,
+    document_metadata,
+)
 from app.infrastructure.vector_db.chroma_client import ChromaDBClient
+from app.infrastructure.vector_db.chunk_store import ChunkStore
+from app.infrastructure.vector_db.local_index import LocalHNSWIndex
+from app.infrastructure.vector_db.memmap_store import MemmapVectorClient
+from app.infrastructure.vector_db.mmr import maximal_marginal_relevance
+from app.infrastructure.vector_db.partitioning import PartitionRouter
+from app.infrastructure.vector_db.retrieval_cache import (
+    RetrievalCache,
+    cache_key,
+    document_scopes,
+    filter_scopes,
+)
+from app.infrastructure.vector_db.retriever import RepositoryRetriever
+from app.infrastructure.vector_db.small_to_big import (
+    ExpansionSpan,
+    merge_chunk_texts,
+    neighbor_spans,
+    page_spans,
+)
 from app.utils.logger import logger
+from app.utils.tokens import count_tokens
 
 
 class VectorDBRepository:
-    """Repository for vector database operations using ChromaDB."""
+    """Repository for vector database operations (ChromaDB or memory-mapped NumPy backend)."""
+
+    # Chunks read per request when scanning whole collections (e.g. listing titles)
+    SCAN_BATCH_SIZE = 1000
 
     def __init__(
         self,
         settings: Settings,
-        chroma_client: ChromaDBClient,
+        chroma_client: ChromaDBClient | None,
         embeddings_client: EmbeddingsClient,
     ) -> None:
         self._settings = settings
-        self._chroma_http_client = chroma_client.client
-        self._embeddings = embeddings_client.client
+        # * Recent query vectors are kept so later steps (local reranking) need no new call
+        self._embeddings: Any = embeddings_client.client
+        if self._settings.query_embedding_cache_size > 0:
+            self._embeddings = QueryCachedEmbeddings(
+                self._embeddings, self._settings.query_embedding_cache_size
+            )
 
-        # Ensure collection exists
-        chroma_client.get_or_create_collection(self._settings.chromadb_collection)
+        # * Client-level API (get_or_create_collection, list_collections) of the backend
+        self._chroma_client = chroma_client
+        self._vector_client: Any
+        if self._settings.vector_backend == "numpy":
+            self._vector_client = MemmapVectorClient(
+                self._settings.numpy_store_path,
+                quantization=self._settings.numpy_store_quantization,
+                pca_dimensions=self._settings.numpy_store_pca_dimensions,
+                rescore_factor=self._settings.numpy_store_rescore_factor,
+            )
+        elif chroma_client is None:
+            raise ValueError("The Chroma vector backend requires a ChromaDB client")
+        else:
+            self._vector_client = chroma_client.client
 
-        # Initialize Langchain Chroma wrapper
-        self._vdb = Chroma(
-            collection_name=self._settings.chromadb_collection,
-            embedding_function=self._embeddings,
-            client=self._chroma_http_client,
+        self._store: VectorBackend = self._open_store(self._settings.chromadb_collection)
+        # * Langchain wrapper kept for the plain similarity retriever (Chroma only)
+        self._vdb: Chroma | None = (
+            self._store.store if isinstance(self._store, ChromaBackend) else None
         )
         logger.info(
             f"VectorDB repository initialized with collection "
-            f"'{self._settings.chromadb_collection}'"
+            f"'{self._settings.chromadb_collection}' ({self._settings.vector_backend} backend)"
         )
 
+        # Optional partitioning: one collection per value of the partition key
+        self._router: PartitionRouter | None = None
+        self._partition_stores: dict[str, VectorBackend] = {}
+        self._partition_lock = threading.Lock()
+        if self._settings.chromadb_partition_key:
+            self._router = PartitionRouter(
+                self._settings.chromadb_collection, self._settings.chromadb_partition_key
+            )
+            logger.info(f"Partitioning collections by '{self._settings.chromadb_partition_key}'")
+
+        # Optional in-process read replica for hot queries
+        self._local_index: LocalHNSWIndex | None = None
+        if self._settings.local_index_enabled:
+            self._local_index = LocalHNSWIndex(
+                space=self._store.space,
+                max_elements=self._settings.local_index_max_elements,
+                m=self._settings.local_index_m,
+                ef_construction=self._settings.local_index_ef_construction,
+                ef_search=self._settings.local_index_ef_search,
+            )
+
+        # Optional document centroid index for routing corpus-wide queries
+        self._centroid_index: CentroidIndex | None = None
+        # * Reads the titles a filter pins (same extraction as partition routing)
+        self._title_scope = PartitionRouter(self._settings.chromadb_collection, "titulo")
+        if self._settings.centroid_routing_enabled:
+            centroid_collection = f"{self._settings.chromadb_collection}-centroids"
+            # * Created through ChromaDBClient: same HNSW configuration as the chunk collections
+            if self._settings.vector_backend == "chroma" and self._chroma_client is not None:
+                self._chroma_client.get_or_create_collection(centroid_collection)
+            self._centroid_index = CentroidIndex(self._vector_client, centroid_collection)
+
+        # Optional local text store for small-to-big expansion by key
+        self._chunk_store: ChunkStore | None = None
+        if self._settings.chunk_store_enabled:
+            self._chunk_store = ChunkStore(self._settings.chunk_store_path)
+
+        # Optional retrieval result cache (ids and scores, hydrated on hit)
+        self._retrieval_cache: RetrievalCache | None = None
+        if self._settings.retrieval_cache_enabled:
+            self._retrieval_cache = RetrievalCache(
+                self._settings.retrieval_cache_path,
+                max_entries=self._settings.retrieval_cache_max_entries,
+            )
+
     @property
-    def vdb(self) -> Chroma:
-        """Get the Langchain Chroma vector database."""
+    def vdb(self) -> Chroma | None:
+        """Get the Langchain Chroma vector database (None with the NumPy backend)."""
         return self._vdb
 
+    @property
+    def local_index(self) -> LocalHNSWIndex | None:
+        """Get the local HNSW replica (None when disabled)."""
+        return self._local_index
+
+    @property
+    def distance_space(self) -> str:
+        """Distance space of the collection ("cosine", "l2" or "ip"), the scale of search scores."""
+        return self._store.space
+
+    @property
+    def partition_router(self) -> PartitionRouter | None:
+        """Get the partition router (None when partitioning is disabled)."""
+        return self._router
+
     def add_documents(self, documents: list[Document]) -> list[str]:
-        return self._vdb.add_documents(documents)
+        if self._router is None:
+            ids = self._store.add_documents(documents)
+            # * Mirror the new chunks into the local replica (ingestion event)
+            self._mirror_to_local_index(self._store, ids)
+            self._after_ingestion(documents, ids)
+            return ids
+
+        # * Route each chunk to its partition, keeping ids in input order
+        groups: dict[str, list[int]] = {}
+        for position, document in enumerate(documents):
+            value = self._router.partition_value(document.metadata)
+            groups.setdefault(self._router.collection_name(value), []).append(position)
+
+        ids = [""] * len(documents)
+        for collection_name, positions in groups.items():
+            store = self._partition_store(collection_name)
+            partition_ids = store.add_documents([documents[position] for position in positions])
+            for position, chunk_id in zip(positions, partition_ids):
+                ids[position] = chunk_id
+            self._mirror_to_local_index(store, partition_ids)
+
+        self._after_ingestion(documents, ids)
+        return ids
 
     def similarity_search_with_score(
         self,
@@ -55,24 +187,888 @@ class VectorDBRepository:
         # * Search for documents that at least have one space in their content
         # TODO: Check how to avoid this default
         where_document = where_document or {"$contains": " "}
+        k = k or self._settings.default_k_results
+
+        if self._retrieval_cache is None:
+            return self._similarity_search(query, k, filter, where_document)
+
+        # * Deterministic for a fixed embeddings model until the filter's scopes are ingested
+        key = cache_key(
+            "similarity", self._settings.embeddings_model, query, k, filter, where_document
+        )
+        cached = self._retrieval_cache.get(key)
+        if cached is not None:
+            results = self._hydrate(cached)
+            if results is not None:
+                return results
+
+        results = self._similarity_search(query, k, filter, where_document)
+        if all(doc.id for doc, _ in results):
+            self._retrieval_cache.put(
+                key, [(str(doc.id), score) for doc, score in results], filter_scopes(filter)
+            )
+        return results
+
+    def _similarity_search(
+        self, query: str, k: int, filter: dict, where_document: dict
+    ) -> list[tuple[Document, float]]:
+        # * Corpus-wide queries are narrowed to the closest documents first
+        query_embedding: list[float] | None = None
+        if self._routes_by_centroid(filter):
+            query_embedding = self._embeddings.embed_query(query)
+            filter = self._route_by_centroid(query_embedding, filter)
+
+        # * Serve from the local replica once it is in sync
+        if self._local_index is not None and self._local_index.ready:
+            return self._local_index.search(
+                embedding=query_embedding or self._embeddings.embed_query(query),
+                k=k,
+                metadata_filter=filter,
+                where_document=where_document,
+            )
+
+        stores = self._stores_for_filter(filter)
+        if not stores:
+            return []
+        if len(stores) == 1 and query_embedding is None:
+            return stores[0].similarity_search_with_score(
+                query=query,
+                k=k,
+                filter=filter,
+                where_document=where_document,
+            )
+
+        # * Filter spans partitions (or the query is already embedded): scatter-gather
+        query_results = self._query_collections(
+            query_embeddings=[query_embedding or self._embeddings.embed_query(query)],
+            n_results=k,
+            where=filter,
+            where_document=where_document,
+            include=["documents", "metadatas", "distances"],
+        )
+        return self._query_row_to_docs_and_scores(query_results, 0, k)
+
+    def batch_similarity_search_with_score(
+        self,
+        queries: list[str],
+        k_values: list[int | None] | None = None,
+        metadata_filters: list[dict | None] | None = None,
+        where_document: dict | None = None,
+    ) -> list[list[tuple[Document, float]]]:
+        """
+        Run many similarity searches with one embeddings call.
+
+        Queries sharing the same metadata filter are sent to Chroma as a single
+        `query` with multiple `query_embeddings`; each query keeps its own `k`.
+        Like `similarity_search_with_score`, queries are answered from the
+        retrieval cache when possible and corpus-wide ones are routed through
+        the centroid index.
+
+        Args:
+            queries: Query texts
+            k_values: Number of results per query (default k when None)
+            metadata_filters: Metadata filter per query (default type filter when None)
+            where_document: Document filter shared by all queries
+
+        Returns:
+            One list of (Document, score) tuples per query, in input order
+        """
+        if not queries:
+            return []
+
+        k_values = k_values or [None] * len(queries)
+        metadata_filters = metadata_filters or [None] * len(queries)
+        ks = [k or self._settings.default_k_results for k in k_values]
+        filters = [f or {"tipo-documento": "documento-pdf"} for f in metadata_filters]
+        where_document = where_document or {"$contains": " "}
+
+        results: list[list[tuple[Document, float]]] = [[] for _ in queries]
+        misses = list(range(len(queries)))
+
+        # * Same cache entries as single searches: only the misses are embedded and searched
+        keys: list[str] = []
+        if self._retrieval_cache is not None:
+            keys = [
+                cache_key(
+                    "similarity",
+                    self._settings.embeddings_model,
+                    query,
+                    k,
+                    metadata_filter,
+                    where_document,
+                )
+                for query, k, metadata_filter in zip(queries, ks, filters)
+            ]
+            misses = []
+            for position, key in enumerate(keys):
+                cached = self._retrieval_cache.get(key)
+                hydrated = self._hydrate(cached) if cached is not None else None
+                if hydrated is None:
+                    misses.append(position)
+                else:
+                    results[position] = hydrated
+            if not misses:
+                return results
+
+        # * Single embeddings request for the whole batch
+        embeddings = dict(
+            zip(misses, self._embeddings.embed_documents([queries[i] for i in misses]))
+        )
+
+        # * Corpus-wide queries are narrowed to the closest documents first
+        search_filters = {
+            position: self._route_by_centroid(embeddings[position], filters[position])
+            if self._routes_by_centroid(filters[position])
+            else filters[position]
+            for position in misses
+        }
+
+        # * Chroma applies one `where` per query call: group queries by filter
+        groups: dict[str, list[int]] = {}
+        for position in misses:
+            metadata_filter = search_filters[position]
+            groups.setdefault(json.dumps(metadata_filter, sort_keys=True), []).append(position)
+
+        for positions in groups.values():
+            metadata_filter = search_filters[positions[0]]
+
+            if self._local_index is not None and self._local_index.ready:
+                for position in positions:
+                    results[position] = self._local_index.search(
+                        embedding=embeddings[position],
+                        k=ks[position],
+                        metadata_filter=metadata_filter,
+                        where_document=where_document,
+                    )
+                continue
+
+            query_results = self._query_collections(
+                query_embeddings=[embeddings[position] for position in positions],
+                n_results=max(ks[position] for position in positions),
+                where=metadata_filter,
+                where_document=where_document,
+                include=["documents", "metadatas", "distances"],
+            )
+            for row, position in enumerate(positions):
+                results[position] = self._query_row_to_docs_and_scores(
+                    query_results, row, ks[position]
+                )
+
+        if self._retrieval_cache is not None:
+            for position in misses:
+                if all(doc.id for doc, _ in results[position]):
+                    self._retrieval_cache.put(
+                        keys[position],
+                        [(str(doc.id), score) for doc, score in results[position]],
+                        filter_scopes(filters[position]),
+                    )
+
+        return results
+
+    def similar_chunks_search_with_score(
+        self,
+        chunk_ids: list[str],
+        k: int | None = None,
+        metadata_filter: dict | None = None,
+        where_document: dict | None = None,
+        exclude_sources: bool = True,
+    ) -> list[tuple[Document, float]]:
+        """
+        Similarity search seeded by stored chunks ("more like this").
+
+        The stored embeddings of `chunk_ids` are read back from the collection,
+        so no embeddings call is made; several ids are combined into their
+        normalized centroid.
+
+        Args:
+            chunk_ids: Ids of the seed chunks
+            k: Number of results to return (uses default if None)
+            metadata_filter: Metadata filter (default type filter when None)
+            where_document: Document filter
+            exclude_sources: Leave the seed chunks out of the results
+
+        Returns:
+            List of (Document, score) tuples; empty when none of the ids exist
+        """
+        k = k or self._settings.default_k_results
+        filter = metadata_filter or {"tipo-documento": "documento-pdf"}
+        where_document = where_document or {"$contains": " "}
+
+        stored = self.chunk_embeddings(chunk_ids)
+        if not stored:
+            return []
+        found_ids = list(stored)
+
+        query_embedding = document_centroids(list(stored.values()))[0].tolist()
+        if self._routes_by_centroid(filter):
+            filter = self._route_by_centroid(query_embedding, filter)
+
+        # * Over-fetch by the number of seeds, which are usually their own nearest neighbors
+        n_results = k + len(found_ids) if exclude_sources else k
+        if self._local_index is not None and self._local_index.ready:
+            results = self._local_index.search(
+                embedding=query_embedding,
+                k=n_results,
+                metadata_filter=filter,
+                where_document=where_document,
+            )
+        else:
+            query_results = self._query_collections(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=filter,
+                where_document=where_document,
+                include=["documents", "metadatas", "distances"],
+            )
+            results = self._query_row_to_docs_and_scores(query_results, 0, n_results)
+
+        if exclude_sources:
+            results = [(doc, score) for doc, score in results if doc.id not in found_ids]
+        return results[:k]
+
+    def chunk_embeddings(self, chunk_ids: list[str]) -> dict[str, Any]:
+        """
+        Stored embeddings of chunks by id (no embeddings call).
+
+        Returns:
+            Embedding of each id found, by id (ids not found are left out)
+        """
+        # * Chunks may live in any partition
+        found: dict[str, Any] = {}
+        for store in self._all_stores():
+            records = store.get(ids=chunk_ids, include=["embeddings"])
+            if records["ids"]:
+                found.update(zip(records["ids"], records["embeddings"]))
+        return found
+
+    def embed_query(self, query: str) -> list[float]:
+        """Query embedding (from the query embedding cache when the query was just searched)."""
+        return self._embeddings.embed_query(query)
+
+    def max_marginal_relevance_search_with_score(
+        self,
+        query: str,
+        k: int | None = None,
+        fetch_k: int | None = None,
+        lambda_mult: float | None = None,
+        metadata_filter: dict | None = None,
+        where_document: dict | None = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Maximal-marginal-relevance search with scores.
+
+        Candidates and their embeddings are fetched from Chroma in one query;
+        the diversity selection runs locally with NumPy.
+
+        Args:
+            query: Query text
+            k: Number of results to return (uses default if None)
+            fetch_k: Number of candidates to fetch (uses default if None)
+            lambda_mult: Relevance/diversity trade-off in [0, 1] (uses default if None)
+            metadata_filter: Metadata filter (default type filter when None)
+            where_document: Document filter
+
+        Returns:
+            Selected (Document, distance) tuples in selection order
+        """
+        k = k or self._settings.default_k_results
+        fetch_k = max(fetch_k or self._settings.default_mmr_fetch_k, k)
+        if lambda_mult is None:
+            lambda_mult = self._settings.default_mmr_lambda
+        filter = metadata_filter or {"tipo-documento": "documento-pdf"}
+        where_document = where_document or {"$contains": " "}
+
+        query_embedding = self._embeddings.embed_query(query)
+        if self._routes_by_centroid(filter):
+            filter = self._route_by_centroid(query_embedding, filter)
+        candidates = self._query_collections(
+            query_embeddings=[query_embedding],
+            n_results=fetch_k,
+            where=filter,
+            where_document=where_document,
+            include=["documents", "metadatas", "distances", "embeddings"],
+        )
+        candidate_embeddings: Any = candidates["embeddings"]
+        if candidate_embeddings is None or len(candidate_embeddings[0]) == 0:
+            return []
+
+        docs_and_scores = self._query_row_to_docs_and_scores(candidates, 0, fetch_k)
+        selected = maximal_marginal_relevance(
+            query_embedding, candidate_embeddings[0], k=k, lambda_mult=lambda_mult
+        )
+        return [docs_and_scores[index] for index in selected]
+
+    def adaptive_search_with_score(
+        self,
+        query: str,
+        fetch_k: int | None = None,
+        max_distance: float | None = None,
+        score_gap: float | None = None,
+        token_budget: int | None = None,
+        min_k: int | None = None,
+        metadata_filter: dict | None = None,
+        where_document: dict | None = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Similarity search returning a variable number of chunks.
+
+        Over-fetches `fetch_k` candidates and cuts the list at a distance
+        threshold, a relative distance gap or a token budget (see `adaptive_cutoff`).
+
+        Args:
+            query: Query text
+            fetch_k: Candidates to fetch (uses default if None)
+            max_distance: Absolute distance threshold (uses default if None)
+            score_gap: Relative distance jump ending the list (uses default if None)
+            token_budget: Token budget of the kept chunks (uses default if None)
+            min_k: Chunks always kept (uses default if None)
+            metadata_filter: Metadata filter (default type filter when None)
+            where_document: Document filter
 
-        return self._vdb.similarity_search_with_score(
+        Returns:
+            Kept (Document, distance) tuples, closest first
+        """
+        candidates = self.similarity_search_with_score(
             query=query,
-            k=k or self._settings.default_k_results,
-            filter=filter,
+            k=fetch_k or self._settings.default_adaptive_fetch_k,
+            metadata_filter=metadata_filter,
             where_document=where_document,
         )
+        kept = adaptive_cutoff(
+            candidates,
+            max_distance=(
+                self._settings.default_adaptive_max_distance
+                if max_distance is None
+                else max_distance
+            ),
+            score_gap=self._settings.default_adaptive_score_gap if score_gap is None else score_gap,
+            token_budget=token_budget or self._settings.default_adaptive_token_budget,
+            min_k=self._settings.default_adaptive_min_k if min_k is None else min_k,
+            token_counter=lambda text: count_tokens(text, self._settings.openai_model),
+        )
+        logger.info(f"Adaptive k: kept {len(kept)}/{len(candidates)} chunks")
+        return kept
+
+    def small_to_big_search_with_score(
+        self,
+        query: str,
+        k: int | None = None,
+        expand: str | None = None,
+        window: int | None = None,
+        metadata_filter: dict | None = None,
+        where_document: dict | None = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Similarity search over small chunks, returning their surrounding text.
+
+        Each hit is expanded to its `window` neighbors on both sides or to its
+        parent page. Neighbors are fetched by (titulo, pagina, seq) from the local
+        chunk store (or by metadata lookup in Chroma), never by another vector
+        search; overlapping spans are merged and the shared chunk overlap removed.
+
+        Args:
+            query: Query text
+            k: Number of small chunks to retrieve (uses default if None)
+            expand: "neighbors" or "page" (uses default if None)
+            window: Neighbors on each side of a hit (uses default if None)
+            metadata_filter: Metadata filter (default type filter when None)
+            where_document: Document filter
+
+        Returns:
+            Expanded (Document, score) tuples ordered by their best hit; hits that
+            cannot be expanded are returned unchanged
+        """
+        expand = expand or self._settings.default_small_to_big_expand
+        if window is None:
+            window = self._settings.default_small_to_big_window
+
+        hits = self.similarity_search_with_score(
+            query=query, k=k, metadata_filter=metadata_filter, where_document=where_document
+        )
+        if expand == "neighbors":
+            spans = neighbor_spans(hits, window)
+        elif expand == "page":
+            spans = page_spans(hits)
+        else:
+            raise ValueError(f"Invalid expansion: {expand}. Use 'neighbors' or 'page'")
+
+        ranked: list[tuple[int, Document, float]] = []
+        fetched: list[ExpansionSpan] = []
+        for span in spans:
+            chunks = self._span_chunks(span)
+            if not chunks:
+                continue
+            fetched.append(span)
+            ranked.append(
+                (
+                    span.rank,
+                    Document(
+                        page_content=merge_chunk_texts([chunk.page_content for chunk in chunks]),
+                        metadata={
+                            **span.hit.metadata,
+                            "seq_start": chunks[0].metadata.get("seq"),
+                            "seq_end": chunks[-1].metadata.get("seq"),
+                            "paginas": sorted(
+                                {chunk.metadata.get("pagina", 0) for chunk in chunks}
+                            ),
+                        },
+                        id=span.hit.id,
+                    ),
+                    span.score,
+                )
+            )
+
+        # * Keep hits that could not be expanded (e.g. ingested without `seq`)
+        for rank, (doc, score) in enumerate(hits):
+            if not any(span.covers(doc) for span in fetched):
+                ranked.append((rank, doc, score))
+
+        ranked.sort(key=lambda item: item[0])
+        return [(doc, score) for _, doc, score in ranked]
+
+    def search_with_scores(
+        self,
+        query: str,
+        search_type: str = "similarity",
+        search_kwargs: dict | None = None,
+    ) -> list[tuple[Document, float]]:
+        """
+        Dispatch a retriever search to the matching repository search mode.
+
+        Args:
+            query: Query text
+            search_type: "similarity", "mmr", "adaptive" or "small_to_big"
+            search_kwargs: Retriever kwargs (k, filter, where_document, fetch_k, lambda_mult,
+                score_threshold, score_gap, token_budget, expand, window)
+
+        Returns:
+            List of (Document, score) tuples
+        """
+        search_kwargs = search_kwargs or {}
+        k = search_kwargs.get("k")
+        metadata_filter = search_kwargs.get("filter")
+        where_document = search_kwargs.get("where_document")
+
+        if search_type == "similarity":
+            return self.similarity_search_with_score(
+                query=query,
+                k=k,
+                metadata_filter=metadata_filter,
+                where_document=where_document,
+            )
+        if search_type == "mmr":
+            return self.max_marginal_relevance_search_with_score(
+                query=query,
+                k=k,
+                fetch_k=search_kwargs.get("fetch_k"),
+                lambda_mult=search_kwargs.get("lambda_mult"),
+                metadata_filter=metadata_filter,
+                where_document=where_document,
+            )
+        if search_type == "adaptive":
+            # * No fixed k: the cutoff decides how many of the `fetch_k` candidates are used
+            return self.adaptive_search_with_score(
+                query=query,
+                fetch_k=search_kwargs.get("fetch_k"),
+                max_distance=search_kwargs.get("score_threshold"),
+                score_gap=search_kwargs.get("score_gap"),
+                token_budget=search_kwargs.get("token_budget"),
+                metadata_filter=metadata_filter,
+                where_document=where_document,
+            )
+        if search_type == "small_to_big":
+            return self.small_to_big_search_with_score(
+                query=query,
+                k=k,
+                expand=search_kwargs.get("expand"),
+                window=search_kwargs.get("window"),
+                metadata_filter=metadata_filter,
+                where_document=where_document,
+            )
+        raise ValueError(
+            f"Invalid search type: {search_type}. "
+            "Use 'similarity', 'mmr', 'adaptive' or 'small_to_big'"
+        )
 
     def as_retriever(self, search_type: str = "similarity", search_kwargs: dict | None = None):
         """Get retriever for RAG chains."""
+        # * MMR, adaptive k and small-to-big run on the repository (post-processing over
+        # * one candidate fetch); partitioned collections and the NumPy backend are served
+        # * by the repository as well
+        if (
+            search_type in ("mmr", "adaptive", "small_to_big")
+            or self._router is not None
+            or self._vdb is None
+            or self._retrieval_cache is not None
+        ):
+            return RepositoryRetriever(
+                repository=self,
+                search_type=search_type,
+                search_kwargs=search_kwargs or {},
+            )
+
         return self._vdb.as_retriever(
             search_type=search_type,
             search_kwargs=search_kwargs or {},
         )
 
+    def refresh_document_centroids(self, titles: list[str] | None = None) -> int:
+        """
+        Recompute document centroids from the stored chunk embeddings.
+
+        Args:
+            titles: Documents to refresh (every document in the collection if None)
+
+        Returns:
+            Number of documents refreshed
+        """
+        if self._centroid_index is None:
+            return 0
+
+        if titles is None:
+            titles = sorted(self._all_titles())
+        for title in titles:
+            self._refresh_document_centroid(title)
+        return len(titles)
+
     def check_document_exists(self, title_filter: dict) -> bool:
         """Check if document exists by metadata filter."""
         # * Check if a document exist with the given title
         # TODO: Same document can be ingested multiple times using different names
-        results = self._vdb.get(where=title_filter)
-        return len(results.get("ids", [])) > 0
+        for store in self._stores_for_filter(title_filter):
+            results = store.get(where=title_filter)
+            if len(results.get("ids", [])) > 0:
+                return True
+        return False
+
+    def reconcile_local_index(self) -> None:
+        """
+        Bring the local replica in line with the Chroma collection.
+
+        Only ids are listed remotely; embeddings are fetched for chunks the
+        replica is missing, and chunks deleted from Chroma are dropped.
+        Chunks are never updated in place by ingestion, so ids are enough
+        to detect drift.
+        """
+        if self._local_index is None:
+            return
+
+        # * Distances must match the collection's (e.g. a collection recreated in another space)
+        space = self._store.space
+        if self._local_index.space != space:
+            logger.warning(
+                f"Local index space '{self._local_index.space}' differs from the collection "
+                f"space '{space}': rebuilding the replica"
+            )
+            self._local_index.reset(space)
+
+        batch_size = self._settings.local_index_sync_batch_size
+        local_ids = self._local_index.ids()
+        remote_ids: set[str] = set()
+        missing_count = 0
+        for store in self._all_stores():
+            store_ids: set[str] = set()
+            offset = 0
+            while True:
+                page = store.get(include=[], limit=batch_size, offset=offset)
+                page_ids = page.get("ids", [])
+                store_ids.update(page_ids)
+                if len(page_ids) < batch_size:
+                    break
+                offset += batch_size
+
+            missing = sorted(store_ids - local_ids)
+            for start in range(0, len(missing), batch_size):
+                self._mirror_to_local_index(store, missing[start : start + batch_size])
+            missing_count += len(missing)
+            remote_ids |= store_ids
+
+        stale = sorted(local_ids - remote_ids)
+        self._local_index.remove(stale)
+
+        if not self._local_index.ready:
+            self._local_index.mark_ready()
+        logger.info(
+            f"Local index reconciled: {len(self._local_index)} chunks "
+            f"(+{missing_count}, -{len(stale)})"
+        )
+
+    @staticmethod
+    def _query_row_to_docs_and_scores(
+        query_results: Any, row: int, k: int
+    ) -> list[tuple[Document, float]]:
+        """Convert one row of a Chroma `query` result into (Document, score) tuples."""
+        return [
+            (Document(page_content=text or "", metadata=metadata or {}, id=chunk_id), distance)
+            for chunk_id, text, metadata, distance in zip(
+                query_results["ids"][row][:k],
+                query_results["documents"][row][:k],
+                query_results["metadatas"][row][:k],
+                query_results["distances"][row][:k],
+            )
+        ]
+
+    def _open_store(self, collection_name: str) -> Any:
+        """Backend collection with the embedding function attached (created if missing)."""
+        if self._settings.vector_backend == "numpy":
+            return self._vector_client.get_or_create_collection(
+                collection_name, embedding_function=self._embeddings
+            )
+
+        # * Created through ChromaDBClient so new collections get the HNSW configuration
+        if self._chroma_client is not None:
+            self._chroma_client.get_or_create_collection(collection_name)
+        return ChromaBackend(
+            Chroma(
+                collection_name=collection_name,
+                embedding_function=self._embeddings,
+                client=self._vector_client,
+            )
+        )
+
+    def _partition_store(self, collection_name: str) -> VectorBackend:
+        """Backend collection of a partition (created if missing: ingestion only)."""
+        with self._partition_lock:
+            store = self._partition_stores.get(collection_name)
+            if store is None:
+                store = self._open_store(collection_name)
+                self._partition_stores[collection_name] = store
+            return store
+
+    def _partition_names(self) -> set[str]:
+        """Partitions existing in the backend (other workers may have created some)."""
+        assert self._router is not None
+        prefix = self._router.prefix
+        return {
+            collection.name
+            for collection in self._vector_client.list_collections()
+            if collection.name.startswith(prefix)
+        }
+
+    def _all_stores(self) -> list[VectorBackend]:
+        """Every collection holding chunks (the base one, or all partitions)."""
+        if self._router is None:
+            return [self._store]
+        return [self._partition_store(name) for name in sorted(self._partition_names())]
+
+    def _stores_for_filter(self, metadata_filter: dict | None) -> list[VectorBackend]:
+        """Collections a metadata filter can match (reads never create a partition)."""
+        if self._router is None:
+            return [self._store]
+
+        values = self._router.values_for_filter(metadata_filter)
+        if values is None:
+            return self._all_stores()
+
+        names = list(dict.fromkeys(self._router.collection_name(value) for value in values))
+        with self._partition_lock:
+            opened = set(self._partition_stores)
+        # * A partition that does not exist yet holds no chunks: it is skipped, not created
+        if not opened.issuperset(names):
+            existing = opened | self._partition_names()
+            names = [name for name in names if name in existing]
+        return [self._partition_store(name) for name in names]
+
+    def _query_collections(
+        self,
+        query_embeddings: list[list[float]],
+        n_results: int,
+        where: dict,
+        where_document: dict,
+        include: list[str],
+    ) -> Any:
+        """
+        Run a `query` on every collection the filter can match.
+
+        Results from several partitions are merged per query row by distance
+        and truncated to `n_results`, mirroring a single-collection result.
+        """
+        stores = self._stores_for_filter(where)
+
+        def query(store: VectorBackend) -> Any:
+            return store.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where,
+                where_document=where_document,
+                include=include,
+            )
+
+        if len(stores) == 1:
+            return query(stores[0])
+
+        with ThreadPoolExecutor(max_workers=len(stores) or 1) as executor:
+            partials = list(executor.map(query, stores))
+
+        fields = ["ids", *include]
+        merged: dict[str, list] = {field: [] for field in fields}
+        for row in range(len(query_embeddings)):
+            entries = [
+                {field: partial[field][row][position] for field in fields}
+                for partial in partials
+                for position in range(len(partial["ids"][row]))
+            ]
+            entries.sort(key=lambda entry: entry["distances"])
+            for field in fields:
+                merged[field].append([entry[field] for entry in entries[:n_results]])
+        return merged
+
+    def _routes_by_centroid(self, metadata_filter: dict) -> bool:
+        """Whether a search should be routed through the centroid index (no title pinned)."""
+        return (
+            self._centroid_index is not None
+            and self._title_scope.values_for_filter(metadata_filter) is None
+        )
+
+    def _route_by_centroid(self, query_embedding: list[float], metadata_filter: dict) -> dict:
+        """Restrict a filter to the documents whose centroids are closest to the query."""
+        if self._centroid_index is None:
+            return metadata_filter
+
+        titles = self._centroid_index.route(
+            query_embedding, self._settings.centroid_routing_top_n, where=metadata_filter
+        )
+        # * No centroids match (e.g. chunk-level filter keys): search unrouted
+        if not titles:
+            return metadata_filter
+        logger.info(f"Centroid routing: {titles}")
+        return {"$and": [metadata_filter, {"titulo": {"$in": titles}}]}
+
+    def _after_ingestion(self, documents: list[Document], ids: list[str]) -> None:
+        """Update the local stores and caches derived from newly added chunks."""
+        if self._chunk_store is not None:
+            # * Stored with the ids assigned by the backend, so cached hits can be hydrated
+            self._chunk_store.put(
+                [
+                    Document(
+                        page_content=document.page_content, metadata=document.metadata, id=chunk_id
+                    )
+                    for document, chunk_id in zip(documents, ids)
+                    if {"titulo", "pagina", "seq"} <= document.metadata.keys()
+                ]
+            )
+        self._refresh_centroids_for(documents)
+        if self._retrieval_cache is not None:
+            self._retrieval_cache.bump(
+                document_scopes([document.metadata for document in documents])
+            )
+
+    def _hydrate(self, hits: list[tuple[str, float]]) -> list[tuple[Document, float]] | None:
+        """Documents of cached hits (chunk store first, then an id lookup); None if any is gone."""
+        ids = [chunk_id for chunk_id, _ in hits]
+        chunks: dict[str, Document] = {}
+        if self._chunk_store is not None:
+            chunks = {str(chunk.id): chunk for chunk in self._chunk_store.get_by_ids(ids)}
+
+        missing = [chunk_id for chunk_id in ids if chunk_id not in chunks]
+        if missing:
+            for store in self._all_stores():
+                records = store.get(ids=missing, include=["documents", "metadatas"])
+                for chunk_id, text, metadata in zip(
+                    records["ids"], records["documents"], records["metadatas"]
+                ):
+                    chunks[chunk_id] = Document(
+                        page_content=text or "", metadata=metadata or {}, id=chunk_id
+                    )
+
+        if any(chunk_id not in chunks for chunk_id in ids):
+            return None
+        return [(chunks[chunk_id], score) for chunk_id, score in hits]
+
+    def _refresh_centroids_for(self, documents: list[Document]) -> None:
+        if self._centroid_index is None:
+            return
+        titles = {
+            document.metadata["titulo"] for document in documents if "titulo" in document.metadata
+        }
+        for title in sorted(titles):
+            self._refresh_document_centroid(title)
+
+    def _refresh_document_centroid(self, title: str) -> None:
+        if self._centroid_index is None:
+            return
+
+        # * Recomputed from every stored chunk, so partial ingestions stay correct
+        where: dict = {"titulo": title}
+        embeddings: list = []
+        metadatas: list = []
+        for store in self._stores_for_filter(where):
+            records = store.get(where=where, include=["embeddings", "metadatas"])
+            embeddings += list(records["embeddings"])
+            metadatas += records["metadatas"]
+
+        if not embeddings:
+            self._centroid_index.delete(title)
+            return
+
+        metadata = document_metadata(metadatas)
+        for chunk_key in ("pagina", "seq"):
+            metadata.pop(chunk_key, None)
+        self._centroid_index.upsert(
+            title,
+            document_centroids(embeddings, clusters=self._settings.centroid_clusters),
+            metadata,
+        )
+
+    def _all_titles(self) -> set[str]:
+        batch_size = self.SCAN_BATCH_SIZE
+        titles: set[str] = set()
+        for store in self._all_stores():
+            offset = 0
+            while True:
+                page = store.get(include=["metadatas"], limit=batch_size, offset=offset)
+                titles.update(
+                    metadata["titulo"]
+                    for metadata in page["metadatas"]
+                    if metadata and "titulo" in metadata
+                )
+                if len(page["ids"]) < batch_size:
+                    break
+                offset += batch_size
+        return titles
+
+    def _span_chunks(self, span: ExpansionSpan) -> list[Document]:
+        """Chunks of an expansion span, by key lookup (local store first, then Chroma)."""
+        if self._chunk_store is not None:
+            if span.pagina is not None:
+                chunks = self._chunk_store.get_page(span.title, span.pagina)
+            else:
+                chunks = self._chunk_store.get_range(span.title, span.seq_start, span.seq_end)
+            if chunks:
+                return chunks
+
+        # * Metadata lookup in Chroma: no embedding call and no ANN search
+        if span.pagina is not None:
+            where: dict = {
+                "$and": [{"titulo": {"$eq": span.title}}, {"pagina": {"$eq": span.pagina}}]
+            }
+        else:
+            where = {
+                "$and": [
+                    {"titulo": {"$eq": span.title}},
+                    {"seq": {"$gte": span.seq_start}},
+                    {"seq": {"$lte": span.seq_end}},
+                ]
+            }
+        chunks = []
+        for store in self._stores_for_filter(where):
+            records = store.get(where=where, include=["documents", "metadatas"])
+            chunks += [
+                Document(page_content=text or "", metadata=metadata or {}, id=chunk_id)
+                for chunk_id, text, metadata in zip(
+                    records["ids"], records["documents"], records["metadatas"]
+                )
+            ]
+        return sorted(chunks, key=lambda chunk: chunk.metadata.get("seq", 0))
+
+    def _mirror_to_local_index(self, store: VectorBackend, ids: list[str]) -> None:
+        if self._local_index is None or not ids:
+            return
+
+        records = store.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+        self._local_index.upsert(
+            ids=records["ids"],
+            embeddings=records["embeddings"],
+            documents=records["documents"],
+            metadatas=records["metadatas"],
+        )
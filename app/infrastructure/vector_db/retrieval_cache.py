@@ -0,0 +1,146 @@
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from app.infrastructure.vector_db.partitioning import PartitionRouter
+
+
+# Scope bumped by every ingestion: entries whose filter pins no title or type depend on it
+GLOBAL_SCOPE = "*"
+# Metadata keys with generation counters, narrowest first
+SCOPE_KEYS = ("titulo", "tipo-documento")
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable key of a retrieval request (e.g. search type, query, k, filters)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def filter_scopes(metadata_filter: dict | None) -> list[str]:
+    """
+    Generation scopes a search with this filter depends on.
+
+    The narrowest key the filter pins is used: results of a search scoped to
+    some titles only change when those titles are ingested again.
+    """
+    for key in SCOPE_KEYS:
+        values = PartitionRouter("", key).values_for_filter(metadata_filter)
+        if values is not None:
+            return sorted({f"{key}:{value}" for value in values})
+    return [GLOBAL_SCOPE]
+
+
+def document_scopes(metadatas: list[dict]) -> list[str]:
+    """Generation scopes touched by ingesting chunks with these metadatas."""
+    scopes = {GLOBAL_SCOPE}
+    for metadata in metadatas:
+        scopes.update(f"{key}:{metadata[key]}" for key in SCOPE_KEYS if key in metadata)
+    return sorted(scopes)
+
+
+class RetrievalCache:
+    """
+    Retrieval results (chunk ids and scores) keyed by query, filter and k.
+
+    Each entry records the generation counters of the scopes (titles or
+    document types, see `filter_scopes`) it depends on; ingestion bumps the
+    counters of the scopes it touches, so stale entries are detected on read
+    and dropped without flushing the rest. Chunk text is not stored: callers
+    hydrate the ids from a local store. Backed by SQLite (WAL mode), so
+    several worker processes share entries and counters.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10_000) -> None:
+        self._path = path
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # * Opened lazily so a disabled/unused cache never touches the filesystem
+        if self._connection is None:
+            Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " hits TEXT NOT NULL,"
+                " generations TEXT NOT NULL,"
+                " used REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                " scope TEXT PRIMARY KEY,"
+                " value INTEGER NOT NULL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def get(self, key: str) -> list[tuple[str, float]] | None:
+        """
+        Cached (chunk id, score) hits for a key.
+
+        Returns:
+            The hits, or None on a miss or when a scope changed since the entry was stored
+        """
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT hits, generations FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            hits, generations = json.loads(row[0]), json.loads(row[1])
+            if self._generations(connection, list(generations)) != generations:
+                with connection:
+                    connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+
+            with connection:
+                connection.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+        return [(chunk_id, score) for chunk_id, score in hits]
+
+    def put(self, key: str, hits: list[tuple[str, float]], scopes: list[str]) -> None:
+        """Store hits with the current generations of `scopes` (evicts least recently used)."""
+        with self._lock:
+            connection = self._connect()
+            generations = self._generations(connection, scopes)
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(hits), json.dumps(generations), time.time()),
+                )
+                connection.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    " SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self._max_entries,),
+                )
+
+    def bump(self, scopes: list[str]) -> None:
+        """Invalidate every entry depending on `scopes` (one counter increment each)."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT INTO generations VALUES (?, 1)"
+                    " ON CONFLICT(scope) DO UPDATE SET value = value + 1",
+                    [(scope,) for scope in scopes],
+                )
+
+    @staticmethod
+    def _generations(connection: sqlite3.Connection, scopes: list[str]) -> dict[str, int]:
+        placeholders = ", ".join("?" * len(scopes))
+        stored = dict(
+            connection.execute(
+                f"SELECT scope, value FROM generations WHERE scope IN ({placeholders})", scopes
+            ).fetchall()
+        )
+        return {scope: stored.get(scope, 0) for scope in scopes}
@@ -0,0 +1,40 @@
+from typing import Any
+
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from pydantic import Field
+
+
+class RepositoryRetriever(BaseRetriever):
+    """Langchain retriever backed by the VectorDBRepository search modes."""
+
+    # VectorDBRepository (typed as Any to avoid a circular import)
+    repository: Any
+    search_type: str = "similarity"
+    search_kwargs: dict = Field(default_factory=dict)
+    # Metadata key receiving the search score of each hit (scores are dropped if None)
+    score_key: str | None = None
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        results = self.repository.search_with_scores(
+            query=query,
+            search_type=self.search_type,
+            search_kwargs=self.search_kwargs,
+        )
+        if self.score_key is None:
+            return [doc for doc, _ in results]
+        # * Copies: hits may be shared objects (chunk store, retrieval cache)
+        return [
+            Document(
+                page_content=doc.page_content,
+                metadata={**doc.metadata, self.score_key: score},
+                id=doc.id,
+            )
+            for doc, score in results
+        ]
@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+
+from langchain.schema import Document
+
+
+# Overlap lengths searched for when stitching consecutive chunks; shorter matches
+# are treated as coincidences (e.g. a shared trailing space)
+MIN_OVERLAP_CHARS = 10
+MAX_OVERLAP_CHARS = 2000
+
+
+@dataclass
+class ExpansionSpan:
+    """Contiguous run of chunks (or a whole page) to fetch for one or more hits."""
+
+    title: str
+    seq_start: int
+    seq_end: int
+    # Best hit inside the span (rank in the original result list and its score)
+    rank: int
+    score: float
+    hit: Document
+    pagina: int | None = None
+
+    def covers(self, doc: Document) -> bool:
+        """Whether the chunk `doc` is part of this span."""
+        if doc.metadata.get("titulo") != self.title:
+            return False
+        if self.pagina is not None:
+            return doc.metadata.get("pagina") == self.pagina
+        seq = doc.metadata.get("seq")
+        return seq is not None and self.seq_start <= seq <= self.seq_end
+
+
+def neighbor_spans(
+    docs_and_scores: list[tuple[Document, float]], window: int
+) -> list[ExpansionSpan]:
+    """
+    Expand each hit to `window` chunks on both sides, merging overlapping or
+    adjacent spans of the same document.
+
+    Hits without `titulo`/`seq` metadata (ingested before sequence numbers
+    existed) are not expandable and are skipped.
+
+    Returns:
+        Spans ordered by their best hit
+    """
+    spans_by_title: dict[str, list[ExpansionSpan]] = {}
+    for rank, (doc, score) in enumerate(docs_and_scores):
+        title, seq = doc.metadata.get("titulo"), doc.metadata.get("seq")
+        if title is None or seq is None:
+            continue
+        spans_by_title.setdefault(title, []).append(
+            ExpansionSpan(title, max(seq - window, 0), seq + window, rank, score, doc)
+        )
+
+    merged: list[ExpansionSpan] = []
+    for spans in spans_by_title.values():
+        spans.sort(key=lambda span: span.seq_start)
+        current = spans[0]
+        for span in spans[1:]:
+            if span.seq_start <= current.seq_end + 1:
+                best = current if current.rank <= span.rank else span
+                current = ExpansionSpan(
+                    current.title,
+                    current.seq_start,
+                    max(current.seq_end, span.seq_end),
+                    best.rank,
+                    best.score,
+                    best.hit,
+                )
+            else:
+                merged.append(current)
+                current = span
+        merged.append(current)
+
+    return sorted(merged, key=lambda span: span.rank)
+
+
+def page_spans(docs_and_scores: list[tuple[Document, float]]) -> list[ExpansionSpan]:
+    """One span per distinct (titulo, pagina) among the hits, ordered by best hit."""
+    spans: dict[tuple[str, int], ExpansionSpan] = {}
+    for rank, (doc, score) in enumerate(docs_and_scores):
+        title, pagina = doc.metadata.get("titulo"), doc.metadata.get("pagina")
+        if title is None or pagina is None or (title, pagina) in spans:
+            continue
+        seq = doc.metadata.get("seq", 0)
+        spans[(title, pagina)] = ExpansionSpan(title, seq, seq, rank, score, doc, pagina=pagina)
+    return list(spans.values())
+
+
+def merge_chunk_texts(texts: list[str]) -> str:
+    """
+    Stitch consecutive chunks, dropping the text they share.
+
+    The splitter repeats up to `chunk_overlap` characters between neighbors;
+    the longest suffix of the running text that prefixes the next chunk is
+    removed before appending.
+    """
+    merged = ""
+    for text in texts:
+        if not merged:
+            merged = text
+            continue
+        overlap = 0
+        for size in range(
+            min(len(merged), len(text), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1
+        ):
+            if merged.endswith(text[:size]):
+                overlap = size
+                break
+        if overlap:
+            merged += text[overlap:]
+        else:
+            merged += "\n" + text
+    return merged
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -16,6 +16,10 @@ class SearchVectorDataBaseRequest(BaseModel):
     title: Optional[str] = Field(
         default=None,
     )
+    # Scope QA retrieval to several documents (combined with `title`)
+    titles: Optional[list[str]] = Field(
+        default=None,
+    )
     document_type: Optional[str] = Field(
         default="documento-pdf",
     )
@@ -26,3 +30,74 @@ class SearchVectorDataBaseRequest(BaseModel):
     metadata_filter: Optional[dict] = Field(
         default={},
     )
+    # "similarity", "mmr" (maximal marginal relevance), "adaptive" (adaptive k)
+    # or "small_to_big" (hits expanded to neighbors/pages)
+    search_type: Literal["similarity", "mmr", "adaptive", "small_to_big"] = Field(
+        default="similarity",
+    )
+    fetch_k: Optional[int] = Field(
+        default=None,
+    )
+    lambda_mult: Optional[float] = Field(
+        default=None,
+    )
+    # Adaptive k (search_type="adaptive"): cut candidates by distance, gap or tokens
+    score_threshold: Optional[float] = Field(
+        default=None,
+    )
+    score_gap: Optional[float] = Field(
+        default=None,
+    )
+    token_budget: Optional[int] = Field(
+        default=None,
+    )
+    # Small-to-big (search_type="small_to_big"): "neighbors" or "page", and neighbors per side
+    expand: Optional[Literal["neighbors", "page"]] = Field(
+        default=None,
+    )
+    window: Optional[int] = Field(
+        default=None,
+    )
+    # QA chain: "stuff" (one prompt) or "map_reduce" (parallel per-group extraction, for large k)
+    chain_type: Literal["stuff", "map_reduce"] = Field(
+        default="stuff",
+    )
+    # Reranked QA: "cohere" (rerank API) or "local" (stored embeddings, no external call);
+    # the configured default if None
+    rerank_mode: Optional[Literal["cohere", "local"]] = Field(
+        default=None,
+    )
+
+
+class BatchSearchQuery(BaseModel):
+    query: str
+    k_results: Optional[int] = Field(
+        default=4,
+    )
+    metadata_filter: Optional[dict] = Field(
+        default={},
+    )
+
+
+class BatchSearchVectorDataBaseRequest(BaseModel):
+    title: Optional[str] = Field(
+        default=None,
+    )
+    queries: list[BatchSearchQuery]
+
+
+class SimilarChunksRequest(BaseModel):
+    # Ids of stored chunks; several ids are searched by their centroid
+    chunk_ids: list[str] = Field(
+        min_length=1,
+    )
+    k_results: Optional[int] = Field(
+        default=4,
+    )
+    metadata_filter: Optional[dict] = Field(
+        default={},
+    )
+    # Leave the seed chunks out of the results
+    exclude_sources: bool = Field(
+        default=True,
+    )
@@ -1,3 +1,4 @@
+from app.infrastructure.scheduling.rate_limiter import Priority, scheduling_priority
 from app.infrastructure.vector_db.repository import VectorDBRepository
 from app.services.document.pdf_loader import PDFLoader
 from app.services.document.text_extractor import PDFTextExtractor
@@ -61,12 +62,18 @@ class DocumentIngestionService:
             chunk_overlap=chunk_overlap,
         )
 
-        # 5. Split documents into chunks
-        chunks = splitter.split_documents(documents)
-        logger.info(f"Split into {len(chunks)} chunks")
+        # * Embedding calls (semantic splitting, indexing) queue behind interactive queries
+        with scheduling_priority(Priority.BULK):
+            # 5. Split documents into chunks
+            chunks = splitter.split_documents(documents)
+            logger.info(f"Split into {len(chunks)} chunks")
 
-        # 6. Add to vector database
-        self._vdb_repo.add_documents(chunks)
+            # * Sequence number in reading order: neighbors are fetched by key at query time
+            for seq, chunk in enumerate(chunks):
+                chunk.metadata["seq"] = seq
+
+            # 6. Add to vector database
+            self._vdb_repo.add_documents(chunks)
         logger.info(f"Document '{title}' ingested successfully")
 
         return True
@@ -0,0 +1,92 @@
+from functools import lru_cache
+from typing import Any
+
+from langchain.prompts import PromptTemplate
+from langchain_core.runnables import ConfigurableField, Runnable, RunnableConfig, RunnableLambda
+
+from app.core.config import Settings
+from app.infrastructure.vector_db.retriever import RepositoryRetriever
+from app.services.rag.context_packer import pack_context
+from app.services.rag.streaming import format_context
+
+
+def configurable_retriever(vdb_repository: Any, score_key: str | None = None) -> Runnable:
+    """
+    Repository retriever built once per service.
+
+    The search mode and kwargs (k, filter, ...) of each call come from the
+    runtime config (see `runtime_config`). With a `score_key`, each hit keeps
+    its search score in that metadata key.
+    """
+    return RepositoryRetriever(repository=vdb_repository, score_key=score_key).configurable_fields(
+        search_type=ConfigurableField(id="search_type"),
+        search_kwargs=ConfigurableField(id="search_kwargs"),
+    )
+
+
+@lru_cache(maxsize=32)
+def prompt_template(template: str) -> PromptTemplate:
+    """Parsed prompt template, shared by the calls using the same template text."""
+    return PromptTemplate.from_template(template=template)
+
+
+def runtime_config(
+    search_type: str,
+    search_kwargs: dict,
+    prompt_template: str | None = None,
+    **configurable: Any,
+) -> RunnableConfig:
+    """
+    Per-request parameters of the prebuilt chains.
+
+    Args:
+        search_type: Retriever search mode
+        search_kwargs: Retriever kwargs (see `build_search_kwargs`)
+        prompt_template: Custom prompt template (the chain default if None)
+        **configurable: Other configurable values (e.g. rerank `top_n`)
+    """
+    values = {"search_type": search_type, "search_kwargs": search_kwargs, **configurable}
+    if prompt_template is not None:
+        values["prompt_template"] = prompt_template
+    return {"configurable": values}
+
+
+def retrieval_step(retriever: Runnable) -> Runnable:
+    """Chain step mapping the question to {"question", "documents"}."""
+
+    def retrieve(question: str, config: RunnableConfig) -> dict:
+        return {"question": question, "documents": retriever.invoke(question, config=config)}
+
+    return RunnableLambda(retrieve)
+
+
+def build_qa_chain(
+    retrieval: Runnable, llm: Any, default_prompt: str, settings: Settings
+) -> Runnable:
+    """
+    Prebuilt "stuff" QA chain: retrieval, then context packing, prompt and LLM.
+
+    Two steps only: every runnable layer adds callback/config overhead to each
+    call (a `RunnableParallel` also starts a thread pool per call). The prompt
+    is the `prompt_template` of the runtime config, if set.
+
+    Args:
+        retrieval: Step mapping the question to {"question", "documents"}
+        llm: Chat model
+        default_prompt: Prompt template with {context} and {question}
+        settings: Application settings (context packing)
+
+    Returns:
+        Runnable returning {"question", "documents", "packing", "answer"}
+    """
+
+    def answer(inputs: dict, config: RunnableConfig) -> dict:
+        documents, report = pack_context(inputs["documents"], settings)
+        template = config.get("configurable", {}).get("prompt_template") or default_prompt
+        prompt = prompt_template(template).format_prompt(
+            context=format_context(documents), question=inputs["question"]
+        )
+        message = llm.invoke(prompt, config=config)
+        return {**inputs, "documents": documents, "packing": report, "answer": message.text()}
+
+    return retrieval | RunnableLambda(answer)
@@ -0,0 +1,175 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from langchain.schema import Document
+
+from app.core.config import Settings
+from app.infrastructure.vector_db.small_to_big import merge_chunk_texts
+from app.utils.logger import logger
+from app.utils.tokens import count_tokens
+
+
+# Separator the "stuff" chain puts between documents
+CONTEXT_SEPARATOR = "\n\n"
+
+
+@dataclass
+class PackingStats:
+    """Prompt context size before (plain concatenation) and after packing."""
+
+    input_chunks: int
+    input_tokens: int
+    packed_chunks: int
+    packed_tokens: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.input_tokens - self.packed_tokens
+
+
+def _page_key(document: Document) -> tuple[Any, Any]:
+    return document.metadata.get("titulo"), document.metadata.get("pagina")
+
+
+def _page_blocks(chunks: list[Document]) -> list[Document]:
+    """
+    Blocks of one page: chunks ordered by `seq`, consecutive ones stitched
+    without their shared overlap; chunks contained in another are dropped.
+    """
+    chunks = [
+        chunk
+        for position, chunk in enumerate(chunks)
+        if not any(
+            chunk.page_content in other.page_content
+            and (len(chunk.page_content) < len(other.page_content) or other_position < position)
+            for other_position, other in enumerate(chunks)
+            if other_position != position
+        )
+    ]
+    # * Chunks without `seq` (ingested before sequence numbers existed) are never stitched
+    ordered = sorted(
+        chunks, key=lambda chunk: (chunk.metadata.get("seq") is None, chunk.metadata.get("seq", 0))
+    )
+
+    runs: list[list[Document]] = []
+    for chunk in ordered:
+        seq, previous = chunk.metadata.get("seq"), runs[-1][-1] if runs else None
+        previous_seq = previous.metadata.get("seq") if previous is not None else None
+        if seq is not None and previous_seq is not None and seq == previous_seq + 1:
+            runs[-1].append(chunk)
+        else:
+            runs.append([chunk])
+
+    return [
+        Document(
+            page_content=merge_chunk_texts([chunk.page_content for chunk in run]),
+            metadata=(
+                {**run[0].metadata, "seq_end": run[-1].metadata["seq"]}
+                if len(run) > 1
+                else run[0].metadata
+            ),
+            id=run[0].id,
+        )
+        for run in runs
+    ]
+
+
+def pack_documents(
+    documents: list[Document],
+    token_budget: int | None,
+    token_counter: Callable[[str], int],
+) -> tuple[list[Document], PackingStats]:
+    """
+    Pack retrieved chunks into a deduplicated, page-ordered context within a token budget.
+
+    Chunks are taken in retrieval (relevance) order while the packed context
+    fits in `token_budget`; the most relevant chunk is always kept. Chunks of
+    the same page are stitched where consecutive (dropping the splitter
+    overlap) and duplicates are removed. The result is ordered by document
+    (most relevant first), then page, then position in the page.
+
+    Args:
+        documents: Retrieved chunks, most relevant first
+        token_budget: Maximum tokens of the packed context (no limit if None)
+        token_counter: Token counting function
+
+    Returns:
+        Packed documents (one per stitched block) and the packing stats
+    """
+    separator_tokens = token_counter(CONTEXT_SEPARATOR)
+    pages: dict[tuple[Any, Any], list[Document]] = {}
+    page_tokens: dict[tuple[Any, Any], int] = {}
+    used_tokens = 0
+    seen: set[str] = set()
+
+    for document in documents:
+        identity = document.id or document.page_content
+        if identity in seen:
+            continue
+        seen.add(identity)
+
+        # * Only the candidate's page changes: re-pack it and charge the difference
+        key = _page_key(document)
+        blocks = _page_blocks([*pages.get(key, []), document])
+        tokens = sum(token_counter(block.page_content) + separator_tokens for block in blocks)
+        added = tokens - page_tokens.get(key, 0)
+        if token_budget is not None and pages and used_tokens + added > token_budget:
+            continue
+
+        pages.setdefault(key, []).append(document)
+        page_tokens[key] = tokens
+        used_tokens += added
+
+    # * Documents in order of their best chunk, pages and chunks in reading order
+    document_rank: dict[Any, int] = {}
+    for key in pages:
+        document_rank.setdefault(key[0], len(document_rank))
+    ordered_keys = sorted(
+        pages, key=lambda key: (document_rank[key[0]], key[1] is None, key[1] or 0)
+    )
+    packed = [block for key in ordered_keys for block in _page_blocks(pages[key])]
+
+    stats = PackingStats(
+        input_chunks=len(documents),
+        input_tokens=token_counter(
+            CONTEXT_SEPARATOR.join(document.page_content for document in documents)
+        ),
+        packed_chunks=len(packed),
+        packed_tokens=token_counter(
+            CONTEXT_SEPARATOR.join(document.page_content for document in packed)
+        ),
+    )
+    return packed, stats
+
+
+def pack_context(
+    documents: list[Document], settings: Settings, budgeted: bool = True
+) -> tuple[list[Document], dict]:
+    """
+    Pack retrieved chunks (see `pack_documents`) when context packing is enabled.
+
+    With `budgeted=False` chunks are only deduplicated and stitched (for
+    callers that split the context over several prompts themselves).
+
+    Returns:
+        The documents for the prompt and the packing report: chunks before
+        packing, prompt context tokens and tokens saved (empty if not packed)
+    """
+    if not settings.context_packing_enabled:
+        return documents, {}
+    packed, stats = pack_documents(
+        documents,
+        settings.context_token_budget if budgeted else None,
+        lambda text: count_tokens(text, settings.openai_model),
+    )
+    logger.info(
+        f"Context packed: {stats.input_chunks} chunks -> {stats.packed_chunks} "
+        f"blocks | {stats.input_tokens} -> {stats.packed_tokens} tokens "
+        f"({stats.saved_tokens} saved)"
+    )
+    return packed, {
+        "chunks_used": stats.input_chunks,
+        "context_tokens": stats.packed_tokens,
+        "context_tokens_saved": stats.saved_tokens,
+    }
@@ -0,0 +1,142 @@
+import re
+from typing import Any
+
+from langchain.schema import Document
+import numpy as np
+
+from app.core.config import Settings
+from app.infrastructure.vector_db.mmr import maximal_marginal_relevance
+from app.infrastructure.vector_db.repository import VectorDBRepository
+
+
+# Terms of 3+ characters (keeps acronyms such as "ROS", skips most articles)
+_TERM = re.compile(r"\w{3,}")
+
+
+def _terms(text: str) -> set[str]:
+    return {term.lower() for term in _TERM.findall(text)}
+
+
+def lexical_overlap(query: str, texts: list[str]) -> np.ndarray:
+    """
+    IDF-weighted share of the query terms found in each text, in [0, 1].
+
+    Document frequencies come from the candidate texts themselves, so terms
+    present in every candidate (e.g. the document subject) weigh little.
+    """
+    query_terms = sorted(_terms(query))
+    if not query_terms or not texts:
+        return np.zeros(len(texts), dtype=np.float32)
+
+    text_terms = [_terms(text) for text in texts]
+    presence = np.array(
+        [[term in terms for term in query_terms] for terms in text_terms], dtype=np.float32
+    )
+    idf = np.log1p(len(texts) / (1 + presence.sum(axis=0)))
+    return (presence @ idf) / idf.sum()
+
+
+def local_rerank_scores(
+    query: str,
+    query_embedding: Any,
+    texts: list[str],
+    candidate_embeddings: Any,
+    lexical_weight: float = 0.3,
+) -> np.ndarray:
+    """
+    Relevance of each candidate: cosine similarity to the query blended with lexical overlap.
+
+    Args:
+        query: Query text
+        query_embedding: Query vector (dim,)
+        texts: Candidate texts
+        candidate_embeddings: Candidate vectors (n, dim); zero rows score 0 on similarity
+        lexical_weight: Weight of the lexical overlap (0 is pure cosine similarity)
+
+    Returns:
+        Scores (n,), higher is more relevant
+    """
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    query_vector = np.asarray(query_embedding, dtype=np.float32)
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query_vector = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+    cosine = candidates @ query_vector
+    return (1 - lexical_weight) * cosine + lexical_weight * lexical_overlap(query, texts)
+
+
+def local_rerank(
+    query: str,
+    query_embedding: Any,
+    texts: list[str],
+    candidate_embeddings: Any,
+    top_n: int,
+    lexical_weight: float = 0.3,
+    mmr_lambda: float | None = None,
+) -> list[dict]:
+    """
+    Rerank candidates locally (see `local_rerank_scores`).
+
+    Args:
+        query: Query text
+        query_embedding: Query vector (dim,)
+        texts: Candidate texts
+        candidate_embeddings: Candidate vectors (n, dim)
+        top_n: Number of candidates to keep
+        lexical_weight: Weight of the lexical overlap
+        mmr_lambda: MMR relevance/diversity trade-off for the selection (pure
+            relevance order if None)
+
+    Returns:
+        [{"index", "relevance_score"}] of the kept candidates, in rank order
+        (same shape as `CohereRerank.rerank`)
+    """
+    if not texts or top_n <= 0:
+        return []
+    scores = local_rerank_scores(
+        query, query_embedding, texts, candidate_embeddings, lexical_weight
+    )
+    if mmr_lambda is None:
+        order = [int(index) for index in np.argsort(-scores, kind="stable")[:top_n]]
+    else:
+        order = maximal_marginal_relevance(
+            query_embedding, candidate_embeddings, k=top_n, lambda_mult=mmr_lambda, relevance=scores
+        )
+    return [{"index": index, "relevance_score": float(scores[index])} for index in order]
+
+
+class LocalReranker:
+    """
+    Reranker over the candidates' stored embeddings (a local alternative to
+    `CohereRerank.rerank`).
+
+    The candidate vectors are read back from the vector store and the query
+    vector comes from the repository's query embedding cache (the retrieval
+    just embedded it), so no external call is made.
+    """
+
+    def __init__(self, settings: Settings, vdb_repository: VectorDBRepository) -> None:
+        self._settings = settings
+        self._vdb_repo = vdb_repository
+
+    def rerank(self, documents: list[Document], query: str, top_n: int) -> list[dict]:
+        """Same contract as `CohereRerank.rerank`: [{"index", "relevance_score"}], best first."""
+        if not documents:
+            return []
+        stored = self._vdb_repo.chunk_embeddings([doc.id for doc in documents if doc.id])
+        query_embedding = np.asarray(self._vdb_repo.embed_query(query), dtype=np.float32)
+
+        # * Chunks without a stored vector are ranked on lexical overlap only
+        candidate_embeddings = np.zeros((len(documents), len(query_embedding)), dtype=np.float32)
+        for position, document in enumerate(documents):
+            if document.id in stored:
+                candidate_embeddings[position] = stored[document.id]
+
+        return local_rerank(
+            query,
+            query_embedding,
+            [document.page_content for document in documents],
+            candidate_embeddings,
+            top_n=top_n,
+            lexical_weight=self._settings.local_rerank_lexical_weight,
+            mmr_lambda=self._settings.local_rerank_mmr_lambda,
+        )
@@ -0,0 +1,110 @@
+from collections.abc import Callable
+from typing import Any
+
+from langchain.schema import Document
+from langchain_core.output_parsers import StrOutputParser
+
+from app.services.rag.chains import prompt_template
+from app.services.rag.streaming import format_context
+from app.utils.logger import logger
+
+
+# Map step reply when a group holds nothing relevant to the question
+NO_RELEVANT_INFO = "NO_RELEVANT_INFO"
+
+# Answer returned without a reduce call when no group was relevant
+NO_ANSWER = "The retrieved documents do not contain information to answer the question."
+
+
+def group_documents(
+    documents: list[Document],
+    group_tokens: int | None,
+    token_counter: Callable[[str], int],
+) -> list[list[Document]]:
+    """
+    Split chunks into consecutive groups of at most `group_tokens` tokens.
+
+    A chunk larger than the budget gets a group of its own; with no budget
+    every chunk is its own group.
+    """
+    groups: list[list[Document]] = []
+    used_tokens = 0
+    for document in documents:
+        tokens = token_counter(document.page_content)
+        if group_tokens is None or not groups or used_tokens + tokens > group_tokens:
+            groups.append([document])
+            used_tokens = tokens
+        else:
+            groups[-1].append(document)
+            used_tokens += tokens
+    return groups
+
+
+def is_relevant(extract: str) -> bool:
+    """Whether a map step reply holds information (not empty nor the no-info marker)."""
+    return bool(extract.strip()) and NO_RELEVANT_INFO not in extract.strip().upper()
+
+
+def map_reduce_answer(
+    llm: Any,
+    query: str,
+    documents: list[Document],
+    map_prompt: str,
+    reduce_prompt: str,
+    max_concurrency: int,
+    group_tokens: int | None,
+    token_counter: Callable[[str], int],
+) -> dict:
+    """
+    Answer a question over many chunks with parallel map calls and one reduce call.
+
+    Each group of chunks gets its own extraction call (at most
+    `max_concurrency` at a time); the relevant extracts are combined by a
+    single reduce call. When no group is relevant the reduce call is skipped.
+
+    Args:
+        llm: Chat model
+        query: User question
+        documents: Retrieved chunks, in prompt order
+        map_prompt: Prompt template with {context} and {question}
+        reduce_prompt: Prompt template with {context} (the extracts) and {question}
+        max_concurrency: Maximum map calls in flight
+        group_tokens: Maximum tokens of chunks per map call (one chunk per call if None)
+        token_counter: Token counting function
+
+    Returns:
+        Dict with 'result', 'source_documents' (chunks of the relevant groups)
+        and 'map_reduce' (groups, relevant groups, whether the reduce ran)
+    """
+    groups = group_documents(documents, group_tokens, token_counter)
+    stats = {"groups": len(groups), "relevant_groups": 0, "reduced": False}
+    if not groups:
+        return {"result": NO_ANSWER, "source_documents": [], "map_reduce": stats}
+
+    # 1. Map: one extraction per group, bounded parallelism
+    map_chain = prompt_template(map_prompt) | llm | StrOutputParser()
+    extracts = map_chain.batch(
+        [{"context": format_context(group), "question": query} for group in groups],
+        config={"max_concurrency": max_concurrency},
+    )
+    relevant = [
+        (group, extract) for group, extract in zip(groups, extracts) if is_relevant(extract)
+    ]
+    stats["relevant_groups"] = len(relevant)
+    logger.info(f"Map-reduce: {len(relevant)}/{len(groups)} groups relevant")
+
+    # * Early termination: nothing to combine
+    if not relevant:
+        return {"result": NO_ANSWER, "source_documents": [], "map_reduce": stats}
+
+    # 2. Reduce: a single call over the extracts
+    reduce_chain = prompt_template(reduce_prompt) | llm | StrOutputParser()
+    result = reduce_chain.invoke(
+        {"context": "\n\n".join(extract.strip() for _, extract in relevant), "question": query}
+    )
+    stats["reduced"] = True
+    return {
+        "result": result,
+        "source_documents": [document for group, _ in relevant for document in group],
+        "map_reduce": stats,
+    }
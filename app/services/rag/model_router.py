@@ -0,0 +1,222 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+import re
+import threading
+import time
+from typing import Any
+
+from langchain.schema import Document
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+from langchain_core.output_parsers import StrOutputParser
+
+from app.core.config import Settings
+from app.services.rag.chains import prompt_template
+from app.services.rag.context_packer import pack_context
+from app.services.rag.streaming import format_context
+from app.utils.logger import logger
+from app.utils.tokens import count_tokens
+
+
+# Routes, cheapest first
+EXTRACTIVE = "extractive"
+SMALL = "small"
+FULL = "full"
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+# Words of 4+ characters (skips most articles and prepositions)
+_WORD = re.compile(r"\w{4,}")
+
+
+@dataclass
+class RouteSignals:
+    """Cheap signals of how hard a question is, from the query and its retrieval."""
+
+    query_tokens: int
+    chunks: int
+    distinct_pages: int
+    # Distance of the best chunk (None without results)
+    top_distance: float | None
+    # Relative distance jump from the best to the second chunk (None with < 2 chunks)
+    top_gap: float | None
+
+
+def route_signals(
+    query: str,
+    docs_and_distances: list[tuple[Document, float]],
+    token_counter: Callable[[str], int],
+) -> RouteSignals:
+    """
+    Compute routing signals.
+
+    Args:
+        query: User question
+        docs_and_distances: (Document, distance) tuples, closest first
+        token_counter: Token counting function
+    """
+    distances = [distance for _, distance in docs_and_distances]
+    top_gap = None
+    if len(distances) > 1:
+        top_gap = (distances[1] - distances[0]) / max(abs(distances[0]), 1e-6)
+    return RouteSignals(
+        query_tokens=token_counter(query),
+        chunks=len(docs_and_distances),
+        distinct_pages=len(
+            {
+                (doc.metadata.get("titulo"), doc.metadata.get("pagina"))
+                for doc, _ in docs_and_distances
+            }
+        ),
+        top_distance=distances[0] if distances else None,
+        top_gap=top_gap,
+    )
+
+
+def extractive_answer(query: str, text: str) -> str | None:
+    """
+    Sentence of `text` sharing the most words with the query (None if none shares any).
+    """
+    query_words = {word.lower() for word in _WORD.findall(query)}
+    best, best_overlap = None, 0
+    for sentence in _SENTENCE_SPLIT.split(text):
+        overlap = len(query_words & {word.lower() for word in _WORD.findall(sentence)})
+        if overlap > best_overlap:
+            best, best_overlap = sentence.strip(), overlap
+    return best
+
+
+class RouteMetrics:
+    """Requests, latency and LLM token counts per route. Thread-safe."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes = {
+            route: {"requests": 0, "latency_ms_total": 0.0, "input_tokens": 0, "output_tokens": 0}
+            for route in (EXTRACTIVE, SMALL, FULL)
+        }
+
+    def record(self, route: str, latency_ms: float, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            metrics = self._routes[route]
+            metrics["requests"] += 1
+            metrics["latency_ms_total"] += latency_ms
+            metrics["input_tokens"] += input_tokens
+            metrics["output_tokens"] += output_tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                route: {
+                    **metrics,
+                    "latency_ms_total": round(metrics["latency_ms_total"], 1),
+                    "latency_ms_avg": round(
+                        metrics["latency_ms_total"] / max(metrics["requests"], 1), 1
+                    ),
+                }
+                for route, metrics in self._routes.items()
+            }
+
+
+class ModelRouter:
+    """
+    Model cascade for QA: route each question to an extractive answer, the
+    small model or the full model from cheap retrieval and query signals.
+
+    - extractive (optional): one dominant chunk (close to the query and far
+      ahead of the second one); the answer is its best matching sentence
+    - small: short query, few distinct pages and a close best chunk
+    - full: everything else
+
+    The distance thresholds are cosine distances: in other collection spaces
+    every question takes the full route.
+    """
+
+    def __init__(self, settings: Settings, distance_space: str = "cosine") -> None:
+        self._settings = settings
+        self._distance_routing = distance_space == "cosine"
+        if not self._distance_routing:
+            logger.warning(
+                f"Model cascade limited to the full route: collection space is "
+                f"'{distance_space}', not 'cosine'"
+            )
+        self.metrics = RouteMetrics()
+
+    def route(self, signals: RouteSignals) -> str:
+        """Pick the route of a question from its signals."""
+        settings = self._settings
+        if not self._distance_routing:
+            return FULL
+        if (
+            settings.cascade_extractive_enabled
+            and signals.top_distance is not None
+            and signals.top_distance <= settings.cascade_extractive_max_distance
+            and (signals.top_gap is None or signals.top_gap >= settings.cascade_extractive_min_gap)
+        ):
+            return EXTRACTIVE
+        return self._llm_route(signals)
+
+    def answer(
+        self,
+        query: str,
+        docs_and_distances: list[tuple[Document, float]],
+        prompt_text: str,
+        llms: dict[str, Any],
+        started_at: float,
+    ) -> dict:
+        """
+        Answer a question on the route picked for it and record the route metrics.
+
+        Args:
+            query: User question
+            docs_and_distances: Retrieved (Document, distance) tuples, closest first
+            prompt_text: Prompt template with {context} and {question}
+            llms: Chat models of the "small" and "full" routes
+            started_at: `time.perf_counter()` at request start (latency includes retrieval)
+
+        Returns:
+            Dict with 'result', 'source_documents', 'route' and, when packed,
+            'context_tokens' / 'context_tokens_saved'
+        """
+        model = self._settings.openai_model
+        signals = route_signals(query, docs_and_distances, lambda text: count_tokens(text, model))
+        route = self.route(signals)
+
+        if route == EXTRACTIVE:
+            dominant = docs_and_distances[0][0]
+            extract = extractive_answer(query, dominant.page_content)
+            if extract is not None:
+                self._record(route, started_at, {}, signals)
+                return {"result": extract, "source_documents": [dominant], "route": route}
+            # * No sentence matches the query: let a model answer
+            route = self._llm_route(signals)
+
+        documents, answer = pack_context([doc for doc, _ in docs_and_distances], self._settings)
+
+        usage = UsageMetadataCallbackHandler()
+        chain = prompt_template(prompt_text) | llms[route] | StrOutputParser()
+        result = chain.invoke(
+            {"context": format_context(documents), "question": query},
+            config={"callbacks": [usage]},
+        )
+        self._record(route, started_at, usage.usage_metadata, signals)
+        return {**answer, "result": result, "source_documents": documents, "route": route}
+
+    def _llm_route(self, signals: RouteSignals) -> str:
+        settings = self._settings
+        if (
+            signals.top_distance is not None
+            and signals.query_tokens <= settings.cascade_small_max_query_tokens
+            and signals.distinct_pages <= settings.cascade_small_max_pages
+            and signals.top_distance <= settings.cascade_small_max_distance
+        ):
+            return SMALL
+        return FULL
+
+    def _record(self, route: str, started_at: float, usage: dict, signals: RouteSignals) -> None:
+        latency_ms = (time.perf_counter() - started_at) * 1000
+        input_tokens = sum(model_usage.get("input_tokens", 0) for model_usage in usage.values())
+        output_tokens = sum(model_usage.get("output_tokens", 0) for model_usage in usage.values())
+        self.metrics.record(route, latency_ms, input_tokens, output_tokens)
+        logger.info(
+            f"Model route: {route} | {signals} | {latency_ms:.0f} ms | "
+            f"{input_tokens} in / {output_tokens} out tokens"
+        )
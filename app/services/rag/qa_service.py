@@ -1,12 +1,29 @@
-from langchain.chains.retrieval_qa.base import RetrievalQA
-from langchain.prompts import PromptTemplate
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+import json
+import time
+
+from langchain.schema import Document
 from langsmith import traceable
 
 from app.core.config import Settings
 from app.infrastructure.llm.client import LLMClient
 from app.infrastructure.vector_db.repository import VectorDBRepository
+from app.services.rag.chains import (
+    build_qa_chain,
+    configurable_retriever,
+    retrieval_step,
+    runtime_config,
+)
+from app.services.rag.context_packer import pack_context
+from app.services.rag.map_reduce import map_reduce_answer
+from app.services.rag.model_router import FULL, SMALL, ModelRouter
+from app.services.rag.retrieval_config import build_search_kwargs
+from app.services.rag.streaming import stream_answer
 from app.utils.load_prompt import load_prompt
 from app.utils.logger import logger
+from app.utils.single_flight import SingleFlight, normalize_query
+from app.utils.tokens import count_tokens
 
 
 class QAService:
@@ -14,16 +31,31 @@ class QAService:
 
     # Default QA prompt
     DEFAULT_PROMPT = load_prompt("default_qa_prompt")
+    # Map-reduce prompts: per-group extraction, then the answer over the extracts
+    MAP_PROMPT = load_prompt("map_qa_prompt")
+    REDUCE_PROMPT = load_prompt("reduce_qa_prompt")
+
+    # Coalesces identical in-flight questions
+    _in_flight = SingleFlight()
 
     def __init__(
         self,
         settings: Settings,
         llm_client: LLMClient,
         vdb_repository: VectorDBRepository,
+        model_router: ModelRouter | None = None,
     ) -> None:
         self._settings = settings
         self._llm = llm_client.client
+        self._small_llm = llm_client.small_client
         self._vdb_repo = vdb_repository
+        self._model_router = model_router
+
+        # * Built once: search parameters and custom prompts come from the runtime config
+        self._retriever = configurable_retriever(vdb_repository)
+        self._qa_chain = build_qa_chain(
+            retrieval_step(self._retriever), self._llm, self.DEFAULT_PROMPT, settings
+        )
 
     @traceable
     def answer_question(
@@ -32,6 +64,16 @@ class QAService:
         document_type: str,
         k_results: int | None = None,
         custom_prompt: str | None = None,
+        search_type: str = "similarity",
+        fetch_k: int | None = None,
+        lambda_mult: float | None = None,
+        titles: list[str] | None = None,
+        score_threshold: float | None = None,
+        score_gap: float | None = None,
+        token_budget: int | None = None,
+        expand: str | None = None,
+        window: int | None = None,
+        chain_type: str = "stuff",
     ) -> dict:
         """
         Answer question using standard RAG.
@@ -41,42 +83,213 @@ class QAService:
             document_type: Filter documents by type (e.g., "documento-pdf")
             k_results: Number of chunks to retrieve (uses default if None)
             custom_prompt: Optional custom prompt template
+            search_type: "similarity", "mmr" (maximal marginal relevance), "adaptive"
+                or "small_to_big"
+            fetch_k: MMR/adaptive candidates to fetch (uses default if None)
+            lambda_mult: MMR relevance/diversity trade-off (uses default if None)
+            titles: Restrict retrieval to these document titles (whole type if None)
+            score_threshold: Adaptive k distance threshold (uses default if None)
+            score_gap: Adaptive k relative distance gap (uses default if None)
+            token_budget: Adaptive k token budget for retrieved chunks (uses default if None)
+            expand: Small-to-big expansion, "neighbors" or "page" (uses default if None)
+            window: Small-to-big neighbors per side (uses default if None)
+            chain_type: "stuff" (all chunks in one prompt) or "map_reduce" (parallel
+                per-group extraction, then one answer call; for large k)
 
         Returns:
             Dict with 'result' (answer) and 'source_documents' (list)
         """
+        if chain_type not in ("stuff", "map_reduce"):
+            raise ValueError(f"Unknown chain type: {chain_type}")
+
         # Use defaults
         k_results = k_results or self._settings.default_k_results
         prompt_text = custom_prompt or self.DEFAULT_PROMPT
+        search_kwargs = build_search_kwargs(
+            document_type,
+            k_results,
+            search_type,
+            fetch_k,
+            lambda_mult,
+            titles,
+            score_threshold,
+            score_gap,
+            token_budget,
+            expand,
+            window,
+        )
+
+        # Concurrent identical requests share a single retrieval + generation
+        key = (
+            normalize_query(query),
+            search_type,
+            json.dumps(search_kwargs, sort_keys=True),
+            prompt_text,
+            chain_type,
+        )
+        if chain_type == "map_reduce":
+            return self._in_flight.do(
+                key,
+                lambda: self._map_reduce_answer(query, search_type, search_kwargs, custom_prompt),
+            )
+        model_router = self._model_router
+        if model_router is not None:
+            return self._in_flight.do(
+                key,
+                lambda: self._routed_answer(
+                    model_router, query, search_type, search_kwargs, prompt_text
+                ),
+            )
+        return self._in_flight.do(
+            key, lambda: self._answer_question(query, search_type, search_kwargs, custom_prompt)
+        )
+
+    async def astream_answer(
+        self,
+        query: str,
+        document_type: str,
+        k_results: int | None = None,
+        custom_prompt: str | None = None,
+        search_type: str = "similarity",
+        fetch_k: int | None = None,
+        lambda_mult: float | None = None,
+        titles: list[str] | None = None,
+        score_threshold: float | None = None,
+        score_gap: float | None = None,
+        token_budget: int | None = None,
+        expand: str | None = None,
+        window: int | None = None,
+    ) -> AsyncGenerator[tuple[str, dict], None]:
+        """
+        Stream an answer using standard RAG (not coalesced).
+
+        Same arguments as `answer_question`.
+
+        Yields:
+            (event, data) pairs: "sources", then "token" per LLM chunk, then "done"
+        """
+        started_at = time.perf_counter()
+        k_results = k_results or self._settings.default_k_results
+        prompt_text = custom_prompt or self.DEFAULT_PROMPT
+        search_kwargs = build_search_kwargs(
+            document_type,
+            k_results,
+            search_type,
+            fetch_k,
+            lambda_mult,
+            titles,
+            score_threshold,
+            score_gap,
+            token_budget,
+            expand,
+            window,
+        )
+        logger.info(
+            f"QA stream: '{query[:50]}...' | search_type={search_type} | "
+            f"filter={search_kwargs['filter']} | k={search_kwargs['k']}"
+        )
 
-        logger.info(f"QA query: '{query[:50]}...' | doc_type={document_type} | k={k_results}")
+        # * Retrieval is not streamed: the sources event carries its (packed) output
+        retrieved = await self._retriever.ainvoke(
+            query, config=runtime_config(search_type, search_kwargs)
+        )
+        documents, _ = pack_context(retrieved, self._settings)
+
+        async with aclosing(
+            stream_answer(self._llm, prompt_text, query, documents, started_at, len(retrieved))
+        ) as events:
+            async for event in events:
+                yield event
+
+    def _answer_question(
+        self,
+        query: str,
+        search_type: str,
+        search_kwargs: dict,
+        custom_prompt: str | None,
+    ) -> dict:
+        """Run retrieval and answer generation for one (coalesced) question."""
+        logger.info(
+            f"QA query: '{query[:50]}...' | search_type={search_type} | "
+            f"filter={search_kwargs['filter']} | k={search_kwargs['k']}"
+        )
 
-        # 1. Create retriever with filters
-        retriever = self._vdb_repo.as_retriever(
-            search_type="similarity",
-            search_kwargs={
-                "k": k_results,
-                "filter": {"tipo-documento": {"$eq": document_type}},
-                "where_document": {"$contains": " "},
-            },
+        # * The prebuilt chain gets the per-request parameters as runtime config
+        output = self._qa_chain.invoke(
+            query, config=runtime_config(search_type, search_kwargs, custom_prompt)
         )
+        documents: list[Document] = output["documents"]
+
+        logger.info(f"QA answer generated: {len(documents)} sources")
+        return {
+            "query": query,
+            "result": output["answer"],
+            "source_documents": documents,
+            **output["packing"],
+        }
 
-        # 2. Create QA prompt
-        # This prompt will be used by the RetrievalQA chain (the one that uses the LLM)
-        qa_prompt = PromptTemplate.from_template(template=prompt_text)
-
-        # 3. Create RetrievalQA chain
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=self._llm,
-            retriever=retriever,
-            return_source_documents=True,
-            chain_type="stuff",  # TODO: Check with other chain types
-            chain_type_kwargs={"prompt": qa_prompt},
+    def _routed_answer(
+        self,
+        model_router: ModelRouter,
+        query: str,
+        search_type: str,
+        search_kwargs: dict,
+        prompt_text: str,
+    ) -> dict:
+        """Run retrieval and answer on the model cascade route of the question."""
+        started_at = time.perf_counter()
+        logger.info(
+            f"QA routed query: '{query[:50]}...' | search_type={search_type} | "
+            f"filter={search_kwargs['filter']} | k={search_kwargs['k']}"
         )
 
-        # 4. Invoke chain
-        # Is the actual question (query) answering step
-        answer = qa_chain.invoke({"query": query})
+        # * Distances are routing signals: search the repository directly
+        docs_and_distances = self._vdb_repo.search_with_scores(
+            query=query, search_type=search_type, search_kwargs=search_kwargs
+        )
+        answer = model_router.answer(
+            query,
+            docs_and_distances,
+            prompt_text,
+            llms={SMALL: self._small_llm or self._llm, FULL: self._llm},
+            started_at=started_at,
+        )
+        answer["query"] = query
+        return answer
+
+    def _map_reduce_answer(
+        self,
+        query: str,
+        search_type: str,
+        search_kwargs: dict,
+        custom_prompt: str | None,
+    ) -> dict:
+        """Run retrieval and map-reduce answer generation for one (coalesced) question."""
+        logger.info(
+            f"QA map-reduce query: '{query[:50]}...' | search_type={search_type} | "
+            f"filter={search_kwargs['filter']} | k={search_kwargs['k']}"
+        )
+
+        # 1. Retrieve (packing only deduplicates and stitches: each map call gets a group)
+        documents, report = pack_context(
+            self._retriever.invoke(query, config=runtime_config(search_type, search_kwargs)),
+            self._settings,
+            budgeted=False,
+        )
+
+        # 2. Map (concurrent, per group of chunks) and reduce (custom prompt answers, if any)
+        answer = map_reduce_answer(
+            self._llm,
+            query,
+            documents,
+            map_prompt=self.MAP_PROMPT,
+            reduce_prompt=custom_prompt or self.REDUCE_PROMPT,
+            max_concurrency=self._settings.map_reduce_max_concurrency,
+            group_tokens=self._settings.map_reduce_group_tokens,
+            token_counter=lambda text: count_tokens(text, self._settings.openai_model),
+        )
+        answer["query"] = query
+        answer.update(report)
 
-        logger.info(f"QA answer generated: {len(answer['source_documents'])} sources")
+        logger.info(f"QA map-reduce answer generated: {len(answer['source_documents'])} sources")
         return answer
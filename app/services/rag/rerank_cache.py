@@ -0,0 +1,89 @@
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+import threading
+import time
+
+from langchain.schema import Document
+
+from app.infrastructure.vector_db.retrieval_cache import cache_key
+from app.utils.single_flight import normalize_query
+
+
+def candidate_fingerprint(document: Document) -> str:
+    """
+    Identity of a rerank candidate: chunk id and a hash of its text.
+
+    A chunk re-ingested or edited under the same id gets a new fingerprint, so
+    entries scored on its previous text are never served again.
+    """
+    digest = hashlib.sha256(document.page_content.encode()).hexdigest()[:16]
+    return f"{document.id or ''}:{digest}"
+
+
+def rerank_cache_key(query: str, documents: list[Document], model: str, top_n: int) -> str:
+    """Key of a rerank request: normalized query, sorted candidate fingerprints, model and top_n."""
+    fingerprints = sorted(candidate_fingerprint(document) for document in documents)
+    return cache_key("rerank", normalize_query(query), fingerprints, model, top_n)
+
+
+class RerankCache:
+    """
+    Rerank results (candidate fingerprints and relevance scores) keyed by
+    `rerank_cache_key`.
+
+    Candidates are stored by fingerprint rather than position, so a repeat
+    with the same candidates in another order is still a hit. Entries never
+    go stale (changed chunks change the key) and old ones are evicted least
+    recently used first. Backed by SQLite (WAL mode), so several worker
+    processes share entries.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10_000) -> None:
+        self._path = path
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # * Opened lazily so a disabled/unused cache never touches the filesystem
+        if self._connection is None:
+            Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " results TEXT NOT NULL,"
+                " used REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+            self._connection = connection
+        return self._connection
+
+    def get(self, key: str) -> list[tuple[str, float]] | None:
+        """Cached (candidate fingerprint, relevance score) results for a key, best first."""
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT results FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            with connection:
+                connection.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+        return [(fingerprint, score) for fingerprint, score in json.loads(row[0])]
+
+    def put(self, key: str, results: list[tuple[str, float]]) -> None:
+        """Store results (evicts least recently used)."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                    (key, json.dumps(results), time.time()),
+                )
+                connection.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    " SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self._max_entries,),
+                )
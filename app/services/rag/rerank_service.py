@@ -1,32 +1,94 @@
-from langchain.prompts import ChatPromptTemplate
-from langchain.retrievers.contextual_compression import ContextualCompressionRetriever
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+from copy import deepcopy
+import json
+import time
+
+from langchain.schema import Document
 from langchain_cohere import CohereRerank
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnableParallel, RunnablePassthrough
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langsmith import traceable
 
 from app.core.config import Settings
 from app.infrastructure.llm.client import LLMClient
 from app.infrastructure.vector_db.repository import VectorDBRepository
+from app.services.rag.chains import (
+    build_qa_chain,
+    configurable_retriever,
+    retrieval_step,
+    runtime_config,
+)
+from app.services.rag.context_packer import pack_context
+from app.services.rag.local_rerank import LocalReranker
+from app.services.rag.model_router import FULL, SMALL, ModelRouter
+from app.services.rag.rerank_cache import RerankCache, candidate_fingerprint, rerank_cache_key
+from app.services.rag.rerank_skip import (
+    CACHED,
+    SKIPPED,
+    VECTOR_DISTANCE,
+    RerankMetrics,
+    is_decisive,
+    score_signals,
+)
+from app.services.rag.retrieval_config import build_search_kwargs
+from app.services.rag.streaming import stream_answer
 from app.utils.load_prompt import load_prompt
 from app.utils.logger import logger
+from app.utils.single_flight import SingleFlight, normalize_query
 
 
 class RerankService:
-    """RAG service with Cohere reranking: retrieval -> rerank -> LLM."""
+    """RAG service with reranking (Cohere or local): retrieval -> rerank -> LLM."""
 
     # Default QA prompt
     DEFAULT_PROMPT = load_prompt("default_qa_prompt")
 
+    # Coalesces identical in-flight questions
+    _in_flight = SingleFlight()
+
     def __init__(
         self,
         settings: Settings,
         llm_client: LLMClient,
         vdb_repository: VectorDBRepository,
+        model_router: ModelRouter | None = None,
     ) -> None:
         self._settings = settings
         self._llm = llm_client.client
+        self._small_llm = llm_client.small_client
         self._vdb_repo = vdb_repository
+        self._model_router = model_router
+
+        # * Built once (one Cohere client and HTTP session): search parameters, top_n
+        # * and custom prompts come from the runtime config
+        self._reranker = CohereRerank(
+            top_n=settings.default_rerank_top_n,
+            model=settings.cohere_model,
+            cohere_api_key=settings.cohere_api_key,
+        )
+        self._local_reranker = LocalReranker(settings, vdb_repository)
+        # * The skip thresholds and the 1 - distance relevance assume cosine distances
+        self._skip_enabled = settings.rerank_skip_enabled
+        if self._skip_enabled and vdb_repository.distance_space != "cosine":
+            logger.warning(
+                f"Rerank skipping disabled: collection space is "
+                f"'{vdb_repository.distance_space}', not 'cosine'"
+            )
+            self._skip_enabled = False
+        self._rerank_cache: RerankCache | None = None
+        if settings.rerank_cache_enabled:
+            self._rerank_cache = RerankCache(
+                settings.rerank_cache_path, max_entries=settings.rerank_cache_max_entries
+            )
+        # Rerank paths and latency per mode
+        self.metrics = RerankMetrics()
+        # * Hits keep their vector distance: it decides whether the rerank can be skipped
+        self._reranked_retrieval = retrieval_step(
+            configurable_retriever(vdb_repository, score_key=VECTOR_DISTANCE)
+        ) | RunnableLambda(self._rerank)
+        self._qa_chain = build_qa_chain(
+            self._reranked_retrieval, self._llm, self.DEFAULT_PROMPT, settings
+        )
 
     @traceable
     def answer_question(
@@ -36,9 +98,19 @@ class RerankService:
         k_results: int | None = None,
         rerank_top_n: int | None = None,
         custom_prompt: str | None = None,
-    ) -> str:
+        search_type: str = "similarity",
+        fetch_k: int | None = None,
+        lambda_mult: float | None = None,
+        titles: list[str] | None = None,
+        score_threshold: float | None = None,
+        score_gap: float | None = None,
+        token_budget: int | None = None,
+        expand: str | None = None,
+        window: int | None = None,
+        rerank_mode: str | None = None,
+    ) -> dict:
         """
-        Answer question using RAG with Cohere reranking.
+        Answer question using RAG with reranking.
 
         Args:
             query: User question
@@ -46,55 +118,306 @@ class RerankService:
             k_results: Number of chunks to retrieve (uses default if None)
             rerank_top_n: Number of top chunks after reranking (uses default if None)
             custom_prompt: Optional custom prompt template
+            search_type: "similarity", "mmr" (maximal marginal relevance), "adaptive"
+                or "small_to_big"
+            fetch_k: MMR/adaptive candidates to fetch (uses default if None)
+            lambda_mult: MMR relevance/diversity trade-off (uses default if None)
+            titles: Restrict retrieval to these document titles (whole type if None)
+            score_threshold: Adaptive k distance threshold (uses default if None)
+            score_gap: Adaptive k relative distance gap (uses default if None)
+            token_budget: Adaptive k token budget for retrieved chunks (uses default if None)
+            expand: Small-to-big expansion, "neighbors" or "page" (uses default if None)
+            window: Small-to-big neighbors per side (uses default if None)
+            rerank_mode: "cohere" (rerank API) or "local" (stored embeddings and lexical
+                overlap, no external call) (uses default if None)
 
         Returns:
-            Answer string
+            Dict with 'result' (answer), 'source_documents' (reranked chunks used) and
+            'rerank' (path taken: "cohere", "local", "cached" or "skipped")
         """
         # Use defaults
         k_results = k_results or self._settings.default_k_results
         rerank_top_n = rerank_top_n or self._settings.default_rerank_top_n
+        rerank_mode = self._rerank_mode(rerank_mode)
         prompt_text = custom_prompt or self.DEFAULT_PROMPT
+        search_kwargs = build_search_kwargs(
+            document_type,
+            k_results,
+            search_type,
+            fetch_k,
+            lambda_mult,
+            titles,
+            score_threshold,
+            score_gap,
+            token_budget,
+            expand,
+            window,
+        )
 
+        # Concurrent identical requests share a single retrieval + rerank + generation
+        key = (
+            normalize_query(query),
+            search_type,
+            json.dumps(search_kwargs, sort_keys=True),
+            rerank_top_n,
+            rerank_mode,
+            prompt_text,
+        )
+        model_router = self._model_router
+        if model_router is not None:
+            return self._in_flight.do(
+                key,
+                lambda: self._routed_answer(
+                    model_router,
+                    query,
+                    search_type,
+                    search_kwargs,
+                    rerank_top_n,
+                    rerank_mode,
+                    prompt_text,
+                ),
+            )
+        return self._in_flight.do(
+            key,
+            lambda: self._answer_question(
+                query, search_type, search_kwargs, rerank_top_n, rerank_mode, custom_prompt
+            ),
+        )
+
+    async def astream_answer(
+        self,
+        query: str,
+        document_type: str,
+        k_results: int | None = None,
+        rerank_top_n: int | None = None,
+        custom_prompt: str | None = None,
+        search_type: str = "similarity",
+        fetch_k: int | None = None,
+        lambda_mult: float | None = None,
+        titles: list[str] | None = None,
+        score_threshold: float | None = None,
+        score_gap: float | None = None,
+        token_budget: int | None = None,
+        expand: str | None = None,
+        window: int | None = None,
+        rerank_mode: str | None = None,
+    ) -> AsyncGenerator[tuple[str, dict], None]:
+        """
+        Stream an answer using RAG with reranking (not coalesced).
+
+        Same arguments as `answer_question`.
+
+        Yields:
+            (event, data) pairs: "sources" (with the rerank path), then "token" per LLM
+            chunk, then "done"
+        """
+        started_at = time.perf_counter()
+        k_results = k_results or self._settings.default_k_results
+        rerank_top_n = rerank_top_n or self._settings.default_rerank_top_n
+        rerank_mode = self._rerank_mode(rerank_mode)
+        prompt_text = custom_prompt or self.DEFAULT_PROMPT
+        search_kwargs = build_search_kwargs(
+            document_type,
+            k_results,
+            search_type,
+            fetch_k,
+            lambda_mult,
+            titles,
+            score_threshold,
+            score_gap,
+            token_budget,
+            expand,
+            window,
+        )
         logger.info(
-            f"Rerank QA query: '{query[:50]}...' | doc_type={document_type} | "
-            f"k={k_results} | rerank_top_n={rerank_top_n}"
+            f"Rerank QA stream: '{query[:50]}...' | search_type={search_type} | "
+            f"filter={search_kwargs['filter']} | k={search_kwargs['k']} | "
+            f"rerank_top_n={rerank_top_n} | rerank_mode={rerank_mode}"
         )
 
-        # 1. Create base retriever with filters
-        base_retriever = self._vdb_repo.as_retriever(
-            search_type="similarity",
-            search_kwargs={
-                "k": k_results,
-                "filter": {"tipo-documento": {"$eq": document_type}},
-                "where_document": {"$contains": " "},
-            },
+        # * Retrieval and reranking are not streamed: the sources event carries their output
+        reranked = await self._reranked_retrieval.ainvoke(
+            query,
+            config=runtime_config(
+                search_type, search_kwargs, top_n=rerank_top_n, rerank_mode=rerank_mode
+            ),
         )
+        documents, _ = pack_context(reranked["documents"], self._settings)
 
-        # 2. Create Cohere reranker
-        compressor = CohereRerank(
-            top_n=rerank_top_n,
-            model=self._settings.cohere_model,
-            cohere_api_key=self._settings.cohere_api_key,
+        async with aclosing(
+            stream_answer(
+                self._llm,
+                prompt_text,
+                query,
+                documents,
+                started_at,
+                len(reranked["documents"]),
+            )
+        ) as events:
+            async for event, data in events:
+                if event == "sources":
+                    data = {**data, "rerank": reranked["rerank"]}
+                yield event, data
+
+    def _rerank_mode(self, rerank_mode: str | None) -> str:
+        rerank_mode = rerank_mode or self._settings.rerank_mode
+        if rerank_mode not in ("cohere", "local"):
+            raise ValueError(f"Unknown rerank mode: {rerank_mode}")
+        return rerank_mode
+
+    def _rerank(self, inputs: dict, config: RunnableConfig) -> dict:
+        """
+        Rerank the retrieved chunks, with the `top_n` and mode of the runtime config.
+
+        Adds "rerank", the path taken: the mode, CACHED or SKIPPED (vector
+        scores already decisive, chunks kept in vector search order).
+        """
+        started_at = time.perf_counter()
+        configurable = config.get("configurable", {})
+        top_n = configurable.get("top_n", self._settings.default_rerank_top_n)
+        mode = configurable.get("rerank_mode", self._settings.rerank_mode)
+        documents: list[Document] = inputs["documents"]
+
+        if self._skips_rerank(documents):
+            # * Vector similarity (1 - cosine distance) stands in for the rerank relevance
+            path = SKIPPED
+            order = sorted(
+                range(len(documents)), key=lambda i: documents[i].metadata[VECTOR_DISTANCE]
+            )
+            scores = [
+                (index, 1 - documents[index].metadata[VECTOR_DISTANCE]) for index in order[:top_n]
+            ]
+        else:
+            scores, path = self._rerank_scores(documents, inputs["question"], top_n, mode)
+
+        reranked = []
+        for index, relevance_score in scores:
+            document = documents[index]
+            metadata = {**deepcopy(document.metadata), "relevance_score": relevance_score}
+            reranked.append(
+                Document(page_content=document.page_content, metadata=metadata, id=document.id)
+            )
+        self.metrics.record(mode, path, (time.perf_counter() - started_at) * 1000)
+        return {**inputs, "documents": reranked, "rerank": path}
+
+    def _skips_rerank(self, documents: list[Document]) -> bool:
+        """Whether the vector search scores of the candidates make reranking pointless."""
+        settings = self._settings
+        if not self._skip_enabled or not documents:
+            return False
+        if any(VECTOR_DISTANCE not in document.metadata for document in documents):
+            return False
+        signals = score_signals(
+            [document.metadata[VECTOR_DISTANCE] for document in documents],
+            settings.rerank_skip_temperature,
         )
+        return is_decisive(signals, settings.rerank_skip_min_gap, settings.rerank_skip_max_entropy)
+
+    def _rerank_scores(
+        self, documents: list[Document], query: str, top_n: int, mode: str
+    ) -> tuple[list[tuple[int, float]], str]:
+        """
+        (candidate index, relevance score) pairs, best first, from the rerank cache if
+        possible, and the path taken (`mode` or CACHED).
+        """
+        local = mode == "local"
+        reranker: CohereRerank | LocalReranker = self._local_reranker if local else self._reranker
+        if self._rerank_cache is None or not documents:
+            return [
+                (result["index"], result["relevance_score"])
+                for result in reranker.rerank(documents, query, top_n=top_n)
+            ], mode
 
-        # 3. Wrap retriever with compression
-        compression_retriever = ContextualCompressionRetriever(
-            base_compressor=compressor,
-            base_retriever=base_retriever,
+        # * The local scores also depend on their weights: part of the "model" of the key
+        model = (
+            f"local:{self._settings.local_rerank_lexical_weight}:"
+            f"{self._settings.local_rerank_mmr_lambda}"
+            if local
+            else self._settings.cohere_model
         )
+        key = rerank_cache_key(query, documents, model, top_n)
+        fingerprints = [candidate_fingerprint(document) for document in documents]
+        cached = self._rerank_cache.get(key)
+        if cached is not None:
+            # * Mapped back by fingerprint: the candidates may come in another order
+            positions = {fingerprint: index for index, fingerprint in enumerate(fingerprints)}
+            return [(positions[fingerprint], score) for fingerprint, score in cached], CACHED
 
-        # 4. Create QA prompt
-        qa_prompt = ChatPromptTemplate.from_template(template=prompt_text)
+        results = [
+            (result["index"], result["relevance_score"])
+            for result in reranker.rerank(documents, query, top_n=top_n)
+        ]
+        self._rerank_cache.put(key, [(fingerprints[index], score) for index, score in results])
+        return results, mode
 
-        # 5. Build LCEL chain
-        setup_and_retrieval = RunnableParallel(
-            {"question": RunnablePassthrough(), "context": compression_retriever}
+    def _answer_question(
+        self,
+        query: str,
+        search_type: str,
+        search_kwargs: dict,
+        rerank_top_n: int,
+        rerank_mode: str,
+        custom_prompt: str | None,
+    ) -> dict:
+        """Run retrieval, reranking and answer generation for one (coalesced) question."""
+        logger.info(
+            f"Rerank QA query: '{query[:50]}...' | search_type={search_type} | "
+            f"filter={search_kwargs['filter']} | k={search_kwargs['k']} | "
+            f"rerank_top_n={rerank_top_n} | rerank_mode={rerank_mode}"
         )
 
-        chain = setup_and_retrieval | qa_prompt | self._llm | StrOutputParser()
+        # * The prebuilt chain gets the per-request parameters as runtime config
+        output = self._qa_chain.invoke(
+            query,
+            config=runtime_config(
+                search_type,
+                search_kwargs,
+                custom_prompt,
+                top_n=rerank_top_n,
+                rerank_mode=rerank_mode,
+            ),
+        )
 
-        # 6. Invoke chain
-        answer = chain.invoke(query)
+        logger.info(f"Rerank QA answer generated: {len(output['documents'])} sources")
+        return {
+            "result": output["answer"],
+            "source_documents": output["documents"],
+            "rerank": output["rerank"],
+            **output["packing"],
+        }
 
-        logger.info("Rerank QA answer generated")
-        return answer
+    def _routed_answer(
+        self,
+        model_router: ModelRouter,
+        query: str,
+        search_type: str,
+        search_kwargs: dict,
+        rerank_top_n: int,
+        rerank_mode: str,
+        prompt_text: str,
+    ) -> dict:
+        """Run retrieval and reranking, then answer on the model cascade route of the question."""
+        started_at = time.perf_counter()
+        logger.info(
+            f"Rerank QA routed query: '{query[:50]}...' | search_type={search_type} | "
+            f"filter={search_kwargs['filter']} | k={search_kwargs['k']} | "
+            f"rerank_top_n={rerank_top_n} | rerank_mode={rerank_mode}"
+        )
+
+        # * Routed on the vector distances of the reranked chunks (rerank order): the cascade
+        # * thresholds are vector distances, not rerank relevance scores
+        reranked = self._reranked_retrieval.invoke(
+            query,
+            config=runtime_config(
+                search_type, search_kwargs, top_n=rerank_top_n, rerank_mode=rerank_mode
+            ),
+        )
+        docs_and_distances = [(doc, doc.metadata[VECTOR_DISTANCE]) for doc in reranked["documents"]]
+        result = model_router.answer(
+            query,
+            docs_and_distances,
+            prompt_text,
+            llms={SMALL: self._small_llm or self._llm, FULL: self._llm},
+            started_at=started_at,
+        )
+        return {**result, "rerank": reranked["rerank"]}
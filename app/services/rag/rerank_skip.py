@@ -0,0 +1,132 @@
+"""
+Adaptive rerank skipping.
+
+When the vector search scores of the candidates are already decisive, they
+keep their vector search order and no rerank call is made. A score is
+decisive when the best candidate is far ahead of the second one (relative
+distance gap), or when softmax(-distance / temperature) puts the probability
+mass on few candidates (normalized entropy). The thresholds and the
+1 - distance relevance of a skipped rerank assume cosine distances.
+"""
+
+from dataclasses import dataclass
+import math
+import threading
+
+
+# Rerank paths
+SKIPPED = "skipped"
+CACHED = "cached"
+
+# Metadata key of the vector search distance of a retrieved chunk
+VECTOR_DISTANCE = "vector_distance"
+
+
+@dataclass
+class ScoreSignals:
+    """How decisive the vector search scores of the rerank candidates are."""
+
+    candidates: int
+    # Relative distance jump from the best to the second candidate (None with < 2 candidates)
+    top_gap: float | None
+    # Normalized entropy (0 to 1) of softmax(-distance / temperature) (None with < 2 candidates)
+    entropy: float | None
+
+
+def score_signals(distances: list[float], temperature: float) -> ScoreSignals:
+    """
+    Compute the score distribution signals of the rerank candidates.
+
+    Args:
+        distances: Vector search distances of the candidates (any order)
+        temperature: Softmax temperature, in distance units
+    """
+    distances = sorted(distances)
+    if len(distances) < 2:
+        return ScoreSignals(candidates=len(distances), top_gap=None, entropy=None)
+
+    top_gap = (distances[1] - distances[0]) / max(abs(distances[0]), 1e-6)
+    weights = [math.exp(-(distance - distances[0]) / temperature) for distance in distances]
+    total = sum(weights)
+    entropy = -sum(weight / total * math.log(weight / total) for weight in weights if weight > 0)
+    return ScoreSignals(
+        candidates=len(distances),
+        top_gap=top_gap,
+        entropy=entropy / math.log(len(distances)),
+    )
+
+
+def is_decisive(signals: ScoreSignals, min_gap: float | None, max_entropy: float | None) -> bool:
+    """
+    Whether reranking would not change the outcome: a single candidate, a top-1
+    far ahead of the second one (`min_gap`) or the probability mass on few
+    candidates (`max_entropy`). A None threshold disables its signal.
+    """
+    if signals.candidates < 2:
+        return True
+    if min_gap is not None and signals.top_gap is not None and signals.top_gap >= min_gap:
+        return True
+    return (
+        max_entropy is not None and signals.entropy is not None and signals.entropy <= max_entropy
+    )
+
+
+class RerankMetrics:
+    """Rerank calls, cache hits, skips and their latency per rerank mode. Thread-safe."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._modes: dict[str, dict] = {}
+
+    def record(self, mode: str, path: str, latency_ms: float) -> None:
+        """
+        Record one rerank step.
+
+        Args:
+            mode: Requested rerank mode ("cohere" or "local")
+            path: `mode` (reranked), CACHED or SKIPPED
+            latency_ms: Duration of the step
+        """
+        kind = path if path in (CACHED, SKIPPED) else "reranked"
+        with self._lock:
+            metrics = self._modes.setdefault(
+                mode,
+                {
+                    "reranked": 0,
+                    "cached": 0,
+                    "skipped": 0,
+                    "reranked_latency_ms_total": 0.0,
+                    "skipped_latency_ms_total": 0.0,
+                },
+            )
+            metrics[kind] += 1
+            if kind != CACHED:
+                metrics[f"{kind}_latency_ms_total"] += latency_ms
+
+    def snapshot(self) -> dict:
+        """
+        Per mode counts, skip rate and latency saved by skipping (skips times the
+        average latency difference between a rerank and a skip).
+        """
+        with self._lock:
+            snapshot = {}
+            for mode, metrics in self._modes.items():
+                requests = metrics["reranked"] + metrics["cached"] + metrics["skipped"]
+                reranked_avg = metrics["reranked_latency_ms_total"] / max(metrics["reranked"], 1)
+                skipped_avg = metrics["skipped_latency_ms_total"] / max(metrics["skipped"], 1)
+                snapshot[mode] = {
+                    "requests": requests,
+                    "reranked": metrics["reranked"],
+                    "cached": metrics["cached"],
+                    "skipped": metrics["skipped"],
+                    "skip_rate": round(metrics["skipped"] / max(requests, 1), 3),
+                    "rerank_latency_ms_avg": round(reranked_avg, 1),
+                    # * Estimated from the reranked calls: 0 until one has been measured
+                    "latency_ms_saved": round(
+                        metrics["skipped"] * max(reranked_avg - skipped_avg, 0.0)
+                        if metrics["reranked"]
+                        else 0.0,
+                        1,
+                    ),
+                }
+            return snapshot
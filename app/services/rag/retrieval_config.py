@@ -0,0 +1,73 @@
+def build_metadata_filter(document_type: str, titles: list[str] | None = None) -> dict:
+    """
+    Build the Chroma metadata filter scoping retrieval to a type and, optionally, titles.
+
+    Args:
+        document_type: Document type (e.g., "documento-pdf")
+        titles: Restrict to these document titles (all titles of the type if None/empty)
+
+    Returns:
+        Chroma `where` filter
+    """
+    type_filter = {"tipo-documento": {"$eq": document_type}}
+    if not titles:
+        return type_filter
+
+    # * Compound filter so ANN search only considers chunks of the requested documents
+    title_filter: dict = {"titulo": {"$eq": titles[0]}}
+    if len(titles) > 1:
+        title_filter = {"titulo": {"$in": titles}}
+    return {"$and": [type_filter, title_filter]}
+
+
+def build_search_kwargs(
+    document_type: str,
+    k_results: int,
+    search_type: str = "similarity",
+    fetch_k: int | None = None,
+    lambda_mult: float | None = None,
+    titles: list[str] | None = None,
+    score_threshold: float | None = None,
+    score_gap: float | None = None,
+    token_budget: int | None = None,
+    expand: str | None = None,
+    window: int | None = None,
+) -> dict:
+    """
+    Build retriever search kwargs shared by the QA services.
+
+    Args:
+        document_type: Filter documents by type (e.g., "documento-pdf")
+        k_results: Number of chunks to retrieve
+        search_type: "similarity", "mmr", "adaptive" or "small_to_big"
+        fetch_k: MMR/adaptive candidates to fetch (repository default if None)
+        lambda_mult: MMR relevance/diversity trade-off (repository default if None)
+        titles: Restrict retrieval to these document titles
+        score_threshold: Adaptive k distance threshold (repository default if None)
+        score_gap: Adaptive k relative distance gap (repository default if None)
+        token_budget: Adaptive k token budget (repository default if None)
+        expand: Small-to-big expansion, "neighbors" or "page" (repository default if None)
+        window: Small-to-big neighbors per side (repository default if None)
+
+    Returns:
+        Search kwargs for `VectorDBRepository.as_retriever`
+    """
+    search_kwargs: dict = {
+        "k": k_results,
+        "filter": build_metadata_filter(document_type, titles),
+        "where_document": {"$contains": " "},
+    }
+
+    if search_type == "mmr":
+        search_kwargs["fetch_k"] = fetch_k
+        search_kwargs["lambda_mult"] = lambda_mult
+    elif search_type == "adaptive":
+        search_kwargs["fetch_k"] = fetch_k
+        search_kwargs["score_threshold"] = score_threshold
+        search_kwargs["score_gap"] = score_gap
+        search_kwargs["token_budget"] = token_budget
+    elif search_type == "small_to_big":
+        search_kwargs["expand"] = expand
+        search_kwargs["window"] = window
+
+    return search_kwargs
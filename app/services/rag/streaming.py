@@ -0,0 +1,75 @@
+from collections.abc import AsyncGenerator
+import time
+from typing import Any
+
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema import Document
+
+
+def format_context(documents: list[Document]) -> str:
+    """Join chunks into the prompt context (same layout as the "stuff" QA chain)."""
+    return "\n\n".join(document.page_content for document in documents)
+
+
+def source_metadata(documents: list[Document]) -> list[dict]:
+    """Id and metadata of the chunks an answer is based on (no text)."""
+    return [{"id": document.id, "metadata": document.metadata} for document in documents]
+
+
+async def stream_answer(
+    llm: Any,
+    prompt_text: str,
+    query: str,
+    documents: list[Document],
+    started_at: float,
+    chunks_used: int | None = None,
+) -> AsyncGenerator[tuple[str, dict], None]:
+    """
+    Stream an answer over already retrieved chunks as (event, data) pairs.
+
+    Events: "sources" (chunk ids and metadata) first, one "token" per LLM
+    chunk, then "done" with token usage and timings. Closing the iterator
+    (e.g. on client disconnect) cancels the LLM request.
+
+    Args:
+        llm: Chat model (ChatOpenAI)
+        prompt_text: Prompt template with {context} and {question}
+        query: User question
+        documents: Chunks used as context
+        started_at: `time.perf_counter()` at request start (timings are relative to it)
+        chunks_used: Retrieved chunks before context packing (defaults to len(documents))
+    """
+    retrieval_ms = (time.perf_counter() - started_at) * 1000
+    yield (
+        "sources",
+        {
+            "source_documents": source_metadata(documents),
+            "chunks_used": len(documents) if chunks_used is None else chunks_used,
+        },
+    )
+
+    # * Usage is only reported on the last streamed chunk when explicitly requested
+    chain = ChatPromptTemplate.from_template(template=prompt_text) | llm.bind(stream_usage=True)
+
+    first_token_ms: float | None = None
+    usage: dict | None = None
+    async for chunk in chain.astream({"context": format_context(documents), "question": query}):
+        if chunk.usage_metadata:
+            usage = dict(chunk.usage_metadata)
+        if not chunk.content:
+            continue
+        if first_token_ms is None:
+            first_token_ms = (time.perf_counter() - started_at) * 1000
+        yield "token", {"text": chunk.content}
+
+    yield (
+        "done",
+        {
+            "usage": usage,
+            "timing": {
+                "retrieval_ms": round(retrieval_ms, 1),
+                "first_token_ms": round(first_token_ms, 1) if first_token_ms is not None else None,
+                "total_ms": round((time.perf_counter() - started_at) * 1000, 1),
+            },
+        },
+    )
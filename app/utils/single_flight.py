@@ -0,0 +1,62 @@
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+import threading
+from typing import Any, TypeVar
+
+
+T = TypeVar("T")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a user query for deduplication (case and whitespace insensitive)."""
+    return " ".join(query.lower().split())
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share the same key.
+
+    The first caller for a key runs the computation; callers arriving while it
+    is in flight wait and receive the same result (or exception). Nothing is
+    cached once the call completes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: dict[Hashable, Future[Any]] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        Run `fn` once per key among concurrent callers.
+
+        Args:
+            key: Hashable identity of the computation
+            fn: Zero-argument callable producing the result
+
+        Returns:
+            Result of the (possibly shared) computation
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if future is None:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._release(key)
+            future.set_exception(e)
+            raise
+
+        self._release(key)
+        future.set_result(result)
+        return result
+
+    def _release(self, key: Hashable) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
@@ -0,0 +1,17 @@
+from functools import lru_cache
+
+import tiktoken
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # * Unknown model names (e.g. non-OpenAI providers) fall back to the GPT-4 encoding
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Number of tokens `text` takes for `model` (tiktoken)."""
+    return len(_encoding(model).encode(text))
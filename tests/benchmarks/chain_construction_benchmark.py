@@ -0,0 +1,116 @@
+"""
+Per-request chain construction vs chains built once with runtime config.
+
+Times what the QA services did on every request before their chains became
+singletons (retriever, prompt, `RetrievalQA` chain; `CohereRerank` client and
+compression retriever for reranking) against the per-request work left with
+the prebuilt chains (building the runtime config). A full QA call with a fake
+LLM and an in-memory repository is timed both ways as well. No network calls:
+the Cohere client is only constructed.
+
+Run from project root:
+    python -m tests.benchmarks.chain_construction_benchmark --requests 500
+"""
+
+import argparse
+import logging
+
+from langchain.chains.retrieval_qa.base import BaseRetrievalQA, RetrievalQA
+from langchain.prompts import PromptTemplate
+from langchain.retrievers.contextual_compression import ContextualCompressionRetriever
+from langchain.schema import Document
+from langchain_cohere import CohereRerank
+from langchain_core.language_models import FakeListChatModel
+
+from app.core.config import settings
+from app.infrastructure.vector_db.retriever import RepositoryRetriever
+from app.services.rag.chains import runtime_config
+from app.services.rag.qa_service import QAService
+from app.services.rag.retrieval_config import build_search_kwargs
+from app.utils.logger import logger
+from tests.benchmarks.common import latency_summary, time_calls
+
+
+DOCUMENT_TYPE = "documento-pdf"
+QUERY = "What is ROS?"
+
+
+class InMemoryRepository:
+    """Repository stub returning the same chunks for every search."""
+
+    def __init__(self, chunks: int) -> None:
+        self._results = [
+            (Document(page_content=f"synthetic chunk {i}", metadata={"pagina": i}), 0.1)
+            for i in range(chunks)
+        ]
+
+    def search_with_scores(self, query, search_type="similarity", search_kwargs=None):
+        return self._results
+
+
+class StubLLMClient:
+    def __init__(self) -> None:
+        self.client = FakeListChatModel(responses=["ROS is a robotics framework"])
+        self.small_client = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--k", type=int, default=settings.default_k_results)
+    args = parser.parse_args()
+    # * Per-request info logs would dominate the timings
+    logger.setLevel(logging.WARNING)
+
+    bench_settings = settings.model_copy(
+        update={"context_packing_enabled": False, "cohere_api_key": "benchmark"}
+    )
+    repository = InMemoryRepository(args.k)
+    llm_client = StubLLMClient()
+    search_kwargs = build_search_kwargs(DOCUMENT_TYPE, args.k)
+
+    def build_qa_chain() -> BaseRetrievalQA:
+        retriever = RepositoryRetriever(repository=repository, search_kwargs=search_kwargs)
+        return RetrievalQA.from_chain_type(
+            llm=llm_client.client,
+            retriever=retriever,
+            return_source_documents=True,
+            chain_type="stuff",
+            chain_type_kwargs={"prompt": PromptTemplate.from_template(QAService.DEFAULT_PROMPT)},
+        )
+
+    def build_rerank_retriever() -> ContextualCompressionRetriever:
+        return ContextualCompressionRetriever(
+            base_compressor=CohereRerank(
+                top_n=bench_settings.default_rerank_top_n,
+                model=bench_settings.cohere_model,
+                cohere_api_key=bench_settings.cohere_api_key,
+            ),
+            base_retriever=RepositoryRetriever(repository=repository, search_kwargs=search_kwargs),
+        )
+
+    print(f"Per-request overhead ({args.requests} requests, k={args.k})")
+    cases = {
+        "QA chain per request": build_qa_chain,
+        "Cohere reranker per request": build_rerank_retriever,
+        "runtime config (prebuilt)": lambda: runtime_config(
+            "similarity", search_kwargs, top_n=bench_settings.default_rerank_top_n
+        ),
+    }
+    for name, fn in cases.items():
+        print(f"  {name:<28} {latency_summary(time_calls(fn, args.requests))}")
+
+    service = QAService(bench_settings, llm_client, repository)  # type: ignore[arg-type]
+    print("Full QA call (fake LLM, in-memory repository)")
+    cases = {
+        "chain built per request": lambda: build_qa_chain().invoke({"query": QUERY}),
+        "chain built once": lambda: service._qa_chain.invoke(
+            QUERY, config=runtime_config("similarity", search_kwargs)
+        ),
+    }
+    for name, fn in cases.items():
+        print(f"  {name:<28} {latency_summary(time_calls(fn, args.requests))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compare query and upsert latency of the HTTP and embedded ChromaDB modes.
+
+The HTTP mode needs a running Chroma server (CHROMADB_HOST/CHROMADB_PORT);
+it is skipped when the server is not reachable.
+
+Run from project root:
+    python -m tests.benchmarks.chroma_modes_benchmark --chunks 5000 --queries 200
+"""
+
+import argparse
+import tempfile
+
+from app.core.config import Settings, settings
+from app.infrastructure.vector_db.chroma_client import ChromaDBClient
+from tests.benchmarks.common import latency_summary, random_embeddings, time_calls
+
+
+BENCHMARK_COLLECTION = "rag-docs-benchmark"
+
+
+def run_mode(mode_settings: Settings, chunks: int, queries: int, batch_size: int, k: int) -> None:
+    """Upsert synthetic chunks and run filtered queries against one ChromaDB mode."""
+    chroma_client = ChromaDBClient(mode_settings)
+    client = chroma_client.client
+    client.heartbeat()
+
+    collection = client.get_or_create_collection(name=BENCHMARK_COLLECTION)
+    try:
+        embeddings = random_embeddings(chunks)
+        batches = iter(range(0, chunks, batch_size))
+
+        def upsert_batch() -> None:
+            start = next(batches)
+            end = min(start + batch_size, chunks)
+            collection.upsert(
+                ids=[f"chunk-{i}" for i in range(start, end)],
+                embeddings=embeddings[start:end],
+                documents=[f"synthetic chunk {i}" for i in range(start, end)],
+                metadatas=[
+                    {"titulo": f"doc-{i % 50}", "tipo-documento": "documento-pdf", "pagina": i}
+                    for i in range(start, end)
+                ],
+            )
+
+        upsert_samples = time_calls(upsert_batch, repeat=-(-chunks // batch_size))
+
+        query_vectors = iter(random_embeddings(queries, seed=99))
+
+        def query() -> None:
+            collection.query(
+                query_embeddings=[next(query_vectors)],
+                n_results=k,
+                where={"tipo-documento": "documento-pdf"},
+                where_document={"$contains": " "},
+            )
+
+        query_samples = time_calls(query, repeat=queries)
+
+        print(f"\n[{mode_settings.chromadb_mode}]")
+        print(f"  upsert ({batch_size}/batch): {latency_summary(upsert_samples)}")
+        print(f"  query  (k={k}):        {latency_summary(query_samples)}")
+    finally:
+        client.delete_collection(name=BENCHMARK_COLLECTION)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--k", type=int, default=settings.default_k_results)
+    args = parser.parse_args()
+
+    try:
+        run_mode(
+            settings.model_copy(update={"chromadb_mode": "http"}),
+            args.chunks,
+            args.queries,
+            args.batch_size,
+            args.k,
+        )
+    except Exception as e:
+        print(f"\n[http] skipped, Chroma server not reachable: {type(e).__name__} - {e}")
+
+    with tempfile.TemporaryDirectory() as persist_path:
+        run_mode(
+            settings.model_copy(
+                update={"chromadb_mode": "embedded", "chromadb_persist_path": persist_path}
+            ),
+            args.chunks,
+            args.queries,
+            args.batch_size,
+            args.k,
+        )
+
+
+if __name__ == "__main__":
+    main()
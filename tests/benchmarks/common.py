@@ -0,0 +1,35 @@
+from collections.abc import Callable
+import time
+
+import numpy as np
+
+
+# ada-002 embedding dimension
+EMBEDDING_DIM = 1536
+
+
+def random_embeddings(count: int, dim: int = EMBEDDING_DIM, seed: int = 17) -> np.ndarray:
+    """Unit-norm float32 vectors, shaped like OpenAI embeddings."""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def time_calls(fn: Callable[[], object], repeat: int) -> list[float]:
+    """Run `fn` `repeat` times and return the latency of each call in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def latency_summary(samples: list[float]) -> str:
+    """Format p50/p99/mean of latency samples (ms)."""
+    values = np.asarray(samples)
+    return (
+        f"p50={np.percentile(values, 50):8.3f} ms | "
+        f"p99={np.percentile(values, 99):8.3f} ms | "
+        f"mean={values.mean():8.3f} ms"
+    )
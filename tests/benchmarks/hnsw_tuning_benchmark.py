@@ -0,0 +1,144 @@
+"""
+Recall@k and latency of ChromaDB HNSW parameters against exact brute-force search.
+
+Builds one embedded collection per (M, ef_construction) pair, sweeps ef_search
+on it, and compares every query's top-k with the exact top-k computed with
+NumPy. Uses the chunk embeddings of an existing collection (`--source-collection`,
+read through the configured Chroma connection) or synthetic embeddings; held-out
+chunks serve as queries.
+
+Run from project root:
+    python -m tests.benchmarks.hnsw_tuning_benchmark --chunks 20000 --queries 200
+    python -m tests.benchmarks.hnsw_tuning_benchmark --source-collection rag-docs
+"""
+
+import argparse
+import tempfile
+import time
+from typing import Any
+
+import numpy as np
+
+from app.core.config import settings
+from app.infrastructure.vector_db.chroma_client import ChromaDBClient, hnsw_configuration
+from tests.benchmarks.common import latency_summary, random_embeddings
+
+
+BENCHMARK_COLLECTION = "rag-docs-hnsw-benchmark"
+UPSERT_BATCH_SIZE = 500
+READ_BATCH_SIZE = 1000
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def load_collection_embeddings(collection_name: str) -> np.ndarray:
+    """All embeddings of a collection through the configured Chroma connection."""
+    collection = ChromaDBClient(settings).client.get_collection(name=collection_name)
+    batches = []
+    offset = 0
+    while True:
+        page: Any = collection.get(include=["embeddings"], limit=READ_BATCH_SIZE, offset=offset)
+        if len(page["ids"]) == 0:
+            break
+        batches.append(np.asarray(page["embeddings"], dtype=np.float32))
+        offset += READ_BATCH_SIZE
+    return np.concatenate(batches)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int, space: str) -> np.ndarray:
+    """Indices of the exact k nearest neighbors of each query (brute force)."""
+    if space == "l2":
+        scores = -(
+            (queries**2).sum(axis=1, keepdims=True)
+            - 2 * queries @ corpus.T
+            + (corpus**2).sum(axis=1)[np.newaxis, :]
+        )
+    elif space == "cosine":
+        normalized = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+        scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T
+    else:
+        scores = queries @ corpus.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source-collection", default=None)
+    parser.add_argument("--chunks", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=settings.default_k_results)
+    parser.add_argument("--space", default=settings.chromadb_hnsw_space)
+    parser.add_argument("--m", type=_int_list, default=[8, 16, 32])
+    parser.add_argument("--ef-construction", type=_int_list, default=[64, 100, 200])
+    parser.add_argument("--ef-search", type=_int_list, default=[16, 32, 64, 100, 200])
+    args = parser.parse_args()
+
+    if args.source_collection:
+        vectors = load_collection_embeddings(args.source_collection)
+        print(f"Loaded {len(vectors)} embeddings from '{args.source_collection}'")
+    else:
+        vectors = random_embeddings(args.chunks + args.queries)
+
+    rng = np.random.default_rng(7)
+    order = rng.permutation(len(vectors))
+    queries, corpus = vectors[order[: args.queries]], vectors[order[args.queries :]]
+    truth = exact_top_k(corpus, queries, args.k, args.space)
+    print(f"Corpus {len(corpus)} chunks, {len(queries)} held-out queries, k={args.k}\n")
+
+    for m in args.m:
+        for ef_construction in args.ef_construction:
+            with tempfile.TemporaryDirectory() as persist_path:
+                benchmark_settings = settings.model_copy(
+                    update={
+                        "chromadb_mode": "embedded",
+                        "chromadb_persist_path": persist_path,
+                        "chromadb_hnsw_space": args.space,
+                        "chromadb_hnsw_m": m,
+                        "chromadb_hnsw_ef_construction": ef_construction,
+                    }
+                )
+                client = ChromaDBClient(benchmark_settings).client
+
+                for ef_search in args.ef_search:
+                    # * Fresh collection per ef_search: the setting is read when the
+                    # * index segment is loaded
+                    name = f"{BENCHMARK_COLLECTION}-{ef_search}"
+                    collection = client.create_collection(
+                        name=name,
+                        configuration=hnsw_configuration(
+                            benchmark_settings.model_copy(
+                                update={"chromadb_hnsw_ef_search": ef_search}
+                            )
+                        ),
+                    )
+                    for start in range(0, len(corpus), UPSERT_BATCH_SIZE):
+                        end = min(start + UPSERT_BATCH_SIZE, len(corpus))
+                        collection.upsert(
+                            ids=[str(i) for i in range(start, end)],
+                            embeddings=corpus[start:end],
+                        )
+
+                    samples = []
+                    hits = 0
+                    for row, query in enumerate(queries):
+                        start_time = time.perf_counter()
+                        result = collection.query(
+                            query_embeddings=query[np.newaxis, :], n_results=args.k, include=[]
+                        )
+                        samples.append((time.perf_counter() - start_time) * 1000)
+                        found = {int(chunk_id) for chunk_id in result["ids"][0]}
+                        hits += len(found & set(truth[row].tolist()))
+
+                    recall = hits / (len(queries) * args.k)
+                    print(
+                        f"M={m:<3} ef_construction={ef_construction:<4} ef_search={ef_search:<4} "
+                        f"recall@{args.k}={recall:.3f} | {latency_summary(samples)}"
+                    )
+                    client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Microbenchmark of the MMR selection step.
+
+Compares the vectorized selection used by VectorDBRepository against the
+langchain reference implementation (which recomputes similarities against
+the selected set on every step) over synthetic ada-002 sized candidates.
+
+Run from project root:
+    python -m tests.benchmarks.mmr_benchmark --repeat 200
+"""
+
+import argparse
+
+from langchain_chroma.vectorstores import maximal_marginal_relevance as langchain_mmr
+
+from app.infrastructure.vector_db.mmr import maximal_marginal_relevance
+from tests.benchmarks.common import latency_summary, random_embeddings, time_calls
+
+
+FETCH_K_GRID = [20, 50, 100, 200]
+K_GRID = [4, 8]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--lambda-mult", type=float, default=0.5)
+    args = parser.parse_args()
+
+    query = random_embeddings(1, seed=1)[0]
+    for fetch_k in FETCH_K_GRID:
+        candidates = random_embeddings(fetch_k, seed=fetch_k)
+        # * The langchain reference expects a list of vectors
+        candidate_rows = list(candidates)
+        for k in K_GRID:
+            vectorized = time_calls(
+                lambda: maximal_marginal_relevance(query, candidates, k, args.lambda_mult),
+                args.repeat,
+            )
+            reference = time_calls(
+                lambda: langchain_mmr(query, candidate_rows, k=k, lambda_mult=args.lambda_mult),
+                args.repeat,
+            )
+            print(f"\nfetch_k={fetch_k} k={k}")
+            print(f"  vectorized: {latency_summary(vectorized)}")
+            print(f"  langchain:  {latency_summary(reference)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Memory-mapped NumPy backend vs embedded ChromaDB: ingestion, query latency and recall.
+
+Loads the same synthetic corpus (many titles of one document type) into an
+embedded Chroma collection and a `MemmapCollection`, then times type-wide and
+title-scoped queries with the filters the QA services build, and reports
+recall@k of each backend against exact search and the on-disk size.
+
+Run from project root:
+    python -m tests.benchmarks.numpy_backend_benchmark --documents 200 --chunks-per-document 25
+"""
+
+import argparse
+from pathlib import Path
+import tempfile
+import time
+from typing import Any
+
+import numpy as np
+
+from app.core.config import settings
+from app.infrastructure.vector_db.chroma_client import ChromaDBClient, hnsw_configuration
+from app.infrastructure.vector_db.memmap_store import MemmapCollection
+from app.services.rag.retrieval_config import build_metadata_filter
+from tests.benchmarks.common import latency_summary, random_embeddings
+
+
+BENCHMARK_COLLECTION = "rag-docs-numpy-benchmark"
+DOCUMENT_TYPE = "documento-pdf"
+UPSERT_BATCH_SIZE = 500
+
+
+def directory_size_mb(path: str) -> float:
+    return sum(file.stat().st_size for file in Path(path).rglob("*") if file.is_file()) / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--chunks-per-document", type=int, default=25)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=settings.default_k_results)
+    args = parser.parse_args()
+
+    total_chunks = args.documents * args.chunks_per_document
+    vectors = random_embeddings(total_chunks + args.queries)
+    corpus, queries = vectors[:total_chunks], vectors[total_chunks:]
+    ids = [str(i) for i in range(total_chunks)]
+    titles = [f"doc-{i // args.chunks_per_document}" for i in range(total_chunks)]
+    metadatas = [{"titulo": title, "tipo-documento": DOCUMENT_TYPE} for title in titles]
+    documents = [f"chunk {i} of {title}" for i, title in enumerate(titles)]
+    print(f"Corpus {total_chunks} chunks ({args.documents} documents), k={args.k}\n")
+
+    rng = np.random.default_rng(3)
+    scoped_titles = [f"doc-{i}" for i in rng.integers(0, args.documents, size=len(queries))]
+    workloads = {
+        "type-wide": [build_metadata_filter(DOCUMENT_TYPE)] * len(queries),
+        "title-scoped": [build_metadata_filter(DOCUMENT_TYPE, [title]) for title in scoped_titles],
+    }
+    title_array = np.asarray(titles)
+
+    def exact_ids(query: np.ndarray, title: str | None) -> set[str]:
+        scores = corpus @ query
+        if title is not None:
+            scores = np.where(title_array == title, scores, -np.inf)
+        return {str(i) for i in np.argsort(-scores)[: args.k]}
+
+    truth = {
+        "type-wide": [exact_ids(query, None) for query in queries],
+        "title-scoped": [exact_ids(query, title) for query, title in zip(queries, scoped_titles)],
+    }
+
+    with tempfile.TemporaryDirectory() as chroma_path, tempfile.TemporaryDirectory() as numpy_path:
+        chroma_settings = settings.model_copy(
+            update={
+                "chromadb_mode": "embedded",
+                "chromadb_persist_path": chroma_path,
+                "chromadb_hnsw_space": "cosine",
+            }
+        )
+        chroma_collection = ChromaDBClient(chroma_settings).client.create_collection(
+            name=BENCHMARK_COLLECTION, configuration=hnsw_configuration(chroma_settings)
+        )
+        numpy_collection = MemmapCollection(Path(numpy_path) / BENCHMARK_COLLECTION)
+
+        backends: dict[str, Any] = {"chroma": chroma_collection, "numpy": numpy_collection}
+        for name, collection in backends.items():
+            start_time = time.perf_counter()
+            for start in range(0, total_chunks, UPSERT_BATCH_SIZE):
+                end = min(start + UPSERT_BATCH_SIZE, total_chunks)
+                collection.upsert(
+                    ids=ids[start:end],
+                    embeddings=corpus[start:end],
+                    documents=documents[start:end],
+                    metadatas=metadatas[start:end],
+                )
+            print(f"{name:<7} ingest: {time.perf_counter() - start_time:8.2f} s")
+        print(
+            f"on disk: chroma={directory_size_mb(chroma_path):.1f} MB | "
+            f"numpy={directory_size_mb(numpy_path):.1f} MB\n"
+        )
+
+        # * A second handle on the same files, as another worker process would open it
+        start_time = time.perf_counter()
+        reopened = MemmapCollection(Path(numpy_path) / BENCHMARK_COLLECTION)
+        reopened.count()
+        print(f"numpy reopen: {(time.perf_counter() - start_time) * 1000:.1f} ms\n")
+
+        for workload, filters in workloads.items():
+            for name, collection in backends.items():
+                samples = []
+                hits = 0
+                for row, (query, where) in enumerate(zip(queries, filters)):
+                    start_time = time.perf_counter()
+                    result = collection.query(
+                        query_embeddings=query[np.newaxis, :],
+                        n_results=args.k,
+                        where=where,
+                        where_document={"$contains": " "},
+                        include=["documents", "metadatas", "distances"],
+                    )
+                    samples.append((time.perf_counter() - start_time) * 1000)
+                    hits += len(set(result["ids"][0]) & truth[workload][row])
+                recall = hits / (len(queries) * args.k)
+                print(
+                    f"{workload:<13} {name:<7} recall@{args.k}={recall:.3f} | "
+                    f"{latency_summary(samples)}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Quantized first pass + exact re-scoring: memory footprint, recall@k and latency.
+
+Loads one corpus into `MemmapCollection`s using each sidecar configuration
+(int8 / binary codes, optionally PCA-reduced, several re-scoring shortlist
+sizes) and compares every query's top-k with the full-precision exact search.
+Uses the vectors of an existing NumPy store collection (`--source-store`) or
+synthetic clustered embeddings; held-out chunks, slightly perturbed, serve as
+queries.
+
+Run from project root:
+    python -m tests.benchmarks.quantization_benchmark --chunks 20000 --queries 200
+    python -m tests.benchmarks.quantization_benchmark --source-store ./vector_store/rag-docs
+"""
+
+import argparse
+from pathlib import Path
+import tempfile
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.infrastructure.vector_db.memmap_store import MemmapCollection
+from tests.benchmarks.common import EMBEDDING_DIM, latency_summary
+
+
+UPSERT_BATCH_SIZE = 2000
+
+
+def clustered_embeddings(count: int, dim: int = EMBEDDING_DIM, seed: int = 17) -> np.ndarray:
+    """Unit vectors around topic centers in a low-rank subspace, like real text embeddings."""
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((128, dim)).astype(np.float32)
+    centers = rng.standard_normal((64, 128)).astype(np.float32)
+    topics = rng.integers(0, len(centers), size=count)
+    latent = centers[topics] + 0.6 * rng.standard_normal((count, 128)).astype(np.float32)
+    vectors = latent @ basis + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--source-store", default=None, help="NumPy store collection directory")
+    parser.add_argument("--chunks", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=settings.default_k_results)
+    parser.add_argument("--pca-dimensions", type=_int_list, default=[0, 256])
+    parser.add_argument("--rescore-factors", type=_int_list, default=[1, 4, 10])
+    args = parser.parse_args()
+
+    if args.source_store:
+        vectors = MemmapCollection(args.source_store).get(include=["embeddings"])["embeddings"]
+        print(f"Loaded {len(vectors)} embeddings from '{args.source_store}'")
+    else:
+        vectors = clustered_embeddings(args.chunks + args.queries)
+
+    rng = np.random.default_rng(7)
+    order = rng.permutation(len(vectors))
+    queries = vectors[order[: args.queries]]
+    noise = rng.standard_normal(queries.shape).astype(np.float32)
+    queries = queries + 0.1 * noise / np.linalg.norm(noise, axis=1, keepdims=True)
+    corpus = vectors[order[args.queries :]]
+    ids = [str(i) for i in range(len(corpus))]
+    full_mb = corpus.nbytes / 1e6
+    print(
+        f"Corpus {len(corpus)} chunks x {corpus.shape[1]} dims "
+        f"(float32: {full_mb:.1f} MB, {corpus.shape[1] * 4} B/chunk), k={args.k}\n"
+    )
+
+    with tempfile.TemporaryDirectory() as store_path:
+
+        def load(name: str, **options) -> MemmapCollection:
+            collection = MemmapCollection(Path(store_path) / name, **options)
+            for start in range(0, len(corpus), UPSERT_BATCH_SIZE):
+                end = min(start + UPSERT_BATCH_SIZE, len(corpus))
+                collection.upsert(ids=ids[start:end], embeddings=corpus[start:end])
+            return collection
+
+        def run(collection: MemmapCollection) -> tuple[list[set[str]], list[float]]:
+            found, samples = [], []
+            for query in queries:
+                start_time = time.perf_counter()
+                result = collection.query(
+                    query_embeddings=query[np.newaxis, :], n_results=args.k, include=[]
+                )
+                samples.append((time.perf_counter() - start_time) * 1000)
+                found.append(set(result["ids"][0]))
+            return found, samples
+
+        exact = load("exact")
+        truth, samples = run(exact)
+        print(f"{'exact float32':<34} recall@{args.k}=1.000 | {latency_summary(samples)}")
+
+        for quantization in ("int8", "binary"):
+            for pca_dimensions in args.pca_dimensions:
+                collection = load(
+                    f"{quantization}-{pca_dimensions}",
+                    quantization=quantization,
+                    pca_dimensions=pca_dimensions or None,
+                )
+                for rescore_factor in args.rescore_factors:
+                    collection._rescore_factor = rescore_factor
+                    # * First query builds the sidecar: keep it out of the latency samples
+                    collection.query(query_embeddings=queries[:1], n_results=args.k, include=[])
+                    found, samples = run(collection)
+                    hits = sum(len(a & b) for a, b in zip(found, truth))
+                    recall = hits / (len(queries) * args.k)
+                    sidecar_mb = collection.sidecar_nbytes / 1e6
+                    label = (
+                        f"{quantization} pca={pca_dimensions or 'off'} rescore={rescore_factor}x"
+                    )
+                    print(
+                        f"{label:<34} recall@{args.k}={recall:.3f} | {latency_summary(samples)} | "
+                        f"sidecar={sidecar_mb:.1f} MB "
+                        f"({collection.sidecar_nbytes // len(corpus)} B/chunk, "
+                        f"{sidecar_mb / full_mb:.1%} of float32)"
+                    )
+
+
+if __name__ == "__main__":
+    main()
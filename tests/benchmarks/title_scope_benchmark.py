@@ -0,0 +1,83 @@
+"""
+Latency of type-wide vs title-scoped retrieval on a collection with many documents.
+
+Builds a synthetic embedded ChromaDB collection (many titles of the same
+document type) and times filtered queries using the same metadata filters
+the QA services build.
+
+Run from project root:
+    python -m tests.benchmarks.title_scope_benchmark --documents 200 --chunks-per-document 25
+"""
+
+import argparse
+import tempfile
+
+from app.core.config import settings
+from app.infrastructure.vector_db.chroma_client import ChromaDBClient
+from app.services.rag.retrieval_config import build_metadata_filter
+from tests.benchmarks.common import latency_summary, random_embeddings, time_calls
+
+
+BENCHMARK_COLLECTION = "rag-docs-benchmark"
+DOCUMENT_TYPE = "documento-pdf"
+UPSERT_BATCH_SIZE = 500
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--chunks-per-document", type=int, default=25)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=settings.default_k_results)
+    args = parser.parse_args()
+
+    total_chunks = args.documents * args.chunks_per_document
+    titles = [f"doc-{i}" for i in range(args.documents)]
+
+    with tempfile.TemporaryDirectory() as persist_path:
+        chroma_client = ChromaDBClient(
+            settings.model_copy(
+                update={"chromadb_mode": "embedded", "chromadb_persist_path": persist_path}
+            )
+        )
+        collection = chroma_client.client.create_collection(name=BENCHMARK_COLLECTION)
+
+        embeddings = random_embeddings(total_chunks)
+        for start in range(0, total_chunks, UPSERT_BATCH_SIZE):
+            end = min(start + UPSERT_BATCH_SIZE, total_chunks)
+            collection.upsert(
+                ids=[f"chunk-{i}" for i in range(start, end)],
+                embeddings=embeddings[start:end],
+                documents=[f"synthetic chunk {i}" for i in range(start, end)],
+                metadatas=[
+                    {
+                        "titulo": titles[i // args.chunks_per_document],
+                        "tipo-documento": DOCUMENT_TYPE,
+                        "pagina": i % args.chunks_per_document,
+                    }
+                    for i in range(start, end)
+                ],
+            )
+        print(f"Collection ready: {args.documents} documents, {total_chunks} chunks")
+
+        scopes = {
+            "type only": build_metadata_filter(DOCUMENT_TYPE),
+            "single title": build_metadata_filter(DOCUMENT_TYPE, titles[:1]),
+            "5 titles": build_metadata_filter(DOCUMENT_TYPE, titles[:5]),
+        }
+        for name, metadata_filter in scopes.items():
+            query_vectors = iter(random_embeddings(args.queries, seed=99))
+            samples = time_calls(
+                lambda: collection.query(
+                    query_embeddings=[next(query_vectors)],
+                    n_results=args.k,
+                    where=metadata_filter,  # type: ignore[arg-type]
+                    where_document={"$contains": " "},
+                ),
+                args.queries,
+            )
+            print(f"  {name:<13} {latency_summary(samples)}")
+
+
+if __name__ == "__main__":
+    main()
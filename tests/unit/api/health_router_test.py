@@ -1,7 +1,9 @@
 import unittest
+from unittest.mock import MagicMock
 
 from fastapi.testclient import TestClient
 
+from app.core.dependencies import get_rerank_service
 from main import app
 
 
@@ -24,6 +26,46 @@ class TestHealthRouter(unittest.TestCase):
         # Assert
         self.assertEqual(response.json(), {"status": "service up"})
 
+    def test_openai_metrics_reports_disabled_scheduler(self):
+        # Act
+        response = self.client.get("/rag-docs/metrics/openai")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"enabled": False})
+
+    def test_llm_hedging_metrics_reports_disabled_hedging(self):
+        # Act
+        response = self.client.get("/rag-docs/metrics/llm_hedging")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"enabled": False})
+
+    def test_model_router_metrics_reports_disabled_cascade(self):
+        # Act
+        response = self.client.get("/rag-docs/metrics/model_router")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"enabled": False})
+
+    def test_rerank_metrics_reports_paths_per_mode(self):
+        # Arrange
+        rerank_service = MagicMock()
+        rerank_service.metrics.snapshot.return_value = {"cohere": {"skipped": 1}}
+        app.dependency_overrides[get_rerank_service] = lambda: rerank_service
+        self.addCleanup(app.dependency_overrides.clear)
+
+        # Act
+        response = self.client.get("/rag-docs/metrics/rerank")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(), {"skip_enabled": False, "modes": {"cohere": {"skipped": 1}}}
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
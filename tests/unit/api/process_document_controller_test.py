@@ -1,3 +1,4 @@
+import asyncio
 import json
 import unittest
 from unittest.mock import MagicMock
@@ -11,6 +12,7 @@ from app.core.dependencies import (
     get_rerank_service,
     get_vector_db_repository,
 )
+from app.infrastructure.scheduling.rate_limiter import RateLimitRejected
 from main import app
 
 from ..services.document.pdf_loader_test import FIXTURES_PATH
@@ -77,6 +79,28 @@ class TestProcessDocumentController(unittest.TestCase):
         self.assertIn("query_id", response.json())
         self.mock_ingestion_service.ingest_document.assert_called_once()
 
+    def test_document_ingestion_runs_off_the_event_loop(self):
+        """Test that ingestion (bulk calls may wait for rate limit budget) runs in a worker."""
+
+        # Arrange
+        def ingest_document(**kwargs):
+            with self.assertRaises(RuntimeError):
+                asyncio.get_running_loop()
+            return True
+
+        self.mock_ingestion_service.ingest_document.side_effect = ingest_document
+        payload = {
+            "title": "test-document",
+            "document_type": "documento-pdf",
+            "document_content": self.sample_pdf_data["base64_content"][:100],
+        }
+
+        # Act
+        response = self.client.post("/rag-docs/api/v1/document", json=payload)
+
+        # Assert
+        self.assertEqual(response.status_code, 201)
+
     def test_document_ingestion_existing_document(self):
         # Arrange
         # ingest_document returns a falsy value for existing documents
@@ -138,7 +162,7 @@ class TestProcessDocumentController(unittest.TestCase):
             )
             search_results.append((doc, result_data["score"]))
 
-        self.mock_vdb_repository.similarity_search_with_score.return_value = search_results
+        self.mock_vdb_repository.search_with_scores.return_value = search_results
         self.mock_vdb_repository.check_document_exists.return_value = True
 
         payload = {
@@ -152,6 +176,9 @@ class TestProcessDocumentController(unittest.TestCase):
 
         # Assert
         self.assertEqual(response.status_code, 200)
+        call_kwargs = self.mock_vdb_repository.search_with_scores.call_args.kwargs
+        self.assertEqual(call_kwargs["search_type"], "similarity")
+        self.assertEqual(call_kwargs["search_kwargs"]["k"], 4)
         response_data = response.json()
         self.assertIn("results", response_data)
         self.assertEqual(len(response_data["results"]), 4)
@@ -168,6 +195,204 @@ class TestProcessDocumentController(unittest.TestCase):
         self.assertIn("metadata", doc_dict)
         self.assertIsInstance(score, float)
 
+    def test_vdb_search_forwards_search_mode_options(self):
+        # Arrange
+        self.mock_vdb_repository.search_with_scores.return_value = []
+        self.mock_vdb_repository.check_document_exists.return_value = True
+        payload = {
+            "query": "What is ROS?",
+            "search_type": "small_to_big",
+            "expand": "page",
+            "metadata_filter": {"titulo": "ros"},
+        }
+
+        # Act
+        response = self.client.post("/rag-docs/api/v1/vdb_result", json=payload)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        call_kwargs = self.mock_vdb_repository.search_with_scores.call_args.kwargs
+        self.assertEqual(call_kwargs["search_type"], "small_to_big")
+        self.assertEqual(call_kwargs["search_kwargs"]["expand"], "page")
+        self.assertEqual(call_kwargs["search_kwargs"]["filter"], {"titulo": "ros"})
+
+    def test_vdb_search_unknown_search_type_returns_422(self):
+        # Act
+        response = self.client.post(
+            "/rag-docs/api/v1/vdb_result", json={"query": "What is ROS?", "search_type": "mmrr"}
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, 422)
+        self.mock_vdb_repository.search_with_scores.assert_not_called()
+
+    def test_vdb_search_unknown_expansion_returns_422(self):
+        # Act
+        response = self.client.post(
+            "/rag-docs/api/v1/vdb_result",
+            json={"query": "What is ROS?", "search_type": "small_to_big", "expand": "section"},
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, 422)
+        self.mock_vdb_repository.search_with_scores.assert_not_called()
+
+    def test_vdb_batch_search_returns_results_per_query(self):
+        # Arrange
+        first_result = self.vdb_search_response["results"][0]
+        doc = Document(page_content=first_result["page_content"], metadata=first_result["metadata"])
+        self.mock_vdb_repository.batch_similarity_search_with_score.return_value = [
+            [(doc, first_result["score"])],
+            [],
+        ]
+        self.mock_vdb_repository.check_document_exists.return_value = True
+
+        payload = {
+            "title": "ros-intro",
+            "queries": [
+                {"query": "What is ROS and what is it used for?", "k_results": 1},
+                {"query": "What is a node?", "k_results": 2, "metadata_filter": {"pagina": 3}},
+            ],
+        }
+
+        # Act
+        response = self.client.post("/rag-docs/api/v1/vdb_batch_result", json=payload)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["query"], "What is ROS and what is it used for?")
+        self.assertEqual(len(results[0]["results"]), 1)
+        self.assertEqual(results[1]["results"], [])
+        self.mock_vdb_repository.batch_similarity_search_with_score.assert_called_once_with(
+            queries=["What is ROS and what is it used for?", "What is a node?"],
+            k_values=[1, 2],
+            metadata_filters=[{}, {"pagina": 3}],
+        )
+
+    def test_vdb_batch_search_unknown_title_returns_empty(self):
+        # Arrange
+        self.mock_vdb_repository.check_document_exists.return_value = False
+
+        payload = {"title": "missing", "queries": [{"query": "q1"}, {"query": "q2"}]}
+
+        # Act
+        response = self.client.post("/rag-docs/api/v1/vdb_batch_result", json=payload)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["results"],
+            [{"query": "q1", "results": []}, {"query": "q2", "results": []}],
+        )
+        self.mock_vdb_repository.batch_similarity_search_with_score.assert_not_called()
+
+    def test_vdb_similar_returns_neighbors_of_stored_chunks(self):
+        # Arrange
+        first_result = self.vdb_search_response["results"][0]
+        doc = Document(page_content=first_result["page_content"], metadata=first_result["metadata"])
+        self.mock_vdb_repository.similar_chunks_search_with_score.return_value = [
+            (doc, first_result["score"])
+        ]
+
+        payload = {"chunk_ids": ["chunk-1", "chunk-2"], "k_results": 3}
+
+        # Act
+        response = self.client.post("/rag-docs/api/v1/vdb_similar", json=payload)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][0]["page_content"], first_result["page_content"])
+        self.mock_vdb_repository.similar_chunks_search_with_score.assert_called_once_with(
+            chunk_ids=["chunk-1", "chunk-2"],
+            k=3,
+            metadata_filter={},
+            exclude_sources=True,
+        )
+
+    def test_vdb_similar_without_chunk_ids_returns_422(self):
+        # Act
+        response = self.client.post("/rag-docs/api/v1/vdb_similar", json={"chunk_ids": []})
+
+        # Assert
+        self.assertEqual(response.status_code, 422)
+        self.mock_vdb_repository.similar_chunks_search_with_score.assert_not_called()
+
+    def test_vdb_similar_repository_error_returns_500(self):
+        # Arrange
+        self.mock_vdb_repository.similar_chunks_search_with_score.side_effect = Exception("boom")
+
+        # Act
+        response = self.client.post("/rag-docs/api/v1/vdb_similar", json={"chunk_ids": ["x"]})
+
+        # Assert
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("Error en búsqueda de similares", response.json()["detail"])
+
+    def test_qa_stream_sends_server_sent_events(self):
+        # Arrange
+        self.mock_vdb_repository.check_document_exists.return_value = True
+
+        async def events(**kwargs):
+            yield "sources", {"source_documents": [], "chunks_used": 0}
+            yield "token", {"text": "ROS"}
+            yield "done", {"usage": None, "timing": None}
+
+        self.mock_qa_service.astream_answer = MagicMock(side_effect=events)
+
+        payload = {"title": "ros-intro", "query": "What is ROS?"}
+
+        # Act
+        response = self.client.post("/rag-docs/api/v1/qa_stream", json=payload)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        self.assertEqual(
+            response.text,
+            'event: sources\ndata: {"source_documents": [], "chunks_used": 0}\n\n'
+            'event: token\ndata: {"text": "ROS"}\n\n'
+            'event: done\ndata: {"usage": null, "timing": null}\n\n',
+        )
+        self.assertEqual(self.mock_qa_service.astream_answer.call_args[1]["titles"], ["ros-intro"])
+
+    def test_qa_ranked_stream_reports_errors_as_an_event(self):
+        # Arrange
+        self.mock_vdb_repository.check_document_exists.return_value = True
+
+        async def events(**kwargs):
+            yield "sources", {"source_documents": [], "chunks_used": 0}
+            raise Exception("LLM service error")
+
+        self.mock_rerank_service.astream_answer = MagicMock(side_effect=events)
+
+        # Act
+        response = self.client.post(
+            "/rag-docs/api/v1/qa_ranked_stream", json={"title": "ros-intro", "query": "q"}
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("event: error", response.text)
+        self.assertIn("LLM service error", response.text)
+
+    def test_qa_stream_unknown_document_sends_no_sources(self):
+        # Arrange
+        self.mock_vdb_repository.check_document_exists.return_value = False
+
+        # Act
+        response = self.client.post(
+            "/rag-docs/api/v1/qa_stream", json={"title": "missing", "query": "q"}
+        )
+
+        # Assert
+        self.assertIn('"chunks_used": 0', response.text)
+        self.assertIn("event: done", response.text)
+        self.mock_qa_service.astream_answer.assert_not_called()
+
     def test_qa_endpoint_success(self):
         # Arrange - Use golden QA response
         source_docs = []
@@ -209,6 +434,99 @@ class TestProcessDocumentController(unittest.TestCase):
         self.assertGreater(len(response_data["result"]), 0)
         self.assertIsInstance(response_data["source_documents"], list)
         self.assertEqual(len(response_data["source_documents"]), 4)
+        self.assertEqual(response_data["chunks_used"], 4)
+
+    def test_qa_endpoints_report_chunks_used_before_packing(self):
+        # Arrange - four retrieved chunks packed into two blocks
+        packed = {
+            "result": "answer",
+            "source_documents": [Document(page_content="ROS", metadata={})] * 2,
+            "chunks_used": 4,
+        }
+        self.mock_qa_service.answer_question.return_value = packed
+        self.mock_rerank_service.answer_question.return_value = packed
+        self.mock_vdb_repository.check_document_exists.return_value = True
+
+        # Act
+        qa_response = self.client.post("/rag-docs/api/v1/qa", json={"query": "What is ROS?"})
+        ranked_response = self.client.post(
+            "/rag-docs/api/v1/qa_ranked", json={"query": "What is ROS?"}
+        )
+
+        # Assert
+        self.assertEqual(qa_response.json()["chunks_used"], 4)
+        self.assertEqual(len(qa_response.json()["source_documents"]), 2)
+        self.assertEqual(ranked_response.json()["chunks_used"], 4)
+
+    def test_qa_endpoint_scopes_retrieval_to_titles(self):
+        # Arrange
+        self.mock_qa_service.answer_question.return_value = {
+            "result": "answer",
+            "source_documents": [],
+        }
+        self.mock_vdb_repository.check_document_exists.return_value = True
+
+        payload = {
+            "query": "What is ROS?",
+            "title": "ros-intro",
+            "titles": ["ros-intro", "ros-nodes"],
+        }
+
+        # Act
+        response = self.client.post("/rag-docs/api/v1/qa", json=payload)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.mock_vdb_repository.check_document_exists.assert_called_once_with(
+            {"titulo": {"$in": ["ros-intro", "ros-nodes"]}}
+        )
+        call_kwargs = self.mock_qa_service.answer_question.call_args[1]
+        self.assertEqual(call_kwargs["titles"], ["ros-intro", "ros-nodes"])
+
+    def test_rate_limit_rejections_return_429_with_retry_after(self):
+        # Arrange
+        rejected = RateLimitRejected("OpenAI llm rate limit", retry_after_s=7.2)
+        self.mock_vdb_repository.check_document_exists.return_value = True
+        self.mock_vdb_repository.search_with_scores.side_effect = rejected
+        self.mock_vdb_repository.batch_similarity_search_with_score.side_effect = rejected
+        self.mock_qa_service.answer_question.side_effect = rejected
+        self.mock_rerank_service.answer_question.side_effect = rejected
+        endpoints = {
+            "/rag-docs/api/v1/vdb_result": {"query": "What is ROS?", "title": "ros"},
+            "/rag-docs/api/v1/vdb_batch_result": {"queries": [{"query": "What is ROS?"}]},
+            "/rag-docs/api/v1/qa": {"query": "What is ROS?"},
+            "/rag-docs/api/v1/qa_ranked": {"query": "What is ROS?"},
+        }
+
+        for endpoint, payload in endpoints.items():
+            with self.subTest(endpoint=endpoint):
+                # Act
+                response = self.client.post(endpoint, json=payload)
+
+                # Assert
+                self.assertEqual(response.status_code, 429)
+                self.assertEqual(response.headers["Retry-After"], "8")
+                self.assertIn("OpenAI llm rate limit", response.json()["detail"])
+
+    def test_qa_endpoint_unknown_chain_type_returns_422(self):
+        # Act
+        response = self.client.post(
+            "/rag-docs/api/v1/qa", json={"query": "What is ROS?", "chain_type": "refine"}
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, 422)
+        self.mock_qa_service.answer_question.assert_not_called()
+
+    def test_rerank_qa_endpoint_unknown_rerank_mode_returns_422(self):
+        # Act
+        response = self.client.post(
+            "/rag-docs/api/v1/qa_ranked", json={"query": "What is ROS?", "rerank_mode": "bm25"}
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, 422)
+        self.mock_rerank_service.answer_question.assert_not_called()
 
     def test_qa_endpoint_service_error_returns_500(self):
         # Arrange
@@ -225,9 +543,11 @@ class TestProcessDocumentController(unittest.TestCase):
 
     def test_rerank_qa_endpoint_success(self):
         # Arrange - Use golden rerank QA response
-        # answer_question returns the answer string directly
         answer_text = self.rerank_qa_response["response"]["content"]
-        self.mock_rerank_service.answer_question.return_value = answer_text
+        self.mock_rerank_service.answer_question.return_value = {
+            "result": answer_text,
+            "source_documents": [Document(page_content="ROS", metadata={})] * 3,
+        }
         self.mock_vdb_repository.check_document_exists.return_value = True
 
         payload = {
@@ -251,6 +571,34 @@ class TestProcessDocumentController(unittest.TestCase):
         self.assertEqual(response_data["query"], "What is ROS and what is it used for?")
         self.assertIsInstance(response_data["result"], str)
         self.assertGreater(len(response_data["result"]), 0)
+        self.assertEqual(response_data["chunks_used"], 3)
+
+    def test_qa_endpoint_forwards_adaptive_k_options(self):
+        # Arrange
+        self.mock_qa_service.answer_question.return_value = {
+            "result": "answer",
+            "source_documents": [Document(page_content="ROS", metadata={})],
+        }
+        self.mock_vdb_repository.check_document_exists.return_value = True
+
+        payload = {
+            "query": "What is ROS?",
+            "search_type": "adaptive",
+            "score_gap": 0.3,
+            "token_budget": 500,
+        }
+
+        # Act
+        response = self.client.post("/rag-docs/api/v1/qa", json=payload)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["chunks_used"], 1)
+        call_kwargs = self.mock_qa_service.answer_question.call_args[1]
+        self.assertEqual(call_kwargs["search_type"], "adaptive")
+        self.assertEqual(call_kwargs["score_gap"], 0.3)
+        self.assertEqual(call_kwargs["token_budget"], 500)
+        self.assertIsNone(call_kwargs["score_threshold"])
 
     def test_rerank_qa_endpoint_service_error(self):
         # Arrange
@@ -0,0 +1,87 @@
+import json
+from pathlib import Path
+import unittest
+
+from langchain.schema import Document
+
+from app.infrastructure.vector_db.adaptive_k import adaptive_cutoff
+
+
+FIXTURES_PATH = Path(__file__).parents[2] / "fixtures"
+
+
+def _results(distances: list[float], words: int = 10) -> list[tuple[Document, float]]:
+    return [
+        (Document(page_content=" ".join(["word"] * words), id=str(i)), distance)
+        for i, distance in enumerate(distances)
+    ]
+
+
+def _word_count(text: str) -> int:
+    return len(text.split())
+
+
+class TestAdaptiveCutoff(unittest.TestCase):
+    def test_no_rules_keeps_everything(self):
+        results = _results([0.1, 0.5, 0.9])
+
+        self.assertEqual(adaptive_cutoff(results), results)
+
+    def test_max_distance(self):
+        results = _results([0.1, 0.2, 0.35, 0.4])
+
+        kept = adaptive_cutoff(results, max_distance=0.3)
+
+        self.assertEqual([doc.id for doc, _ in kept], ["0", "1"])
+
+    def test_relative_score_gap(self):
+        results = _results([0.20, 0.22, 0.40, 0.41])
+
+        kept = adaptive_cutoff(results, score_gap=0.5)
+
+        self.assertEqual([doc.id for doc, _ in kept], ["0", "1"])
+
+    def test_token_budget(self):
+        results = _results([0.1, 0.11, 0.12, 0.13], words=10)
+
+        kept = adaptive_cutoff(results, token_budget=25, token_counter=_word_count)
+
+        self.assertEqual(len(kept), 2)
+
+    def test_min_k_is_always_kept(self):
+        results = _results([0.9, 0.95, 2.0])
+
+        kept = adaptive_cutoff(
+            results,
+            max_distance=0.1,
+            token_budget=1,
+            min_k=2,
+            token_counter=_word_count,
+        )
+
+        self.assertEqual(len(kept), 2)
+
+    def test_token_budget_requires_counter(self):
+        with self.assertRaises(ValueError):
+            adaptive_cutoff(_results([0.1]), token_budget=10)
+
+    def test_golden_search_keeps_the_answering_chunks(self):
+        """The golden ROS query drops the two trailing, less relevant chunks."""
+        # Arrange
+        with open(FIXTURES_PATH / "golden_responses" / "chromadb_search_response.json") as f:
+            golden = json.load(f)
+        results = [
+            (Document(page_content=item["page_content"], metadata=item["metadata"]), item["score"])
+            for item in golden["results"]
+        ]
+
+        # Act
+        kept = adaptive_cutoff(results, score_gap=0.2)
+
+        # Assert
+        self.assertEqual(len(kept), 2)
+        self.assertIn("What is ROS?", kept[0][0].page_content)
+
+
+if __name__ == "__main__":
+    unittest.main()
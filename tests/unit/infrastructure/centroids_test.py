@@ -0,0 +1,82 @@
+import unittest
+import uuid
+
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+import numpy as np
+
+from app.infrastructure.vector_db.centroids import (
+    CentroidIndex,
+    document_centroids,
+    document_metadata,
+)
+
+
+class TestDocumentCentroids(unittest.TestCase):
+    def test_single_centroid_is_normalized_mean_of_normalized_chunks(self):
+        centroids = document_centroids([[2.0, 0.0], [0.0, 5.0]])
+
+        np.testing.assert_allclose(centroids, [[np.sqrt(0.5), np.sqrt(0.5)]], rtol=1e-6)
+
+    def test_clusters_split_distinct_topics(self):
+        embeddings = [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.1, 0.9]]
+
+        centroids = document_centroids(embeddings, clusters=2)
+
+        self.assertEqual(centroids.shape, (2, 2))
+        self.assertGreater(centroids[0][0], 0.9)
+        self.assertGreater(centroids[1][1], 0.9)
+
+    def test_clusters_are_capped_by_chunk_count(self):
+        self.assertEqual(document_centroids([[1.0, 0.0]], clusters=3).shape, (1, 2))
+
+    def test_document_metadata_keeps_shared_keys(self):
+        metadata = document_metadata(
+            [
+                {"titulo": "ros", "tipo-documento": "documento-pdf", "pagina": 0},
+                {"titulo": "ros", "tipo-documento": "documento-pdf", "pagina": 1},
+            ]
+        )
+
+        self.assertEqual(metadata, {"titulo": "ros", "tipo-documento": "documento-pdf"})
+
+
+class TestCentroidIndex(unittest.TestCase):
+    def setUp(self):
+        client = chromadb.EphemeralClient(ChromaSettings(anonymized_telemetry=False))
+        self.index = CentroidIndex(client, f"centroids-{uuid.uuid4().hex[:8]}")
+        self.index.upsert(
+            "ros-intro",
+            document_centroids([[1.0, 0.0], [0.0, 1.0]], clusters=2),
+            {"tipo-documento": "documento-pdf"},
+        )
+        self.index.upsert("ros-nodes", np.array([[0.7, 0.7]]), {"tipo-documento": "documento-pdf"})
+        self.index.upsert("manual", np.array([[0.0, 1.0]]), {"tipo-documento": "web"})
+
+    def test_route_returns_distinct_closest_titles(self):
+        titles = self.index.route([0.0, 1.0], n_documents=2, where=None)
+
+        self.assertIn(titles[0], ("ros-intro", "manual"))
+        self.assertEqual(len(titles), 2)
+        self.assertEqual(len(set(titles)), 2)
+
+    def test_route_applies_document_filter(self):
+        titles = self.index.route(
+            [0.0, 1.0], n_documents=5, where={"tipo-documento": "documento-pdf"}
+        )
+
+        self.assertEqual(titles, ["ros-intro", "ros-nodes"])
+
+    def test_upsert_replaces_previous_clusters(self):
+        # Act
+        self.index.upsert("ros-intro", np.array([[1.0, 0.0]]), {"tipo-documento": "documento-pdf"})
+
+        # Assert
+        titles = self.index.route(
+            [0.0, 1.0], n_documents=5, where={"tipo-documento": "documento-pdf"}
+        )
+        self.assertEqual(titles, ["ros-nodes", "ros-intro"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch
 
+from chromadb.errors import NotFoundError
+from pydantic import ValidationError
+
 from app.core.config import Settings
 from app.infrastructure.vector_db.chroma_client import ChromaDBClient
 
@@ -85,7 +89,127 @@ class TestChromaDBClient(unittest.TestCase):
 
         # Assert
         mock_client_instance.get_collection.assert_called_once_with(name="new-collection")
-        mock_client_instance.create_collection.assert_called_once_with(name="new-collection")
+        mock_client_instance.create_collection.assert_called_once_with(
+            name="new-collection",
+            configuration={
+                "hnsw": {
+                    "space": self.settings.chromadb_hnsw_space,
+                    "max_neighbors": self.settings.chromadb_hnsw_m,
+                    "ef_construction": self.settings.chromadb_hnsw_ef_construction,
+                    "ef_search": self.settings.chromadb_hnsw_ef_search,
+                }
+            },
+        )
+
+    @patch("app.infrastructure.vector_db.chroma_client.chromadb.HttpClient")
+    def test_get_or_create_collection_applies_ef_search_to_existing(self, mock_http_client):
+        """Test that a different ef_search is applied to an existing collection."""
+        # Arrange
+        settings = self.settings.model_copy(update={"chromadb_hnsw_ef_search": 64})
+        mock_client_instance = MagicMock()
+        mock_collection = MagicMock()
+        mock_collection.configuration = {
+            "hnsw": {
+                "space": settings.chromadb_hnsw_space,
+                "max_neighbors": settings.chromadb_hnsw_m,
+                "ef_construction": settings.chromadb_hnsw_ef_construction,
+                "ef_search": 100,
+            }
+        }
+        mock_client_instance.get_collection.return_value = mock_collection
+        mock_http_client.return_value = mock_client_instance
+
+        client = ChromaDBClient(settings)
+
+        # Act
+        client.get_or_create_collection("test-collection")
+
+        # Assert
+        mock_collection.modify.assert_called_once_with(configuration={"hnsw": {"ef_search": 64}})
+        mock_client_instance.create_collection.assert_not_called()
+
+    def test_get_or_create_collection_uses_hnsw_settings_embedded(self):
+        """Test the configured HNSW parameters end up on a real embedded collection."""
+        # Arrange
+        with tempfile.TemporaryDirectory() as persist_path:
+            settings = self.settings.model_copy(
+                update={
+                    "chromadb_mode": "embedded",
+                    "chromadb_persist_path": persist_path,
+                    "chromadb_hnsw_space": "cosine",
+                    "chromadb_hnsw_m": 24,
+                    "chromadb_hnsw_ef_construction": 150,
+                    "chromadb_hnsw_ef_search": 50,
+                }
+            )
+            client = ChromaDBClient(settings)
+
+            # Act
+            client.get_or_create_collection("hnsw-collection")
+            configuration = client.client.get_collection("hnsw-collection").configuration
+
+        # Assert
+        hnsw = configuration["hnsw"]
+        self.assertEqual(
+            (hnsw["space"], hnsw["max_neighbors"], hnsw["ef_construction"], hnsw["ef_search"]),
+            ("cosine", 24, 150, 50),
+        )
+
+    @patch("app.infrastructure.vector_db.chroma_client.chromadb.AdminClient")
+    @patch("app.infrastructure.vector_db.chroma_client.chromadb.PersistentClient")
+    @patch("app.infrastructure.vector_db.chroma_client.chromadb.HttpClient")
+    def test_embedded_mode_uses_persistent_client(
+        self, mock_http_client, mock_persistent_client, mock_admin_client
+    ):
+        """Test embedded mode builds a PersistentClient with the same tenant/database."""
+        # Arrange
+        settings = self.settings.model_copy(
+            update={"chromadb_mode": "embedded", "chromadb_persist_path": "/tmp/chroma-test"}
+        )
+        mock_admin_instance = MagicMock()
+        mock_admin_client.return_value = mock_admin_instance
+
+        # Act
+        client = ChromaDBClient(settings)
+
+        # Assert
+        mock_http_client.assert_not_called()
+        mock_admin_instance.get_tenant.assert_called_once_with(name="test-tenant")
+        mock_admin_instance.get_database.assert_called_once_with(
+            name="test-db", tenant="test-tenant"
+        )
+        call_kwargs = mock_persistent_client.call_args[1]
+        self.assertEqual(call_kwargs["path"], "/tmp/chroma-test")
+        self.assertEqual(call_kwargs["tenant"], "test-tenant")
+        self.assertEqual(call_kwargs["database"], "test-db")
+        self.assertEqual(client.client, mock_persistent_client.return_value)
+
+    @patch("app.infrastructure.vector_db.chroma_client.chromadb.AdminClient")
+    @patch("app.infrastructure.vector_db.chroma_client.chromadb.PersistentClient")
+    def test_embedded_mode_creates_missing_tenant_and_database(
+        self, mock_persistent_client, mock_admin_client
+    ):
+        """Test embedded mode creates tenant and database on first run."""
+        # Arrange
+        settings = self.settings.model_copy(update={"chromadb_mode": "embedded"})
+        mock_admin_instance = MagicMock()
+        mock_admin_instance.get_tenant.side_effect = NotFoundError("Tenant not found")
+        mock_admin_instance.get_database.side_effect = NotFoundError("Database not found")
+        mock_admin_client.return_value = mock_admin_instance
+
+        # Act
+        ChromaDBClient(settings)
+
+        # Assert
+        mock_admin_instance.create_tenant.assert_called_once_with(name="test-tenant")
+        mock_admin_instance.create_database.assert_called_once_with(
+            name="test-db", tenant="test-tenant"
+        )
+
+    def test_invalid_mode_is_rejected_by_settings(self):
+        """Test unknown ChromaDB mode fails settings validation."""
+        with self.assertRaises(ValidationError):
+            Settings(chromadb_mode="grpc")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,65 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from langchain.schema import Document
+
+from app.infrastructure.vector_db.chunk_store import ChunkStore
+
+
+class TestChunkStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = ChunkStore(str(Path(self.tmp_dir.name) / "chunks.sqlite3"))
+        self.store.put(
+            [
+                Document(
+                    page_content=f"chunk {seq}",
+                    metadata={"titulo": title, "pagina": seq // 2, "seq": seq},
+                    id=f"{title}-{seq}",
+                )
+                for title in ("ros-intro", "ros-nodes")
+                for seq in range(5)
+            ]
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_range_is_ordered_by_seq(self):
+        chunks = self.store.get_range("ros-intro", 1, 3)
+
+        self.assertEqual(
+            [chunk.id for chunk in chunks], ["ros-intro-1", "ros-intro-2", "ros-intro-3"]
+        )
+        self.assertEqual(chunks[0].metadata, {"titulo": "ros-intro", "pagina": 0, "seq": 1})
+
+    def test_get_page(self):
+        chunks = self.store.get_page("ros-nodes", 1)
+
+        self.assertEqual([chunk.page_content for chunk in chunks], ["chunk 2", "chunk 3"])
+
+    def test_get_by_ids_skips_unknown_ids(self):
+        chunks = self.store.get_by_ids(["ros-nodes-4", "missing", "ros-intro-0"])
+
+        self.assertEqual(sorted(chunk.id for chunk in chunks), ["ros-intro-0", "ros-nodes-4"])
+        self.assertEqual(self.store.get_by_ids([]), [])
+
+    def test_put_upserts_by_key_and_delete_document(self):
+        # Act
+        self.store.put(
+            [Document(page_content="new", metadata={"titulo": "ros-intro", "pagina": 0, "seq": 0})]
+        )
+        self.store.delete_document("ros-nodes")
+
+        # Assert
+        self.assertEqual(self.store.get_range("ros-intro", 0, 0)[0].page_content, "new")
+        self.assertEqual(self.store.get_page("ros-nodes", 0), [])
+
+    def test_put_requires_key_metadata(self):
+        with self.assertRaises(KeyError):
+            self.store.put([Document(page_content="x", metadata={"titulo": "t"})])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ from unittest.mock import ANY, MagicMock, patch
 
 from app.core.config import Settings
 from app.infrastructure.embeddings.client import EmbeddingsClient
+from app.infrastructure.scheduling.rate_limiter import OpenAIScheduler
 
 
 class TestEmbeddingsClient(unittest.TestCase):
@@ -27,6 +28,27 @@ class TestEmbeddingsClient(unittest.TestCase):
         )
         self.assertIsNotNone(client.client)
 
+    @patch("app.infrastructure.scheduling.models.count_tokens", return_value=3)
+    def test_scheduled_embeddings_admit_each_batch(self, _count_tokens):
+        # Arrange
+        scheduler = OpenAIScheduler(self.settings)
+        embeddings = EmbeddingsClient(self.settings, scheduler).client
+        embeddings.chunk_size = 2
+
+        # Act
+        with patch(
+            "langchain_openai.OpenAIEmbeddings.embed_documents",
+            side_effect=lambda texts, chunk_size=None: [[0.0]] * len(texts),
+        ) as mock_embed:
+            vectors = embeddings.embed_documents(["a", "b", "c"])
+
+        # Assert: one request per batch of `chunk_size` texts
+        self.assertEqual(len(vectors), 3)
+        self.assertEqual(mock_embed.call_count, 2)
+        metrics = scheduler.embeddings.metrics()
+        self.assertEqual(metrics["priorities"]["interactive"]["granted"], 2)
+        self.assertEqual(metrics["tokens_granted"], 9)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,8 +1,12 @@
 import unittest
 from unittest.mock import ANY, MagicMock, patch
 
+from langchain_core.messages import HumanMessage
+
 from app.core.config import Settings
 from app.infrastructure.llm.client import LLMClient
+from app.infrastructure.scheduling.models import ScheduledChatOpenAI
+from app.infrastructure.scheduling.rate_limiter import OpenAIScheduler
 
 
 class TestLLMClient(unittest.TestCase):
@@ -59,6 +63,45 @@ class TestLLMClient(unittest.TestCase):
         )
         self.assertIsNotNone(client.client)
 
+    def test_llm_client_builds_small_model_for_cascade(self):
+        # Arrange
+        settings = self.settings.model_copy(update={"cascade_enabled": True})
+
+        # Act
+        client = LLMClient(settings)
+
+        # Assert
+        self.assertEqual(client.small_client.model_name, settings.cascade_small_model)
+        self.assertEqual(client.small_client.max_tokens, settings.cascade_small_max_tokens)
+        self.assertIsNone(LLMClient(self.settings).small_client)
+
+    def test_llm_client_with_scheduler_uses_rate_limited_model(self):
+        # Arrange
+        scheduler = OpenAIScheduler(self.settings)
+
+        # Act
+        client = LLMClient(self.settings, scheduler)
+
+        # Assert
+        self.assertIsInstance(client.client, ScheduledChatOpenAI)
+        self.assertIs(client.client.openai_limiter, scheduler.llm)
+
+    @patch("app.infrastructure.scheduling.models.count_tokens", return_value=10)
+    def test_scheduled_model_reserves_prompt_and_completion_tokens(self, _count_tokens):
+        # Arrange
+        scheduler = OpenAIScheduler(self.settings)
+        llm = LLMClient(self.settings, scheduler).client
+        result = MagicMock(llm_output={"token_usage": {"total_tokens": 50}})
+
+        # Act
+        with patch("langchain_openai.ChatOpenAI._generate", return_value=result):
+            llm._generate([HumanMessage(content="hola")])
+
+        # Assert: 10 prompt + 4000 max tokens reserved, all but the 50 used refunded
+        metrics = scheduler.llm.metrics()
+        self.assertEqual(metrics["tokens_granted"], 4010)
+        self.assertEqual(metrics["tokens_refunded"], 3960)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,195 @@
+import asyncio
+import time
+import unittest
+
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+from app.core.config import Settings
+from app.infrastructure.llm.client import LLMClient
+from app.infrastructure.llm.hedging import HedgedChatModel, HedgingPolicy, LatencyTracker
+
+
+class DelayedFakeChatModel(BaseChatModel):
+    """Fake chat model that streams `text` word by word after `delay_s` (or fails)."""
+
+    text: str
+    delay_s: float = 0.0
+    fail: bool = False
+    calls: int = 0
+    closed: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "delayed-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        try:
+            time.sleep(self.delay_s)
+            if self.fail:
+                raise RuntimeError("provider down")
+            for word in self.text.split(" "):
+                yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+        finally:
+            self.closed = True
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay_s)
+            if self.fail:
+                raise RuntimeError("provider down")
+            for word in self.text.split(" "):
+                yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+        finally:
+            self.closed = True
+
+
+class TestHedgingPolicy(unittest.TestCase):
+    def test_latency_tracker_ewma(self):
+        # Arrange
+        tracker = LatencyTracker(alpha=0.5)
+
+        # Act
+        for seconds in (1.0, 3.0):
+            tracker.observe(seconds)
+
+        # Assert
+        self.assertEqual(tracker.samples, 2)
+        self.assertAlmostEqual(tracker.mean, 2.0)
+        self.assertAlmostEqual(tracker.variance, 1.0)
+        self.assertAlmostEqual(tracker.quantile(0.5), 2.0)
+
+    def test_deadline_is_initial_until_min_samples_then_clamped_quantile(self):
+        # Arrange
+        policy = HedgingPolicy(
+            quantile=0.95, initial_delay_s=2.0, min_delay_s=0.5, max_delay_s=10.0, min_samples=3
+        )
+
+        # Act / Assert
+        self.assertEqual(policy.deadline(), 2.0)
+        for _ in range(3):
+            policy.observe("primary", 0.1)
+        self.assertEqual(policy.deadline(), 0.5)
+        for _ in range(50):
+            policy.observe("primary", 30.0)
+        self.assertEqual(policy.deadline(), 10.0)
+
+
+class TestHedgedChatModel(unittest.TestCase):
+    def _model(self, primary, secondary, initial_delay_s=0.05):
+        policy = HedgingPolicy(initial_delay_s=initial_delay_s)
+        return HedgedChatModel(primary=primary, secondary=secondary, policy=policy), policy
+
+    def test_fast_primary_is_not_hedged(self):
+        # Arrange
+        primary = DelayedFakeChatModel(text="from primary")
+        secondary = DelayedFakeChatModel(text="from secondary")
+        llm, policy = self._model(primary, secondary, initial_delay_s=1.0)
+
+        # Act
+        answer = asyncio.run(llm.ainvoke([HumanMessage(content="hola")]))
+
+        # Assert
+        self.assertEqual(answer.content, "from primary ")
+        self.assertEqual(secondary.calls, 0)
+        self.assertEqual(policy.metrics()["hedged"], 0)
+        self.assertEqual(policy.metrics()["providers"]["primary"]["samples"], 1)
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        # Arrange
+        primary = DelayedFakeChatModel(text="from primary", delay_s=5.0)
+        secondary = DelayedFakeChatModel(text="from secondary")
+        llm, policy = self._model(primary, secondary)
+
+        async def stream():
+            return [chunk.content async for chunk in llm.astream([HumanMessage(content="hola")])]
+
+        # Act
+        started_at = time.perf_counter()
+        chunks = asyncio.run(stream())
+
+        # Assert
+        self.assertLess(time.perf_counter() - started_at, 1.0)
+        self.assertEqual("".join(chunks), "from secondary ")
+        self.assertTrue(primary.closed)
+        metrics = policy.metrics()
+        self.assertEqual(metrics["hedged"], 1)
+        self.assertEqual(metrics["providers"]["secondary"]["wins"], 1)
+
+    def test_hedged_win_logs_latency_from_request_start(self):
+        # Arrange - hedged after 0.3s, the secondary answers right away
+        primary = DelayedFakeChatModel(text="from primary", delay_s=5.0)
+        secondary = DelayedFakeChatModel(text="from secondary")
+        llm, _ = self._model(primary, secondary, initial_delay_s=0.3)
+
+        # Act
+        with self.assertLogs("rag-docs", level="INFO") as logs:
+            asyncio.run(llm.ainvoke([HumanMessage(content="hola")]))
+
+        # Assert - not the secondary's own (near zero) time to first token
+        message = next(line for line in logs.output if "LLM hedge won by secondary" in line)
+        latency_s = float(message.rsplit("after ", 1)[1].rstrip("s"))
+        self.assertGreaterEqual(latency_s, 0.3)
+
+    def test_failing_primary_falls_back_to_secondary(self):
+        # Arrange
+        primary = DelayedFakeChatModel(text="from primary", fail=True)
+        secondary = DelayedFakeChatModel(text="from secondary")
+        llm, policy = self._model(primary, secondary, initial_delay_s=5.0)
+
+        # Act
+        answer = asyncio.run(llm.ainvoke([HumanMessage(content="hola")]))
+
+        # Assert
+        self.assertEqual(answer.content, "from secondary ")
+        self.assertEqual(policy.metrics()["providers"]["primary"]["samples"], 0)
+
+    def test_sync_invoke_is_hedged(self):
+        # Arrange
+        primary = DelayedFakeChatModel(text="from primary", delay_s=0.5)
+        secondary = DelayedFakeChatModel(text="from secondary")
+        llm, policy = self._model(primary, secondary)
+
+        # Act
+        answer = llm.invoke([HumanMessage(content="hola")])
+
+        # Assert
+        self.assertEqual(answer.content, "from secondary ")
+        self.assertEqual(policy.metrics()["providers"]["secondary"]["wins"], 1)
+
+    def test_both_providers_failing_raises(self):
+        # Arrange
+        primary = DelayedFakeChatModel(text="from primary", fail=True)
+        secondary = DelayedFakeChatModel(text="from secondary", fail=True)
+        llm, _ = self._model(primary, secondary)
+
+        # Act / Assert
+        with self.assertRaises(RuntimeError):
+            llm.invoke([HumanMessage(content="hola")])
+        with self.assertRaises(RuntimeError):
+            asyncio.run(llm.ainvoke([HumanMessage(content="hola")]))
+
+    def test_llm_client_wraps_model_when_hedging_enabled(self):
+        # Arrange
+        settings = Settings(
+            openai_api_key="test-key", llm_hedging_enabled=True, llm_hedge_provider="openai"
+        )
+
+        # Act
+        client = LLMClient(settings)
+
+        # Assert
+        self.assertIsInstance(client.client, HedgedChatModel)
+        self.assertTrue(client.client.primary.stream_usage)
+        self.assertEqual(client.client.secondary.model_name, settings.llm_hedge_model)
+        self.assertIs(client.client.policy, client.hedging_policy)
+
+
+if __name__ == "__main__":
+    unittest.main()
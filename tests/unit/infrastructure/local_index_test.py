@@ -0,0 +1,123 @@
+import unittest
+
+from app.infrastructure.vector_db.filters import matches_where, matches_where_document
+from app.infrastructure.vector_db.local_index import LocalHNSWIndex
+
+
+class TestLocalHNSWIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = LocalHNSWIndex(max_elements=2)
+        self.index.upsert(
+            ids=["a", "b", "c"],
+            embeddings=[[1.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.0, 1.0, 0.0]],
+            documents=["ROS intro", "ROS nodes", "Python basics"],
+            metadatas=[
+                {"titulo": "ros-intro", "tipo-documento": "documento-pdf", "pagina": 0},
+                {"titulo": "ros-intro", "tipo-documento": "documento-pdf", "pagina": 1},
+                {"titulo": "python", "tipo-documento": "otro", "pagina": 0},
+            ],
+        )
+
+    def test_search_returns_closest_first(self):
+        # Act
+        results = self.index.search([1.0, 0.0, 0.0], k=2)
+
+        # Assert
+        self.assertEqual([doc.id for doc, _ in results], ["a", "b"])
+        self.assertAlmostEqual(results[0][1], 0.0)
+        self.assertEqual(results[0][0].metadata["titulo"], "ros-intro")
+
+    def test_search_applies_metadata_filter(self):
+        # Act
+        results = self.index.search(
+            [1.0, 0.0, 0.0],
+            k=3,
+            metadata_filter={"tipo-documento": {"$eq": "otro"}},
+        )
+
+        # Assert - fewer matches than k are returned without error
+        self.assertEqual([doc.id for doc, _ in results], ["c"])
+
+    def test_search_returns_every_match_when_fewer_than_k_pass_the_filter(self):
+        # Arrange - 7 of 20 chunks match
+        index = LocalHNSWIndex()
+        index.upsert(
+            ids=[f"id{i}" for i in range(20)],
+            embeddings=[[1.0, i / 20, 0.0] for i in range(20)],
+            documents=["chunk"] * 20,
+            metadatas=[{"tipo-documento": "pdf" if i % 3 == 0 else "web"} for i in range(20)],
+        )
+
+        # Act
+        results = index.search([1.0, 0.0, 0.0], k=10, metadata_filter={"tipo-documento": "pdf"})
+
+        # Assert
+        self.assertEqual([doc.id for doc, _ in results], [f"id{i}" for i in range(0, 20, 3)])
+
+    def test_search_returns_nothing_when_no_chunk_passes_the_filter(self):
+        self.assertEqual(
+            self.index.search([1.0, 0.0, 0.0], k=2, metadata_filter={"titulo": "x"}), []
+        )
+
+    def test_search_applies_document_filter(self):
+        # Act
+        results = self.index.search([1.0, 0.0, 0.0], k=3, where_document={"$contains": "nodes"})
+
+        # Assert
+        self.assertEqual([doc.id for doc, _ in results], ["b"])
+
+    def test_remove_drops_chunks(self):
+        # Act
+        self.index.remove(["a"])
+
+        # Assert
+        self.assertEqual(self.index.ids(), {"b", "c"})
+        results = self.index.search([1.0, 0.0, 0.0], k=1)
+        self.assertEqual(results[0][0].id, "b")
+
+    def test_upsert_replaces_existing_chunk(self):
+        # Act
+        self.index.upsert(
+            ids=["c"],
+            embeddings=[[1.0, 0.0, 0.0]],
+            documents=["Python updated"],
+            metadatas=[{"titulo": "python"}],
+        )
+
+        # Assert
+        self.assertEqual(len(self.index), 3)
+        results = self.index.search([1.0, 0.0, 0.0], k=1, metadata_filter={"titulo": "python"})
+        self.assertEqual(results[0][0].page_content, "Python updated")
+
+
+class TestFilters(unittest.TestCase):
+    def test_matches_where_operators(self):
+        metadata = {"titulo": "ros-intro", "pagina": 3}
+
+        self.assertTrue(matches_where(metadata, None))
+        self.assertTrue(matches_where(metadata, {"titulo": "ros-intro"}))
+        self.assertTrue(matches_where(metadata, {"pagina": {"$gte": 3}}))
+        self.assertTrue(matches_where(metadata, {"titulo": {"$in": ["a", "ros-intro"]}}))
+        self.assertFalse(matches_where(metadata, {"titulo": {"$ne": "ros-intro"}}))
+        self.assertTrue(
+            matches_where(
+                metadata,
+                {"$and": [{"titulo": {"$eq": "ros-intro"}}, {"pagina": {"$lt": 4}}]},
+            )
+        )
+        self.assertFalse(
+            matches_where(metadata, {"$or": [{"titulo": "other"}, {"pagina": {"$gt": 3}}]})
+        )
+
+    def test_matches_where_document(self):
+        self.assertTrue(matches_where_document("ROS nodes", {"$contains": " "}))
+        self.assertFalse(matches_where_document("ROS", {"$contains": " "}))
+        self.assertTrue(matches_where_document("ROS", {"$not_contains": "x"}))
+
+    def test_unsupported_operator_raises(self):
+        with self.assertRaises(ValueError):
+            matches_where({"pagina": 1}, {"pagina": {"$regex": "1"}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from langchain.schema import Document
+import numpy as np
+
+from app.infrastructure.vector_db.memmap_store import MemmapCollection, MemmapVectorClient
+
+
+class TestMemmapCollection(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.collection = MemmapCollection(f"{self.tmp_dir.name}/rag-docs")
+        self.collection.upsert(
+            ids=["a", "b", "c"],
+            embeddings=[[2.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.0, 1.0, 0.0]],
+            documents=["ROS intro", "ROS nodes", "Python basics"],
+            metadatas=[
+                {"titulo": "ros-intro", "tipo-documento": "documento-pdf", "pagina": 0},
+                {"titulo": "ros-intro", "tipo-documento": "documento-pdf", "pagina": 1},
+                {"titulo": "python", "tipo-documento": "otro", "pagina": 0},
+            ],
+        )
+
+    def test_query_returns_closest_first_with_cosine_distance(self):
+        # Act
+        results = self.collection.query(query_embeddings=[[1.0, 0.0, 0.0]], n_results=2)
+
+        # Assert - embeddings are normalized, so the scaled vector is an exact match
+        self.assertEqual(results["ids"], [["a", "b"]])
+        self.assertAlmostEqual(results["distances"][0][0], 0.0, places=6)
+        self.assertEqual(results["metadatas"][0][0]["titulo"], "ros-intro")
+        self.assertEqual(results["documents"][0][1], "ROS nodes")
+
+    def test_query_applies_metadata_and_document_prefilters(self):
+        # Act
+        by_type = self.collection.query(
+            query_embeddings=[[1.0, 0.0, 0.0]],
+            n_results=3,
+            where={"$and": [{"tipo-documento": "documento-pdf"}, {"pagina": {"$gte": 1}}]},
+        )
+        by_title = self.collection.query(
+            query_embeddings=[[1.0, 0.0, 0.0]],
+            n_results=3,
+            where={"titulo": {"$in": ["python"]}},
+            where_document={"$contains": "Python"},
+        )
+        no_match = self.collection.query(
+            query_embeddings=[[1.0, 0.0, 0.0]],
+            n_results=3,
+            where_document={"$contains": "Java"},
+        )
+
+        # Assert - fewer matches than n_results are returned without error
+        self.assertEqual(by_type["ids"], [["b"]])
+        self.assertEqual(by_title["ids"], [["c"]])
+        self.assertEqual(no_match["ids"], [[]])
+
+    def test_query_matches_brute_force_top_k(self):
+        # Arrange
+        rng = np.random.default_rng(0)
+        embeddings = rng.normal(size=(200, 16)).astype(np.float32)
+        queries = rng.normal(size=(3, 16)).astype(np.float32)
+        collection = MemmapCollection(f"{self.tmp_dir.name}/random")
+        collection.upsert(ids=[str(i) for i in range(200)], embeddings=embeddings)
+
+        # Act
+        results = collection.query(query_embeddings=queries, n_results=10, include=[])
+
+        # Assert
+        unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        for row, query in enumerate(queries):
+            expected = np.argsort(-(unit @ (query / np.linalg.norm(query))))[:10]
+            self.assertEqual(results["ids"][row], [str(i) for i in expected])
+
+    def test_upsert_replaces_and_delete_removes(self):
+        # Act
+        self.collection.upsert(
+            ids=["a"],
+            embeddings=[[0.0, 0.0, 1.0]],
+            documents=["ROS intro v2"],
+            metadatas=[{"titulo": "ros-intro", "tipo-documento": "documento-pdf", "pagina": 0}],
+        )
+        self.collection.delete(where={"titulo": "python"})
+
+        # Assert
+        self.assertEqual(self.collection.count(), 2)
+        records = self.collection.get(ids=["a", "c"], include=["documents", "embeddings"])
+        self.assertEqual(records["ids"], ["a"])
+        self.assertEqual(records["documents"], ["ROS intro v2"])
+        np.testing.assert_allclose(records["embeddings"][0], [0.0, 0.0, 1.0])
+
+    def test_get_paginates_in_insertion_order(self):
+        # Act
+        first = self.collection.get(include=[], limit=2)
+        rest = self.collection.get(include=["metadatas"], limit=2, offset=2)
+
+        # Assert
+        self.assertEqual(first, {"ids": ["a", "b"]})
+        self.assertEqual(rest["ids"], ["c"])
+        self.assertEqual(rest["metadatas"][0]["titulo"], "python")
+
+    def test_another_instance_sees_committed_writes(self):
+        # Arrange - a second handle on the same directory, as another worker process would open
+        reader = MemmapCollection(f"{self.tmp_dir.name}/rag-docs")
+        self.assertEqual(reader.count(), 3)
+
+        # Act
+        self.collection.upsert(ids=["d"], embeddings=[[0.0, 0.0, 1.0]], documents=["Gazebo"])
+        self.collection.delete(ids=["b"])
+
+        # Assert
+        results = reader.query(query_embeddings=[[0.0, 0.0, 1.0]], n_results=1)
+        self.assertEqual(results["ids"], [["d"]])
+        self.assertEqual(reader.get(include=[])["ids"], ["a", "c", "d"])
+
+    def test_dimension_mismatch_raises(self):
+        with self.assertRaises(ValueError):
+            self.collection.upsert(ids=["x"], embeddings=[[1.0, 0.0]])
+
+    def test_add_documents_and_similarity_search_embed_text(self):
+        # Arrange
+        embedding_function = MagicMock()
+        embedding_function.embed_documents.return_value = [[1.0, 0.0], [0.0, 1.0]]
+        embedding_function.embed_query.return_value = [0.1, 1.0]
+        collection = MemmapCollection(f"{self.tmp_dir.name}/text", embedding_function)
+
+        # Act
+        ids = collection.add_documents(
+            [
+                Document(page_content="ROS intro", metadata={"pagina": 0}, id="a"),
+                Document(page_content="Python basics", metadata={"pagina": 1}),
+            ]
+        )
+        results = collection.similarity_search_with_score("python", k=1)
+
+        # Assert
+        self.assertEqual(ids[0], "a")
+        self.assertEqual(results[0][0].page_content, "Python basics")
+        self.assertEqual(results[0][0].id, ids[1])
+
+
+class TestMemmapVectorClient(unittest.TestCase):
+    def test_lists_collections_created_on_disk(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            client = MemmapVectorClient(tmp_dir)
+            client.get_or_create_collection("rag-docs.a").upsert(ids=["1"], embeddings=[[1.0]])
+            client.get_or_create_collection("rag-docs.b").upsert(ids=["2"], embeddings=[[1.0]])
+
+            # Act - a fresh client (e.g. another worker) discovers both
+            names = [
+                collection.name for collection in MemmapVectorClient(tmp_dir).list_collections()
+            ]
+
+        # Assert
+        self.assertEqual(names, ["rag-docs.a", "rag-docs.b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from langchain_chroma.vectorstores import maximal_marginal_relevance as langchain_mmr
+import numpy as np
+
+from app.infrastructure.vector_db.mmr import maximal_marginal_relevance
+
+
+class TestMaximalMarginalRelevance(unittest.TestCase):
+    def test_pure_relevance_returns_nearest_candidates(self):
+        # Arrange
+        query = [1.0, 0.0]
+        candidates = [[0.0, 1.0], [1.0, 0.1], [1.0, 0.0]]
+
+        # Act
+        selected = maximal_marginal_relevance(query, candidates, k=2, lambda_mult=1.0)
+
+        # Assert
+        self.assertEqual(selected, [2, 1])
+
+    def test_diversity_skips_near_duplicates(self):
+        # Arrange - two near-identical chunks (overlap) and one distinct but relevant chunk
+        query = [1.0, 0.2]
+        candidates = [[1.0, 0.2], [1.0, 0.21], [0.6, 0.8]]
+
+        # Act
+        selected = maximal_marginal_relevance(query, candidates, k=2, lambda_mult=0.5)
+
+        # Assert
+        self.assertEqual(selected, [0, 2])
+
+    def test_matches_langchain_reference(self):
+        # Arrange
+        rng = np.random.default_rng(7)
+        query = rng.standard_normal(64)
+        candidates = rng.standard_normal((30, 64))
+
+        # Act
+        selected = maximal_marginal_relevance(query, candidates, k=6, lambda_mult=0.7)
+        expected = langchain_mmr(query, candidates, k=6, lambda_mult=0.7)
+
+        # Assert
+        self.assertEqual(selected, expected)
+
+    def test_precomputed_relevance_replaces_query_similarity(self):
+        # Arrange - the reranking scores prefer the candidate farthest from the query vector
+        query = [1.0, 0.0]
+        candidates = [[1.0, 0.0], [0.0, 1.0]]
+
+        # Act
+        selected = maximal_marginal_relevance(
+            query, candidates, k=1, lambda_mult=1.0, relevance=[0.1, 0.9]
+        )
+
+        # Assert
+        self.assertEqual(selected, [1])
+
+    def test_k_larger_than_candidates_and_empty_input(self):
+        self.assertEqual(sorted(maximal_marginal_relevance([1.0], [[1.0], [0.5]], k=5)), [0, 1])
+        self.assertEqual(maximal_marginal_relevance([1.0], [], k=3), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import uuid
+
+import chromadb
+from chromadb.config import Settings as ChromaSettings
+
+from app.infrastructure.vector_db.partition_migration import migrate_to_partitions
+from app.infrastructure.vector_db.partitioning import PartitionRouter
+
+
+class TestPartitionRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = PartitionRouter("rag-docs", "tipo-documento")
+
+    def test_collection_name_is_sanitized(self):
+        self.assertEqual(self.router.collection_name("documento-pdf"), "rag-docs.documento-pdf")
+        self.assertEqual(self.router.collection_name("nota técnica"), "rag-docs.nota-t-cnica")
+        self.assertEqual(self.router.collection_name("a..b"), "rag-docs.a-b")
+
+    def test_partition_value_requires_key(self):
+        self.assertEqual(self.router.partition_value({"tipo-documento": "web"}), "web")
+        with self.assertRaises(ValueError):
+            self.router.partition_value({"titulo": "doc"})
+
+    def test_values_for_filter(self):
+        cases = [
+            (None, None),
+            ({"tipo-documento": "documento-pdf"}, ["documento-pdf"]),
+            ({"tipo-documento": {"$eq": "web"}}, ["web"]),
+            ({"tipo-documento": {"$in": ["web", "pdf"]}}, ["web", "pdf"]),
+            ({"tipo-documento": {"$ne": "web"}}, None),
+            ({"titulo": "doc"}, None),
+            (
+                {"$and": [{"titulo": "doc"}, {"tipo-documento": {"$eq": "pdf"}}]},
+                ["pdf"],
+            ),
+            (
+                {"$or": [{"tipo-documento": "pdf"}, {"tipo-documento": {"$in": ["web", "pdf"]}}]},
+                ["pdf", "web"],
+            ),
+            ({"$or": [{"tipo-documento": "pdf"}, {"titulo": "doc"}]}, None),
+        ]
+
+        for where, expected in cases:
+            with self.subTest(where=where):
+                self.assertEqual(self.router.values_for_filter(where), expected)
+
+
+class TestPartitionMigration(unittest.TestCase):
+    def setUp(self):
+        self.client = chromadb.EphemeralClient(ChromaSettings(anonymized_telemetry=False))
+        self.collection_name = f"migration-{uuid.uuid4().hex[:8]}"
+        self.source = self.client.create_collection(name=self.collection_name)
+        self.source.add(
+            ids=["c1", "c2", "c3", "c4"],
+            embeddings=[[1.0, 0.0], [0.0, 1.0], [1.0, 1.0], [0.5, 0.5]],
+            documents=["uno", "dos", "tres", "cuatro"],
+            metadatas=[
+                {"tipo-documento": "documento-pdf"},
+                {"tipo-documento": "web"},
+                {"tipo-documento": "documento-pdf"},
+                {"titulo": "sin tipo"},
+            ],
+        )
+
+    def test_migrate_copies_chunks_with_embeddings(self):
+        # Act
+        counts = migrate_to_partitions(
+            self.client, self.collection_name, "tipo-documento", batch_size=2
+        )
+
+        # Assert
+        pdf_name = f"{self.collection_name}.documento-pdf"
+        self.assertEqual(
+            counts,
+            {pdf_name: 2, f"{self.collection_name}.web": 1, "unpartitioned": 1},
+        )
+        pdf = self.client.get_collection(pdf_name).get(ids=["c1"], include=["embeddings"])
+        self.assertEqual(list(pdf["embeddings"][0]), [1.0, 0.0])
+        self.assertEqual(self.source.count(), 4)
+
+    def test_migrate_delete_source_keeps_unpartitioned_chunks(self):
+        # Act
+        migrate_to_partitions(
+            self.client, self.collection_name, "tipo-documento", delete_source=True
+        )
+
+        # Assert
+        self.assertEqual(self.source.get()["ids"], ["c4"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from app.infrastructure.vector_db.memmap_store import MemmapCollection
+from app.infrastructure.vector_db.quantization import (
+    BinaryQuantizer,
+    Int8Quantizer,
+    build_quantizer,
+)
+
+
+def unit_vectors(count: int, dim: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestQuantizers(unittest.TestCase):
+    def setUp(self):
+        self.vectors = unit_vectors(300, 64)
+        self.queries = unit_vectors(5, 64, seed=1)
+
+    def test_int8_scores_approximate_dot_products(self):
+        # Arrange
+        quantizer = Int8Quantizer()
+        quantizer.fit(self.vectors)
+
+        # Act
+        codes = quantizer.encode(self.vectors)
+        scores = quantizer.scores(codes, self.queries)
+
+        # Assert
+        self.assertEqual((codes.dtype, codes.shape), (np.dtype(np.int8), (300, 64)))
+        np.testing.assert_allclose(scores, self.vectors @ self.queries.T, atol=0.03)
+
+    def test_binary_codes_pack_one_bit_per_dimension(self):
+        # Arrange
+        quantizer = BinaryQuantizer()
+        quantizer.fit(self.vectors)
+
+        # Act
+        codes = quantizer.encode(self.vectors)
+        scores = quantizer.scores(codes, self.vectors[:3])
+
+        # Assert - scores are negative Hamming distances between the codes
+        self.assertEqual((codes.dtype, codes.shape), (np.dtype(np.uint8), (300, 8)))
+        hamming = np.unpackbits(codes[:, np.newaxis] ^ codes[np.newaxis, :3], axis=2).sum(
+            axis=2, dtype=np.int64
+        )
+        np.testing.assert_array_equal(scores, -hamming)
+        np.testing.assert_array_equal(scores[[0, 1, 2], [0, 1, 2]], [0, 0, 0])
+
+    def test_binary_codes_are_padded_to_whole_words(self):
+        # Arrange
+        quantizer = BinaryQuantizer(pca_dimensions=20)
+        quantizer.fit(self.vectors)
+
+        # Act
+        codes = quantizer.encode(self.vectors)
+
+        # Assert - 20 bits pack into 3 bytes, padded to one 8-byte word
+        self.assertEqual(codes.shape, (300, 8))
+        self.assertTrue((codes[:, 3:] == 0).all())
+
+    def test_pca_reduces_code_width(self):
+        # Arrange
+        quantizer = Int8Quantizer(pca_dimensions=16)
+        quantizer.fit(self.vectors)
+
+        # Act
+        codes = quantizer.encode(self.vectors)
+
+        # Assert
+        self.assertEqual(codes.shape, (300, 16))
+
+    def test_build_quantizer(self):
+        self.assertIsNone(build_quantizer("none"))
+        self.assertIsInstance(build_quantizer("binary", 32), BinaryQuantizer)
+        with self.assertRaises(ValueError):
+            build_quantizer("pq")
+
+
+class TestQuantizedMemmapCollection(unittest.TestCase):
+    def test_first_pass_with_exact_rescoring_matches_full_precision(self):
+        # Arrange
+        vectors = unit_vectors(500, 32)
+        queries = vectors[:10] + 0.05 * unit_vectors(10, 32, seed=2)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            exact = MemmapCollection(f"{tmp_dir}/exact")
+            quantized = MemmapCollection(f"{tmp_dir}/int8", quantization="int8", rescore_factor=10)
+            for collection in (exact, quantized):
+                collection.upsert(ids=[str(i) for i in range(500)], embeddings=vectors)
+
+            # Act
+            expected = exact.query(query_embeddings=queries, n_results=5, include=["distances"])
+            results = quantized.query(query_embeddings=queries, n_results=5, include=["distances"])
+
+        # Assert - distances come from the full vectors, not the codes
+        self.assertEqual(results["ids"], expected["ids"])
+        np.testing.assert_allclose(results["distances"], expected["distances"], atol=1e-6)
+        self.assertEqual(quantized.sidecar_nbytes, 500 * 32)
+        self.assertEqual(exact.sidecar_nbytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.infrastructure.embeddings.query_cache import QueryCachedEmbeddings
+
+
+class TestQueryCachedEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.embeddings = MagicMock()
+        self.embeddings.embed_query.side_effect = lambda text: [float(len(text))]
+        self.cached = QueryCachedEmbeddings(self.embeddings, max_entries=2)
+
+    def test_repeated_query_is_embedded_once(self):
+        # Act
+        first = self.cached.embed_query("what is ros")
+        second = self.cached.embed_query("what is ros")
+
+        # Assert
+        self.assertEqual(first, second)
+        self.embeddings.embed_query.assert_called_once_with("what is ros")
+
+    def test_least_recently_used_query_is_evicted(self):
+        # Act - "a" is used again, so "bb" is the one evicted by "ccc"
+        for text in ("a", "bb", "a", "ccc", "a", "bb"):
+            self.cached.embed_query(text)
+
+        # Assert
+        calls = [call.args[0] for call in self.embeddings.embed_query.call_args_list]
+        self.assertEqual(calls, ["a", "bb", "ccc", "bb"])
+
+    def test_documents_are_not_cached(self):
+        # Arrange
+        self.embeddings.embed_documents.return_value = [[1.0]]
+
+        # Act
+        self.cached.embed_documents(["chunk"])
+        self.cached.embed_documents(["chunk"])
+
+        # Assert
+        self.assertEqual(self.embeddings.embed_documents.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import threading
+import unittest
+
+from app.core.config import Settings
+from app.infrastructure.scheduling.rate_limiter import (
+    OpenAIScheduler,
+    Priority,
+    RateLimiter,
+    RateLimitRejected,
+    TokenBucket,
+    current_priority,
+    scheduling_priority,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refills_continuously_up_to_capacity(self):
+        # Arrange
+        bucket = TokenBucket(60, now=0.0)
+        bucket.take(60, now=0.0)
+
+        # Act / Assert
+        self.assertAlmostEqual(bucket.level(now=10.0), 10.0)
+        self.assertAlmostEqual(bucket.level(now=1000.0), 60.0)
+
+    def test_wait_time_caps_amount_at_capacity(self):
+        # Arrange
+        bucket = TokenBucket(60, now=0.0)
+        bucket.take(60, now=0.0)
+
+        # Act / Assert
+        self.assertAlmostEqual(bucket.wait_time(30, now=0.0), 30.0)
+        self.assertAlmostEqual(bucket.wait_time(600, now=0.0), 60.0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def _limiter(self, rpm=60, tpm=6000, max_wait_s=None):
+        max_wait_s = max_wait_s or {Priority.INTERACTIVE: 5.0, Priority.BULK: None}
+        return RateLimiter("llm", rpm, tpm, max_wait_s, clock=self.clock)
+
+    def test_acquire_grants_immediately_with_budget(self):
+        # Arrange
+        limiter = self._limiter()
+
+        # Act
+        reservation = limiter.acquire(100)
+
+        # Assert
+        self.assertEqual(reservation.tokens, 100)
+        self.assertEqual(reservation.priority, Priority.INTERACTIVE)
+        self.assertEqual(reservation.wait_s, 0.0)
+        metrics = limiter.metrics()
+        self.assertEqual(metrics["tokens_available"], 5900)
+        self.assertEqual(metrics["priorities"]["interactive"]["granted"], 1)
+
+    def test_acquire_rejects_when_wait_exceeds_priority_limit(self):
+        # Arrange: the bucket refills 100 tokens/s, emptying it needs a 60s wait
+        limiter = self._limiter()
+        limiter.acquire(6000)
+
+        # Act / Assert
+        with self.assertRaises(RateLimitRejected) as rejected:
+            limiter.acquire(1000)
+        self.assertAlmostEqual(rejected.exception.retry_after_s, 10.0, places=1)
+        self.assertEqual(limiter.metrics()["priorities"]["interactive"]["rejected"], 1)
+        self.assertEqual(limiter.metrics()["queue_depth"], 0)
+
+    def test_settle_refunds_unused_tokens(self):
+        # Arrange
+        limiter = self._limiter()
+        reservation = limiter.acquire(1000)
+
+        # Act
+        limiter.settle(reservation, 200)
+        limiter.settle(reservation, None)
+
+        # Assert
+        metrics = limiter.metrics()
+        self.assertEqual(metrics["tokens_available"], 5800)
+        self.assertEqual(metrics["tokens_refunded"], 800)
+
+    def test_release_returns_request_and_tokens(self):
+        # Arrange
+        limiter = self._limiter(rpm=1)
+        reservation = limiter.acquire(1000)
+
+        # Act
+        limiter.release(reservation)
+
+        # Assert - the request slot is free again: no wait for the next call
+        self.assertEqual(limiter.metrics()["tokens_available"], 6000)
+        self.assertEqual(limiter.acquire(1).wait_s, 0.0)
+
+    def test_interactive_calls_are_served_before_queued_bulk_calls(self):
+        # Arrange: no requests left, so every caller has to queue
+        limiter = self._limiter(rpm=1, max_wait_s={Priority.INTERACTIVE: None})
+        limiter.acquire(1)
+        served: list[str] = []
+
+        def call(name, priority):
+            limiter.acquire(1, priority)
+            served.append(name)
+
+        bulk = threading.Thread(target=call, args=("bulk", Priority.BULK))
+        bulk.start()
+        self._wait_for_queue(limiter, 1)
+        interactive = threading.Thread(target=call, args=("interactive", Priority.INTERACTIVE))
+        interactive.start()
+        self._wait_for_queue(limiter, 2)
+
+        # Act: refill one request at a time
+        for depth in (1, 0):
+            self.clock.now += 60
+            with limiter._condition:
+                limiter._condition.notify_all()
+            self._wait_for_queue(limiter, depth)
+        bulk.join(timeout=5)
+        interactive.join(timeout=5)
+
+        # Assert
+        self.assertEqual(served, ["interactive", "bulk"])
+        self.assertEqual(limiter.metrics()["priorities"]["bulk"]["wait_s_max"], 120.0)
+
+    def _wait_for_queue(self, limiter, depth):
+        for _ in range(500):
+            if limiter.metrics()["queue_depth"] == depth:
+                return
+            threading.Event().wait(0.01)
+        self.fail(f"queue never reached depth {depth}")
+
+
+class TestSchedulingPriority(unittest.TestCase):
+    def test_scheduling_priority_sets_and_restores_priority(self):
+        # Act / Assert
+        self.assertEqual(current_priority(), Priority.INTERACTIVE)
+        with scheduling_priority(Priority.BULK):
+            self.assertEqual(current_priority(), Priority.BULK)
+        self.assertEqual(current_priority(), Priority.INTERACTIVE)
+
+    def test_acquire_uses_current_priority(self):
+        # Arrange
+        scheduler = OpenAIScheduler(Settings(openai_api_key="test-key"), clock=FakeClock())
+
+        # Act
+        with scheduling_priority(Priority.BULK):
+            reservation = scheduler.embeddings.acquire(10)
+
+        # Assert
+        self.assertEqual(reservation.priority, Priority.BULK)
+        self.assertEqual(scheduler.metrics()["embeddings"]["priorities"]["bulk"]["granted"], 1)
+        self.assertEqual(scheduler.metrics()["llm"]["priorities"]["bulk"]["granted"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from app.infrastructure.vector_db.retrieval_cache import (
+    GLOBAL_SCOPE,
+    RetrievalCache,
+    cache_key,
+    document_scopes,
+    filter_scopes,
+)
+
+
+class TestRetrievalCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = RetrievalCache(str(Path(self.tmp_dir.name) / "cache.sqlite3"), max_entries=2)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_returns_stored_hits(self):
+        # Act
+        self.cache.put("k1", [("a", 0.1), ("b", 0.2)], ["titulo:ros"])
+
+        # Assert
+        self.assertEqual(self.cache.get("k1"), [("a", 0.1), ("b", 0.2)])
+        self.assertIsNone(self.cache.get("unknown"))
+
+    def test_bump_invalidates_only_dependent_entries(self):
+        # Arrange
+        self.cache.put("ros", [("a", 0.1)], ["titulo:ros"])
+        self.cache.put("python", [("b", 0.1)], ["titulo:python"])
+
+        # Act
+        self.cache.bump(document_scopes([{"titulo": "ros", "tipo-documento": "documento-pdf"}]))
+
+        # Assert
+        self.assertIsNone(self.cache.get("ros"))
+        self.assertEqual(self.cache.get("python"), [("b", 0.1)])
+
+    def test_least_recently_used_entry_is_evicted(self):
+        # Arrange
+        self.cache.put("k1", [("a", 0.1)], [GLOBAL_SCOPE])
+        self.cache.put("k2", [("b", 0.1)], [GLOBAL_SCOPE])
+        self.cache.get("k1")
+
+        # Act
+        self.cache.put("k3", [("c", 0.1)], [GLOBAL_SCOPE])
+
+        # Assert
+        self.assertIsNotNone(self.cache.get("k1"))
+        self.assertIsNone(self.cache.get("k2"))
+        self.assertIsNotNone(self.cache.get("k3"))
+
+    def test_entries_are_shared_between_instances(self):
+        # Arrange
+        other = RetrievalCache(str(Path(self.tmp_dir.name) / "cache.sqlite3"))
+        self.cache.put("k1", [("a", 0.1)], ["tipo-documento:documento-pdf"])
+
+        # Act
+        other.bump(["tipo-documento:documento-pdf"])
+
+        # Assert
+        self.assertIsNone(self.cache.get("k1"))
+
+
+class TestCacheScopes(unittest.TestCase):
+    def test_filter_scopes_use_the_narrowest_pinned_key(self):
+        self.assertEqual(
+            filter_scopes({"$and": [{"tipo-documento": "documento-pdf"}, {"titulo": "ros"}]}),
+            ["titulo:ros"],
+        )
+        self.assertEqual(filter_scopes({"titulo": {"$in": ["b", "a"]}}), ["titulo:a", "titulo:b"])
+        self.assertEqual(
+            filter_scopes({"tipo-documento": "documento-pdf"}), ["tipo-documento:documento-pdf"]
+        )
+        self.assertEqual(filter_scopes({"pagina": 3}), [GLOBAL_SCOPE])
+
+    def test_document_scopes_include_the_global_scope(self):
+        self.assertEqual(
+            document_scopes([{"titulo": "ros", "tipo-documento": "documento-pdf", "pagina": 0}]),
+            [GLOBAL_SCOPE, "tipo-documento:documento-pdf", "titulo:ros"],
+        )
+
+    def test_cache_key_ignores_filter_key_order(self):
+        self.assertEqual(cache_key("q", {"a": 1, "b": 2}, 4), cache_key("q", {"b": 2, "a": 1}, 4))
+        self.assertNotEqual(cache_key("q", {}, 4), cache_key("q", {}, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from app.infrastructure.scheduling.models import _reserve_in_thread
+from app.infrastructure.scheduling.rate_limiter import Priority, Reservation
+
+
+class TestReserveInThread(unittest.TestCase):
+    def test_returns_the_reservation(self):
+        # Arrange
+        limiter = MagicMock()
+        reservation = Reservation(tokens=10, priority=Priority.INTERACTIVE, wait_s=0.0)
+
+        # Act
+        result = asyncio.run(_reserve_in_thread(limiter, lambda: reservation))
+
+        # Assert
+        self.assertIs(result, reservation)
+        limiter.release.assert_not_called()
+
+    def test_cancelled_caller_releases_the_reservation_granted_later(self):
+        # Arrange
+        limiter = MagicMock()
+        reservation = Reservation(tokens=10, priority=Priority.BULK, wait_s=1.0)
+        granted = threading.Event()
+
+        def reserve():
+            granted.wait(timeout=5)
+            return reservation
+
+        async def cancel_while_waiting():
+            task = asyncio.create_task(_reserve_in_thread(limiter, reserve))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            limiter.release.assert_not_called()
+
+            # Budget granted after the cancellation
+            granted.set()
+            for _ in range(500):
+                if limiter.release.called:
+                    return
+                await asyncio.sleep(0.01)
+
+        # Act
+        asyncio.run(cancel_while_waiting())
+
+        # Assert
+        limiter.release.assert_called_once_with(reservation)
+
+
+if __name__ == "__main__":
+    unittest.main()
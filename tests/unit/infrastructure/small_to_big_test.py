@@ -0,0 +1,72 @@
+import unittest
+
+from langchain.schema import Document
+
+from app.infrastructure.vector_db.small_to_big import (
+    merge_chunk_texts,
+    neighbor_spans,
+    page_spans,
+)
+
+
+def _hit(title: str, pagina: int, seq: int | None) -> Document:
+    metadata = {"titulo": title, "pagina": pagina}
+    if seq is not None:
+        metadata["seq"] = seq
+    return Document(page_content=f"{title}-{seq}", metadata=metadata, id=f"{title}-{seq}")
+
+
+class TestNeighborSpans(unittest.TestCase):
+    def test_merges_overlapping_and_adjacent_spans_of_the_same_document(self):
+        hits = [(_hit("a", 0, 5), 0.1), (_hit("b", 0, 2), 0.2), (_hit("a", 0, 2), 0.3)]
+
+        spans = neighbor_spans(hits, window=1)
+
+        self.assertEqual(
+            [(span.title, span.seq_start, span.seq_end, span.rank) for span in spans],
+            [("a", 1, 6, 0), ("b", 1, 3, 1)],
+        )
+        self.assertEqual(spans[0].hit.id, "a-5")
+
+    def test_keeps_distant_spans_apart_and_clips_at_zero(self):
+        hits = [(_hit("a", 0, 0), 0.1), (_hit("a", 3, 10), 0.2)]
+
+        spans = neighbor_spans(hits, window=2)
+
+        self.assertEqual([(span.seq_start, span.seq_end) for span in spans], [(0, 2), (8, 12)])
+
+    def test_skips_hits_without_sequence_numbers(self):
+        self.assertEqual(neighbor_spans([(_hit("a", 0, None), 0.1)], window=1), [])
+
+
+class TestPageSpans(unittest.TestCase):
+    def test_one_span_per_page(self):
+        hits = [(_hit("a", 1, 4), 0.1), (_hit("a", 1, 5), 0.2), (_hit("a", 2, 9), 0.3)]
+
+        spans = page_spans(hits)
+
+        self.assertEqual([(span.pagina, span.rank) for span in spans], [(1, 0), (2, 2)])
+        self.assertTrue(spans[0].covers(hits[1][0]))
+        self.assertFalse(spans[0].covers(hits[2][0]))
+
+
+class TestMergeChunkTexts(unittest.TestCase):
+    def test_removes_shared_overlap(self):
+        texts = [
+            "ROS is a collection of tools and frameworks",
+            "tools and frameworks which make automating robots easier",
+        ]
+
+        self.assertEqual(
+            merge_chunk_texts(texts),
+            "ROS is a collection of tools and frameworks which make automating robots easier",
+        )
+
+    def test_joins_chunks_without_overlap_with_newline(self):
+        self.assertEqual(
+            merge_chunk_texts(["first chunk.", "second chunk."]), "first chunk.\nsecond chunk."
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,16 @@
+from pathlib import Path
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch
 
 from langchain.schema import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
 
 from app.core.config import Settings
+from app.infrastructure.embeddings.query_cache import QueryCachedEmbeddings
+from app.infrastructure.vector_db.chroma_client import ChromaDBClient
 from app.infrastructure.vector_db.repository import VectorDBRepository
+from app.infrastructure.vector_db.retriever import RepositoryRetriever
 
 
 class TestVectorDBRepository(unittest.TestCase):
@@ -48,6 +54,19 @@ class TestVectorDBRepository(unittest.TestCase):
         )
         self.assertIsNotNone(repo.vdb)
 
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_query_embedding_cache_is_opt_in(self, mock_chroma):
+        # Arrange
+        settings = self.settings.model_copy(update={"query_embedding_cache_size": 256})
+
+        # Act
+        VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+
+        # Assert - query vectors are cached in front of the embeddings client
+        embedding_function = mock_chroma.call_args[1]["embedding_function"]
+        self.assertIsInstance(embedding_function, QueryCachedEmbeddings)
+        self.assertIs(embedding_function.embeddings, self.mock_embeddings)
+
     @patch("app.infrastructure.vector_db.repository.Chroma")
     def test_add_documents(self, mock_chroma):
         # Arrange
@@ -170,6 +189,820 @@ class TestVectorDBRepository(unittest.TestCase):
         )
         self.assertEqual(retriever, mock_retriever)
 
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_batch_similarity_search_groups_queries_by_filter(self, mock_chroma):
+        # Arrange
+        mock_chroma_instance = MagicMock()
+        mock_collection = mock_chroma_instance._collection
+        mock_collection.query.side_effect = [
+            {
+                "ids": [["a1", "a2", "a3"], ["b1", "b2", "b3"]],
+                "documents": [["A1", "A2", "A3"], ["B1", "B2", "B3"]],
+                "metadatas": [[{}, {}, {}], [{}, {}, {}]],
+                "distances": [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]],
+            },
+            {
+                "ids": [["c1"]],
+                "documents": [["C1"]],
+                "metadatas": [[{"titulo": "other"}]],
+                "distances": [[0.7]],
+            },
+        ]
+        mock_chroma.return_value = mock_chroma_instance
+        self.mock_embeddings.embed_documents.return_value = [[1.0], [2.0], [3.0]]
+
+        repo = VectorDBRepository(
+            self.settings,
+            self.mock_chroma_client,
+            self.mock_embeddings_client,
+        )
+
+        # Act
+        results = repo.batch_similarity_search_with_score(
+            queries=["q1", "q2", "q3"],
+            k_values=[3, 1, None],
+            metadata_filters=[None, None, {"titulo": "other"}],
+        )
+
+        # Assert - one embeddings call, one Chroma query per distinct filter
+        self.mock_embeddings.embed_documents.assert_called_once_with(["q1", "q2", "q3"])
+        self.assertEqual(mock_collection.query.call_count, 2)
+        first_call = mock_collection.query.call_args_list[0][1]
+        self.assertEqual(first_call["n_results"], 3)
+        self.assertEqual(first_call["where"], {"tipo-documento": "documento-pdf"})
+        self.assertEqual(len(first_call["query_embeddings"]), 2)
+
+        # Each query keeps its own k
+        self.assertEqual([doc.id for doc, _ in results[0]], ["a1", "a2", "a3"])
+        self.assertEqual([doc.id for doc, _ in results[1]], ["b1"])
+        self.assertEqual(results[2][0][0].metadata["titulo"], "other")
+        self.assertEqual(results[2][0][1], 0.7)
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_batch_similarity_search_shares_the_retrieval_cache(self, mock_chroma):
+        # Arrange - "q1" was already answered by a single search
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance.similarity_search_with_score.return_value = [
+            (Document(page_content="A", metadata={}, id="a"), 0.1),
+        ]
+        mock_chroma_instance._collection.query.return_value = {
+            "ids": [["b"]],
+            "documents": [["B"]],
+            "metadatas": [[{}]],
+            "distances": [[0.2]],
+        }
+        mock_chroma_instance.get.return_value = {
+            "ids": ["a", "b"],
+            "documents": ["A", "B"],
+            "metadatas": [{}, {}],
+        }
+        mock_chroma.return_value = mock_chroma_instance
+        self.mock_embeddings.embed_documents.return_value = [[2.0]]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            settings = self.settings.model_copy(
+                update={
+                    "retrieval_cache_enabled": True,
+                    "retrieval_cache_path": str(Path(tmp_dir) / "cache.sqlite3"),
+                }
+            )
+            repo = VectorDBRepository(
+                settings, self.mock_chroma_client, self.mock_embeddings_client
+            )
+            repo.similarity_search_with_score("q1", k=1)
+
+            # Act
+            first = repo.batch_similarity_search_with_score(queries=["q1", "q2"], k_values=[1, 1])
+            second = repo.batch_similarity_search_with_score(queries=["q1", "q2"], k_values=[1, 1])
+
+        # Assert - only the miss is embedded and searched, then both are cached
+        self.mock_embeddings.embed_documents.assert_called_once_with(["q2"])
+        self.assertEqual(mock_chroma_instance._collection.query.call_count, 1)
+        self.assertEqual(
+            [[(doc.id, score) for doc, score in rows] for rows in first],
+            [[("a", 0.1)], [("b", 0.2)]],
+        )
+        self.assertEqual([[doc.id for doc, _ in rows] for rows in second], [["a"], ["b"]])
+
+    @patch("app.infrastructure.vector_db.repository.CentroidIndex")
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_batch_similarity_search_routes_corpus_wide_queries_by_centroid(
+        self, mock_chroma, mock_centroid_index
+    ):
+        # Arrange
+        settings = self.settings.model_copy(update={"centroid_routing_enabled": True})
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance._collection.query.return_value = {
+            "ids": [["a"]],
+            "documents": [["A"]],
+            "metadatas": [[{"titulo": "ros-intro"}]],
+            "distances": [[0.1]],
+        }
+        mock_chroma.return_value = mock_chroma_instance
+        mock_centroid_index.return_value.route.return_value = ["ros-intro"]
+        self.mock_embeddings.embed_documents.return_value = [[0.1, 0.2], [0.3, 0.4]]
+        title_filter = {"titulo": "ros-nodes"}
+
+        repo = VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+
+        # Act
+        repo.batch_similarity_search_with_score(
+            queries=["q1", "q2"], k_values=[1, 1], metadata_filters=[None, title_filter]
+        )
+
+        # Assert - only the query without a pinned title is routed
+        mock_centroid_index.return_value.route.assert_called_once_with(
+            [0.1, 0.2], 5, where={"tipo-documento": "documento-pdf"}
+        )
+        wheres = [
+            call[1]["where"] for call in mock_chroma_instance._collection.query.call_args_list
+        ]
+        self.assertEqual(
+            wheres,
+            [
+                {"$and": [{"tipo-documento": "documento-pdf"}, {"titulo": {"$in": ["ros-intro"]}}]},
+                title_filter,
+            ],
+        )
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_max_marginal_relevance_search_fetches_candidates_once(self, mock_chroma):
+        # Arrange - "a" and "b" are near duplicates, "c" is diverse
+        mock_chroma_instance = MagicMock()
+        mock_collection = mock_chroma_instance._collection
+        mock_collection.query.return_value = {
+            "ids": [["a", "b", "c"]],
+            "documents": [["A", "A'", "C"]],
+            "metadatas": [[{}, {}, {}]],
+            "distances": [[0.1, 0.11, 0.5]],
+            "embeddings": [[[1.0, 0.2], [1.0, 0.21], [0.6, 0.8]]],
+        }
+        mock_chroma.return_value = mock_chroma_instance
+        self.mock_embeddings.embed_query.return_value = [1.0, 0.2]
+
+        repo = VectorDBRepository(
+            self.settings,
+            self.mock_chroma_client,
+            self.mock_embeddings_client,
+        )
+
+        # Act
+        results = repo.max_marginal_relevance_search_with_score(
+            query="test query", k=2, fetch_k=3, lambda_mult=0.5
+        )
+
+        # Assert
+        mock_collection.query.assert_called_once()
+        call_kwargs = mock_collection.query.call_args[1]
+        self.assertEqual(call_kwargs["n_results"], 3)
+        self.assertIn("embeddings", call_kwargs["include"])
+        self.assertEqual([(doc.id, score) for doc, score in results], [("a", 0.1), ("c", 0.5)])
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_similar_chunks_search_reuses_stored_embeddings(self, mock_chroma):
+        # Arrange - two seeds: their centroid points halfway between them
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance.get.return_value = {
+            "ids": ["a", "b"],
+            "embeddings": [[1.0, 0.0], [0.0, 1.0]],
+        }
+        mock_collection = mock_chroma_instance._collection
+        mock_collection.query.return_value = {
+            "ids": [["a", "c", "b", "d"]],
+            "documents": [["A", "C", "B", "D"]],
+            "metadatas": [[{}, {}, {}, {}]],
+            "distances": [[0.29, 0.3, 0.31, 0.6]],
+        }
+        mock_chroma.return_value = mock_chroma_instance
+
+        repo = VectorDBRepository(
+            self.settings,
+            self.mock_chroma_client,
+            self.mock_embeddings_client,
+        )
+
+        # Act
+        results = repo.similar_chunks_search_with_score(chunk_ids=["a", "b", "missing"], k=2)
+
+        # Assert - seeds are over-fetched and dropped, nothing is embedded
+        mock_chroma_instance.get.assert_called_once_with(
+            ids=["a", "b", "missing"], include=["embeddings"]
+        )
+        call_kwargs = mock_collection.query.call_args[1]
+        self.assertEqual(call_kwargs["n_results"], 4)
+        self.assertAlmostEqual(call_kwargs["query_embeddings"][0][0], 2**-0.5, places=6)
+        self.assertAlmostEqual(call_kwargs["query_embeddings"][0][1], 2**-0.5, places=6)
+        self.assertEqual([(doc.id, score) for doc, score in results], [("c", 0.3), ("d", 0.6)])
+        self.mock_embeddings.embed_query.assert_not_called()
+        self.mock_embeddings.embed_documents.assert_not_called()
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_similar_chunks_search_unknown_ids_returns_empty(self, mock_chroma):
+        # Arrange
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance.get.return_value = {"ids": [], "embeddings": []}
+        mock_chroma.return_value = mock_chroma_instance
+
+        repo = VectorDBRepository(
+            self.settings,
+            self.mock_chroma_client,
+            self.mock_embeddings_client,
+        )
+
+        # Act
+        results = repo.similar_chunks_search_with_score(chunk_ids=["missing"])
+
+        # Assert
+        self.assertEqual(results, [])
+        mock_chroma_instance._collection.query.assert_not_called()
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_retrieval_cache_hydrates_hits_until_the_title_is_ingested(self, mock_chroma):
+        # Arrange
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance.similarity_search_with_score.return_value = [
+            (Document(page_content="A", metadata={"titulo": "ros"}, id="a"), 0.1),
+        ]
+        mock_chroma_instance.get.return_value = {
+            "ids": ["a"],
+            "documents": ["A"],
+            "metadatas": [{"titulo": "ros"}],
+        }
+        mock_chroma_instance.add_documents.return_value = ["b"]
+        mock_chroma.return_value = mock_chroma_instance
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            settings = self.settings.model_copy(
+                update={
+                    "retrieval_cache_enabled": True,
+                    "retrieval_cache_path": str(Path(tmp_dir) / "cache.sqlite3"),
+                }
+            )
+            repo = VectorDBRepository(
+                settings, self.mock_chroma_client, self.mock_embeddings_client
+            )
+            ros_filter = {"titulo": "ros"}
+
+            # Act
+            first = repo.similarity_search_with_score("q", k=1, metadata_filter=ros_filter)
+            cached = repo.similarity_search_with_score("q", k=1, metadata_filter=ros_filter)
+            repo.add_documents([Document(page_content="other", metadata={"titulo": "python"})])
+            after_other = repo.similarity_search_with_score("q", k=1, metadata_filter=ros_filter)
+            repo.add_documents([Document(page_content="B", metadata={"titulo": "ros"})])
+            repo.similarity_search_with_score("q", k=1, metadata_filter=ros_filter)
+
+        # Assert - one search, hydrated by id, until "ros" itself is ingested again
+        self.assertEqual([(doc.id, score) for doc, score in first], [("a", 0.1)])
+        self.assertEqual([(doc.page_content, score) for doc, score in cached], [("A", 0.1)])
+        self.assertEqual([doc.id for doc, _ in after_other], ["a"])
+        self.assertEqual(mock_chroma_instance.similarity_search_with_score.call_count, 2)
+        mock_chroma_instance.get.assert_called_with(ids=["a"], include=["documents", "metadatas"])
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_as_retriever_mmr_uses_repository_retriever(self, mock_chroma):
+        # Arrange
+        mock_chroma_instance = MagicMock()
+        mock_chroma.return_value = mock_chroma_instance
+
+        repo = VectorDBRepository(
+            self.settings,
+            self.mock_chroma_client,
+            self.mock_embeddings_client,
+        )
+        repo.search_with_scores = MagicMock(
+            return_value=[(Document(page_content="Result", metadata={}), 0.1)]
+        )
+
+        # Act
+        retriever = repo.as_retriever(search_type="mmr", search_kwargs={"k": 2, "fetch_k": 10})
+        docs = retriever.invoke("test query")
+
+        # Assert
+        self.assertIsInstance(retriever, RepositoryRetriever)
+        mock_chroma_instance.as_retriever.assert_not_called()
+        repo.search_with_scores.assert_called_once_with(
+            query="test query", search_type="mmr", search_kwargs={"k": 2, "fetch_k": 10}
+        )
+        self.assertEqual(docs[0].page_content, "Result")
+
+    @patch("app.infrastructure.vector_db.repository.count_tokens")
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_adaptive_search_over_fetches_and_cuts_at_score_gap(self, mock_chroma, mock_count):
+        # Arrange
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance.similarity_search_with_score.return_value = [
+            (Document(page_content="A", metadata={}, id="a"), 0.20),
+            (Document(page_content="B", metadata={}, id="b"), 0.22),
+            (Document(page_content="C", metadata={}, id="c"), 0.50),
+        ]
+        mock_chroma.return_value = mock_chroma_instance
+        mock_count.return_value = 10
+
+        repo = VectorDBRepository(
+            self.settings,
+            self.mock_chroma_client,
+            self.mock_embeddings_client,
+        )
+
+        # Act
+        results = repo.search_with_scores(
+            "test query",
+            search_type="adaptive",
+            search_kwargs={"k": 4, "fetch_k": 8, "score_gap": 0.5, "token_budget": 100},
+        )
+
+        # Assert
+        call_kwargs = mock_chroma_instance.similarity_search_with_score.call_args[1]
+        self.assertEqual(call_kwargs["k"], 8)
+        self.assertEqual([doc.id for doc, _ in results], ["a", "b"])
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_small_to_big_expands_hits_from_chunk_store(self, mock_chroma):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            settings = self.settings.model_copy(
+                update={
+                    "chunk_store_enabled": True,
+                    "chunk_store_path": str(Path(tmp_dir) / "chunks.sqlite3"),
+                }
+            )
+            chunks = [
+                Document(
+                    page_content=f"Part {seq} of the ROS introduction text.",
+                    metadata={"titulo": "ros-intro", "pagina": 0, "seq": seq},
+                    id=f"id{seq}",
+                )
+                for seq in range(6)
+            ]
+            mock_chroma_instance = MagicMock()
+            mock_chroma_instance.add_documents.return_value = [chunk.id for chunk in chunks]
+            mock_chroma_instance.similarity_search_with_score.return_value = [
+                (chunks[3], 0.1),
+                (chunks[2], 0.2),
+                (Document(page_content="legacy", metadata={"titulo": "old"}, id="x"), 0.3),
+            ]
+            mock_chroma.return_value = mock_chroma_instance
+
+            repo = VectorDBRepository(
+                settings, self.mock_chroma_client, self.mock_embeddings_client
+            )
+            repo.add_documents(chunks)
+
+            # Act
+            results = repo.search_with_scores(
+                "test query", search_type="small_to_big", search_kwargs={"k": 3, "window": 1}
+            )
+
+        # Assert - hits 2 and 3 merge into one span, the legacy hit is kept as-is
+        self.assertEqual([(doc.id, score) for doc, score in results], [("id3", 0.1), ("x", 0.3)])
+        expanded = results[0][0]
+        self.assertEqual((expanded.metadata["seq_start"], expanded.metadata["seq_end"]), (1, 4))
+        self.assertIn("Part 1", expanded.page_content)
+        self.assertIn("Part 4", expanded.page_content)
+        mock_chroma_instance.get.assert_not_called()
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_small_to_big_page_expansion_falls_back_to_chroma_lookup(self, mock_chroma):
+        # Arrange
+        hit = Document(
+            page_content="second", metadata={"titulo": "ros-intro", "pagina": 2, "seq": 7}, id="b"
+        )
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance.similarity_search_with_score.return_value = [(hit, 0.1)]
+        mock_chroma_instance.get.return_value = {
+            "ids": ["b", "a"],
+            "documents": ["second", "first"],
+            "metadatas": [
+                {"titulo": "ros-intro", "pagina": 2, "seq": 7},
+                {"titulo": "ros-intro", "pagina": 2, "seq": 6},
+            ],
+        }
+        mock_chroma.return_value = mock_chroma_instance
+
+        repo = VectorDBRepository(
+            self.settings, self.mock_chroma_client, self.mock_embeddings_client
+        )
+
+        # Act
+        results = repo.small_to_big_search_with_score("test query", k=1, expand="page")
+
+        # Assert
+        mock_chroma_instance.get.assert_called_once_with(
+            where={"$and": [{"titulo": {"$eq": "ros-intro"}}, {"pagina": {"$eq": 2}}]},
+            include=["documents", "metadatas"],
+        )
+        self.assertEqual(results[0][0].page_content, "first\nsecond")
+        self.assertEqual(results[0][0].metadata["paginas"], [2])
+
+    @patch("app.infrastructure.vector_db.repository.CentroidIndex")
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_centroid_routing_restricts_search_to_closest_documents(
+        self, mock_chroma, mock_centroid_index
+    ):
+        # Arrange
+        settings = self.settings.model_copy(update={"centroid_routing_enabled": True})
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance._collection.query.return_value = {
+            "ids": [["a"]],
+            "documents": [["A"]],
+            "metadatas": [[{"titulo": "ros-intro"}]],
+            "distances": [[0.1]],
+        }
+        mock_chroma.return_value = mock_chroma_instance
+        mock_centroid_index.return_value.route.return_value = ["ros-intro", "ros-nodes"]
+        self.mock_embeddings.embed_query.return_value = [0.1, 0.2]
+
+        repo = VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+
+        # Act
+        results = repo.similarity_search_with_score(
+            query="test query", k=2, metadata_filter={"tipo-documento": "documento-pdf"}
+        )
+
+        # Assert
+        self.mock_chroma_client.get_or_create_collection.assert_any_call(
+            "test-collection-centroids"
+        )
+        mock_centroid_index.return_value.route.assert_called_once_with(
+            [0.1, 0.2], 5, where={"tipo-documento": "documento-pdf"}
+        )
+        call_kwargs = mock_chroma_instance._collection.query.call_args[1]
+        self.assertEqual(
+            call_kwargs["where"],
+            {
+                "$and": [
+                    {"tipo-documento": "documento-pdf"},
+                    {"titulo": {"$in": ["ros-intro", "ros-nodes"]}},
+                ]
+            },
+        )
+        mock_chroma_instance.similarity_search_with_score.assert_not_called()
+        self.mock_embeddings.embed_query.assert_called_once_with("test query")
+        self.assertEqual(results[0][0].id, "a")
+
+    @patch("app.infrastructure.vector_db.repository.CentroidIndex")
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_centroid_routing_skipped_when_title_is_pinned(self, mock_chroma, mock_centroid_index):
+        # Arrange
+        settings = self.settings.model_copy(update={"centroid_routing_enabled": True})
+        mock_chroma_instance = MagicMock()
+        mock_chroma.return_value = mock_chroma_instance
+        repo = VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+        title_filter = {"$and": [{"tipo-documento": "documento-pdf"}, {"titulo": {"$eq": "ros"}}]}
+
+        # Act
+        repo.similarity_search_with_score(query="test query", k=2, metadata_filter=title_filter)
+
+        # Assert
+        mock_centroid_index.return_value.route.assert_not_called()
+        mock_chroma_instance.similarity_search_with_score.assert_called_once_with(
+            query="test query", k=2, filter=title_filter, where_document={"$contains": " "}
+        )
+
+    @patch("app.infrastructure.vector_db.repository.CentroidIndex")
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_add_documents_refreshes_document_centroids(self, mock_chroma, mock_centroid_index):
+        # Arrange
+        settings = self.settings.model_copy(
+            update={"centroid_routing_enabled": True, "centroid_clusters": 1}
+        )
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance.add_documents.return_value = ["id1", "id2"]
+        mock_chroma_instance.get.return_value = {
+            "ids": ["id1", "id2"],
+            "embeddings": [[1.0, 0.0], [0.0, 1.0]],
+            "metadatas": [
+                {"titulo": "ros", "tipo-documento": "documento-pdf", "pagina": 0, "seq": 0},
+                {"titulo": "ros", "tipo-documento": "documento-pdf", "pagina": 0, "seq": 1},
+            ],
+        }
+        mock_chroma.return_value = mock_chroma_instance
+        repo = VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+
+        # Act
+        repo.add_documents(
+            [
+                Document(page_content="a", metadata={"titulo": "ros"}),
+                Document(page_content="b", metadata={"titulo": "ros"}),
+            ]
+        )
+
+        # Assert
+        mock_chroma_instance.get.assert_called_once_with(
+            where={"titulo": "ros"}, include=["embeddings", "metadatas"]
+        )
+        title, centroids, metadata = mock_centroid_index.return_value.upsert.call_args[0]
+        self.assertEqual(title, "ros")
+        self.assertEqual(centroids.shape, (1, 2))
+        self.assertEqual(metadata, {"titulo": "ros", "tipo-documento": "documento-pdf"})
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_search_with_scores_rejects_unknown_search_type(self, mock_chroma):
+        repo = VectorDBRepository(
+            self.settings,
+            self.mock_chroma_client,
+            self.mock_embeddings_client,
+        )
+
+        with self.assertRaises(ValueError):
+            repo.search_with_scores("test query", search_type="bm25")
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_add_documents_mirrors_to_local_index(self, mock_chroma):
+        # Arrange
+        settings = self.settings.model_copy(update={"local_index_enabled": True})
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance.add_documents.return_value = ["id1"]
+        mock_chroma_instance.get.return_value = {
+            "ids": ["id1"],
+            "embeddings": [[1.0, 0.0]],
+            "documents": ["Test content"],
+            "metadatas": [{"titulo": "test_doc"}],
+        }
+        mock_chroma.return_value = mock_chroma_instance
+
+        repo = VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+
+        # Act
+        repo.add_documents([Document(page_content="Test content", metadata={})])
+
+        # Assert
+        mock_chroma_instance.get.assert_called_once_with(
+            ids=["id1"], include=["embeddings", "documents", "metadatas"]
+        )
+        self.assertEqual(repo.local_index.ids(), {"id1"})
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_similarity_search_uses_local_index_when_ready(self, mock_chroma):
+        # Arrange
+        settings = self.settings.model_copy(update={"local_index_enabled": True})
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance.get.side_effect = [
+            {"ids": ["id1", "id2"]},
+            {
+                "ids": ["id1", "id2"],
+                "embeddings": [[1.0, 0.0], [0.0, 1.0]],
+                "documents": ["Result 1", "Result 2"],
+                "metadatas": [
+                    {"tipo-documento": "documento-pdf"},
+                    {"tipo-documento": "documento-pdf"},
+                ],
+            },
+        ]
+        mock_chroma.return_value = mock_chroma_instance
+        self.mock_embeddings.embed_query.return_value = [0.0, 1.0]
+
+        repo = VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+        repo.reconcile_local_index()
+
+        # Act
+        results = repo.similarity_search_with_score(query="test query", k=1)
+
+        # Assert
+        mock_chroma_instance.similarity_search_with_score.assert_not_called()
+        self.assertTrue(repo.local_index.ready)
+        self.assertEqual(results[0][0].id, "id2")
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_local_index_uses_collection_space_and_rebuilds_on_change(self, mock_chroma):
+        # Arrange
+        settings = self.settings.model_copy(update={"local_index_enabled": True})
+        mock_chroma_instance = MagicMock()
+        mock_chroma_instance._collection.configuration = {"hnsw": {"space": "cosine"}}
+        mock_chroma_instance.get.side_effect = lambda ids=None, include=None, **kwargs: (
+            {"ids": ["id1"]}
+            if ids is None
+            else {
+                "ids": ids,
+                "embeddings": [[1.0, 0.0]],
+                "documents": ["Result 1"],
+                "metadatas": [{}],
+            }
+        )
+        mock_chroma.return_value = mock_chroma_instance
+        repo = VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+        repo.reconcile_local_index()
+
+        # Act - collection recreated in another space
+        mock_chroma_instance._collection.configuration = {"hnsw": {"space": "l2"}}
+        repo.reconcile_local_index()
+
+        # Assert
+        self.assertEqual(repo.local_index.space, "l2")
+        self.assertEqual(repo.local_index.ids(), {"id1"})
+        self.assertTrue(repo.local_index.ready)
+
+    def test_local_index_and_chroma_return_the_same_distances(self):
+        """Test that the replica and Chroma score the same hit on the same scale."""
+        # Arrange
+        with tempfile.TemporaryDirectory() as persist_path:
+            settings = self.settings.model_copy(
+                update={
+                    "chromadb_mode": "embedded",
+                    "chromadb_persist_path": persist_path,
+                    "chromadb_hnsw_space": "cosine",
+                    "local_index_enabled": True,
+                }
+            )
+            self.mock_embeddings_client.client = DeterministicFakeEmbedding(size=16)
+            repo = VectorDBRepository(
+                settings, ChromaDBClient(settings), self.mock_embeddings_client
+            )
+            repo.add_documents(
+                [
+                    Document(
+                        page_content=f"ROS chunk number {i}",
+                        metadata={"tipo-documento": "documento-pdf"},
+                    )
+                    for i in range(5)
+                ]
+            )
+
+            # Act
+            from_chroma = repo.similarity_search_with_score("ROS nodes", k=3)
+            repo.reconcile_local_index()
+            from_replica = repo.similarity_search_with_score("ROS nodes", k=3)
+
+        # Assert
+        self.assertEqual([doc.id for doc, _ in from_replica], [doc.id for doc, _ in from_chroma])
+        for (_, replica_distance), (_, chroma_distance) in zip(from_replica, from_chroma):
+            self.assertAlmostEqual(replica_distance, chroma_distance, places=4)
+        self.assertEqual(repo.local_index.space, "cosine")
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_partitioned_add_documents_routes_by_partition_key(self, mock_chroma):
+        # Arrange
+        settings = self.settings.model_copy(update={"chromadb_partition_key": "tipo-documento"})
+        stores = {}
+
+        def make_store(collection_name, **kwargs):
+            store = MagicMock()
+            store.add_documents.side_effect = lambda docs: [
+                f"{collection_name}:{doc.page_content}" for doc in docs
+            ]
+            stores[collection_name] = store
+            return store
+
+        mock_chroma.side_effect = make_store
+        repo = VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+        documents = [
+            Document(page_content="a", metadata={"tipo-documento": "documento-pdf"}),
+            Document(page_content="b", metadata={"tipo-documento": "web"}),
+            Document(page_content="c", metadata={"tipo-documento": "documento-pdf"}),
+        ]
+
+        # Act
+        ids = repo.add_documents(documents)
+
+        # Assert
+        self.assertEqual(
+            ids,
+            [
+                "test-collection.documento-pdf:a",
+                "test-collection.web:b",
+                "test-collection.documento-pdf:c",
+            ],
+        )
+        stores["test-collection"].add_documents.assert_not_called()
+        self.mock_chroma_client.get_or_create_collection.assert_any_call(
+            "test-collection.documento-pdf"
+        )
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_partitioned_search_queries_single_partition(self, mock_chroma):
+        # Arrange
+        settings = self.settings.model_copy(update={"chromadb_partition_key": "tipo-documento"})
+        stores = {}
+
+        def make_store(collection_name, **kwargs):
+            stores[collection_name] = MagicMock()
+            return stores[collection_name]
+
+        mock_chroma.side_effect = make_store
+        collection = MagicMock()
+        collection.name = "test-collection.web"
+        self.mock_chroma_http_client.list_collections.return_value = [collection]
+        repo = VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+
+        # Act
+        repo.similarity_search_with_score(
+            query="test query", k=2, metadata_filter={"tipo-documento": {"$eq": "web"}}
+        )
+
+        # Assert
+        stores["test-collection.web"].similarity_search_with_score.assert_called_once()
+        stores["test-collection"].similarity_search_with_score.assert_not_called()
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_partitioned_reads_never_create_missing_partitions(self, mock_chroma):
+        # Arrange - no partition exists yet
+        settings = self.settings.model_copy(update={"chromadb_partition_key": "tipo-documento"})
+        self.mock_chroma_http_client.list_collections.return_value = []
+        repo = VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+        self.mock_chroma_client.get_or_create_collection.reset_mock()
+        unknown_type = {"tipo-documento": "made-up"}
+
+        # Act
+        results = repo.similarity_search_with_score(
+            query="test query", k=2, metadata_filter=unknown_type
+        )
+        exists = repo.check_document_exists(unknown_type)
+
+        # Assert - missing partitions read as empty and are neither created nor kept
+        self.assertEqual(results, [])
+        self.assertFalse(exists)
+        self.mock_chroma_client.get_or_create_collection.assert_not_called()
+        self.mock_embeddings.embed_query.assert_not_called()
+        self.assertEqual(repo._partition_stores, {})
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_partitioned_search_scatter_gathers_across_partitions(self, mock_chroma):
+        # Arrange
+        settings = self.settings.model_copy(update={"chromadb_partition_key": "tipo-documento"})
+        results = {
+            "test-collection.documento-pdf": ("pdf", [0.2, 0.6]),
+            "test-collection.web": ("web", [0.1, 0.4]),
+        }
+
+        def make_store(collection_name, **kwargs):
+            store = MagicMock()
+            if collection_name in results:
+                prefix, distances = results[collection_name]
+                store._collection.query.return_value = {
+                    "ids": [[f"{prefix}-{i}" for i in range(len(distances))]],
+                    "documents": [[f"{prefix} text {i}" for i in range(len(distances))]],
+                    "metadatas": [[{"tipo-documento": prefix} for _ in distances]],
+                    "distances": [distances],
+                }
+            return store
+
+        mock_chroma.side_effect = make_store
+        collections = []
+        for name in ["test-collection", *results, "test-collection-benchmark"]:
+            collection = MagicMock()
+            collection.name = name
+            collections.append(collection)
+        self.mock_chroma_http_client.list_collections.return_value = collections
+        self.mock_embeddings.embed_query.return_value = [0.1, 0.2]
+        repo = VectorDBRepository(settings, self.mock_chroma_client, self.mock_embeddings_client)
+
+        # Act
+        results_with_scores = repo.similarity_search_with_score(
+            query="test query", k=3, metadata_filter={"titulo": "doc"}
+        )
+
+        # Assert
+        self.assertEqual(
+            [(doc.id, score) for doc, score in results_with_scores],
+            [("web-0", 0.1), ("pdf-0", 0.2), ("web-1", 0.4)],
+        )
+        self.mock_embeddings.embed_query.assert_called_once_with("test query")
+
+    @patch("app.infrastructure.vector_db.repository.Chroma")
+    def test_numpy_backend_runs_without_chroma(self, mock_chroma):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            settings = self.settings.model_copy(
+                update={
+                    "vector_backend": "numpy",
+                    "numpy_store_path": tmp_dir,
+                    "chromadb_partition_key": "tipo-documento",
+                }
+            )
+            vectors = {"ROS intro": [1.0, 0.0], "Python basics": [0.0, 1.0]}
+            self.mock_embeddings.embed_documents.side_effect = lambda texts: [
+                vectors[text] for text in texts
+            ]
+            self.mock_embeddings.embed_query.return_value = [0.2, 1.0]
+            repo = VectorDBRepository(settings, None, self.mock_embeddings_client)
+
+            # Act
+            repo.add_documents(
+                [
+                    Document(
+                        page_content="ROS intro",
+                        metadata={"titulo": "ros", "tipo-documento": "documento-pdf"},
+                    ),
+                    Document(
+                        page_content="Python basics",
+                        metadata={"titulo": "python", "tipo-documento": "documento-web"},
+                    ),
+                ]
+            )
+            results = repo.similarity_search_with_score(
+                query="python", k=2, metadata_filter={"titulo": {"$in": ["ros", "python"]}}
+            )
+            exists = repo.check_document_exists({"titulo": "ros"})
+            retriever = repo.as_retriever(search_kwargs={"k": 2})
+
+        # Assert - both partitions are searched and merged by cosine distance
+        self.assertEqual([doc.page_content for doc, _ in results], ["Python basics", "ROS intro"])
+        self.assertLess(results[0][1], results[1][1])
+        self.assertTrue(exists)
+        self.assertIsInstance(retriever, RepositoryRetriever)
+        self.assertIsNone(repo.vdb)
+        mock_chroma.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -74,6 +74,10 @@ class TestDocumentIngestionService(unittest.TestCase):
         self.mock_splitter.split_documents.assert_called_once_with(mock_documents)
         self.mock_vdb_repo.add_documents.assert_called_once()
 
+        # Chunks carry their reading-order sequence number
+        chunks = self.mock_vdb_repo.add_documents.call_args[0][0]
+        self.assertEqual([chunk.metadata["seq"] for chunk in chunks], [0, 1])
+
     @patch("app.services.ingest.ingestion.PDFTextExtractor.extract_with_metadata")
     @patch("app.services.ingest.ingestion.PDFLoader.load_from_base64")
     def test_ingest_document_already_exists_returns_false(
@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import patch
+
+from langchain.schema import Document
+
+from app.core.config import Settings
+from app.services.rag.context_packer import pack_context, pack_documents
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+def chunk(text: str, pagina: int, seq: int | None, titulo: str = "ros") -> Document:
+    metadata = {"titulo": titulo, "pagina": pagina}
+    if seq is not None:
+        metadata["seq"] = seq
+    return Document(page_content=text, metadata=metadata, id=f"{titulo}-{pagina}-{seq}")
+
+
+class TestPackDocuments(unittest.TestCase):
+    def test_adjacent_chunks_are_stitched_without_their_overlap(self):
+        # Arrange - the splitter repeats "shared overlap text" between seq 1 and 2
+        documents = [
+            chunk("middle part with shared overlap text", 0, 1),
+            chunk("shared overlap text and the end", 0, 2),
+        ]
+
+        # Act
+        packed, stats = pack_documents(documents, None, word_count)
+
+        # Assert
+        self.assertEqual(
+            [doc.page_content for doc in packed],
+            ["middle part with shared overlap text and the end"],
+        )
+        self.assertEqual(packed[0].metadata["seq"], 1)
+        self.assertEqual(packed[0].metadata["seq_end"], 2)
+        self.assertEqual(stats.saved_tokens, 3)
+
+    def test_chunks_are_ordered_by_document_then_page(self):
+        # Arrange - relevance order mixes documents and pages
+        documents = [
+            chunk("ros page two", 2, 5),
+            chunk("python page zero", 0, 0, titulo="python"),
+            chunk("ros page zero", 0, 0),
+            chunk("ros page one", 1, 3),
+        ]
+
+        # Act
+        packed, _ = pack_documents(documents, None, word_count)
+
+        # Assert - best document first, pages in reading order
+        self.assertEqual(
+            [doc.page_content for doc in packed],
+            ["ros page zero", "ros page one", "ros page two", "python page zero"],
+        )
+
+    def test_duplicates_and_contained_chunks_are_dropped(self):
+        # Arrange
+        documents = [
+            chunk("a long chunk about ROS nodes", 0, 1),
+            chunk("a long chunk about ROS nodes", 0, 1),
+            Document(page_content="about ROS nodes", metadata={"titulo": "ros", "pagina": 0}),
+        ]
+
+        # Act
+        packed, stats = pack_documents(documents, None, word_count)
+
+        # Assert
+        self.assertEqual([doc.page_content for doc in packed], ["a long chunk about ROS nodes"])
+        self.assertEqual((stats.input_chunks, stats.packed_chunks), (3, 1))
+
+    def test_token_budget_keeps_the_most_relevant_chunks(self):
+        # Arrange - 3 words each, plus the separator
+        documents = [chunk(f"chunk number {position}", position, position) for position in range(4)]
+
+        # Act
+        packed, stats = pack_documents(documents, 6, word_count)
+
+        # Assert
+        self.assertEqual([doc.page_content for doc in packed], ["chunk number 0", "chunk number 1"])
+        self.assertLessEqual(stats.packed_tokens, 6)
+
+    def test_most_relevant_chunk_is_kept_over_budget(self):
+        packed, _ = pack_documents([chunk("a chunk larger than the budget", 0, 0)], 2, word_count)
+
+        self.assertEqual(len(packed), 1)
+
+
+class TestPackContext(unittest.TestCase):
+    @patch("app.services.rag.context_packer.count_tokens")
+    def test_packs_documents_and_reports_savings(self, mock_count):
+        # Arrange
+        mock_count.side_effect = lambda text, model: word_count(text)
+        documents = [
+            chunk("first half shared words here", 0, 0),
+            chunk("shared words here second half", 0, 1),
+        ]
+
+        # Act
+        docs, report = pack_context(documents, Settings(context_token_budget=100))
+
+        # Assert
+        self.assertEqual(
+            [doc.page_content for doc in docs], ["first half shared words here second half"]
+        )
+        self.assertEqual(report, {"chunks_used": 2, "context_tokens": 7, "context_tokens_saved": 3})
+
+    def test_disabled_packing_returns_the_documents_unchanged(self):
+        documents = [chunk("a chunk", 0, 0)]
+
+        docs, report = pack_context(documents, Settings(context_packing_enabled=False))
+
+        self.assertIs(docs, documents)
+        self.assertEqual(report, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from langchain.schema import Document
+import numpy as np
+
+from app.core.config import Settings
+from app.services.rag.local_rerank import LocalReranker, lexical_overlap, local_rerank
+
+from ..document.pdf_loader_test import FIXTURES_PATH
+
+
+class TestLocalRerank(unittest.TestCase):
+    def test_lexical_overlap_weighs_rare_terms_higher(self):
+        # Arrange - "ros" is in every text, "nodes" only in the second
+        texts = ["ros basics", "ros nodes explained", "about ros"]
+
+        # Act
+        overlap = lexical_overlap("what are ros nodes", texts)
+
+        # Assert
+        self.assertEqual(int(np.argmax(overlap)), 1)
+        self.assertAlmostEqual(float(overlap[0]), float(overlap[2]))
+        self.assertTrue(np.all((overlap >= 0) & (overlap <= 1)))
+
+    def test_lexical_overlap_without_query_terms_is_zero(self):
+        self.assertEqual(lexical_overlap("a b", ["ros", "nodes"]).tolist(), [0.0, 0.0])
+
+    def test_lexical_weight_breaks_embedding_ties(self):
+        # Arrange - same cosine similarity, only the second text mentions the query term
+        query_embedding = [1.0, 0.0]
+        candidates = [[1.0, 0.5], [1.0, -0.5]]
+
+        # Act
+        ranked = local_rerank(
+            "launch files", query_embedding, ["ros", "launch files"], candidates, top_n=2
+        )
+
+        # Assert
+        self.assertEqual([result["index"] for result in ranked], [1, 0])
+        self.assertGreater(ranked[0]["relevance_score"], ranked[1]["relevance_score"])
+
+    def test_mmr_skips_near_duplicate_candidates(self):
+        # Arrange - candidates 0 and 1 are near duplicates, 2 is distinct but less relevant
+        query_embedding = [1.0, 0.2]
+        candidates = [[1.0, 0.2], [1.0, 0.21], [0.6, 0.8]]
+        texts = ["chunk", "chunk", "chunk"]
+
+        # Act
+        plain = local_rerank("chunk", query_embedding, texts, candidates, top_n=2)
+        diverse = local_rerank("chunk", query_embedding, texts, candidates, top_n=2, mmr_lambda=0.5)
+
+        # Assert
+        self.assertEqual([result["index"] for result in plain], [0, 1])
+        self.assertEqual([result["index"] for result in diverse], [0, 2])
+
+    def test_local_reranker_uses_stored_embeddings_and_cached_query(self):
+        # Arrange
+        repository = MagicMock()
+        repository.chunk_embeddings.return_value = {"a": [0.0, 1.0], "b": [1.0, 0.0]}
+        repository.embed_query.return_value = [1.0, 0.0]
+        documents = [
+            Document(page_content="first", id="a"),
+            Document(page_content="second", id="b"),
+            Document(page_content="no stored vector", id=None),
+        ]
+        reranker = LocalReranker(Settings(local_rerank_lexical_weight=0.0), repository)
+
+        # Act
+        ranked = reranker.rerank(documents, "query", top_n=2)
+
+        # Assert
+        self.assertEqual([result["index"] for result in ranked], [1, 0])
+        repository.chunk_embeddings.assert_called_once_with(["a", "b"])
+        repository.embed_query.assert_called_once_with("query")
+
+
+class TestLocalRerankGoldenFixtures(unittest.TestCase):
+    """Quality comparison against the recorded Cohere rerank-v3.5 results."""
+
+    search_response: dict
+    cohere_response: dict
+    query_embedding: np.ndarray
+
+    @classmethod
+    def setUpClass(cls):
+        golden_responses_path = FIXTURES_PATH / "golden_responses"
+        with open(golden_responses_path / "chromadb_search_response.json", "r") as f:
+            cls.search_response = json.load(f)
+        with open(golden_responses_path / "cohere_rerank_response.json", "r") as f:
+            cls.cohere_response = json.load(f)
+        with open(golden_responses_path / "embedding_response.json", "r") as f:
+            cls.query_embedding = np.asarray(json.load(f)["embedding"])
+
+    def _candidate_embeddings(self) -> np.ndarray:
+        """
+        Candidate vectors at the recorded distances from the query (the fixtures
+        keep distances, not the stored vectors).
+
+        The fixtures were recorded on a default (l2) collection: Chroma's l2 is
+        the squared distance, 2 * (1 - cosine) for the unit-length OpenAI vectors.
+        """
+        query = self.query_embedding / np.linalg.norm(self.query_embedding)
+        similarity = np.array(
+            [1 - result["score"] / 2 for result in self.search_response["results"]]
+        )
+        rng = np.random.default_rng(0)
+        noise = rng.standard_normal((len(similarity), len(query)))
+        noise -= np.outer(noise @ query, query)
+        orthonormal = np.linalg.qr(noise.T)[0].T
+        return similarity[:, None] * query + np.sqrt(1 - similarity**2)[:, None] * orthonormal
+
+    def test_local_rerank_matches_cohere_top_n(self):
+        # Arrange
+        texts = [result["page_content"] for result in self.search_response["results"]]
+        query = self.cohere_response["input"]["query"]
+        top_n = self.cohere_response["input"]["top_n"]
+        cohere_order = [
+            next(
+                position
+                for position, text in enumerate(texts)
+                if text.startswith(document["page_content"][:60])
+            )
+            for document in self.cohere_response["reranked_documents"]
+        ]
+
+        # Act
+        ranked = local_rerank(
+            query,
+            self.query_embedding,
+            texts,
+            self._candidate_embeddings(),
+            top_n=top_n,
+            lexical_weight=Settings().local_rerank_lexical_weight,
+        )
+
+        # Assert - same chunks in the same order as Cohere
+        self.assertEqual([result["index"] for result in ranked], cohere_order)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import threading
+import time
+import unittest
+
+from langchain.schema import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.services.rag.map_reduce import (
+    NO_ANSWER,
+    NO_RELEVANT_INFO,
+    group_documents,
+    is_relevant,
+    map_reduce_answer,
+)
+
+
+_lock = threading.Lock()
+
+MAP_PROMPT = "map|{context}|{question}"
+REDUCE_PROMPT = "reduce|{context}|{question}"
+
+
+class ExtractFakeChatModel(BaseChatModel):
+    """Fake chat model: map calls extract chunks about ROS, reduce calls join the extracts."""
+
+    prompts: list = []
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "extract-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        with _lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        prompt = messages[0].content
+        self.prompts.append(prompt)
+        kind, context, _ = prompt.split("|")
+        if kind == "map":
+            lines = [line for line in context.split("\n\n") if "ROS" in line]
+            content = " ".join(lines) if lines else NO_RELEVANT_INFO
+        else:
+            content = f"answer from: {context}"
+        with _lock:
+            self.in_flight -= 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+class TestGroupDocuments(unittest.TestCase):
+    def test_groups_consecutive_chunks_within_budget(self):
+        # Arrange
+        documents = [Document(page_content=text) for text in ("a b", "c d", "e f g", "h")]
+
+        # Act
+        groups = group_documents(documents, 4, word_count)
+
+        # Assert
+        self.assertEqual(
+            [[doc.page_content for doc in group] for group in groups],
+            [["a b", "c d"], ["e f g", "h"]],
+        )
+
+    def test_no_budget_gives_one_chunk_per_group(self):
+        # Arrange
+        documents = [Document(page_content="a"), Document(page_content="b")]
+
+        # Act / Assert
+        self.assertEqual(len(group_documents(documents, None, word_count)), 2)
+
+    def test_is_relevant(self):
+        # Act / Assert
+        self.assertTrue(is_relevant("ROS uses nodes"))
+        self.assertFalse(is_relevant(" no_relevant_info "))
+        self.assertFalse(is_relevant(""))
+
+
+class TestMapReduceAnswer(unittest.TestCase):
+    def setUp(self):
+        self.llm = ExtractFakeChatModel(prompts=[])
+
+    def test_maps_groups_concurrently_then_reduces_relevant_extracts(self):
+        # Arrange
+        documents = [
+            Document(page_content="ROS is a framework", id="a"),
+            Document(page_content="Cooking pasta", id="b"),
+            Document(page_content="ROS uses nodes", id="c"),
+            Document(page_content="Gardening tips", id="d"),
+        ]
+
+        # Act
+        answer = map_reduce_answer(
+            self.llm,
+            "What is ROS?",
+            documents,
+            MAP_PROMPT,
+            REDUCE_PROMPT,
+            max_concurrency=2,
+            group_tokens=None,
+            token_counter=word_count,
+        )
+
+        # Assert
+        self.assertEqual(answer["result"], "answer from: ROS is a framework\n\nROS uses nodes")
+        self.assertEqual([doc.id for doc in answer["source_documents"]], ["a", "c"])
+        self.assertEqual(answer["map_reduce"], {"groups": 4, "relevant_groups": 2, "reduced": True})
+        self.assertEqual(self.llm.max_in_flight, 2)
+        self.assertEqual(len(self.llm.prompts), 5)
+
+    def test_skips_reduce_when_nothing_is_relevant(self):
+        # Arrange
+        documents = [Document(page_content="Cooking pasta"), Document(page_content="Gardening")]
+
+        # Act
+        answer = map_reduce_answer(
+            self.llm,
+            "What is ROS?",
+            documents,
+            MAP_PROMPT,
+            REDUCE_PROMPT,
+            max_concurrency=4,
+            group_tokens=100,
+            token_counter=word_count,
+        )
+
+        # Assert
+        self.assertEqual(answer["result"], NO_ANSWER)
+        self.assertEqual(answer["source_documents"], [])
+        self.assertEqual(
+            answer["map_reduce"], {"groups": 1, "relevant_groups": 0, "reduced": False}
+        )
+        self.assertEqual(len(self.llm.prompts), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from langchain.schema import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from app.core.config import Settings
+from app.services.rag.model_router import (
+    EXTRACTIVE,
+    FULL,
+    SMALL,
+    ModelRouter,
+    RouteSignals,
+    extractive_answer,
+    route_signals,
+)
+
+
+def word_count(text: str, model: str = "") -> int:
+    return len(text.split())
+
+
+def signals(query_tokens=5, distinct_pages=1, top_distance=0.1, top_gap=1.0) -> RouteSignals:
+    return RouteSignals(
+        query_tokens=query_tokens,
+        chunks=4,
+        distinct_pages=distinct_pages,
+        top_distance=top_distance,
+        top_gap=top_gap,
+    )
+
+
+class TestRouteSignals(unittest.TestCase):
+    def test_signals_from_query_and_retrieval(self):
+        # Arrange
+        docs_and_distances = [
+            (Document(page_content="a", metadata={"titulo": "ros", "pagina": 1}), 0.1),
+            (Document(page_content="b", metadata={"titulo": "ros", "pagina": 1}), 0.3),
+            (Document(page_content="c", metadata={"titulo": "ros", "pagina": 2}), 0.4),
+        ]
+
+        # Act
+        result = route_signals("What is ROS?", docs_and_distances, word_count)
+
+        # Assert
+        self.assertEqual(result.query_tokens, 3)
+        self.assertEqual(result.chunks, 3)
+        self.assertEqual(result.distinct_pages, 2)
+        self.assertEqual(result.top_distance, 0.1)
+        self.assertAlmostEqual(result.top_gap, 2.0)
+
+    def test_extractive_answer_picks_best_matching_sentence(self):
+        # Arrange
+        text = "ROS has many tools. The ROS master registers nodes. Nodes talk over topics."
+
+        # Act / Assert
+        self.assertEqual(
+            extractive_answer("What does the ROS master register?", text),
+            "The ROS master registers nodes.",
+        )
+        self.assertIsNone(extractive_answer("Who won the match?", text))
+
+
+class TestModelRouter(unittest.TestCase):
+    def setUp(self):
+        self.settings = Settings(
+            openai_api_key="test-key",
+            cascade_enabled=True,
+            cascade_extractive_enabled=True,
+            context_packing_enabled=False,
+        )
+        self.router = ModelRouter(self.settings)
+
+    def test_route_decisions(self):
+        # Act / Assert
+        self.assertEqual(self.router.route(signals()), EXTRACTIVE)
+        self.assertEqual(self.router.route(signals(top_distance=0.3)), SMALL)
+        self.assertEqual(self.router.route(signals(top_distance=0.1, top_gap=0.1)), SMALL)
+        self.assertEqual(self.router.route(signals(top_distance=0.3, query_tokens=60)), FULL)
+        self.assertEqual(self.router.route(signals(top_distance=0.3, distinct_pages=4)), FULL)
+        self.assertEqual(self.router.route(signals(top_distance=None, top_gap=None)), FULL)
+
+    def test_only_full_route_outside_the_cosine_space(self):
+        # Arrange - the default l2 space: distances are not on the thresholds' scale
+        with self.assertLogs("rag-docs", level="WARNING"):
+            router = ModelRouter(self.settings, distance_space="l2")
+
+        # Act / Assert
+        self.assertEqual(router.route(signals()), FULL)
+        self.assertEqual(router.route(signals(top_distance=0.3)), FULL)
+
+    def test_extractive_route_can_be_disabled(self):
+        # Arrange
+        router = ModelRouter(self.settings.model_copy(update={"cascade_extractive_enabled": False}))
+
+        # Act / Assert
+        self.assertEqual(router.route(signals()), SMALL)
+
+    @patch("app.services.rag.model_router.count_tokens", side_effect=word_count)
+    def test_answer_extractive_skips_llm(self, _count_tokens):
+        # Arrange
+        llms = {SMALL: FakeListChatModel(responses=[]), FULL: FakeListChatModel(responses=[])}
+        dominant = Document(page_content="Intro. The ROS master registers nodes.", id="a")
+        docs_and_distances = [(dominant, 0.05), (Document(page_content="Other", id="b"), 0.4)]
+
+        # Act
+        answer = self.router.answer(
+            "What does the ROS master register?",
+            docs_and_distances,
+            "{context}|{question}",
+            llms,
+            started_at=time.perf_counter(),
+        )
+
+        # Assert
+        self.assertEqual(answer["route"], EXTRACTIVE)
+        self.assertEqual(answer["result"], "The ROS master registers nodes.")
+        self.assertEqual(answer["source_documents"], [dominant])
+        self.assertEqual(self.router.metrics.snapshot()[EXTRACTIVE]["requests"], 1)
+
+    @patch("app.services.rag.model_router.count_tokens", side_effect=word_count)
+    def test_answer_uses_model_of_route_and_records_metrics(self, _count_tokens):
+        # Arrange
+        llms = {
+            SMALL: FakeListChatModel(responses=["small answer"]),
+            FULL: FakeListChatModel(responses=["full answer"]),
+        }
+        docs_and_distances = [
+            (Document(page_content="ROS nodes", metadata={"pagina": page}), 0.3)
+            for page in range(5)
+        ]
+
+        # Act
+        answer = self.router.answer(
+            "What is ROS?", docs_and_distances, "{context}|{question}", llms, time.perf_counter()
+        )
+
+        # Assert: five distinct pages go to the full model
+        self.assertEqual(answer["route"], FULL)
+        self.assertEqual(answer["result"], "full answer")
+        self.assertEqual(len(answer["source_documents"]), 5)
+        metrics = self.router.metrics.snapshot()
+        self.assertEqual(metrics[FULL]["requests"], 1)
+        self.assertEqual(metrics[SMALL]["requests"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
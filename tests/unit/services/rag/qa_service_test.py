@@ -1,8 +1,10 @@
+import asyncio
 import json
 import unittest
 from unittest.mock import MagicMock, patch
 
 from langchain.schema import Document
+from langchain_core.language_models import FakeListChatModel
 
 from app.core.config import Settings
 from app.services.rag.qa_service import QAService
@@ -35,15 +37,22 @@ class TestQAService(unittest.TestCase):
             default_chunk_overlap=self.settings_snapshot["default_chunk_overlap"],
         )
 
-        # Mock LLMClient
+        # Mock LLMClient (fake chat model: the chain is built once at construction)
         self.mock_llm_client = MagicMock()
-        self.mock_llm = MagicMock()
+        self.mock_llm = FakeListChatModel(responses=["answer"])
         self.mock_llm_client.client = self.mock_llm
 
         # Mock VectorDBRepository
         self.mock_vdb_repo = MagicMock()
-        self.mock_retriever = MagicMock()
-        self.mock_vdb_repo.as_retriever.return_value = self.mock_retriever
+        self.mock_vdb_repo.search_with_scores.return_value = []
+
+        # Word count as token count (no tokenizer download)
+        patcher = patch(
+            "app.services.rag.context_packer.count_tokens",
+            side_effect=lambda text, model: len(text.split()),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
         # Create service instance
         self.service = QAService(
@@ -52,9 +61,7 @@ class TestQAService(unittest.TestCase):
             self.mock_vdb_repo,
         )
 
-    @patch("app.services.rag.qa_service.RetrievalQA.from_chain_type")
-    @patch("app.services.rag.qa_service.PromptTemplate.from_template")
-    def test_answer_question_with_golden_response(self, mock_prompt_template, mock_retrieval_qa):
+    def test_answer_question_with_golden_response(self):
         """Test QA service returns expected answer using golden response data."""
         # Arrange - Use golden response data
         query = self.golden_response["input"]["query"]
@@ -68,20 +75,11 @@ class TestQAService(unittest.TestCase):
                 metadata=doc_data["metadata"],
             )
             source_docs.append(doc)
+        self.mock_vdb_repo.search_with_scores.return_value = [(doc, 0.1) for doc in source_docs]
 
         # Expected answer from golden response
         expected_answer = self.golden_response["response"]["content"]
-
-        # Mock the QA chain to return golden response structure
-        mock_qa_chain = MagicMock()
-        mock_qa_chain.invoke.return_value = {
-            "result": expected_answer,
-            "source_documents": source_docs,
-        }
-        mock_retrieval_qa.return_value = mock_qa_chain
-
-        mock_prompt = MagicMock()
-        mock_prompt_template.return_value = mock_prompt
+        self.mock_llm.responses = [expected_answer]
 
         # Act
         result = self.service.answer_question(query, document_type)
@@ -93,19 +91,17 @@ class TestQAService(unittest.TestCase):
 
         # Verify answer content matches golden response
         self.assertEqual(result["result"], expected_answer)
+        self.assertEqual(result["query"], query)
 
         # Verify source documents are present
         self.assertEqual(len(result["source_documents"]), len(source_docs))
         self.assertIsInstance(result["source_documents"][0], Document)
 
-        # Verify chain was invoked with correct query
-        mock_qa_chain.invoke.assert_called_once_with({"query": query})
+        # Verify retrieval ran with the query and the chunks were packed
+        self.assertEqual(self.mock_vdb_repo.search_with_scores.call_args[1]["query"], query)
+        self.assertIn("context_tokens", result)
 
-    @patch("app.services.rag.qa_service.RetrievalQA.from_chain_type")
-    @patch("app.services.rag.qa_service.PromptTemplate.from_template")
-    def test_answer_question_returns_source_documents(
-        self, mock_prompt_template, mock_retrieval_qa
-    ):
+    def test_answer_question_returns_source_documents(self):
         """Test that answer includes source documents with metadata."""
         # Arrange
         query = "What is ROS?"
@@ -120,13 +116,7 @@ class TestQAService(unittest.TestCase):
             page_content="ROS provides tools for robotics",
             metadata={"titulo": "ros-intro", "pagina": 1, "tipo-documento": document_type},
         )
-
-        mock_qa_chain = MagicMock()
-        mock_qa_chain.invoke.return_value = {
-            "result": "ROS is a robotics framework",
-            "source_documents": [mock_doc1, mock_doc2],
-        }
-        mock_retrieval_qa.return_value = mock_qa_chain
+        self.mock_vdb_repo.search_with_scores.return_value = [(mock_doc1, 0.1), (mock_doc2, 0.2)]
 
         # Act
         result = self.service.answer_question(query, document_type)
@@ -142,6 +132,198 @@ class TestQAService(unittest.TestCase):
             self.assertIn("pagina", doc.metadata)
             self.assertIn("tipo-documento", doc.metadata)
 
+    def test_answer_question_reuses_chain_with_per_request_config(self):
+        """Test that one prebuilt chain serves requests with different parameters."""
+        # Arrange
+        chain = self.service._qa_chain
+        self.mock_llm.responses = ["first", "second"]
+
+        # Act
+        first = self.service.answer_question("What is ROS?", "documento-pdf", k_results=2)
+        second = self.service.answer_question(
+            "What is a node?", "documento-pdf", k_results=7, custom_prompt="Q: {question}"
+        )
+
+        # Assert
+        self.assertIs(self.service._qa_chain, chain)
+        self.assertEqual((first["result"], second["result"]), ("first", "second"))
+        ks = [
+            call[1]["search_kwargs"]["k"]
+            for call in self.mock_vdb_repo.search_with_scores.call_args_list
+        ]
+        self.assertEqual(ks, [2, 7])
+
+    def test_answer_question_mmr_passes_search_kwargs(self):
+        """Test that MMR mode forwards fetch_k and lambda_mult to the retriever."""
+        # Act
+        self.service.answer_question(
+            "What is ROS?",
+            "documento-pdf",
+            k_results=2,
+            search_type="mmr",
+            fetch_k=12,
+            lambda_mult=0.3,
+        )
+
+        # Assert
+        self.mock_vdb_repo.search_with_scores.assert_called_once_with(
+            query="What is ROS?",
+            search_type="mmr",
+            search_kwargs={
+                "k": 2,
+                "filter": {"tipo-documento": {"$eq": "documento-pdf"}},
+                "where_document": {"$contains": " "},
+                "fetch_k": 12,
+                "lambda_mult": 0.3,
+            },
+        )
+
+    def test_answer_question_scopes_filter_by_titles(self):
+        """Test that title scoping builds a compound metadata filter."""
+        # Act
+        self.service.answer_question("What is ROS?", "documento-pdf", titles=["ros-intro"])
+        self.service.answer_question("What is ROS?", "documento-pdf", titles=["a", "b"])
+
+        # Assert
+        filters = [
+            call[1]["search_kwargs"]["filter"]
+            for call in self.mock_vdb_repo.search_with_scores.call_args_list
+        ]
+        self.assertEqual(
+            filters,
+            [
+                {
+                    "$and": [
+                        {"tipo-documento": {"$eq": "documento-pdf"}},
+                        {"titulo": {"$eq": "ros-intro"}},
+                    ]
+                },
+                {
+                    "$and": [
+                        {"tipo-documento": {"$eq": "documento-pdf"}},
+                        {"titulo": {"$in": ["a", "b"]}},
+                    ]
+                },
+            ],
+        )
+
+    def test_answer_question_adaptive_passes_cutoff_kwargs(self):
+        """Test that adaptive k forwards the cutoff options to the retriever."""
+        # Act
+        self.service.answer_question(
+            "What is ROS?",
+            "documento-pdf",
+            search_type="adaptive",
+            fetch_k=10,
+            score_gap=0.3,
+            token_budget=800,
+        )
+
+        # Assert
+        call_kwargs = self.mock_vdb_repo.search_with_scores.call_args[1]
+        search_kwargs = call_kwargs["search_kwargs"]
+        self.assertEqual(call_kwargs["search_type"], "adaptive")
+        self.assertEqual(search_kwargs["fetch_k"], 10)
+        self.assertIsNone(search_kwargs["score_threshold"])
+        self.assertEqual(search_kwargs["score_gap"], 0.3)
+        self.assertEqual(search_kwargs["token_budget"], 800)
+
+    @patch("app.services.rag.qa_service.stream_answer")
+    def test_astream_answer_retrieves_then_streams(self, mock_stream_answer):
+        # Arrange
+        docs = [Document(page_content="ROS is a robotics framework", metadata={}, id="a")]
+        self.mock_vdb_repo.search_with_scores.return_value = [(docs[0], 0.1)]
+
+        async def events(*args):
+            yield "sources", {"chunks_used": 1}
+            yield "token", {"text": "ROS"}
+
+        mock_stream_answer.side_effect = events
+
+        async def collect():
+            return [
+                event
+                async for event in self.service.astream_answer(
+                    "What is ROS?", "documento-pdf", titles=["ros-intro"]
+                )
+            ]
+
+        # Act
+        result = asyncio.run(collect())
+
+        # Assert
+        self.assertEqual(result, [("sources", {"chunks_used": 1}), ("token", {"text": "ROS"})])
+        call_kwargs = self.mock_vdb_repo.search_with_scores.call_args[1]
+        self.assertEqual(call_kwargs["search_kwargs"]["k"], self.settings.default_k_results)
+        self.assertEqual(call_kwargs["query"], "What is ROS?")
+        llm, prompt_text, query, documents, _, chunks_used = mock_stream_answer.call_args[0]
+        self.assertIs(llm, self.mock_llm)
+        self.assertEqual(
+            (prompt_text, query, documents), (QAService.DEFAULT_PROMPT, "What is ROS?", docs)
+        )
+        self.assertEqual(chunks_used, 1)
+
+    @patch("app.services.rag.qa_service.map_reduce_answer")
+    def test_answer_question_map_reduce_skips_context_budget(self, mock_map_reduce_answer):
+        # Arrange
+        docs = [Document(page_content="ROS is a robotics framework", metadata={}, id="a")]
+        self.mock_vdb_repo.search_with_scores.return_value = [(docs[0], 0.1)]
+        mock_map_reduce_answer.return_value = {
+            "result": "ROS is a framework",
+            "source_documents": docs,
+            "map_reduce": {"groups": 1, "relevant_groups": 1, "reduced": True},
+        }
+
+        # Act
+        result = self.service.answer_question(
+            "What is ROS?", "documento-pdf", k_results=20, chain_type="map_reduce"
+        )
+
+        # Assert
+        self.assertEqual(result["result"], "ROS is a framework")
+        self.assertEqual(result["query"], "What is ROS?")
+        self.assertEqual(result["context_tokens_saved"], 0)
+        self.assertEqual(result["chunks_used"], 1)
+        self.assertEqual(
+            self.mock_vdb_repo.search_with_scores.call_args[1]["search_kwargs"]["k"], 20
+        )
+        args, kwargs = mock_map_reduce_answer.call_args
+        self.assertEqual(args, (self.mock_llm, "What is ROS?", docs))
+        self.assertEqual(kwargs["map_prompt"], QAService.MAP_PROMPT)
+        self.assertEqual(kwargs["reduce_prompt"], QAService.REDUCE_PROMPT)
+        self.assertEqual(kwargs["max_concurrency"], self.settings.map_reduce_max_concurrency)
+
+    def test_answer_question_with_model_router_answers_on_route(self):
+        # Arrange
+        docs_and_distances = [(Document(page_content="ROS is a framework", id="a"), 0.1)]
+        self.mock_vdb_repo.search_with_scores.return_value = docs_and_distances
+        model_router = MagicMock()
+        model_router.answer.return_value = {
+            "result": "ROS is a framework",
+            "source_documents": [docs_and_distances[0][0]],
+            "route": "small",
+        }
+        service = QAService(self.settings, self.mock_llm_client, self.mock_vdb_repo, model_router)
+
+        # Act
+        result = service.answer_question("What is ROS?", "documento-pdf")
+
+        # Assert
+        self.assertEqual(result["route"], "small")
+        self.assertEqual(result["query"], "What is ROS?")
+        args, kwargs = model_router.answer.call_args
+        self.assertEqual(args, ("What is ROS?", docs_and_distances, QAService.DEFAULT_PROMPT))
+        self.assertEqual(
+            kwargs["llms"],
+            {"small": self.mock_llm_client.small_client, "full": self.mock_llm},
+        )
+        self.mock_vdb_repo.search_with_scores.assert_called_once()
+
+    def test_answer_question_rejects_unknown_chain_type(self):
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            self.service.answer_question("What is ROS?", "documento-pdf", chain_type="refine")
+
 
 if __name__ == "__main__":
     unittest.main()
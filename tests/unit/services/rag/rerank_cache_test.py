@@ -0,0 +1,82 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from langchain.schema import Document
+
+from app.services.rag.rerank_cache import RerankCache, candidate_fingerprint, rerank_cache_key
+
+
+class TestRerankCacheKey(unittest.TestCase):
+    def setUp(self):
+        self.documents = [
+            Document(page_content="ROS nodes", id="a"),
+            Document(page_content="ROS topics", id="b"),
+        ]
+
+    def test_key_ignores_query_formatting_and_candidate_order(self):
+        # Act
+        key = rerank_cache_key("What is ROS?", self.documents, "rerank-v3.5", 3)
+        repeat = rerank_cache_key("  what is  ros? ", self.documents[::-1], "rerank-v3.5", 3)
+
+        # Assert
+        self.assertEqual(key, repeat)
+
+    def test_key_changes_with_model_top_n_and_chunk_text(self):
+        # Arrange
+        key = rerank_cache_key("What is ROS?", self.documents, "rerank-v3.5", 3)
+        edited = [self.documents[0], Document(page_content="ROS services", id="b")]
+
+        # Act / Assert
+        self.assertNotEqual(key, rerank_cache_key("What is ROS?", self.documents, "other", 3))
+        self.assertNotEqual(key, rerank_cache_key("What is ROS?", self.documents, "rerank-v3.5", 2))
+        self.assertNotEqual(key, rerank_cache_key("What is ROS?", edited, "rerank-v3.5", 3))
+
+    def test_fingerprint_includes_chunk_id(self):
+        self.assertNotEqual(
+            candidate_fingerprint(Document(page_content="same", id="a")),
+            candidate_fingerprint(Document(page_content="same", id="b")),
+        )
+
+
+class TestRerankCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp_dir.name) / "rerank.sqlite3")
+        self.cache = RerankCache(self.path, max_entries=2)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_get_returns_stored_results(self):
+        # Act
+        self.cache.put("k1", [("b:1", 0.9), ("a:2", 0.4)])
+
+        # Assert
+        self.assertEqual(self.cache.get("k1"), [("b:1", 0.9), ("a:2", 0.4)])
+        self.assertIsNone(self.cache.get("unknown"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        # Arrange
+        self.cache.put("k1", [("a", 0.1)])
+        self.cache.put("k2", [("b", 0.1)])
+        self.cache.get("k1")
+
+        # Act
+        self.cache.put("k3", [("c", 0.1)])
+
+        # Assert
+        self.assertIsNotNone(self.cache.get("k1"))
+        self.assertIsNone(self.cache.get("k2"))
+        self.assertIsNotNone(self.cache.get("k3"))
+
+    def test_entries_are_shared_between_instances(self):
+        # Arrange
+        self.cache.put("k1", [("a", 0.1)])
+
+        # Act / Assert
+        self.assertEqual(RerankCache(self.path).get("k1"), [("a", 0.1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,12 @@
 import json
+from pathlib import Path
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch
 
+from langchain.schema import Document
+from langchain_core.language_models import FakeListChatModel
+
 from app.core.config import Settings
 from app.services.rag.rerank_service import RerankService
 
@@ -35,101 +40,234 @@ class TestRerankService(unittest.TestCase):
             default_chunk_overlap=self.settings_snapshot["default_chunk_overlap"],
         )
 
-        # Mock LLMClient
+        # Mock LLMClient (fake chat model: the chain is built once at construction)
         self.mock_llm_client = MagicMock()
-        self.mock_llm = MagicMock()
+        self.mock_llm = FakeListChatModel(responses=["answer"])
         self.mock_llm_client.client = self.mock_llm
 
         # Mock VectorDBRepository
         self.mock_vdb_repo = MagicMock()
-        self.mock_retriever = MagicMock()
-        self.mock_vdb_repo.as_retriever.return_value = self.mock_retriever
-
-        # Create service instance
-        self.service = RerankService(
-            self.settings,
-            self.mock_llm_client,
-            self.mock_vdb_repo,
+        self.docs = [
+            Document(page_content=f"ROS chunk {i}", metadata={"pagina": i}, id=str(i))
+            for i in range(4)
+        ]
+        self.mock_vdb_repo.search_with_scores.return_value = [(doc, 0.1) for doc in self.docs]
+
+        # Word count as token count (no tokenizer download)
+        patcher = patch(
+            "app.services.rag.context_packer.count_tokens",
+            side_effect=lambda text, model: len(text.split()),
         )
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
-    @patch("app.services.rag.rerank_service.StrOutputParser")
-    @patch("app.services.rag.rerank_service.RunnableParallel")
-    @patch("app.services.rag.rerank_service.ChatPromptTemplate.from_template")
-    @patch("app.services.rag.rerank_service.ContextualCompressionRetriever")
-    @patch("app.services.rag.rerank_service.CohereRerank")
-    def test_answer_question_with_golden_response(
-        self,
-        mock_cohere_rerank,
-        mock_compression_retriever,
-        mock_chat_prompt,
-        mock_runnable_parallel,
-        mock_str_parser,
-    ):
+        # Create service instance (Cohere client mocked)
+        with patch("app.services.rag.rerank_service.CohereRerank") as mock_cohere_rerank:
+            self.mock_reranker = mock_cohere_rerank.return_value
+            self.mock_reranker.rerank.return_value = [
+                {"index": 2, "relevance_score": 0.9},
+                {"index": 0, "relevance_score": 0.5},
+            ]
+            self.service = RerankService(
+                self.settings,
+                self.mock_llm_client,
+                self.mock_vdb_repo,
+            )
+        self.mock_cohere_rerank = mock_cohere_rerank
+
+    def test_answer_question_with_golden_response(self):
         """Test rerank QA service returns expected answer using golden response."""
         query = self.golden_response["input"]["query"]
         document_type = "documento-pdf"
         expected_answer = self.golden_response["response"]["content"]
+        self.mock_llm.responses = [expected_answer]
 
-        # Mock components
-        mock_cohere_rerank.return_value = MagicMock()
-        mock_compression_retriever.return_value = MagicMock()
-        mock_chat_prompt.return_value = MagicMock()
-        mock_str_parser.return_value = MagicMock()
+        # Act
+        result = self.service.answer_question(query, document_type)
 
-        # Mock the LCEL chain to return expected answer
-        mock_chain = MagicMock()
-        mock_chain.invoke.return_value = expected_answer
+        # Assert - answer next to the reranked context, most relevant first
+        self.assertEqual(result["result"], expected_answer)
+        self.assertEqual(
+            [doc.page_content for doc in result["source_documents"]],
+            ["ROS chunk 0", "ROS chunk 2"],
+        )
+        self.assertEqual(
+            sorted(doc.metadata["relevance_score"] for doc in result["source_documents"]),
+            [0.5, 0.9],
+        )
+        self.assertIn("context_tokens", result)
+        self.assertNotIn("relevance_score", self.docs[2].metadata)
+
+    def test_answer_question_creates_cohere_reranker_once(self):
+        """Test that the Cohere reranker is created once and top_n is passed per request."""
+        # Act
+        self.service.answer_question("What is ROS?", "documento-pdf")
+        self.service.answer_question("What is ROS?", "documento-pdf", rerank_top_n=1)
+
+        # Assert
+        self.mock_cohere_rerank.assert_called_once()
+        call_kwargs = self.mock_cohere_rerank.call_args[1]
+        self.assertEqual(call_kwargs["top_n"], self.settings.default_rerank_top_n)
+        self.assertEqual(call_kwargs["model"], self.settings.cohere_model)
+        top_ns = [call[1]["top_n"] for call in self.mock_reranker.rerank.call_args_list]
+        self.assertEqual(top_ns, [self.settings.default_rerank_top_n, 1])
+        search_kwargs = self.mock_vdb_repo.search_with_scores.call_args[1]["search_kwargs"]
+        self.assertEqual(search_kwargs["k"], self.settings.default_k_results)
 
-        # Mock RunnableParallel to return a chain that produces the expected result
-        mock_setup = MagicMock()
-        mock_setup.__or__.return_value.__or__.return_value.__or__.return_value = mock_chain
-        mock_runnable_parallel.return_value = mock_setup
+    def test_answer_question_local_rerank_mode_skips_cohere(self):
+        """Test that the local rerank mode re-scores stored embeddings with no Cohere call."""
+        # Arrange
+        self.mock_vdb_repo.chunk_embeddings.return_value = {
+            doc.id: [1.0, 0.0] if doc.id == "3" else [0.0, 1.0] for doc in self.docs
+        }
+        self.mock_vdb_repo.embed_query.return_value = [1.0, 0.0]
 
         # Act
-        result = self.service.answer_question(query, document_type)
+        result = self.service.answer_question(
+            "What is ROS?", "documento-pdf", rerank_top_n=1, rerank_mode="local"
+        )
 
         # Assert
-        self.assertEqual(result, expected_answer)
-        mock_chain.invoke.assert_called_once_with(query)
-
-    @patch("app.services.rag.rerank_service.StrOutputParser")
-    @patch("app.services.rag.rerank_service.RunnableParallel")
-    @patch("app.services.rag.rerank_service.ChatPromptTemplate.from_template")
-    @patch("app.services.rag.rerank_service.ContextualCompressionRetriever")
-    @patch("app.services.rag.rerank_service.CohereRerank")
-    def test_answer_question_creates_cohere_reranker(
-        self,
-        mock_cohere_rerank,
-        mock_compression_retriever,
-        mock_chat_prompt,
-        mock_runnable_parallel,
-        mock_str_parser,
-    ):
-        """Test that Cohere reranker is created with correct parameters."""
-        query = "What is ROS?"
-        document_type = "documento-pdf"
+        self.mock_reranker.rerank.assert_not_called()
+        self.assertEqual([doc.id for doc in result["source_documents"]], ["3"])
+        self.assertIn("relevance_score", result["source_documents"][0].metadata)
 
-        # Mock components
-        mock_cohere_rerank.return_value = MagicMock()
-        mock_compression_retriever.return_value = MagicMock()
-        mock_chat_prompt.return_value = MagicMock()
-        mock_str_parser.return_value = MagicMock()
+    def test_answer_question_rejects_unknown_rerank_mode(self):
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            self.service.answer_question("What is ROS?", "documento-pdf", rerank_mode="bm25")
 
-        # Mock chain
-        mock_chain = MagicMock()
-        mock_chain.invoke.return_value = "Test answer"
-        mock_setup = MagicMock()
-        mock_setup.__or__.return_value.__or__.return_value.__or__.return_value = mock_chain
-        mock_runnable_parallel.return_value = mock_setup
+    def _cached_service(self) -> RerankService:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings = self.settings.model_copy(
+            update={
+                "rerank_cache_enabled": True,
+                "rerank_cache_path": str(Path(tmp_dir.name) / "rerank.sqlite3"),
+            }
+        )
+        with patch("app.services.rag.rerank_service.CohereRerank", self.mock_cohere_rerank):
+            return RerankService(settings, self.mock_llm_client, self.mock_vdb_repo)
+
+    def test_repeated_question_reuses_cached_rerank(self):
+        """Test that a repeat over the same candidates (any order) skips the Cohere call."""
+        # Arrange
+        service = self._cached_service()
+        service.answer_question("What is ROS?", "documento-pdf", rerank_top_n=2)
+        self.mock_vdb_repo.search_with_scores.return_value = [(doc, 0.1) for doc in self.docs[::-1]]
 
         # Act
-        self.service.answer_question(query, document_type)
+        result = service.answer_question("what is ros?", "documento-pdf", rerank_top_n=2)
 
         # Assert
-        mock_cohere_rerank.assert_called_once()
-        call_kwargs = mock_cohere_rerank.call_args[1]
-        self.assertEqual(call_kwargs["top_n"], self.settings.default_rerank_top_n)
-        self.assertEqual(call_kwargs["model"], self.settings.cohere_model)
+        self.mock_reranker.rerank.assert_called_once()
+        self.assertEqual(
+            {doc.id: doc.metadata["relevance_score"] for doc in result["source_documents"]},
+            {"2": 0.9, "0": 0.5},
+        )
+
+    def test_changed_candidate_chunk_misses_the_rerank_cache(self):
+        """Test that an edited candidate chunk is reranked again."""
+        # Arrange
+        service = self._cached_service()
+        service.answer_question("What is ROS?", "documento-pdf", rerank_top_n=2)
+        edited = [*self.docs[:3], Document(page_content="edited", metadata={"pagina": 3}, id="3")]
+        self.mock_vdb_repo.search_with_scores.return_value = [(doc, 0.1) for doc in edited]
+
+        # Act
+        service.answer_question("What is ROS?", "documento-pdf", rerank_top_n=2)
+
+        # Assert
+        self.assertEqual(self.mock_reranker.rerank.call_count, 2)
+
+    def _skipping_service(self) -> RerankService:
+        settings = self.settings.model_copy(
+            update={"rerank_skip_enabled": True, "rerank_skip_min_gap": 0.5}
+        )
+        self.mock_vdb_repo.distance_space = "cosine"
+        with patch("app.services.rag.rerank_service.CohereRerank", self.mock_cohere_rerank):
+            return RerankService(settings, self.mock_llm_client, self.mock_vdb_repo)
+
+    def test_decisive_vector_scores_skip_the_rerank(self):
+        """Test that a top-1 far ahead of the rest keeps the vector order with no Cohere call."""
+        # Arrange
+        service = self._skipping_service()
+        self.mock_vdb_repo.search_with_scores.return_value = [
+            (self.docs[0], 0.5),
+            (self.docs[1], 0.1),
+            (self.docs[2], 0.6),
+            (self.docs[3], 0.7),
+        ]
+
+        # Act
+        result = service.answer_question("What is ROS?", "documento-pdf", rerank_top_n=2)
+
+        # Assert
+        self.mock_reranker.rerank.assert_not_called()
+        self.assertEqual(result["rerank"], "skipped")
+        self.assertEqual(
+            {doc.id: doc.metadata["vector_distance"] for doc in result["source_documents"]},
+            {"1": 0.1, "0": 0.5},
+        )
+        self.assertEqual(service.metrics.snapshot()["cohere"]["skipped"], 1)
+
+    def test_rerank_skipping_is_disabled_outside_the_cosine_space(self):
+        """Test that l2 distances (other scale) never skip the rerank."""
+        # Arrange
+        settings = self.settings.model_copy(update={"rerank_skip_enabled": True})
+        self.mock_vdb_repo.distance_space = "l2"
+        with patch("app.services.rag.rerank_service.CohereRerank", self.mock_cohere_rerank):
+            service = RerankService(settings, self.mock_llm_client, self.mock_vdb_repo)
+        self.mock_vdb_repo.search_with_scores.return_value = [
+            (doc, 0.1 if i == 0 else 1.2) for i, doc in enumerate(self.docs)
+        ]
+
+        # Act
+        result = service.answer_question("What is ROS?", "documento-pdf", rerank_top_n=2)
+
+        # Assert
+        self.assertEqual(result["rerank"], "cohere")
+        self.mock_reranker.rerank.assert_called_once()
+
+    def test_routed_answer_uses_vector_distances_of_reranked_chunks(self):
+        """Test that the cascade routes on vector distances, not rerank relevance."""
+        # Arrange
+        model_router = MagicMock()
+        model_router.answer.return_value = {"result": "answer", "source_documents": []}
+        with patch("app.services.rag.rerank_service.CohereRerank", self.mock_cohere_rerank):
+            service = RerankService(
+                self.settings, self.mock_llm_client, self.mock_vdb_repo, model_router
+            )
+        self.mock_vdb_repo.search_with_scores.return_value = [
+            (doc, [0.1, 0.2, 0.3, 0.4][i]) for i, doc in enumerate(self.docs)
+        ]
+
+        # Act
+        result = service.answer_question("What is ROS?", "documento-pdf", rerank_top_n=2)
+
+        # Assert - rerank order (chunks 2 then 0) with their vector distances
+        docs_and_distances = model_router.answer.call_args.args[1]
+        self.assertEqual(
+            [(doc.id, distance) for doc, distance in docs_and_distances],
+            [("2", 0.3), ("0", 0.1)],
+        )
+        self.assertEqual(result["rerank"], "cohere")
+
+    def test_close_vector_scores_are_reranked(self):
+        """Test that candidates with close scores still go through Cohere."""
+        # Arrange
+        service = self._skipping_service()
+        self.mock_vdb_repo.search_with_scores.return_value = [
+            (doc, 0.3 + 0.01 * i) for i, doc in enumerate(self.docs)
+        ]
+
+        # Act
+        result = service.answer_question("What is ROS?", "documento-pdf", rerank_top_n=2)
+
+        # Assert
+        self.mock_reranker.rerank.assert_called_once()
+        self.assertEqual(result["rerank"], "cohere")
+        self.assertEqual(service.metrics.snapshot()["cohere"]["reranked"], 1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+import unittest
+
+from app.services.rag.rerank_skip import (
+    CACHED,
+    SKIPPED,
+    RerankMetrics,
+    ScoreSignals,
+    is_decisive,
+    score_signals,
+)
+
+
+class TestScoreSignals(unittest.TestCase):
+    def test_top_gap_is_relative_to_the_best_distance(self):
+        # Act - any order
+        signals = score_signals([0.4, 0.2, 0.5], temperature=0.05)
+
+        # Assert
+        self.assertEqual(signals.candidates, 3)
+        self.assertAlmostEqual(signals.top_gap or 0.0, 1.0)
+
+    def test_entropy_is_low_for_a_dominant_candidate_and_one_for_ties(self):
+        # Act
+        dominant = score_signals([0.1, 0.5, 0.5, 0.5], temperature=0.05)
+        ties = score_signals([0.3, 0.3, 0.3, 0.3], temperature=0.05)
+
+        # Assert
+        self.assertLess(dominant.entropy or 1.0, 0.01)
+        self.assertAlmostEqual(ties.entropy or 0.0, 1.0)
+
+    def test_single_candidate_has_no_distribution_signals(self):
+        self.assertEqual(score_signals([0.2], temperature=0.05), ScoreSignals(1, None, None))
+
+
+class TestIsDecisive(unittest.TestCase):
+    def test_gap_or_entropy_thresholds_decide(self):
+        # Arrange
+        signals = ScoreSignals(candidates=4, top_gap=0.6, entropy=0.4)
+
+        # Act / Assert
+        self.assertTrue(is_decisive(signals, min_gap=0.5, max_entropy=None))
+        self.assertFalse(is_decisive(signals, min_gap=0.8, max_entropy=None))
+        self.assertTrue(is_decisive(signals, min_gap=0.8, max_entropy=0.5))
+        self.assertFalse(is_decisive(signals, min_gap=None, max_entropy=0.3))
+
+    def test_single_candidate_is_decisive(self):
+        self.assertTrue(is_decisive(ScoreSignals(1, None, None), min_gap=None, max_entropy=None))
+
+
+class TestRerankMetrics(unittest.TestCase):
+    def test_snapshot_reports_skip_rate_and_latency_saved(self):
+        # Arrange
+        metrics = RerankMetrics()
+
+        # Act
+        metrics.record("cohere", "cohere", 200.0)
+        metrics.record("cohere", "cohere", 100.0)
+        metrics.record("cohere", CACHED, 5.0)
+        metrics.record("cohere", SKIPPED, 1.0)
+        snapshot = metrics.snapshot()
+
+        # Assert - saved: one skip, 150 ms average rerank against 1 ms for the skip
+        self.assertEqual(
+            snapshot["cohere"],
+            {
+                "requests": 4,
+                "reranked": 2,
+                "cached": 1,
+                "skipped": 1,
+                "skip_rate": 0.25,
+                "rerank_latency_ms_avg": 150.0,
+                "latency_ms_saved": 149.0,
+            },
+        )
+
+    def test_latency_saved_is_zero_before_any_rerank(self):
+        # Arrange
+        metrics = RerankMetrics()
+
+        # Act
+        metrics.record("local", SKIPPED, 1.0)
+
+        # Assert
+        self.assertEqual(metrics.snapshot()["local"]["latency_ms_saved"], 0.0)
+        self.assertEqual(metrics.snapshot()["local"]["skip_rate"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
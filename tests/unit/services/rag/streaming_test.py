@@ -0,0 +1,93 @@
+import asyncio
+import time
+import unittest
+
+from langchain.schema import Document
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+from app.services.rag.streaming import format_context, stream_answer
+
+
+class UsageFakeChatModel(GenericFakeChatModel):
+    """Fake chat model that reports token usage on a final empty chunk, like ChatOpenAI."""
+
+    prompts: list = []
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(messages[0].content)
+        for token in ("ROS ", "is ", "a framework"):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15},
+            )
+        )
+
+
+async def collect(events) -> list[tuple[str, dict]]:
+    return [event async for event in events]
+
+
+class TestStreamAnswer(unittest.TestCase):
+    def setUp(self):
+        self.documents = [
+            Document(page_content="ROS intro", metadata={"titulo": "ros", "pagina": 0}, id="a"),
+            Document(page_content="ROS nodes", metadata={"titulo": "ros", "pagina": 1}, id="b"),
+        ]
+
+    def test_events_are_sources_tokens_then_done(self):
+        # Arrange
+        llm = UsageFakeChatModel(messages=iter([]), prompts=[])
+
+        # Act
+        events = asyncio.run(
+            collect(
+                stream_answer(
+                    llm, "{context}|{question}", "What is ROS?", self.documents, time.perf_counter()
+                )
+            )
+        )
+
+        # Assert
+        names = [name for name, _ in events]
+        self.assertEqual(names, ["sources", "token", "token", "token", "done"])
+        self.assertEqual(
+            events[0][1]["source_documents"],
+            [
+                {"id": "a", "metadata": {"titulo": "ros", "pagina": 0}},
+                {"id": "b", "metadata": {"titulo": "ros", "pagina": 1}},
+            ],
+        )
+        self.assertEqual(
+            "".join(data["text"] for name, data in events if name == "token"), "ROS is a framework"
+        )
+        done = events[-1][1]
+        self.assertEqual(done["usage"]["total_tokens"], 15)
+        self.assertLessEqual(done["timing"]["first_token_ms"], done["timing"]["total_ms"])
+        self.assertEqual(llm.prompts, ["ROS intro\n\nROS nodes|What is ROS?"])
+
+    def test_sources_report_chunks_used_before_packing(self):
+        # Arrange - both chunks were packed into one block
+        llm = UsageFakeChatModel(messages=iter([]), prompts=[])
+        packed = [Document(page_content="ROS intro\nROS nodes", metadata={}, id="a")]
+
+        # Act
+        events = asyncio.run(
+            collect(stream_answer(llm, "{context}|{question}", "Q", packed, time.perf_counter(), 2))
+        )
+
+        # Assert
+        self.assertEqual(
+            events[0],
+            ("sources", {"source_documents": [{"id": "a", "metadata": {}}], "chunks_used": 2}),
+        )
+
+    def test_format_context_joins_chunks(self):
+        self.assertEqual(format_context(self.documents), "ROS intro\n\nROS nodes")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import unittest
+
+from app.utils.single_flight import SingleFlight, normalize_query
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_identical_calls_share_one_computation(self):
+        # Arrange
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(timeout=5)
+            return "answer"
+
+        # Act
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            leader = executor.submit(single_flight.do, "key", compute)
+            started.wait(timeout=5)
+            followers = [executor.submit(single_flight.do, "key", compute) for _ in range(4)]
+            # Let followers join the in-flight call before the leader finishes
+            time.sleep(0.1)
+            release.set()
+            results = [future.result() for future in [leader, *followers]]
+
+        # Assert
+        self.assertEqual(results, ["answer"] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_different_keys_run_independently(self):
+        single_flight = SingleFlight()
+
+        self.assertEqual(single_flight.do("a", lambda: 1), 1)
+        self.assertEqual(single_flight.do("b", lambda: 2), 2)
+
+    def test_completed_calls_are_not_cached(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        single_flight.do("key", lambda: calls.append(1))
+        single_flight.do("key", lambda: calls.append(1))
+
+        self.assertEqual(len(calls), 2)
+
+    def test_exception_is_propagated_and_key_released(self):
+        single_flight = SingleFlight()
+
+        def fail():
+            raise RuntimeError("LLM error")
+
+        with self.assertRaises(RuntimeError):
+            single_flight.do("key", fail)
+        self.assertEqual(single_flight.do("key", lambda: "ok"), "ok")
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  What IS   ROS?\n"), "what is ros?")
+
+
+if __name__ == "__main__":
+    unittest.main()